@@ -0,0 +1,131 @@
+import json
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.env import env_bool, env_float, env_int
+from app.metrics import access_log_records_total
+from app.request_context import RequestContext, add_request_finished_hook
+
+# 구조화된 접근 로그 (JSON 한 줄에 요청 하나)
+# - 요청 종료 훅에서는 필드만 모아 큐에 넣고, 직렬화와 파일 쓰기는 백그라운드 스레드가 모아서 처리
+# - 큐가 가득 차면 요청을 막지 않고 버린 뒤 diary_access_log_records_total{result="dropped"}로 집계
+# - 에러(4xx/5xx)와 느린 요청은 항상, 나머지는 ACCESS_LOG_SAMPLE_RATE 비율만 기록
+#   (기록마다 sample_rate를 남겨 1/sample_rate를 곱하면 전체 건수를 추정할 수 있음, 정확한 건수는 /metrics)
+# - 이 로그를 켜면 uvicorn 기본 접근 로그는 끔 (app/server.py)
+
+ENABLED = env_bool("ACCESS_LOG_ENABLED", True)
+# 비워두면 표준 출력
+LOG_FILE = os.environ.get("ACCESS_LOG_FILE", "")
+SAMPLE_RATE = min(max(env_float("ACCESS_LOG_SAMPLE_RATE", 0.1), 0.0), 1.0)
+SLOW_MS = env_float("ACCESS_LOG_SLOW_MS", 500.0)
+QUEUE_SIZE = env_int("ACCESS_LOG_QUEUE_SIZE", 10000)
+# 한 번에 모아 쓰는 최대 기록 수
+BATCH_SIZE = 256
+
+_STOP = object()
+
+
+def should_log(context: RequestContext, sample_rate: float = SAMPLE_RATE, slow_ms: float = SLOW_MS) -> bool:
+    """에러와 느린 요청은 항상, 그 외는 샘플링"""
+    if context.status_code >= 400 or context.status_code == 0:
+        return True
+    # SSE 스트림은 연결 시간이 길 뿐 느린 요청이 아님
+    if context.elapsed * 1000 >= slow_ms and not context.route.endswith("/events"):
+        return True
+    return sample_rate >= 1.0 or random.random() < sample_rate
+
+
+class AccessLogWriter:
+    """큐에 쌓인 접근 로그 기록을 백그라운드 스레드에서 JSON 줄로 기록"""
+
+    def __init__(self, path: str = LOG_FILE, queue_size: int = QUEUE_SIZE, sample_rate: float = SAMPLE_RATE,
+                 slow_ms: float = SLOW_MS):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # fork 전(gunicorn preload)에 스레드를 만들지 않도록 첫 기록 시점에 시작
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+                    self._thread.start()
+
+    def record(self, context: RequestContext):
+        """요청 종료 훅: 기록 대상이면 큐에 넣음 (블로킹 없음)"""
+        if not should_log(context, self.sample_rate, self.slow_ms):
+            access_log_records_total.inc("sampled_out")
+            return
+        sampled = context.status_code < 400 and context.elapsed * 1000 < self.slow_ms
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "method": context.method,
+            "route": context.route,
+            "status": context.status_code,
+            "duration_ms": round(context.elapsed * 1000, 2),
+            "db_commands": context.db_commands,
+            "db_ms": round(context.db_time * 1000, 2),
+            "route_class": context.route_class or None,
+            "sample_rate": self.sample_rate if sampled else 1.0,
+        }
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            access_log_records_total.inc("dropped")
+
+    def _open(self):
+        if not self.path:
+            return sys.stdout
+        return open(self.path, "a", encoding="utf-8", buffering=1024 * 64)
+
+    def _run(self):
+        stream = self._open()
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                # 이미 쌓인 기록은 한 번의 write/flush로 처리
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = any(entry is _STOP for entry in batch)
+                lines = [json.dumps(entry, ensure_ascii=False, default=str) for entry in batch if entry is not _STOP]
+                if lines:
+                    stream.write("\n".join(lines) + "\n")
+                    stream.flush()
+                    access_log_records_total.inc("written", amount=len(lines))
+                if stop:
+                    return
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+    def stop(self, timeout: float = 5.0):
+        """남은 기록을 쓰고 스레드 종료"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+        self._thread = None
+
+
+writer = AccessLogWriter()
+
+if ENABLED:
+    add_request_finished_hook(writer.record)
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.env import env_float, env_int
+from app.database import get_repositories
+from app.images import make_thumbnail, probe
+from app.jobs import enqueue, job
+from app.metrics import image_collections_total, image_uploads_total
+
+# 일기 첨부 이미지 (내용 주소 저장소)
+# - 업로드 본문을 받으면서 SHA-256을 계산해 임시 파일에 쓰고, 다이제스트를 파일 이름으로 옮김
+#   (같은 이미지는 몇 번을 올려도 파일 하나, 받는 도중 IMAGE_MAX_BYTES를 넘으면 바로 중단)
+# - images 컬렉션에 다이제스트별 메타데이터와 참조 수(refs)를 두고 일기 작성/수정/삭제가 참조 수를 증감.
+#   일기 문서에는 (다이제스트, 확장자, 가로, 세로)만 저장해 목록 응답이 추가 조회 없이 URL을 만듦
+# - 파일 URL은 내용이 바뀌지 않으므로 1년 immutable 캐시, Range 요청 지원 (app/routes/image.py)
+# - 썸네일은 작업 프로세스 풀에서 만들고(image.thumbnail), 만들어지기 전에는 원본으로 보냄
+# - 참조가 없는 이미지는 IMAGE_ORPHAN_GRACE_SECONDS 뒤 image.collect 작업이 지움. 파일을 먼저 휴지통으로
+#   옮기고 문서를 조건부로 지운 뒤, 그 사이 다시 올라오거나 붙었으면(문서 삭제 실패) 파일을 되돌림
+# - 저장소 디렉터리(IMAGE_STORE_DIR)는 여러 워커가 같은 곳을 봐야 함 (/uploads 정적 마운트 밖)
+
+STORE_DIR = Path(os.environ.get("IMAGE_STORE_DIR", "data/images"))
+MAX_BYTES = env_int("IMAGE_MAX_BYTES", 10 * 1024 * 1024)
+UPLOAD_TIMEOUT_SECONDS = env_float("IMAGE_UPLOAD_TIMEOUT_SECONDS", 30.0)
+ORPHAN_GRACE_SECONDS = env_float("IMAGE_ORPHAN_GRACE_SECONDS", 86400.0)
+
+URL_PREFIX = "/api/images"
+THUMBNAIL_SUFFIX = "thumb.webp"
+# Pillow 형식 -> (확장자, Content-Type)
+FORMATS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "PNG": ("png", "image/png"),
+    "GIF": ("gif", "image/gif"),
+    "WEBP": ("webp", "image/webp"),
+}
+CONTENT_TYPES = {ext: content_type for ext, content_type in FORMATS.values()}
+CONTENT_TYPES[THUMBNAIL_SUFFIX] = "image/webp"
+# 디스크 쓰기와 해시 계산을 스레드로 넘기는 단위
+_WRITE_CHUNK = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def original_path(digest: str, ext: str) -> Path:
+    return STORE_DIR / digest[:2] / f"{digest}.{ext}"
+
+
+def thumbnail_path(digest: str) -> Path:
+    return STORE_DIR / digest[:2] / f"{digest}.{THUMBNAIL_SUFFIX}"
+
+
+def image_view(entry: dict) -> dict:
+    """일기 문서의 첨부 항목을 응답 형태로"""
+    digest = entry["id"]
+    return {
+        "id": digest,
+        "url": f"{URL_PREFIX}/{digest}.{entry['ext']}",
+        "thumbnail_url": f"{URL_PREFIX}/{digest}.{THUMBNAIL_SUFFIX}",
+        "width": entry["width"],
+        "height": entry["height"],
+    }
+
+
+def _open_temporary():
+    directory = STORE_DIR / "tmp"
+    directory.mkdir(parents=True, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=directory, suffix=".upload", delete=False)
+
+
+def _write(handle, hasher, data: bytearray):
+    hasher.update(data)
+    handle.write(data)
+
+
+def _discard(handle, path: Path):
+    handle.close()
+    path.unlink(missing_ok=True)
+
+
+async def receive(chunks: AsyncIterator[bytes]) -> Tuple[Path, str, int]:
+    """요청 본문을 임시 파일로 받으며 SHA-256 계산 (MAX_BYTES를 넘으면 UploadTooLarge)"""
+    handle = await asyncio.to_thread(_open_temporary)
+    path = Path(handle.name)
+    hasher = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > MAX_BYTES:
+                raise UploadTooLarge()
+            buffer += chunk
+            if len(buffer) >= _WRITE_CHUNK:
+                data, buffer = buffer, bytearray()
+                await asyncio.to_thread(_write, handle, hasher, data)
+        await asyncio.to_thread(_write, handle, hasher, buffer)
+        await asyncio.to_thread(handle.close)
+    except BaseException:
+        _discard(handle, path)
+        raise
+    return path, hasher.hexdigest(), size
+
+
+def _commit(temporary: Path, target: Path) -> Tuple[bool, bool]:
+    """임시 파일을 다이제스트 이름으로 옮김 (이미 있으면 버림). (새로 저장했는지, 썸네일이 있는지)"""
+    if target.exists():
+        temporary.unlink()
+        created = False
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temporary, target)
+        created = True
+    return created, thumbnail_path(target.name.split(".", 1)[0]).exists()
+
+
+async def store(chunks: AsyncIterator[bytes]) -> dict:
+    """업로드를 저장소에 넣고 images 문서 반환 (형식이 잘못됐으면 ValueError)"""
+    try:
+        temporary, digest, size = await receive(chunks)
+    except UploadTooLarge:
+        image_uploads_total.inc("too_large")
+        raise
+    try:
+        info = await asyncio.to_thread(probe, temporary)
+        if info["format"] not in FORMATS:
+            raise ValueError("Unsupported image format")
+    except BaseException as exc:
+        temporary.unlink(missing_ok=True)
+        if isinstance(exc, ValueError):
+            image_uploads_total.inc("invalid")
+        raise
+
+    ext, content_type = FORMATS[info["format"]]
+    metadata = {"ext": ext, "content_type": content_type, "size": size,
+                "width": info["width"], "height": info["height"]}
+    repos = get_repositories()
+    try:
+        # 문서의 updated_at을 파일보다 먼저 갱신해야 정리 작업이 방금 올린 파일을 지우지 않음
+        await repos.images.register(digest, metadata, datetime.now(timezone.utc))
+        created, has_thumbnail = await asyncio.to_thread(_commit, temporary, original_path(digest, ext))
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+    if not has_thumbnail:
+        await enqueue("image.thumbnail", {
+            "source": str(original_path(digest, ext).resolve()),
+            "target": str(thumbnail_path(digest).resolve()),
+        }, key=f"image.thumbnail:{digest}")
+    # 일기에 붙이지 않은 업로드도 유예 기간 뒤 정리 (다시 올리면 같은 작업이 뒤로 밀림)
+    await enqueue("image.collect", {"digest": digest}, delay=ORPHAN_GRACE_SECONDS, key=f"image.collect:{digest}")
+    image_uploads_total.inc("stored" if created else "deduplicated")
+    return {"_id": digest, **metadata}
+
+
+async def attach(digests: List[str]) -> List[dict]:
+    """일기에 붙일 이미지의 참조 수를 올리고 일기 문서에 저장할 항목 반환 (없는 이미지가 있으면 LookupError)"""
+    if not digests:
+        return []
+    repos = get_repositories()
+    images = await repos.images.get_many(digests)
+    if len(images) == len(digests):
+        found = await repos.images.add_refs(digests, 1, datetime.now(timezone.utc))
+        if found == len(digests):
+            return [
+                {"id": digest, "ext": images[digest]["ext"],
+                 "width": images[digest]["width"], "height": images[digest]["height"]}
+                for digest in digests
+            ]
+        # 확인과 증가 사이에 정리된 이미지가 있으면 올린 참조를 되돌림
+        await detach(digests)
+    raise LookupError("Image not found")
+
+
+async def detach(digests: List[str]):
+    """참조 수를 내리고 유예 기간 뒤 정리 예약 (여러 번 나온 이미지는 그만큼 내림, 참조가 남으면 정리 작업이 그대로 둠)"""
+    counts = Counter(digests)
+    if not counts:
+        return
+    repos = get_repositories()
+    now = datetime.now(timezone.utc)
+    for amount in sorted(set(counts.values())):
+        await repos.images.add_refs([digest for digest, count in counts.items() if count == amount], -amount, now)
+    await enqueue("image.collect", {"digests": list(counts)}, delay=ORPHAN_GRACE_SECONDS)
+
+
+job("image.thumbnail", cpu_bound=True)(make_thumbnail)
+
+
+def _trash_path(path: Path) -> Path:
+    return STORE_DIR / "trash" / path.name
+
+
+def _move_to_trash(paths: List[Path]):
+    (STORE_DIR / "trash").mkdir(parents=True, exist_ok=True)
+    for path in paths:
+        try:
+            os.replace(path, _trash_path(path))
+        except FileNotFoundError:
+            pass
+
+
+def _restore_from_trash(paths: List[Path]):
+    for path in paths:
+        trash = _trash_path(path)
+        if not trash.exists():
+            continue
+        # 그 사이 같은 내용이 다시 올라왔으면 그쪽을 남김
+        if path.exists():
+            trash.unlink(missing_ok=True)
+        else:
+            os.replace(trash, path)
+
+
+def _empty_trash(digest: str):
+    for trash in (STORE_DIR / "trash").glob(f"{digest}.*"):
+        trash.unlink(missing_ok=True)
+
+
+@job("image.collect")
+async def collect_images(payload: dict) -> int:
+    """참조 없이 유예 기간이 지난 이미지의 파일과 문서 삭제 (중간에 멈춰도 다시 실행하면 정리됨), 지운 수 반환"""
+    digests = payload.get("digests") or [payload["digest"]]
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ORPHAN_GRACE_SECONDS)
+    images = await get_repositories().images.get_many(digests)
+    collected = 0
+    for digest in digests:
+        collected += await _collect(digest, images.get(digest), cutoff)
+    return collected
+
+
+async def _collect(digest: str, image: Optional[dict], cutoff: datetime) -> bool:
+    if image is None:
+        # 이전 실행이 문서를 지운 뒤 멈췄으면 휴지통만 비움
+        await asyncio.to_thread(_empty_trash, digest)
+        return False
+
+    paths = [original_path(digest, image["ext"]), thumbnail_path(digest)]
+    updated_at = image["updated_at"]
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    if image["refs"] > 0 or updated_at >= cutoff:
+        # 이전 실행이 휴지통에 옮긴 뒤 멈췄으면 되돌림
+        await asyncio.to_thread(_restore_from_trash, paths)
+        image_collections_total.inc("kept")
+        return False
+
+    await asyncio.to_thread(_move_to_trash, paths)
+    if await get_repositories().images.delete_unreferenced(digest, cutoff):
+        await asyncio.to_thread(_empty_trash, digest)
+        image_collections_total.inc("deleted")
+        return True
+    await asyncio.to_thread(_restore_from_trash, paths)
+    image_collections_total.inc("kept")
+    return False
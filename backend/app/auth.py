@@ -1,5 +1,9 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
+import hashlib
+import secrets
+import time
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -9,18 +13,23 @@ from bson import ObjectId
 import os
 from dotenv import load_dotenv
 
+from app.env import env_int
 from app.models.user import TokenData, UserResponse
-from app.database import get_database
+from app.database import get_repositories
+from app.metrics import cache_requests_total
+from app.request_context import current_request
 
 load_dotenv()
 
 # JWT configuration (use environment variables in production)
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
-try:
-    ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-except ValueError:
-    ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = env_int("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
+REFRESH_TOKEN_EXPIRE_DAYS = env_int("REFRESH_TOKEN_EXPIRE_DAYS", 14)
+# 교체 직후 같은 토큰이 다시 오는 것은 동시 요청(여러 탭)으로 보고 계열을 폐기하지 않는 시간
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = env_int("REFRESH_TOKEN_REUSE_GRACE_SECONDS", 10)
+# 검증된 토큰 클레임 캐시 크기 (0이면 매 요청 디코딩)
+TOKEN_CACHE_SIZE = env_int("TOKEN_CACHE_SIZE", 10000)
 
 # OAuth2 설정
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -53,6 +62,132 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+class VerifiedTokenCache:
+    """서명 검증을 마친 토큰의 클레임 캐시 (토큰 다이제스트 -> 클레임, 토큰의 exp까지 유효)
+
+    같은 토큰이 수명 동안 수백 번 제시되므로 서명 검증과 클레임 파싱은 워커당 한 번만 함
+    토큰 원문 대신 다이제스트를 키로 써서 메모리에 토큰을 남기지 않음
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # 다이제스트 -> (exp 타임스탬프, 클레임)
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+
+    def get(self, digest: bytes) -> Optional[dict]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            cache_requests_total.inc("jwt_claims", "miss")
+            return None
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[digest]
+            cache_requests_total.inc("jwt_claims", "expired")
+            return None
+        self._entries.move_to_end(digest)
+        cache_requests_total.inc("jwt_claims", "hit")
+        return claims
+
+    def set(self, digest: bytes, claims: dict):
+        expires_at = claims.get("exp")
+        # exp가 없는 토큰은 만료 시점을 알 수 없으므로 캐시하지 않음
+        if self.maxsize <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        self._entries[digest] = (float(expires_at), claims)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(token: str) -> dict:
+    """액세스 토큰 검증 후 클레임 반환 (검증된 토큰은 캐시, 실패 시 JWTError)"""
+    digest = hashlib.sha256(token.encode('utf-8')).digest()
+    claims = verified_tokens.get(digest)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        verified_tokens.set(digest, claims)
+    return claims
+
+
+def hash_refresh_token(token: str) -> str:
+    """리프레시 토큰 해시 (256비트 난수라 bcrypt 없이 SHA-256으로 충분, 원문은 저장하지 않음)"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+async def issue_refresh_token(user: dict, family_id: Optional[str] = None) -> str:
+    """리프레시 토큰 발급 (family_id가 없으면 새 로그인으로 새 계열 시작)"""
+    token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    await get_repositories().refresh_tokens.create({
+        "token_hash": hash_refresh_token(token),
+        "family_id": family_id or secrets.token_hex(16),
+        "user_id": user["_id"],
+        "username": user["username"],
+        "created_at": now,
+        "expires_at": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "rotated_at": None,
+    })
+    return token
+
+
+async def rotate_refresh_token(token: str) -> Tuple[dict, str]:
+    """리프레시 토큰 교체 후 (사용자 문서, 새 리프레시 토큰) 반환
+
+    이미 교체된 토큰이 유예 시간 안에 다시 쓰이면(여러 탭의 동시 재발급) 같은 계열로 새 토큰을 발급하고,
+    유예 시간 뒤에 다시 쓰이면 탈취로 보고 같은 계열 토큰을 모두 폐기
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    repos = get_repositories()
+    token_hash = hash_refresh_token(token)
+    now = datetime.now(timezone.utc)
+
+    current = await repos.refresh_tokens.rotate(token_hash, now)
+    if current is None:
+        reused = await repos.refresh_tokens.find(token_hash)
+        if reused and reused.get("rotated_at") is not None:
+            rotated_at = reused["rotated_at"]
+            if rotated_at.tzinfo is None:
+                rotated_at = rotated_at.replace(tzinfo=timezone.utc)
+            if now - rotated_at > timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+                await repos.refresh_tokens.revoke_family(reused["family_id"])
+                raise credentials_exception
+            current = reused
+        if current is None:
+            raise credentials_exception
+
+    user = await repos.users.get_by_username(current["username"])
+    if user is None:
+        await repos.refresh_tokens.revoke_family(current["family_id"])
+        raise credentials_exception
+
+    return user, await issue_refresh_token(user, current["family_id"])
+
+
+async def revoke_refresh_token(token: str):
+    """리프레시 토큰이 속한 계열 폐기 (로그아웃)"""
+    repos = get_repositories()
+    existing = await repos.refresh_tokens.find(hash_refresh_token(token))
+    if existing:
+        await repos.refresh_tokens.revoke_family(existing["family_id"])
+
+
+def _remember_user(user_id: ObjectId):
+    """요청 컨텍스트에 인증된 사용자 기록 (쓰기 요청 뒤 single-flight가 본인 쓰기를 반영하도록)"""
+    context = current_request()
+    if context is not None:
+        context.user_id = str(user_id)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
     """현재 로그인한 사용자 정보 가져오기"""
     credentials_exception = HTTPException(
@@ -62,7 +197,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
     )
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -70,12 +205,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
     except JWTError:
         raise credentials_exception
 
-    db = get_database()
-    user = await db.users.find_one({"username": token_data.username})
+    user = await get_repositories().users.get_by_username(token_data.username)
 
     if user is None:
         raise credentials_exception
 
+    _remember_user(user["_id"])
     return UserResponse(
         _id=str(user["_id"]),
         username=user["username"],
@@ -95,7 +230,7 @@ async def get_current_user_optional(
 
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             return None
@@ -103,12 +238,12 @@ async def get_current_user_optional(
     except JWTError:
         return None
 
-    db = get_database()
-    user = await db.users.find_one({"username": token_data.username})
+    user = await get_repositories().users.get_by_username(token_data.username)
 
     if user is None:
         return None
 
+    _remember_user(user["_id"])
     return UserResponse(
         _id=str(user["_id"]),
         username=user["username"],
@@ -0,0 +1,139 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from app.env import env_float, env_int
+from app.metrics import cache_invalidations_total, cache_requests_total
+
+# 프로세스 내 캐시와 무효화 레지스트리
+# - 캐시 항목에는 "컬렉션:문서ID" 태그를 붙이고, 해당 문서가 바뀌면 태그로 지움
+# - 다른 워커의 쓰기는 change stream 리스너(app/change_streams.py)가 레지스트리로 전달
+# - 스트림이 끊긴 동안에는 어떤 쓰기를 놓쳤는지 모르므로 짧은 TTL로만 항목을 신뢰함
+
+CACHE_TTL_SECONDS = env_float("CACHE_TTL_SECONDS", 300.0)
+CACHE_FALLBACK_TTL_SECONDS = env_float("CACHE_FALLBACK_TTL_SECONDS", 5.0)
+USER_CACHE_SIZE = env_int("USER_CACHE_SIZE", 10000)
+
+
+class InvalidationRegistry:
+    """컬렉션별 무효화 구독자 목록
+
+    콜백은 바뀐 문서의 _id를 받음 (None이면 컬렉션 전체를 무효화)
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[Optional[Any]], None]]] = {}
+        # 무효화 이벤트를 빠짐없이 받고 있는지 (False면 캐시는 fallback TTL 사용)
+        self.healthy = False
+
+    def subscribe(self, collection: str, callback: Callable[[Optional[Any]], None]):
+        self._subscribers.setdefault(collection, []).append(callback)
+
+    def publish(self, collection: str, document_id: Optional[Any] = None):
+        """문서(또는 컬렉션 전체) 변경 알림"""
+        cache_invalidations_total.inc(collection)
+        for callback in self._subscribers.get(collection, ()):
+            callback(document_id)
+
+    def publish_all(self):
+        """모든 컬렉션 무효화 (이벤트를 놓쳤을 수 있을 때)"""
+        for collection in list(self._subscribers):
+            self.publish(collection)
+
+    def set_healthy(self, healthy: bool):
+        self.healthy = healthy
+
+
+registry = InvalidationRegistry()
+
+
+def tag(collection: str, document_id) -> str:
+    """캐시 태그 (예: users:65f...)"""
+    return f"{collection}:{document_id}"
+
+
+class LocalCache:
+    """태그 기반 무효화를 지원하는 LRU + TTL 캐시
+
+    항목은 레지스트리가 healthy일 때 ttl, 아닐 때 fallback_ttl 동안만 유효함
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float = CACHE_TTL_SECONDS,
+                 fallback_ttl: float = CACHE_FALLBACK_TTL_SECONDS,
+                 invalidation: InvalidationRegistry = registry):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.fallback_ttl = fallback_ttl
+        self.invalidation = invalidation
+        # key -> (저장 시각, 값, 태그)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # 무효화가 일어날 때마다 증가 (조회 중에 무효화된 값을 다시 넣지 않기 위함)
+        self.generation = 0
+
+    def watch(self, collection: str):
+        """컬렉션 변경 시 해당 문서 태그의 항목 삭제"""
+        def on_change(document_id):
+            if document_id is None:
+                self.clear()
+            else:
+                self.invalidate_tag(tag(collection, document_id))
+        self.invalidation.subscribe(collection, on_change)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            cache_requests_total.inc(self.name, "miss")
+            return None
+        stored_at, value, _ = entry
+        ttl = self.ttl if self.invalidation.healthy else self.fallback_ttl
+        if time.monotonic() - stored_at > ttl:
+            self._remove(key)
+            cache_requests_total.inc(self.name, "expired")
+            return None
+        self._entries.move_to_end(key)
+        cache_requests_total.inc(self.name, "hit")
+        return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = (), generation: Optional[int] = None):
+        """값 저장 (generation을 주면 그 사이 무효화가 있었을 때 저장하지 않음)"""
+        if generation is not None and generation != self.generation:
+            return
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic(), value, tags)
+        for item in tags:
+            self._tags.setdefault(item, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_tag(self, item: str):
+        self.generation += 1
+        for key in self._tags.pop(item, ()):
+            self._remove(key)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for item in entry[2]:
+            keys = self._tags.get(item)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[item]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# 인증 시 매 요청마다 조회하는 사용자 문서 캐시 (username -> users 문서)
+user_cache = LocalCache("users", USER_CACHE_SIZE)
+user_cache.watch("users")
@@ -0,0 +1,206 @@
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+from app.database import get_repositories
+from app.jobs import enqueue, job
+from app.repositories.base import calendar_month_id
+
+logger = logging.getLogger("app.calendar")
+
+# 내 일기 달력 (GET /api/diaries/me/calendar)
+# - 사용자의 한 달을 diary_calendar 문서 하나로 미리 묶어 둠 (일별 일기 ID/제목)
+#   한 달 조회는 _id 조회 한 번, 한 해 조회는 user_id + year 인덱스로 최대 12개 문서
+# - 일기 작성/수정/삭제 라우트가 해당 날짜 항목만 증분 갱신하고(일괄 작업은 bulk_write 한 번),
+#   갱신이 실패하면 원본 일기로 그 달을 다시 계산하는 작업(calendar.rebuild)을 추가
+# - 가져오기(app/transfer.py)는 항목을 하나씩 넣지 않고 가져온 달마다 calendar.rebuild를 추가
+# - 날짜는 CALENDAR_TIMEZONE(기본 Asia/Seoul) 기준 작성일 (created_at은 바뀌지 않으므로 날짜 이동은 없음)
+# - 기존 일기는 app/migrations.py의 백필로 채움
+
+_timezone_name = os.environ.get("CALENDAR_TIMEZONE", "Asia/Seoul")
+try:
+    TIMEZONE = ZoneInfo(_timezone_name)
+except (ZoneInfoNotFoundError, ValueError):
+    print(f"✗ Unknown CALENDAR_TIMEZONE {_timezone_name!r}, using UTC")
+    TIMEZONE = timezone.utc
+
+
+def local_day(created_at: datetime) -> date:
+    """작성 시각의 달력 날짜 (MongoDB가 돌려주는 naive 값은 UTC)"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.astimezone(TIMEZONE).date()
+
+
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """달력 기준 한 달의 [시작, 끝) UTC 시각"""
+    start = datetime(year, month, 1, tzinfo=TIMEZONE)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=TIMEZONE)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def calendar_entry(diary: dict) -> dict:
+    return {"id": diary["_id"], "title": diary["title"], "is_public": diary.get("is_public", True)}
+
+
+def month_view(document: dict) -> dict:
+    """diary_calendar 문서를 응답 모양으로 (빈 날짜는 제외하고 날짜순)"""
+    days = []
+    for day, entries in sorted(document.get("days", {}).items(), key=lambda item: int(item[0])):
+        if not entries:
+            continue
+        days.append({
+            "day": int(day),
+            "count": len(entries),
+            "diaries": [{"id": str(entry["id"]), "title": entry["title"], "is_public": entry["is_public"]}
+                        for entry in entries],
+        })
+    return {"month": document["month"], "count": sum(day["count"] for day in days), "days": days}
+
+
+async def _schedule_rebuild(user_id: ObjectId, day: date):
+    try:
+        await enqueue(
+            "calendar.rebuild",
+            {"user_id": str(user_id), "year": day.year, "month": day.month},
+            key=f"calendar.rebuild:{calendar_month_id(user_id, day.year, day.month)}",
+        )
+    except Exception:
+        logger.exception("failed to schedule calendar rebuild for %s", user_id)
+
+
+async def record_created(diary: dict):
+    """새 일기를 달력에 추가 (실패해도 일기 작성은 성공으로 두고 그 달을 다시 계산)"""
+    user_id, day = diary.get("user_id"), local_day(diary["created_at"])
+    if user_id is None:
+        return
+    try:
+        await get_repositories().calendar.add(user_id, day, calendar_entry(diary))
+    except Exception:
+        logger.exception("calendar add failed for diary %s", diary["_id"])
+        await _schedule_rebuild(user_id, day)
+
+
+async def record_updated(diary: dict):
+    """제목/공개 여부 변경 반영"""
+    user_id, day = diary.get("user_id"), local_day(diary["created_at"])
+    if user_id is None:
+        return
+    entry = calendar_entry(diary)
+    try:
+        await get_repositories().calendar.update_entry(
+            user_id, day, diary["_id"], {"title": entry["title"], "is_public": entry["is_public"]}
+        )
+    except Exception:
+        logger.exception("calendar update failed for diary %s", diary["_id"])
+        await _schedule_rebuild(user_id, day)
+
+
+async def record_deleted(diary: dict):
+    user_id, day = diary.get("user_id"), local_day(diary["created_at"])
+    if user_id is None:
+        return
+    try:
+        await get_repositories().calendar.remove(user_id, day, diary["_id"])
+    except Exception:
+        logger.exception("calendar remove failed for diary %s", diary["_id"])
+        await _schedule_rebuild(user_id, day)
+
+
+async def record_bulk(updated: List[dict], deleted: List[dict]):
+    """일괄 작업의 제목/공개 여부 변경과 삭제를 한 번에 반영 (실패하면 관련된 달을 다시 계산)"""
+    changes = []
+    for diary in updated:
+        if diary.get("user_id") is not None:
+            entry = calendar_entry(diary)
+            changes.append((diary["user_id"], local_day(diary["created_at"]), diary["_id"],
+                            {"title": entry["title"], "is_public": entry["is_public"]}))
+    for diary in deleted:
+        if diary.get("user_id") is not None:
+            changes.append((diary["user_id"], local_day(diary["created_at"]), diary["_id"], None))
+    if not changes:
+        return
+    try:
+        await get_repositories().calendar.apply(changes)
+    except Exception:
+        logger.exception("calendar bulk update failed for %d diaries", len(changes))
+        for user_id, day in {(user_id, day.replace(day=1)) for user_id, day, _, _ in changes}:
+            await _schedule_rebuild(user_id, day)
+
+
+async def record_imported(diaries: List[dict]):
+    """가져온 일기가 있는 달을 다시 계산하도록 예약 (같은 달은 key로 합쳐져 작업 하나)"""
+    months = {(diary["user_id"], local_day(diary["created_at"]).replace(day=1))
+              for diary in diaries if diary.get("user_id") is not None}
+    for user_id, day in months:
+        await _schedule_rebuild(user_id, day)
+
+
+async def rebuild_month(user_id: ObjectId, year: int, month: int) -> int:
+    """원본 일기로 한 달 문서를 다시 계산 (반영한 일기 수 반환)"""
+    repos = get_repositories()
+    start, end = month_bounds(year, month)
+    days: Dict[str, List[dict]] = {}
+    for diary in await repos.diaries.list_for_user_between(user_id, start, end):
+        days.setdefault(str(local_day(diary["created_at"]).day), []).append(calendar_entry(diary))
+    await repos.calendar.replace_month(user_id, year, month, days)
+    return sum(len(entries) for entries in days.values())
+
+
+@job("calendar.rebuild")
+async def rebuild_month_job(payload: dict) -> int:
+    return await rebuild_month(ObjectId(payload["user_id"]), payload["year"], payload["month"])
+
+
+async def backfill_calendar(db, batch_size: int = 1000) -> int:
+    """모든 일기로 diary_calendar 채우기 (마이그레이션, 다시 실행해도 같은 결과)
+
+    user_id + created_at 인덱스 순서로 한 번 훑으며 사용자의 한 달이 끝날 때마다 문서를 만들고,
+    batch_size개 달씩 bulk_write로 교체함
+    """
+    cursor = db.diaries.find(
+        {"user_id": {"$ne": None}}, {"user_id": 1, "title": 1, "is_public": 1, "created_at": 1}
+    ).sort([("user_id", 1), ("created_at", -1)])
+    operations: List[ReplaceOne] = []
+    current: Optional[dict] = None
+    total = 0
+
+    async def flush():
+        nonlocal operations
+        if operations:
+            await db.diary_calendar.bulk_write(operations, ordered=False)
+            print(f"  diary_calendar: {total} diaries backfilled")
+            operations = []
+
+    def close(document: Optional[dict]):
+        if document is None:
+            return
+        # 최신순으로 읽었으므로 날짜별로 작성순으로 뒤집음
+        for entries in document["days"].values():
+            entries.reverse()
+        operations.append(ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+
+    async for diary in cursor:
+        day = local_day(diary["created_at"])
+        month_id = calendar_month_id(diary["user_id"], day.year, day.month)
+        if current is None or current["_id"] != month_id:
+            close(current)
+            if len(operations) >= batch_size:
+                await flush()
+            current = {"_id": month_id, "user_id": diary["user_id"], "year": day.year, "month": day.month,
+                       "count": 0, "days": {}}
+        current["days"].setdefault(str(day.day), []).append(calendar_entry(diary))
+        current["count"] += 1
+        total += 1
+    close(current)
+    await flush()
+    return total
+
+
+def current_year() -> int:
+    return datetime.now(TIMEZONE).year
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.env import env_bool, env_float
+from app.cache import InvalidationRegistry, registry
+from app.metrics import change_stream_events_total, change_stream_restarts_total, change_stream_up
+
+logger = logging.getLogger("app.change_streams")
+
+# 여러 워커의 캐시 일관성을 위한 change stream 리스너
+# - 워커마다 데이터베이스 단위 스트림 하나로 watched 컬렉션의 변경을 받아 무효화 레지스트리에 전달
+# - 재개 토큰을 주기적으로 저장해 재연결/재시작 시 놓친 이벤트부터 다시 받음
+# - 재개할 수 없으면(이력 소실, 토큰 없음) 로컬 캐시를 모두 비우고 현재 시점부터 시작
+# - 스트림이 끊긴 동안 레지스트리는 unhealthy 상태가 되어 캐시가 짧은 TTL로만 동작함
+# change stream은 레플리카셋에서만 지원됨 (단일 노드 레플리카셋도 가능)
+
+WATCHED_COLLECTIONS = ("users", "diaries", "comments", "likes")
+TOKEN_COLLECTION = "change_stream_tokens"
+
+ENABLED = env_bool("CHANGE_STREAMS_ENABLED", True)
+CONSUMER_NAME = os.environ.get("CHANGE_STREAM_CONSUMER", "cache-invalidation")
+TOKEN_SAVE_SECONDS = env_float("CHANGE_STREAM_TOKEN_SAVE_SECONDS", 5.0)
+MAX_BACKOFF_SECONDS = 30.0
+
+# 재개 토큰으로 이어받을 수 없는 에러 (oplog에서 이미 밀려남 등)
+_RESUME_FAILED_CODES = {136, 280, 286}
+# 레플리카셋이 아니라 change stream을 쓸 수 없음
+_NOT_SUPPORTED_CODES = {40573}
+
+_DOCUMENT_OPERATIONS = {"insert", "update", "replace", "delete"}
+
+
+class ChangeStreamListener:
+    """데이터베이스 change stream을 읽어 무효화 이벤트를 발행하는 백그라운드 태스크"""
+
+    def __init__(self, db, invalidation: InvalidationRegistry = registry,
+                 consumer: str = CONSUMER_NAME, token_save_seconds: float = TOKEN_SAVE_SECONDS):
+        self.db = db
+        self.invalidation = invalidation
+        self.consumer = consumer
+        self.token_save_seconds = token_save_seconds
+        self._tokens = db[TOKEN_COLLECTION]
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self._token_loaded = False
+        self._saved_token = None
+        self._saved_at = 0.0
+        self._backoff = 1.0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self._save_token(force=True)
+        except PyMongoError:
+            pass
+        self._set_up(False)
+
+    def _set_up(self, up: bool):
+        self.invalidation.set_healthy(up)
+        change_stream_up.set(1 if up else 0)
+
+    @staticmethod
+    def _pipeline() -> list:
+        """watched 컬렉션의 변경만, 무효화에 필요한 필드만 받음 (_id는 재개 토큰이라 유지)
+
+        조회 수 반영(app/views.py)은 view_count를 바꾸는 유일한 쓰기이고 내용은 그대로라 제외함
+        """
+        return [
+            {"$match": {"$or": [
+                {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}},
+                {"operationType": {"$in": ["dropDatabase", "invalidate"]}},
+            ]}},
+            {"$match": {"updateDescription.updatedFields.view_count": {"$exists": False}}},
+            {"$project": {"operationType": 1, "ns": 1, "documentKey": 1}},
+        ]
+
+    async def _load_token(self):
+        document = await self._tokens.find_one({"_id": self.consumer})
+        return document["token"] if document else None
+
+    async def _save_token(self, force: bool = False):
+        """재개 토큰 저장 (기본적으로 token_save_seconds마다 한 번)"""
+        token = self._resume_token
+        if token is None or token == self._saved_token:
+            return
+        if not force and time.monotonic() - self._saved_at < self.token_save_seconds:
+            return
+        await self._tokens.update_one(
+            {"_id": self.consumer},
+            {"$set": {"token": token, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        self._saved_token = token
+        self._saved_at = time.monotonic()
+
+    async def _discard_token(self):
+        self._resume_token = None
+        self._saved_token = None
+        await self._tokens.delete_one({"_id": self.consumer})
+
+    def _dispatch(self, change: dict):
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        change_stream_events_total.inc(collection or "*", operation)
+        if operation in _DOCUMENT_OPERATIONS:
+            self.invalidation.publish(collection, change["documentKey"]["_id"])
+        elif collection:
+            # drop, rename
+            self.invalidation.publish(collection)
+        else:
+            # dropDatabase, invalidate
+            self.invalidation.publish_all()
+
+    async def _consume(self):
+        """스트림을 열고 닫힐 때까지 이벤트 처리"""
+        async with self.db.watch(self._pipeline(), resume_after=self._resume_token,
+                                 max_await_time_ms=1000) as stream:
+            if self._resume_token is None:
+                # 이어받을 지점이 없으므로 그 사이의 쓰기를 놓쳤을 수 있음
+                self.invalidation.publish_all()
+            self._set_up(True)
+            self._backoff = 1.0
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    self._dispatch(change)
+                    if change["operationType"] == "invalidate":
+                        # invalidate 이후 토큰으로는 resume_after 불가
+                        await self._discard_token()
+                        return
+                # 이벤트가 없어도 postBatchResumeToken으로 토큰이 전진함
+                self._resume_token = stream.resume_token
+                await self._save_token()
+
+    async def _run(self):
+        while True:
+            reason = "closed"
+            try:
+                if not self._token_loaded:
+                    self._resume_token = await self._load_token()
+                    self._saved_token = self._resume_token
+                    self._token_loaded = True
+                await self._consume()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _NOT_SUPPORTED_CODES:
+                    logger.warning("change streams not supported (not a replica set); caches fall back to TTL")
+                    self._set_up(False)
+                    return
+                if e.code in _RESUME_FAILED_CODES:
+                    reason = "history_lost"
+                    logger.warning("change stream resume token is no longer valid, flushing caches: %s", e)
+                    try:
+                        await self._discard_token()
+                    except PyMongoError:
+                        self._resume_token = None
+                    self.invalidation.publish_all()
+                else:
+                    reason = "error"
+                    logger.warning("change stream failed: %s", e)
+            except PyMongoError as e:
+                reason = "error"
+                logger.warning("change stream disconnected: %s", e)
+
+            self._set_up(False)
+            change_stream_restarts_total.inc(reason)
+            await asyncio.sleep(self._backoff)
+            self._backoff = min(self._backoff * 2, MAX_BACKOFF_SECONDS)
+
+
+listener: Optional[ChangeStreamListener] = None
+
+
+def start_change_listener(db):
+    """change stream 리스너 시작 (CHANGE_STREAMS_ENABLED=false면 캐시는 TTL로만 동작)"""
+    global listener
+    if not ENABLED:
+        print("✓ Change streams disabled, caches use TTL expiry only")
+        return
+    listener = ChangeStreamListener(db)
+    listener.start()
+    print("✓ Change stream listener started")
+
+
+async def stop_change_listener():
+    """change stream 리스너 종료 (마지막 재개 토큰 저장)"""
+    global listener
+    if listener is not None:
+        await listener.stop()
+        listener = None
@@ -1,29 +1,236 @@
+from dataclasses import dataclass
+from typing import Tuple
+import asyncio
+import importlib.util
+import os
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 from pymongo.server_api import ServerApi
-import os
 from dotenv import load_dotenv
 
+from app.env import env_bool, env_int
+from app.metrics import command_listener
+from app.repositories.base import Repositories
+from app.repositories.cached import with_caches
+from app.repositories.memory import create_memory_repositories
+from app.repositories.mongo import create_mongo_repositories
+
 load_dotenv()
 
-# MongoDB 연결 설정 (환경변수 사용 권장)
-MONGODB_URL = os.environ.get("MONGODB_URL", "mongodb://localhost:27017")
-DATABASE_NAME = os.environ.get("DATABASE_NAME", "diary_db")
+
+def _available_compressors(names: str) -> Tuple[str, ...]:
+    """설치된 라이브러리로 지원 가능한 압축 방식만 남김 (zstd는 zstandard 패키지 필요)"""
+    result = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        if name == "zstd" and importlib.util.find_spec("zstandard") is None:
+            continue
+        if name == "snappy" and importlib.util.find_spec("snappy") is None:
+            continue
+        result.append(name)
+    return tuple(result)
+
+
+@dataclass(frozen=True)
+class MongoSettings:
+    """MongoDB 클라이언트 설정 (커넥션 풀, 압축, 읽기 라우팅)"""
+    # "mongo" 또는 "memory" (MongoDB 없이 메모리 저장소로 실행)
+    backend: str = "mongo"
+    url: str = "mongodb://localhost:27017"
+    database_name: str = "diary_db"
+    max_pool_size: int = 100
+    min_pool_size: int = 10
+    max_idle_time_ms: int = 60000
+    wait_queue_timeout_ms: int = 2000
+    compressors: Tuple[str, ...] = _available_compressors("zstd,zlib")
+    zlib_compression_level: int = 6
+    # 비로그인 피드/상세 조회는 세컨더리에서 읽어 프라이머리 부하를 줄임
+    anonymous_read_preference: str = "secondaryPreferred"
+    # 로그인 사용자는 자신의 쓰기를 바로 읽어야 하므로 기본값은 primary
+    authenticated_read_preference: str = "primary"
+    # -1이면 제한 없음, 설정 시 90초 이상이어야 함 (MongoDB 제약)
+    max_staleness_seconds: int = -1
+    prewarm: bool = True
+
+    @classmethod
+    def from_env(cls) -> "MongoSettings":
+        """환경변수에서 설정 로드"""
+        return cls(
+            backend=os.environ.get("DATA_BACKEND", cls.backend).lower(),
+            url=os.environ.get("MONGODB_URL", cls.url),
+            database_name=os.environ.get("DATABASE_NAME", cls.database_name),
+            max_pool_size=env_int("MONGODB_MAX_POOL_SIZE", cls.max_pool_size),
+            min_pool_size=env_int("MONGODB_MIN_POOL_SIZE", cls.min_pool_size),
+            max_idle_time_ms=env_int("MONGODB_MAX_IDLE_TIME_MS", cls.max_idle_time_ms),
+            wait_queue_timeout_ms=env_int("MONGODB_WAIT_QUEUE_TIMEOUT_MS", cls.wait_queue_timeout_ms),
+            compressors=_available_compressors(
+                os.environ.get("MONGODB_COMPRESSORS", ",".join(cls.compressors))
+            ),
+            zlib_compression_level=env_int("MONGODB_ZLIB_COMPRESSION_LEVEL", cls.zlib_compression_level),
+            anonymous_read_preference=os.environ.get(
+                "MONGODB_ANONYMOUS_READ_PREFERENCE", cls.anonymous_read_preference
+            ),
+            authenticated_read_preference=os.environ.get(
+                "MONGODB_AUTHENTICATED_READ_PREFERENCE", cls.authenticated_read_preference
+            ),
+            max_staleness_seconds=env_int("MONGODB_MAX_STALENESS_SECONDS", cls.max_staleness_seconds),
+            prewarm=env_bool("MONGODB_PREWARM", cls.prewarm),
+        )
+
+    def client_options(self) -> dict:
+        """AsyncIOMotorClient에 전달할 옵션"""
+        options = {
+            "server_api": ServerApi('1'),
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+        }
+        if self.compressors:
+            options["compressors"] = ",".join(self.compressors)
+            if "zlib" in self.compressors:
+                options["zlibCompressionLevel"] = self.zlib_compression_level
+        return options
+
+    def read_preference(self, name: str):
+        """읽기 선호도 이름을 pymongo ReadPreference 객체로 변환"""
+        mode = read_pref_mode_from_name(name)
+        # primary 모드는 maxStalenessSeconds를 허용하지 않음
+        max_staleness = self.max_staleness_seconds if mode != 0 else -1
+        return make_read_preference(mode, None, max_staleness)
+
+
+settings = MongoSettings.from_env()
+
+# 기존 코드 호환을 위한 상수
+MONGODB_URL = settings.url
+DATABASE_NAME = settings.database_name
 
 # MongoDB 클라이언트
 client = None
 database = None
+anonymous_read_database = None
+authenticated_read_database = None
+repositories: Repositories = None
+
+
+async def _prewarm_pool():
+    """커넥션 풀 미리 채우기 (첫 요청이 연결 비용을 치르지 않도록)"""
+    count = max(settings.min_pool_size, 1)
+    await asyncio.gather(*(client.admin.command('ping') for _ in range(count)))
+
+    anonymous_pref = settings.read_preference(settings.anonymous_read_preference)
+    if anonymous_pref.mode != 0:
+        await asyncio.gather(*(
+            client.admin.command('ping', read_preference=anonymous_pref)
+            for _ in range(count)
+        ))
+
+
+# 라우트의 모든 조회가 COLLSCAN이나 메모리 내 SORT 없이 처리되도록 하는 인덱스
+# (test_query_shape.py가 explain으로 검증)
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "diaries": [
+        IndexModel([("is_public", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "comments": [
+        # 스레드 전체/하위 답글 범위 조회와 최상위 댓글 페이지
+        IndexModel([("diary_id", ASCENDING), ("path", ASCENDING)]),
+        IndexModel([("diary_id", ASCENDING), ("depth", ASCENDING), ("path", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "likes": [
+        IndexModel([("target_type", ASCENDING), ("target_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+    ],
+    "refresh_tokens": [
+        IndexModel([("token_hash", ASCENDING)], unique=True),
+        IndexModel([("family_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING)]),
+        # 만료된 토큰은 MongoDB가 자동 삭제
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "notifications": [
+        # 알림함 목록 (최근 갱신순)
+        IndexModel([("recipient_id", ASCENDING), ("updated_at", DESCENDING)]),
+        # 받는 사람별로 같은 대상의 안 읽은 좋아요 알림은 하나 (app/notifications.py)
+        IndexModel([("recipient_id", ASCENDING), ("group", ASCENDING)], unique=True,
+                   partialFilterExpression={"read": False, "group": {"$exists": True}}),
+        # 일기/댓글 삭제 시 정리
+        IndexModel([("diary_id", ASCENDING)]),
+        IndexModel([("comment_id", ASCENDING)], sparse=True),
+        # 읽은 알림은 보관 기간이 지나면 MongoDB가 자동 삭제 (read_at이 없는 안 읽은 알림은 대상 아님)
+        IndexModel([("read_at", ASCENDING)],
+                   expireAfterSeconds=env_int("NOTIFICATION_READ_RETENTION_SECONDS", 30 * 86400)),
+    ],
+    "diary_calendar": [
+        # 한 달 조회는 _id로, 한 해 조회는 이 인덱스로
+        IndexModel([("user_id", ASCENDING), ("year", ASCENDING), ("month", ASCENDING)]),
+    ],
+    "jobs": [
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)]),
+        # 같은 key의 대기 작업은 하나만 (실행 중이거나 끝난 작업은 제외)
+        IndexModel([("key", ASCENDING)], unique=True,
+                   partialFilterExpression={"status": "queued", "key": {"$exists": True}}),
+        # 끝난 작업은 보관 기간이 지나면 MongoDB가 자동 삭제 (finished_at이 없는 대기 작업은 대상 아님)
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=env_int("JOB_RETENTION_SECONDS", 7 * 86400)),
+    ],
+    "imports": [
+        # 끝난 가져오기 체크포인트는 보관 기간 뒤 자동 삭제 (_id로만 조회하므로 다른 인덱스는 없음)
+        IndexModel([("finished_at", ASCENDING)],
+                   expireAfterSeconds=env_int("IMPORT_RETENTION_SECONDS", 30 * 86400)),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """필요한 인덱스 생성 (이미 있으면 무시됨)"""
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                # 기존 데이터에 중복이 있으면 unique 인덱스를 만들 수 없으므로 일반 인덱스로 대체
+                if e.code != 11000:
+                    raise
+                keys = list(index.document["key"].items())
+                print(f"✗ Duplicate keys in {collection_name} {keys}, creating non-unique index instead")
+                await db[collection_name].create_index(keys)
 
 
 async def connect_to_mongo():
     """MongoDB에 연결"""
-    global client, database
+    global client, database, anonymous_read_database, authenticated_read_database, repositories
     try:
-        client = AsyncIOMotorClient(MONGODB_URL, server_api=ServerApi('1'))
-        database = client[DATABASE_NAME]
+        client = AsyncIOMotorClient(
+            settings.url, event_listeners=[command_listener], **settings.client_options()
+        )
+        database = client[settings.database_name]
+        anonymous_read_database = database.with_options(
+            read_preference=settings.read_preference(settings.anonymous_read_preference)
+        )
+        authenticated_read_database = database.with_options(
+            read_preference=settings.read_preference(settings.authenticated_read_preference)
+        )
+        repositories = with_caches(create_mongo_repositories(
+            database, anonymous_read_database, authenticated_read_database
+        ))
         # 연결 테스트
         await client.admin.command('ping')
-        print(f"✓ Successfully connected to MongoDB at {MONGODB_URL}")
-        print(f"✓ Using database: {DATABASE_NAME}")
+        await ensure_indexes(database)
+        if settings.prewarm:
+            await _prewarm_pool()
+        print(f"✓ Successfully connected to MongoDB at {settings.url}")
+        print(f"✓ Using database: {settings.database_name}")
     except Exception as e:
         print(f"✗ Error connecting to MongoDB: {e}")
         raise
@@ -38,5 +245,17 @@ async def close_mongo_connection():
 
 
 def get_database():
-    """데이터베이스 인스턴스 반환"""
+    """데이터베이스 인스턴스 반환 (쓰기 및 primary 읽기용)"""
     return database
+
+
+def use_memory_backend():
+    """MongoDB 대신 메모리 저장소 사용 (테스트, 프로파일링용)"""
+    global repositories
+    repositories = with_caches(create_memory_repositories())
+    print("✓ Using in-memory repositories (no MongoDB)")
+
+
+def get_repositories() -> Repositories:
+    """저장소 묶음 반환 (users, diaries, comments, likes)"""
+    return repositories
@@ -0,0 +1,190 @@
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import pymongo
+from starlette.responses import JSONResponse
+
+from app.env import env_float
+from app.metrics import (
+    deadline_exceeded_total,
+    requests_shed_total,
+    route_class_in_flight,
+    route_class_queue_seconds,
+)
+from app.request_context import current_request
+
+# 라우트 분류별 요청 데드라인, 동시성 제한, 부하 차단(load shedding)
+# - 데드라인은 pymongo.timeout()으로 걸어서 요청 안의 모든 Motor 호출이 남은 시간만큼 maxTimeMS를 가짐
+#   (Motor는 contextvars를 복사해 스레드풀에서 실행하므로 핸들러 안의 호출에 그대로 전파됨)
+# - 분류마다 세마포어로 동시 처리 수를 제한하고, 대기 시간이 길어지면 기다리게 하지 않고 503으로 돌려보냄
+# - 헬스 체크, 메트릭, 문서, 정적 파일, 첨부 이미지 파일, SSE 스트림은 제외
+# - 이미지 업로드는 본문을 받는 시간이 길어 따로 분류 (동시 업로드 수를 작게 제한)
+# - 계정 내보내기/가져오기는 응답/본문 스트리밍이 길어 따로 분류 (긴 데드라인, 동시 처리 수는 작게)
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    """라우트 분류별 예산"""
+    name: str
+    # 요청 도착부터의 시간 예산 (초, 대기 시간 포함)
+    deadline: float
+    # 동시에 처리하는 요청 수
+    concurrency: int
+
+    @classmethod
+    def from_env(cls, name: str, deadline_ms: float, concurrency: int) -> "RouteClass":
+        upper = name.upper()
+        return cls(
+            name=name,
+            deadline=env_float(f"DEADLINE_{upper}_MS", deadline_ms) / 1000,
+            concurrency=max(int(env_float(f"CONCURRENCY_{upper}", concurrency)), 1),
+        )
+
+
+ROUTE_CLASSES: Dict[str, RouteClass] = {
+    "feed": RouteClass.from_env("feed", 2000, 64),
+    "detail": RouteClass.from_env("detail", 1000, 64),
+    "write": RouteClass.from_env("write", 3000, 32),
+    "auth": RouteClass.from_env("auth", 2000, 16),
+    "upload": RouteClass.from_env("upload", 35000, 8),
+    "transfer": RouteClass.from_env("transfer", 600000, 4),
+}
+
+# 대기 시간이 SHED_QUEUE_TARGET_MS를 SHED_INTERVAL_MS 이상 계속 넘으면 과부하로 보고
+# 빈 자리가 없는 새 요청은 바로 차단 (CoDel 방식), 그 외에는 최대 SHED_MAX_QUEUE_MS까지만 대기
+QUEUE_TARGET = env_float("SHED_QUEUE_TARGET_MS", 50) / 1000
+QUEUE_INTERVAL = env_float("SHED_INTERVAL_MS", 100) / 1000
+MAX_QUEUE = env_float("SHED_MAX_QUEUE_MS", 500) / 1000
+
+EXEMPT_ROUTES = {"/", "/health", "/metrics", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json",
+                 "/uploads", "/api/images/{name}", "unmatched"}
+DETAIL_ROUTES = {"/api/diaries/{diary_id}"}
+UPLOAD_ROUTES = {"/api/images/"}
+TRANSFER_ROUTES = {"/api/me/export", "/api/me/import"}
+
+
+def classify(method: str, route: str) -> Optional[str]:
+    """라우트 템플릿을 분류 이름으로 변환 (제외 대상이면 None)"""
+    if route in EXEMPT_ROUTES or route.endswith("/events"):
+        return None
+    if route.startswith("/api/auth"):
+        return "auth"
+    if route in UPLOAD_ROUTES:
+        return "upload"
+    if route in TRANSFER_ROUTES:
+        return "transfer"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if route in DETAIL_ROUTES:
+        return "detail"
+    return "feed"
+
+
+class ConcurrencyLimiter:
+    """세마포어 + 대기 시간 기반 적응형 차단"""
+
+    def __init__(self, route_class: RouteClass, queue_target: float = QUEUE_TARGET,
+                 queue_interval: float = QUEUE_INTERVAL, max_queue: float = MAX_QUEUE):
+        self.route_class = route_class
+        self.queue_target = queue_target
+        self.queue_interval = queue_interval
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(route_class.concurrency)
+        # 대기 시간이 목표를 처음 넘은 시각 (넘지 않으면 None)
+        self._above_target_since: Optional[float] = None
+        self.overloaded = False
+
+    def _record(self, waited: float):
+        now = time.monotonic()
+        if waited <= self.queue_target:
+            self._above_target_since = None
+            self.overloaded = False
+        elif self._above_target_since is None:
+            self._above_target_since = now
+        elif now - self._above_target_since >= self.queue_interval:
+            self.overloaded = True
+
+    async def acquire(self) -> Tuple[bool, float, str]:
+        """(허용 여부, 대기 시간, 차단 사유)"""
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self._record(0.0)
+            return True, 0.0, ""
+        if self.overloaded:
+            return False, 0.0, "overloaded"
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_queue)
+        except asyncio.TimeoutError:
+            self._record(time.monotonic() - started)
+            return False, time.monotonic() - started, "queue_timeout"
+        waited = time.monotonic() - started
+        self._record(waited)
+        return True, waited, ""
+
+    def release(self):
+        self._semaphore.release()
+
+
+def _retry_after(limiter: ConcurrencyLimiter) -> str:
+    return str(max(1, math.ceil(limiter.max_queue)))
+
+
+class DeadlineMiddleware:
+    """분류별 동시성 제한과 데드라인을 적용하는 ASGI 미들웨어
+
+    RequestContextMiddleware 안쪽에 있어야 라우트 템플릿을 알 수 있음
+    """
+
+    def __init__(self, app, route_classes: Dict[str, RouteClass] = ROUTE_CLASSES):
+        self.app = app
+        self.limiters = {name: ConcurrencyLimiter(route_class) for name, route_class in route_classes.items()}
+
+    async def __call__(self, scope, receive, send):
+        context = current_request()
+        if scope["type"] != "http" or context is None:
+            await self.app(scope, receive, send)
+            return
+
+        class_name = classify(scope["method"], context.route)
+        if class_name is None:
+            await self.app(scope, receive, send)
+            return
+        context.route_class = class_name
+
+        limiter = self.limiters[class_name]
+        admitted, waited, reason = await limiter.acquire()
+        route_class_queue_seconds.observe(waited, class_name)
+        remaining = limiter.route_class.deadline - waited
+        if admitted and remaining <= 0:
+            limiter.release()
+            admitted, reason = False, "deadline"
+        if not admitted:
+            requests_shed_total.inc(class_name, reason)
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry"},
+                status_code=503,
+                headers={"Retry-After": _retry_after(limiter)},
+            )
+            await response(scope, receive, send)
+            return
+
+        route_class_in_flight.inc(class_name)
+        try:
+            # 남은 예산이 요청 안의 모든 MongoDB 명령에 maxTimeMS/소켓 타임아웃으로 적용됨
+            with pymongo.timeout(remaining):
+                await self.app(scope, receive, send)
+        finally:
+            route_class_in_flight.dec(class_name)
+            limiter.release()
+
+
+def deadline_exceeded_response(exc) -> JSONResponse:
+    """데드라인 초과로 MongoDB 명령이 중단됐을 때의 응답"""
+    context = current_request()
+    deadline_exceeded_total.inc(context.route_class if context and context.route_class else "none")
+    return JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
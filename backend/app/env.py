@@ -0,0 +1,28 @@
+import os
+
+# 환경변수 설정 읽기 (잘못된 값이면 기본값 사용)
+# - 다른 app 모듈을 가져오지 않으므로 metrics, database 등 어느 모듈이든 import 시점에 사용 가능
+
+
+def env_int(name: str, default: int) -> int:
+    """정수 환경변수 읽기 (잘못된 값이면 기본값 사용)"""
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """실수 환경변수 읽기 (잘못된 값이면 기본값 사용)"""
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """불리언 환경변수 읽기 (1, true, yes, on이면 참)"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,149 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from app.env import env_float, env_int
+from app.metrics import sse_events_total, sse_evictions_total, sse_subscribers
+
+# 일기별 실시간 이벤트 (SSE) 허브
+# - 토픽(일기 ID)마다 구독자 집합을 두고, 발행 시 메시지를 한 번만 직렬화해 모든 큐에 넣음
+# - 연결 하나당 작은 bounded 큐와 제너레이터 하나뿐이라 유휴 연결 수천 개도 가벼움
+# - 하트비트는 연결마다 타이머를 두지 않고 허브의 태스크 하나가 일괄 전송
+# - 큐가 가득 찬(따라오지 못하는) 구독자는 끊고, 클라이언트는 재연결 후 다시 조회함
+# - 워커 프로세스 안에서만 전달되므로 여러 워커로 실행하면 같은 워커에 붙은 구독자만 받음
+
+QUEUE_SIZE = env_int("EVENTS_QUEUE_SIZE", 32)
+HEARTBEAT_SECONDS = env_float("EVENTS_HEARTBEAT_SECONDS", 15.0)
+MAX_SUBSCRIBERS = env_int("EVENTS_MAX_SUBSCRIBERS", 10000)
+# 연결이 끊겼을 때 브라우저 EventSource의 재연결 대기 시간
+RETRY_MS = 3000
+
+_HEARTBEAT = b": ping\n\n"
+_CLOSE = object()
+
+
+def format_event(event: str, data) -> bytes:
+    """SSE 메시지 포맷 (data는 한 줄 JSON)"""
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscriber:
+    """구독 연결 하나 (bounded 큐)"""
+    __slots__ = ("topic", "queue", "closed")
+
+    def __init__(self, topic: str, queue_size: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+
+class EventHub:
+    """프로세스 내 pub/sub 허브"""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, heartbeat_seconds: float = HEARTBEAT_SECONDS,
+                 max_subscribers: int = MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._count = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def full(self) -> bool:
+        """구독자 수 상한에 도달했는지"""
+        return self._count >= self.max_subscribers
+
+    def subscribe(self, topic: str) -> Subscriber:
+        subscriber = Subscriber(topic, self.queue_size)
+        self._topics.setdefault(topic, set()).add(subscriber)
+        self._count += 1
+        sse_subscribers.inc()
+        self._ensure_heartbeat()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._topics.get(subscriber.topic)
+        if not subscribers or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._topics[subscriber.topic]
+        self._count -= 1
+        sse_subscribers.dec()
+
+    def publish(self, topic: str, event: str, data) -> int:
+        """토픽 구독자에게 이벤트 전달 (대기하지 않음), 전달한 구독자 수 반환"""
+        sse_events_total.inc(event)
+        subscribers = self._topics.get(topic)
+        if not subscribers:
+            return 0
+        message = format_event(event, data)
+        delivered = 0
+        for subscriber in list(subscribers):
+            if self._offer(subscriber, message):
+                delivered += 1
+        return delivered
+
+    def _offer(self, subscriber: Subscriber, message: bytes) -> bool:
+        try:
+            subscriber.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self._evict(subscriber, "slow_consumer")
+            return False
+
+    def _evict(self, subscriber: Subscriber, reason: str):
+        """밀린 메시지를 버리고 종료 신호를 넣음 (스트림이 다음 읽기에서 끝남)"""
+        if subscriber.closed:
+            return
+        subscriber.closed = True
+        self.unsubscribe(subscriber)
+        sse_evictions_total.inc(reason)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(_CLOSE)
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+
+    async def _heartbeat(self):
+        """주기적으로 모든 구독자에게 주석 메시지 전송 (프록시 유휴 타임아웃 방지, 죽은 연결 감지)"""
+        while self._topics:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscribers in list(self._topics.values()):
+                for subscriber in list(subscribers):
+                    self._offer(subscriber, _HEARTBEAT)
+
+    async def stream(self, topic: str) -> AsyncIterator[bytes]:
+        """StreamingResponse용 제너레이터 (클라이언트가 끊으면 취소되며 구독 해제)"""
+        subscriber = self.subscribe(topic)
+        try:
+            yield f"retry: {RETRY_MS}\n".encode("utf-8") + format_event("ready", {"topic": topic})
+            while True:
+                message = await subscriber.queue.get()
+                if message is _CLOSE:
+                    yield format_event("evicted", {"reconnect": True})
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def close(self):
+        """모든 스트림 종료 (애플리케이션 종료 시)"""
+        for subscribers in list(self._topics.values()):
+            for subscriber in list(subscribers):
+                self._evict(subscriber, "shutdown")
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+
+hub = EventHub()
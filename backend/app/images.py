@@ -0,0 +1,100 @@
+import os
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from app.env import env_int
+
+# 업로드된 이미지 후처리 (app/jobs.py의 프로세스 풀에서 실행되므로 가벼운 의존성만 import)
+
+PROFILE_IMAGE_MAX_SIZE = env_int("PROFILE_IMAGE_MAX_SIZE", 512)
+IMAGE_THUMBNAIL_SIZE = env_int("IMAGE_THUMBNAIL_SIZE", 480)
+# 압축 폭탄 방지 (헤더의 가로 x 세로 기준, 디코딩 전에 거절)
+IMAGE_MAX_PIXELS = env_int("IMAGE_MAX_PIXELS", 40_000_000)
+
+
+def downscale(path: Path, max_size: int) -> bool:
+    """긴 변이 max_size를 넘거나 EXIF가 있으면 회전을 적용해 줄이고 메타데이터를 뺀 뒤 같은 이름으로 교체"""
+    with Image.open(path) as image:
+        image_format = image.format
+        # 애니메이션 GIF는 첫 프레임만 남게 되므로 건드리지 않음
+        if getattr(image, "is_animated", False):
+            return False
+        if max(image.size) <= max_size and not image.getexif():
+            return False
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size))
+        temporary = path.with_name(path.name + ".tmp")
+        image.save(temporary, format=image_format)
+    # 업로드 순서는 수정 시각으로 판단하므로(remove_older) 원본의 시각을 유지
+    original = path.stat()
+    os.utime(temporary, ns=(original.st_atime_ns, original.st_mtime_ns))
+    # 읽는 쪽이 반쯤 쓴 파일을 보지 않도록 교체는 rename 한 번으로
+    os.replace(temporary, path)
+    return True
+
+
+def remove_older(path: Path, prefix: str, modified_at: float) -> int:
+    """같은 사용자의 이전 프로필 사진 삭제 (더 나중에 올린 사진은 남김)"""
+    removed = 0
+    for candidate in path.parent.glob(f"{prefix}*"):
+        if candidate == path or candidate.suffix == ".tmp":
+            continue
+        if candidate.stem != prefix and not candidate.stem.startswith(f"{prefix}-"):
+            continue
+        try:
+            if candidate.stat().st_mtime < modified_at:
+                candidate.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def process_profile_image(payload: dict) -> dict:
+    """프로필 사진 리사이즈와 이전 사진 정리 (다시 실행해도 안전함)"""
+    path = Path(payload["path"])
+    try:
+        modified_at = path.stat().st_mtime
+    except FileNotFoundError:
+        # 처리 전에 더 새 사진이 올라와 정리된 경우
+        return {"resized": False, "removed": 0}
+    try:
+        resized = downscale(path, PROFILE_IMAGE_MAX_SIZE)
+    except Image.UnidentifiedImageError:
+        # 확장자만 이미지인 파일은 그대로 둠 (다시 시도해도 같은 결과)
+        resized = False
+    removed = remove_older(path, payload["user_id"], modified_at)
+    return {"resized": resized, "removed": removed}
+
+
+def probe(path: Path) -> dict:
+    """일기 첨부 이미지의 형식과 크기 확인 (픽셀은 디코딩하지 않음, 이미지가 아니거나 너무 크면 ValueError)"""
+    try:
+        with Image.open(path) as image:
+            image_format, (width, height) = image.format, image.size
+            if width * height > IMAGE_MAX_PIXELS:
+                raise ValueError("Image dimensions are too large")
+            image.verify()
+    except (Image.UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, OSError) as exc:
+        raise ValueError("Invalid image file") from exc
+    return {"format": image_format, "width": width, "height": height}
+
+
+def make_thumbnail(payload: dict) -> dict:
+    """일기 첨부 이미지의 WebP 썸네일 생성 (이미 있거나 원본이 정리됐으면 건너뜀)"""
+    source, target = Path(payload["source"]), Path(payload["target"])
+    if target.exists():
+        return {"created": False}
+    temporary = target.with_name(target.name + ".tmp")
+    try:
+        with Image.open(source) as image:
+            # 애니메이션은 첫 프레임으로
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((IMAGE_THUMBNAIL_SIZE, IMAGE_THUMBNAIL_SIZE))
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P", "PA") else "RGB")
+            image.save(temporary, format="WEBP", quality=80)
+    except FileNotFoundError:
+        return {"created": False}
+    os.replace(temporary, target)
+    return {"created": True}
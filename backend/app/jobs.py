@@ -0,0 +1,277 @@
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.env import env_bool, env_float, env_int
+from app.database import get_repositories
+from app.metrics import job_duration, jobs_total
+
+logger = logging.getLogger("app.jobs")
+
+# 백그라운드 작업 큐
+# - 요청은 jobs 컬렉션에 작업을 넣고 바로 응답하며, 워커 프로세스마다 lifespan에서 시작한 asyncio 워커가 꺼내 실행
+#   (FastAPI BackgroundTasks와 달리 재시작해도 작업이 남아 있음)
+# - 꺼낼 때 find_one_and_update로 running 상태와 리스 만료 시각, 꺼낼 때마다 새로 만든 소유자 토큰을 한 번에 기록하므로
+#   여러 워커가 같은 작업을 잡지 않고, 리스가 만료돼 다른 워커가 가져간 작업은 원래 워커가 연장하거나 끝내지 못함
+# - 실행 중에는 리스를 주기적으로 연장하고, 프로세스가 죽어 연장이 멈추면 리스가 지난 뒤 다른 워커가 다시 가져감
+#   (같은 작업이 두 번 실행될 수 있으므로 핸들러는 다시 실행해도 안전해야 함)
+# - 실패하면 지수 백오프로 다시 시도하고 max_attempts를 넘으면 failed로 남김 (보관 기간 후 TTL 인덱스로 삭제)
+# - CPU를 쓰는 작업(cpu_bound=True)은 이벤트 루프를 막지 않도록 프로세스 풀에서 실행
+
+ENABLED = env_bool("JOBS_ENABLED", True)
+WORKERS = env_int("JOB_WORKERS", 2)
+PROCESS_WORKERS = env_int("JOB_PROCESS_WORKERS", 1)
+POLL_SECONDS = env_float("JOB_POLL_SECONDS", 1.0)
+LEASE_SECONDS = env_float("JOB_LEASE_SECONDS", 60.0)
+TIMEOUT_SECONDS = env_float("JOB_TIMEOUT_SECONDS", 300.0)
+MAX_ATTEMPTS = env_int("JOB_MAX_ATTEMPTS", 5)
+RETRY_BASE_SECONDS = env_float("JOB_RETRY_BASE_SECONDS", 2.0)
+RETRY_MAX_SECONDS = env_float("JOB_RETRY_MAX_SECONDS", 300.0)
+SHUTDOWN_GRACE_SECONDS = env_float("JOB_SHUTDOWN_GRACE_SECONDS", 10.0)
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    name: str
+    func: Callable
+    cpu_bound: bool = False
+    max_attempts: int = MAX_ATTEMPTS
+    timeout: float = TIMEOUT_SECONDS
+
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job(name: str, *, cpu_bound: bool = False, max_attempts: int = MAX_ATTEMPTS, timeout: float = TIMEOUT_SECONDS):
+    """작업 핸들러 등록 데코레이터
+
+    일반 작업은 async def handler(payload), cpu_bound 작업은 프로세스 풀에서 실행할 모듈 수준의 def handler(payload)
+    """
+    def decorator(func):
+        HANDLERS[name] = JobHandler(name, func, cpu_bound, max_attempts, timeout)
+        return func
+    return decorator
+
+
+def retry_delay(attempts: int) -> float:
+    """attempts번째 실패 뒤 다시 시도할 때까지의 시간 (함께 실패한 작업이 한꺼번에 몰리지 않게 지터)"""
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+async def enqueue(name: str, payload: Optional[dict] = None, *, delay: float = 0, key: Optional[str] = None) -> dict:
+    """작업 추가
+
+    key를 주면 아직 시작하지 않은 같은 key의 작업과 합쳐지고, 그 작업의 실행 시각은 둘 중 늦은 쪽으로 미뤄짐
+    """
+    if name not in HANDLERS:
+        raise ValueError(f"Unknown job: {name}")
+    now = datetime.now(timezone.utc)
+    document = {
+        "name": name,
+        "payload": payload or {},
+        "status": "queued",
+        "run_at": now + timedelta(seconds=delay),
+        "attempts": 0,
+        "created_at": now,
+    }
+    if key is not None:
+        document["key"] = key
+    queued = await get_repositories().jobs.enqueue(document)
+    jobs_total.inc(name, "enqueued")
+    if delay <= 0:
+        runner.notify()
+    return queued
+
+
+class JobRunner:
+    """워커 프로세스 안에서 작업을 꺼내 실행하는 asyncio 워커 묶음"""
+
+    def __init__(self, workers: int = WORKERS, poll_seconds: float = POLL_SECONDS,
+                 lease_seconds: float = LEASE_SECONDS, process_workers: int = PROCESS_WORKERS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.process_workers = process_workers
+        self.worker_id = ""
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if self._tasks or self.workers <= 0:
+            return
+        # gunicorn은 preload 후 fork하므로 pid는 시작 시점에 읽음
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._work(), name=f"job-worker-{index}", context=contextvars.Context())
+            for index in range(self.workers)
+        ]
+        print(f"✓ Started {self.workers} job worker(s)")
+
+    def notify(self):
+        """같은 프로세스에서 넣은 작업은 폴링을 기다리지 않고 바로 꺼내게 깨움"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, grace: float = SHUTDOWN_GRACE_SECONDS):
+        """새 작업은 꺼내지 않고, 실행 중인 작업은 grace초까지 기다린 뒤 취소 (취소된 작업은 큐로 되돌림)"""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self.notify()
+        _, pending = await asyncio.wait(self._tasks, timeout=grace)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        print("✓ Job workers stopped")
+
+    async def run_in_process(self, func: Callable, *args):
+        """CPU를 쓰는 함수를 프로세스 풀에서 실행 (JOB_PROCESS_WORKERS=0이면 스레드에서)"""
+        if self.process_workers <= 0:
+            return await asyncio.to_thread(func, *args)
+        if self._pool is None:
+            # fork는 부모의 스레드와 소켓 상태까지 복사하므로 spawn으로 새 인터프리터를 띄움
+            self._pool = ProcessPoolExecutor(max_workers=self.process_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+        except BrokenProcessPool:
+            # 자식 프로세스가 죽으면 풀을 다시 만들고 이 작업은 재시도에 맡김
+            self._pool = None
+            raise
+
+    async def _work(self):
+        names = list(HANDLERS)
+        repos = get_repositories()
+        while not self._stopping:
+            # 꺼내기 전에 지워야 그사이 들어온 작업의 알림을 놓치지 않음
+            self._wakeup.clear()
+            now = datetime.now(timezone.utc)
+            try:
+                # hostname:pid는 같은 프로세스의 워커끼리, 재시작한 컨테이너(pid 1)와도 겹치므로 꺼낼 때마다 새 토큰
+                claimed = await repos.jobs.claim(names, self.claim_token(), now,
+                                                 now + timedelta(seconds=self.lease_seconds))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("failed to claim a job")
+                claimed = None
+            if claimed is None:
+                try:
+                    # 여러 워커의 폴링이 한 시점에 몰리지 않게 간격을 흩뜨림
+                    # (wait_for는 취소와 깨우기가 겹치면 취소를 삼켜 종료가 멈출 수 있어 timeout 사용)
+                    async with asyncio.timeout(self.poll_seconds * random.uniform(0.5, 1.5)):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+                continue
+            await self._run(claimed)
+
+    def claim_token(self) -> str:
+        """작업을 가져올 때 기록하는 소유자 토큰 (앞부분은 어느 프로세스인지 보기 위한 것)"""
+        return f"{self.worker_id}:{uuid.uuid4().hex}"
+
+    async def _run(self, claimed: dict):
+        handler = HANDLERS[claimed["name"]]
+        if claimed["attempts"] > handler.max_attempts:
+            # 실행 도중 프로세스가 죽어 리스 만료로 다시 꺼내지기를 반복한 작업
+            await self._finish(claimed, "failed", error="lease expired too many times")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(claimed))
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(handler.timeout):
+                if handler.cpu_bound:
+                    result = await self.run_in_process(handler.func, claimed["payload"])
+                else:
+                    result = await handler.func(claimed["payload"])
+        except asyncio.CancelledError:
+            # 종료 유예 시간을 넘겨 취소된 작업은 시도 횟수를 되돌려 다른 워커가 바로 가져가게 함
+            await self._requeue(claimed, "released", run_at=datetime.now(timezone.utc),
+                                attempts=claimed["attempts"] - 1)
+            raise
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if claimed["attempts"] >= handler.max_attempts:
+                logger.error("job %s %s failed after %d attempts", claimed["name"], claimed["_id"],
+                             claimed["attempts"], exc_info=exc)
+                await self._finish(claimed, "failed", error=error)
+            else:
+                delay = retry_delay(claimed["attempts"])
+                logger.warning("job %s %s failed (attempt %d), retrying in %.1fs: %s", claimed["name"],
+                               claimed["_id"], claimed["attempts"], delay, error)
+                await self._requeue(claimed, "retry", run_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+                                    error=error)
+        else:
+            await self._finish(claimed, "done", result=result)
+        finally:
+            heartbeat.cancel()
+            job_duration.observe(time.perf_counter() - started, claimed["name"])
+
+    async def _heartbeat(self, claimed: dict):
+        """실행 중인 작업의 리스를 주기적으로 연장"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            lease_until = datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+            try:
+                extended = await get_repositories().jobs.update_claimed(
+                    claimed["_id"], claimed["worker"], {"run_at": lease_until}
+                )
+            except Exception:
+                logger.warning("failed to extend lease on job %s", claimed["_id"], exc_info=True)
+                continue
+            if not extended:
+                logger.warning("lost lease on job %s %s", claimed["name"], claimed["_id"])
+                return
+
+    async def _finish(self, claimed: dict, status: str, **fields):
+        fields.update(status=status, finished_at=datetime.now(timezone.utc))
+        await self._update(claimed, status, fields)
+
+    async def _requeue(self, claimed: dict, result: str, **fields):
+        fields["status"] = "queued"
+        try:
+            await self._update(claimed, result, fields)
+        except DuplicateKeyError:
+            # 같은 key의 작업이 새로 들어와 있으므로 이 작업은 그쪽에 맡기고 끝냄
+            await self._finish(claimed, "done", superseded=True)
+
+    async def _update(self, claimed: dict, result: str, fields: dict):
+        try:
+            updated = await get_repositories().jobs.update_claimed(claimed["_id"], claimed["worker"], fields)
+        except DuplicateKeyError:
+            raise
+        except Exception:
+            # 기록하지 못해도 리스가 만료되면 다시 실행됨
+            logger.exception("failed to record job %s %s as %s", claimed["name"], claimed["_id"], result)
+            return
+        if not updated:
+            result = "lease_lost"
+        elif fields.get("superseded"):
+            result = "superseded"
+        jobs_total.inc(claimed["name"], result)
+
+
+runner = JobRunner()
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.env import env_float, env_int
+from app.database import get_repositories
+from app.jobs import enqueue, job
+from app.metrics import author_snapshot_updates_total
+
+# 일기/댓글의 작성자 표시 정보는 문서에 스냅샷(author, author_profile_image)으로 저장
+# - 조회 시 users를 조인하지 않음 (스냅샷이 없는 이전 문서만 users에서 조회)
+# - 닉네임/프로필 사진이 바뀌면 백그라운드 작업(app/jobs.py)으로 해당 사용자의 문서를 청크 단위로 갱신
+#   (author_synced_at으로 버전을 매겨 늦게 끝난 이전 변경이 최신 값을 덮어쓰지 않음)
+# - 변경 직후 다른 워커가 캐시된 이전 사용자 정보로 만든 문서를 위해 잠시 뒤 최신 사용자 정보로 한 번 더 전파
+# - 기존 데이터는 app/migrations.py의 백필로 채움
+
+PROPAGATION_CHUNK_SIZE = env_int("AUTHOR_PROPAGATION_CHUNK_SIZE", 500)
+PROPAGATION_RECHECK_SECONDS = env_float("AUTHOR_PROPAGATION_RECHECK_SECONDS", 10.0)
+
+
+def author_display(author: Optional[dict]):
+    """작성자의 최신 닉네임과 프로필 이미지 (탈퇴 등으로 없으면 익명)"""
+    if not author:
+        return "익명", None
+    return author.get("nickname", author.get("username", "익명")), author.get("profile_image")
+
+
+def author_snapshot(user, synced_at: Optional[datetime] = None) -> dict:
+    """일기/댓글에 저장할 작성자 스냅샷 (사용자 문서, UserResponse, 없는 사용자는 None)
+
+    새 문서는 synced_at에 작성 시각을 넣어 그 이전의 프로필 변경 전파가 덮어쓰지 않게 함
+    """
+    if user is not None and not isinstance(user, dict):
+        user = {"username": user.username, "nickname": user.nickname, "profile_image": user.profile_image}
+    nickname, profile_image = author_display(user)
+    snapshot = {"author": nickname or user.get("username") or "익명", "author_profile_image": profile_image}
+    if synced_at is not None:
+        snapshot["author_synced_at"] = synced_at
+    return snapshot
+
+
+def has_author_snapshot(document: dict) -> bool:
+    return "author_profile_image" in document
+
+
+async def resolve_authors(documents: List[dict], viewer: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+    """문서별 (작성자 닉네임, 프로필 이미지)
+
+    스냅샷이 있으면 그대로 쓰고, 백필 전 문서만 users에서 한 번에 조회
+    """
+    missing = [document.get("user_id") for document in documents if not has_author_snapshot(document)]
+    authors = await get_repositories().users.get_many(missing, viewer=viewer) if missing else {}
+
+    result = []
+    for document in documents:
+        if has_author_snapshot(document):
+            result.append((document.get("author") or "익명", document.get("author_profile_image")))
+        else:
+            author = authors.get(ObjectId(document["user_id"])) if document.get("user_id") else None
+            result.append(author_display(author))
+    return result
+
+
+async def propagate_author(user: dict, version: Optional[datetime] = None,
+                           chunk_size: int = PROPAGATION_CHUNK_SIZE) -> int:
+    """사용자의 일기/댓글 스냅샷 갱신 (갱신한 문서 수 반환)"""
+    repos = get_repositories()
+    snapshot = author_snapshot(user)
+    version = version or datetime.now(timezone.utc)
+    total = 0
+    for name, repository in (("diaries", repos.diaries), ("comments", repos.comments)):
+        while True:
+            updated = await repository.update_author_snapshot(user["_id"], snapshot, version, chunk_size)
+            if not updated:
+                break
+            author_snapshot_updates_total.inc(name, amount=updated)
+            total += updated
+            # 청크 사이에 다른 요청이 실행될 수 있게 양보
+            await asyncio.sleep(0)
+    return total
+
+
+@job("author.propagate")
+async def propagate_author_job(payload: dict) -> int:
+    """최신 사용자 정보로 스냅샷 전파 (여러 번 실행해도 결과가 같음)"""
+    # 사용자를 읽기 전 시각을 버전으로 써서, 이후의 변경을 읽은 전파나 새 문서를 덮어쓰지 않게 함
+    version = datetime.now(timezone.utc)
+    user = await get_repositories().users.get_by_id(ObjectId(payload["user_id"]))
+    if user is None:
+        return 0
+    return await propagate_author(user, version)
+
+
+async def schedule_author_propagation(user: dict):
+    """프로필 변경 후 작성자 스냅샷 전파 작업 추가
+
+    아직 시작하지 않은 같은 사용자의 전파 작업이 있으면 합쳐짐
+    """
+    user_id = str(user["_id"])
+    await enqueue("author.propagate", {"user_id": user_id}, key=f"author.propagate:{user_id}")
+    if PROPAGATION_RECHECK_SECONDS > 0:
+        # 다른 워커가 캐시된 이전 프로필로 방금 만든 문서까지 최신 사용자 정보로 다시 맞춤
+        await enqueue("author.propagate", {"user_id": user_id}, delay=PROPAGATION_RECHECK_SECONDS,
+                      key=f"author.recheck:{user_id}")
@@ -1,20 +1,66 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routes import diary, auth, comment, like
+import asyncio
+from pymongo.errors import PyMongoError
+from app import access_log, jobs, migrations, notifications, profiling, similar, views
+from app.cache import registry as invalidation_registry
+from app.change_streams import start_change_listener, stop_change_listener
+from app.database import connect_to_mongo, close_mongo_connection, use_memory_backend, settings, get_database
+from app.deadlines import DeadlineMiddleware, deadline_exceeded_response
+from app.events import hub
+from app.metrics import render_metrics
+from app.request_context import RequestContextMiddleware
+from app.routes import diary, auth, comment, like, notification, image, account
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """애플리케이션 생명주기 관리"""
     # 시작 시 실행
-    await connect_to_mongo()
+    migration_task = None
+    if settings.backend == "memory":
+        use_memory_backend()
+        # 단일 프로세스이므로 로컬 무효화만으로 캐시가 일관됨
+        invalidation_registry.set_healthy(True)
+    else:
+        await connect_to_mongo()
+        # 다른 워커의 쓰기를 로컬 캐시에 반영
+        start_change_listener(get_database())
+        if migrations.RUN_ON_STARTUP:
+            # 백필 등 데이터 마이그레이션 (한 워커에서만 실행되며 요청 처리를 막지 않음)
+            migration_task = asyncio.create_task(migrations.run_pending_in_background(get_database()))
+    if jobs.ENABLED:
+        # 이 프로세스에서 백그라운드 작업 실행 (JOBS_ENABLED=false면 작업 추가만 하고 실행은 다른 프로세스에 맡김)
+        jobs.runner.start()
+    if similar.ENABLED:
+        # 비슷한 일기 추천 색인 구축 (끝나기 전에는 추천 없이 응답)
+        similar.service.start()
+    if views.ENABLED:
+        # 일기 조회 수를 모아서 주기적으로 반영
+        views.counter.start()
+    if notifications.ENABLED:
+        # 댓글/좋아요 알림을 모아서 저장
+        notifications.notifier.start()
     yield
     # 종료 시 실행
+    if migration_task is not None:
+        migration_task.cancel()
+        await asyncio.gather(migration_task, return_exceptions=True)
+    # 실행 중인 작업은 유예 시간까지 마치고, 못 마친 작업은 큐로 되돌림
+    await jobs.runner.stop()
+    await similar.service.stop()
+    # 남은 조회 수 반영 (DB 연결을 닫기 전에)
+    await views.counter.stop()
+    await notifications.notifier.stop()
+    await hub.close()
+    await stop_change_listener()
     await close_mongo_connection()
+    # 남은 접근 로그 기록
+    await asyncio.to_thread(access_log.writer.stop)
 
 
 app = FastAPI(
@@ -24,6 +70,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 요청 단위 프로파일러 (PROFILING_TOKEN이나 PROFILING_SAMPLE_RATE를 설정했을 때만 등록)
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# 라우트 분류별 데드라인, 동시성 제한, 부하 차단 (CORS 안쪽이라 503 응답에도 CORS 헤더가 붙음)
+app.add_middleware(DeadlineMiddleware)
+
 # CORS 설정 (React 프론트엔드와 통신을 위해)
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +86,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 요청별 라우트/DB 호출 통계 수집 (metrics)
+app.add_middleware(RequestContextMiddleware, router=app.router)
+
+
+@app.exception_handler(PyMongoError)
+async def mongo_error_handler(request: Request, exc: PyMongoError):
+    """데드라인 초과로 중단된 MongoDB 명령은 504로 응답 (그 외 에러는 그대로 500)"""
+    if exc.timeout:
+        return deadline_exceeded_response(exc)
+    raise exc
+
 
 @app.get("/")
 async def root():
@@ -50,11 +114,20 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus 메트릭 엔드포인트"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # 라우터 등록
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(diary.router, prefix="/api/diaries", tags=["diaries"])
 app.include_router(comment.router, prefix="/api", tags=["comments"])
 app.include_router(like.router, prefix="/api", tags=["likes"])
+app.include_router(notification.router, prefix="/api/notifications", tags=["notifications"])
+app.include_router(image.router, prefix="/api/images", tags=["images"])
+app.include_router(account.router, prefix="/api/me", tags=["account"])
 
 # 정적 파일 서빙 (프로필 이미지)
 uploads_dir = Path("uploads")
@@ -0,0 +1,394 @@
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, Tuple
+
+import bson
+from pymongo import monitoring
+
+from app.env import env_bool, env_float
+from app.request_context import RequestContext, add_request_finished_hook, current_request
+
+logger = logging.getLogger("app.db")
+
+SLOW_COMMAND_MS = env_float("DB_SLOW_COMMAND_MS", 100.0)
+# 응답 크기 측정은 응답 문서를 다시 BSON 인코딩하므로 끌 수 있게 함
+MEASURE_REPLY_BYTES = env_bool("DB_METRICS_REPLY_BYTES", True)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Prometheus counter (라벨별 누적 값)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """Prometheus histogram (라벨별 버킷 분포)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # 라벨 -> [버킷별 카운트..., +Inf 카운트, 합계]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            cumulative += state[len(self.buckets)]
+            inf = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, inf)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """Prometheus gauge (라벨별 현재 값)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+REGISTRY = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+http_requests_total = _register(Counter(
+    "diary_http_requests_total", "HTTP requests by route template and status",
+    ("method", "route", "status"),
+))
+http_request_duration = _register(Histogram(
+    "diary_http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route"),
+))
+db_commands_total = _register(Counter(
+    "diary_db_commands_total", "MongoDB commands issued, attributed to the active route",
+    ("route", "command"),
+))
+db_command_failures_total = _register(Counter(
+    "diary_db_command_failures_total", "MongoDB commands that failed",
+    ("route", "command"),
+))
+db_command_duration = _register(Histogram(
+    "diary_db_command_duration_seconds", "MongoDB command latency by route and command",
+    ("route", "command"),
+))
+db_reply_bytes_total = _register(Counter(
+    "diary_db_reply_bytes_total", "BSON bytes returned by MongoDB per route",
+    ("route",),
+))
+db_commands_per_request = _register(Histogram(
+    "diary_db_commands_per_request", "MongoDB round trips per HTTP request (N+1 detector)",
+    ("method", "route"), buckets=COUNT_BUCKETS,
+))
+
+sse_subscribers = _register(Gauge(
+    "diary_sse_subscribers", "Open server-sent event streams in this worker",
+))
+sse_events_total = _register(Counter(
+    "diary_sse_events_total", "Events published to the in-process hub",
+    ("event",),
+))
+sse_evictions_total = _register(Counter(
+    "diary_sse_evictions_total", "Event streams closed by the server",
+    ("reason",),
+))
+
+cache_requests_total = _register(Counter(
+    "diary_cache_requests_total", "In-process cache lookups by result (hit, miss, expired)",
+    ("cache", "result"),
+))
+cache_invalidations_total = _register(Counter(
+    "diary_cache_invalidations_total", "Invalidation events delivered to local caches",
+    ("collection",),
+))
+change_stream_up = _register(Gauge(
+    "diary_change_stream_up", "1 while the change stream listener is receiving events",
+))
+change_stream_events_total = _register(Counter(
+    "diary_change_stream_events_total", "Change events received by this worker",
+    ("collection", "operation"),
+))
+change_stream_restarts_total = _register(Counter(
+    "diary_change_stream_restarts_total", "Change stream reconnects by reason",
+    ("reason",),
+))
+
+requests_shed_total = _register(Counter(
+    "diary_requests_shed_total", "Requests rejected with 503 before reaching a handler",
+    ("route_class", "reason"),
+))
+deadline_exceeded_total = _register(Counter(
+    "diary_deadline_exceeded_total", "Requests whose MongoDB calls ran past the route deadline",
+    ("route_class",),
+))
+route_class_in_flight = _register(Gauge(
+    "diary_route_class_in_flight", "Requests currently holding a concurrency slot",
+    ("route_class",),
+))
+route_class_queue_seconds = _register(Histogram(
+    "diary_route_class_queue_seconds", "Time spent waiting for a concurrency slot",
+    ("route_class",),
+))
+
+singleflight_requests_total = _register(Counter(
+    "diary_singleflight_requests_total",
+    "Coalesced read requests by role (leader, coalesced, own_write, wait_timeout, leader_cancelled)",
+    ("handler", "result"),
+))
+
+access_log_records_total = _register(Counter(
+    "diary_access_log_records_total", "Access log records by outcome (written, sampled_out, dropped)",
+    ("result",),
+))
+
+profiles_total = _register(Counter(
+    "diary_profiles_total", "Requests profiled by trigger (header, sample)",
+    ("trigger",),
+))
+
+author_snapshot_updates_total = _register(Counter(
+    "diary_author_snapshot_updates_total", "Diaries/comments whose denormalized author snapshot was rewritten",
+    ("collection",),
+))
+
+jobs_total = _register(Counter(
+    "diary_jobs_total",
+    "Background jobs by outcome (enqueued, done, retry, failed, superseded, released, lease_lost)",
+    ("name", "result"),
+))
+job_duration = _register(Histogram(
+    "diary_job_duration_seconds", "Background job run time by job name",
+    ("name",), buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0),
+))
+
+similar_index_documents = _register(Gauge(
+    "diary_similar_index_documents", "Public diaries in this worker's similar-diaries index",
+))
+similar_index_builds_total = _register(Counter(
+    "diary_similar_index_builds_total", "Similar-diaries index rebuilds by reason (startup, requested, compaction)",
+    ("reason",),
+))
+
+view_buffer_diaries = _register(Gauge(
+    "diary_view_buffer_diaries", "Diaries with buffered views waiting to be flushed in this worker",
+))
+view_flushes_total = _register(Counter(
+    "diary_view_flushes_total", "Buffered diary views flushed to MongoDB by outcome (ok, error)",
+    ("result",),
+))
+
+notification_buffer_size = _register(Gauge(
+    "diary_notification_buffer_size", "Notifications buffered in this worker waiting to be written",
+))
+notification_flushes_total = _register(Counter(
+    "diary_notification_flushes_total", "Buffered notification writes by outcome (ok, error)",
+    ("result",),
+))
+
+image_uploads_total = _register(Counter(
+    "diary_image_uploads_total", "Diary image uploads by outcome (stored, deduplicated, too_large, invalid)",
+    ("result",),
+))
+image_collections_total = _register(Counter(
+    "diary_image_collections_total", "Unreferenced image collection runs by outcome (deleted, kept)",
+    ("result",),
+))
+
+transfer_documents_total = _register(Counter(
+    "diary_transfer_documents_total", "Documents streamed by account export or written by import (diary, comment)",
+    ("direction", "type"),
+))
+
+
+def render_metrics() -> str:
+    """등록된 모든 메트릭을 Prometheus 텍스트 포맷으로 출력"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# 명령별 필터가 들어있는 필드 이름
+_FILTER_KEYS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+
+
+def filter_shape(value):
+    """쿼리 필터의 값을 타입 이름으로 치환한 모양 (슬로우 로그에 민감정보를 남기지 않음)"""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [filter_shape(item) for item in value]
+        return [type(value[0]).__name__] if value else []
+    return type(value).__name__
+
+
+def command_filter(command_name: str, command) -> object:
+    """명령 문서에서 필터 부분 추출"""
+    key = _FILTER_KEYS.get(command_name)
+    if key:
+        return command.get(key, {})
+    if command_name == "aggregate":
+        return [stage for stage in command.get("pipeline", []) if "$match" in stage]
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s") or []
+        return statements[0].get("q", {}) if statements else {}
+    return None
+
+
+class DatabaseCommandListener(monitoring.CommandListener):
+    """모든 MongoDB 명령을 현재 요청의 라우트에 귀속시켜 기록하는 리스너
+
+    Motor는 contextvars를 복사해서 스레드풀에서 pymongo를 실행하므로
+    리스너 콜백에서도 요청 컨텍스트를 읽을 수 있음
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, object], Tuple[RequestContext, object]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = (current_request(), event.command)
+
+    def _finish(self, event):
+        with self._lock:
+            return self._pending.pop((event.request_id, event.connection_id), (None, None))
+
+    def succeeded(self, event):
+        context, command = self._finish(event)
+        route = context.route if context else "background"
+        duration = event.duration_micros / 1_000_000
+
+        reply_bytes = len(bson.encode(event.reply)) if MEASURE_REPLY_BYTES else 0
+        db_commands_total.inc(route, event.command_name)
+        db_command_duration.observe(duration, route, event.command_name)
+        if reply_bytes:
+            db_reply_bytes_total.inc(route, amount=reply_bytes)
+        if context:
+            context.db_commands += 1
+            context.db_time += duration
+            context.db_reply_bytes += reply_bytes
+
+        if duration * 1000 >= SLOW_COMMAND_MS and command is not None:
+            logger.warning(
+                "slow mongo command: route=%s command=%s collection=%s duration_ms=%.1f filter=%s",
+                route,
+                event.command_name,
+                command.get(event.command_name),
+                duration * 1000,
+                filter_shape(command_filter(event.command_name, command)),
+            )
+
+    def failed(self, event):
+        context, _ = self._finish(event)
+        route = context.route if context else "background"
+        db_commands_total.inc(route, event.command_name)
+        db_command_failures_total.inc(route, event.command_name)
+        db_command_duration.observe(event.duration_micros / 1_000_000, route, event.command_name)
+        if context:
+            context.db_commands += 1
+            context.db_time += event.duration_micros / 1_000_000
+
+
+command_listener = DatabaseCommandListener()
+
+
+def _record_request(context: RequestContext):
+    """요청 종료 시 HTTP 메트릭 기록"""
+    http_requests_total.inc(context.method, context.route, str(context.status_code))
+    http_request_duration.observe(context.elapsed, context.method, context.route)
+    db_commands_per_request.observe(context.db_commands, context.method, context.route)
+
+
+add_request_finished_hook(_record_request)
@@ -0,0 +1,206 @@
+"""버전이 매겨진 데이터 마이그레이션
+
+적용 기록은 migrations 컬렉션에 {_id: 버전, status: running|done}으로 남기며,
+기록 문서 삽입을 잠금으로 써서 여러 워커가 동시에 시작해도 한 곳에서만 실행됩니다.
+마이그레이션은 버전 순서대로 적용하고, 앞 버전이 끝나지 않았으면 뒤 버전은 실행하지 않습니다.
+
+사용법 (backend 디렉토리에서):
+    python -m app.migrations status
+    python -m app.migrations run
+    python -m app.migrations unlock 1    # 실행 도중 프로세스가 죽어 running으로 남은 기록 제거
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.env import env_bool, env_int
+from app.calendar_rollup import backfill_calendar
+from app.lookups import author_snapshot
+from app.repositories.base import comment_thread_fields
+
+logger = logging.getLogger("app.migrations")
+
+COLLECTION = "migrations"
+BATCH_SIZE = env_int("MIGRATION_BATCH_SIZE", 1000)
+RUN_ON_STARTUP = env_bool("MIGRATIONS_ON_STARTUP", True)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[..., Awaitable[int]]
+
+
+async def backfill_author_snapshot(db, batch_size: int = BATCH_SIZE) -> int:
+    """스냅샷이 없는 일기/댓글에 작성자 닉네임과 프로필 이미지 채우기
+
+    배치마다 작성자를 한 번에 조회해 작성자별 update_many를 bulk_write로 보냄.
+    조건 필드에 인덱스가 없으므로 _id 순으로 이어서 읽어 이미 채운 문서를 다시 훑지 않음
+    """
+    started_at = datetime.now(timezone.utc)
+    missing = {"author_profile_image": {"$exists": False}}
+    total = 0
+    for collection_name in ("diaries", "comments"):
+        collection = db[collection_name]
+        last_id = None
+        while True:
+            query = missing if last_id is None else {"_id": {"$gt": last_id}, **missing}
+            cursor = collection.find(query, {"user_id": 1}).sort("_id", 1).limit(batch_size)
+            documents = await cursor.to_list(batch_size)
+            if not documents:
+                break
+            last_id = documents[-1]["_id"]
+            by_user: Dict[object, list] = {}
+            for document in documents:
+                by_user.setdefault(document.get("user_id"), []).append(document["_id"])
+            user_ids = [user_id for user_id in by_user if user_id is not None]
+            users = {
+                user["_id"]: user
+                async for user in db.users.find({"_id": {"$in": user_ids}},
+                                                {"username": 1, "nickname": 1, "profile_image": 1})
+            }
+            operations = [
+                # 백필 시작 시각을 버전으로 써서 백필 중 일어난 프로필 변경 전파가 우선하게 함
+                UpdateMany({"_id": {"$in": ids}, **missing},
+                           {"$set": author_snapshot(users.get(user_id), synced_at=started_at)})
+                for user_id, ids in by_user.items()
+            ]
+            result = await collection.bulk_write(operations, ordered=False)
+            total += result.modified_count
+            print(f"  {collection_name}: {total} documents backfilled")
+    return total
+
+
+async def backfill_comment_threads(db, batch_size: int = BATCH_SIZE) -> int:
+    """스레드 경로가 없는 기존 댓글을 최상위 댓글로 (답글 기능 이전 댓글은 모두 최상위)
+
+    작성자 스냅샷 백필처럼 _id 순으로 이어서 읽어 이미 채운 댓글을 다시 훑지 않음
+    """
+    missing = {"path": {"$exists": False}}
+    total = 0
+    last_id = None
+    while True:
+        query = missing if last_id is None else {"_id": {"$gt": last_id}, **missing}
+        cursor = db.comments.find(query, {"created_at": 1}).sort("_id", 1).limit(batch_size)
+        comments = await cursor.to_list(batch_size)
+        if not comments:
+            break
+        last_id = comments[-1]["_id"]
+        operations = [
+            UpdateOne({"_id": comment["_id"], **missing},
+                      {"$set": comment_thread_fields(comment["_id"], comment["created_at"])})
+            for comment in comments
+        ]
+        result = await db.comments.bulk_write(operations, ordered=False)
+        total += result.modified_count
+        print(f"  comments: {total} documents backfilled")
+    return total
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "author_snapshot_backfill", backfill_author_snapshot),
+    Migration(2, "diary_calendar_backfill", backfill_calendar),
+    Migration(3, "comment_thread_backfill", backfill_comment_threads),
+]
+
+
+async def status(db) -> List[dict]:
+    """마이그레이션별 적용 상태"""
+    records = {record["_id"]: record async for record in db[COLLECTION].find()}
+    return [
+        {"version": migration.version, "name": migration.name,
+         "status": records.get(migration.version, {}).get("status", "pending")}
+        for migration in MIGRATIONS
+    ]
+
+
+async def run_pending(db, batch_size: int = BATCH_SIZE) -> List[int]:
+    """적용되지 않은 마이그레이션을 순서대로 실행 (실행한 버전 목록 반환)"""
+    applied = []
+    for migration in MIGRATIONS:
+        record = await db[COLLECTION].find_one({"_id": migration.version})
+        if record is not None:
+            if record.get("status") == "done":
+                continue
+            # 다른 워커가 실행 중 (또는 중단되어 unlock 필요)
+            print(f"✗ Migration {migration.version} ({migration.name}) is {record.get('status')}, stopping")
+            break
+        try:
+            await db[COLLECTION].insert_one({
+                "_id": migration.version,
+                "name": migration.name,
+                "status": "running",
+                "started_at": datetime.now(timezone.utc),
+                "host": f"{socket.gethostname()}:{os.getpid()}",
+            })
+        except DuplicateKeyError:
+            break
+
+        print(f"✓ Applying migration {migration.version} ({migration.name})")
+        try:
+            affected = await migration.apply(db, batch_size)
+        except BaseException:
+            # 실패하면 기록을 지워 다음 실행에서 다시 시도 (백필은 이어서 해도 안전함)
+            await db[COLLECTION].delete_one({"_id": migration.version, "status": "running"})
+            raise
+        await db[COLLECTION].update_one(
+            {"_id": migration.version},
+            {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc), "affected": affected}},
+        )
+        applied.append(migration.version)
+    return applied
+
+
+async def run_pending_in_background(db):
+    """앱 시작 시 백그라운드 실행 (실패해도 서버는 계속 동작하고 조회는 users 조인으로 대체됨)"""
+    try:
+        await run_pending(db)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("data migration failed")
+
+
+async def _main(argv=None) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.database import settings
+
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="데이터 마이그레이션")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="적용 상태 출력")
+    run_parser = subparsers.add_parser("run", help="적용되지 않은 마이그레이션 실행")
+    run_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    unlock_parser = subparsers.add_parser("unlock", help="running으로 남은 기록 제거")
+    unlock_parser.add_argument("version", type=int)
+    args = parser.parse_args(argv)
+
+    client = AsyncIOMotorClient(settings.url)
+    db = client[settings.database_name]
+    try:
+        if args.command == "status":
+            for item in await status(db):
+                print(f"{item['version']:>4}  {item['name']:<32} {item['status']}")
+        elif args.command == "run":
+            applied = await run_pending(db, args.batch_size)
+            print(f"✓ Applied {len(applied)} migration(s)")
+        else:
+            result = await db[COLLECTION].delete_one({"_id": args.version, "status": "running"})
+            print(f"✓ Unlocked migration {args.version}" if result.deleted_count
+                  else f"✗ Migration {args.version} is not running")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
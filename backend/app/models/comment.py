@@ -10,8 +10,8 @@ class CommentBase(BaseModel):
 
 
 class CommentCreate(CommentBase):
-    """댓글 생성 요청 모델"""
-    pass
+    """댓글 생성 요청 모델 (parent_id가 있으면 그 댓글의 답글)"""
+    parent_id: Optional[str] = None
 
 
 class CommentUpdate(BaseModel):
@@ -28,6 +28,10 @@ class CommentResponse(CommentBase):
     author_profile_image: Optional[str] = None
     likes_count: int = 0  # 좋아요 수
     is_liked: bool = False  # 현재 사용자의 좋아요 여부
+    parent_id: Optional[str] = None  # 답글이면 부모 댓글 ID
+    depth: int = 0  # 최상위 댓글은 0
+    reply_count: int = 0  # 바로 아래 답글 수
+    is_deleted: bool = False  # 답글이 있어 삭제 표시만 남은 댓글
     created_at: datetime
     updated_at: datetime
 
@@ -1,8 +1,17 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Annotated, List, Literal, Optional
 from datetime import datetime
 from bson import ObjectId
 
+from app.models.image import DiaryImage
+
+# 일기 하나에 붙일 수 있는 이미지 수
+MAX_IMAGES = 4
+# 업로드 응답의 id (SHA-256 다이제스트)
+ImageId = Annotated[str, Field(pattern=r"^[0-9a-f]{64}$")]
+# 일괄 작업 요청 하나의 최대 작업 수
+BULK_MAX_OPERATIONS = 100
+
 
 class PyObjectId(ObjectId):
     """MongoDB ObjectId를 Pydantic에서 사용하기 위한 커스텀 타입"""
@@ -30,7 +39,7 @@ class DiaryBase(BaseModel):
 
 class DiaryCreate(DiaryBase):
     """일기 생성 요청 모델 (author는 인증된 사용자로 자동 설정)"""
-    pass
+    images: List[ImageId] = Field(default_factory=list, max_length=MAX_IMAGES)  # POST /api/images 응답의 id
 
 
 class DiaryUpdate(BaseModel):
@@ -38,6 +47,20 @@ class DiaryUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200)
     content: Optional[str] = Field(None, min_length=1)
     is_public: Optional[bool] = None
+    images: Optional[List[ImageId]] = Field(None, max_length=MAX_IMAGES)  # 주면 첨부 이미지 전체를 교체
+
+
+class DiaryBulkOperation(BaseModel):
+    """일괄 작업 하나 (update는 준 필드만 바꿈)"""
+    id: str
+    op: Literal["update", "delete"]
+    title: Optional[str] = Field(None, min_length=1, max_length=200)
+    is_public: Optional[bool] = None
+
+
+class DiaryBulkRequest(BaseModel):
+    """내 일기 일괄 수정/삭제 요청 모델"""
+    operations: List[DiaryBulkOperation] = Field(..., min_length=1, max_length=BULK_MAX_OPERATIONS)
 
 
 class DiaryResponse(DiaryBase):
@@ -48,6 +71,9 @@ class DiaryResponse(DiaryBase):
     author_profile_image: Optional[str] = None
     likes_count: int = 0  # 좋아요 수
     is_liked: bool = False  # 현재 사용자의 좋아요 여부
+    view_count: int = 0  # 조회 수 (몇 초 단위로 모아서 반영)
+    unique_viewers: int = 0  # 순 조회자 추정치
+    images: List[DiaryImage] = []
     created_at: datetime
     updated_at: datetime
 
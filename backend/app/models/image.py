@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class DiaryImage(BaseModel):
+    """일기에 붙은 이미지 (URL은 내용의 SHA-256이라 바뀌지 않음)"""
+    id: str  # SHA-256 다이제스트
+    url: str
+    thumbnail_url: str  # 썸네일이 만들어지기 전에는 원본으로 리다이렉트
+    width: int
+    height: int
+
+
+class ImageUploadResponse(DiaryImage):
+    """이미지 업로드 응답 모델 (id를 일기 작성/수정의 images에 넣어 첨부)"""
+    size: int
+    content_type: str
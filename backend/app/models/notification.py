@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class NotificationRead(BaseModel):
+    """알림 읽음 처리 요청 모델 (ids를 생략하면 모두 읽음)"""
+    ids: Optional[List[str]] = Field(None, max_length=100)
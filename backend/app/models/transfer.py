@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
+from datetime import datetime
+
+from app.models.comment import CommentBase
+from app.models.diary import DiaryBase
+
+# 가져오기 파일의 원본 ID (다른 플랫폼의 값일 수 있어 형식은 정하지 않음)
+SourceId = Annotated[str, Field(min_length=1, max_length=100)]
+# 가져오기 식별자 (중단된 가져오기를 같은 값으로 다시 보내면 체크포인트부터 이어서 가져옴)
+IMPORT_ID_PATTERN = r"^[A-Za-z0-9_.-]{1,64}$"
+
+
+class ImportedDiary(DiaryBase):
+    """가져오기 NDJSON의 일기 줄 ({"type": "diary", ...}, 모르는 필드는 무시)"""
+    id: SourceId
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class ImportedComment(CommentBase):
+    """가져오기 NDJSON의 댓글 줄 (diary_id, parent_id는 같은 파일 안의 원본 ID)"""
+    id: SourceId
+    diary_id: SourceId
+    parent_id: Optional[SourceId] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class ImportLineError(BaseModel):
+    """가져오지 못한 줄"""
+    line: int
+    detail: str
+
+
+class ImportResult(BaseModel):
+    """가져오기 결과 (diaries, comments는 중단된 앞선 시도를 포함한 누적 값)"""
+    import_id: str
+    status: str  # running(중단됨), done
+    lines: int  # 반영을 마친 마지막 줄 번호
+    resumed_from: int  # 이번 요청이 건너뛴 줄 수 (체크포인트)
+    diaries: int  # 가져온 일기 수 (앞선 시도가 넣은 것 포함)
+    comments: int  # 가져온 댓글 수 (앞선 시도가 넣은 것 포함)
+    skipped: int  # 형식이 잘못됐거나 파일에 없는 일기의 댓글이라 건너뛴 줄 수
+    errors: List[ImportLineError] = []  # 형식 오류 (앞에서부터 최대 20개)
+    seconds: float
+    lines_per_second: float
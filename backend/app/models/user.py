@@ -36,9 +36,15 @@ class Token(BaseModel):
     """토큰 응답 모델"""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
     user: UserResponse
 
 
+class RefreshRequest(BaseModel):
+    """리프레시 토큰 요청 모델 (재발급, 로그아웃)"""
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     """토큰 데이터 모델"""
     username: Optional[str] = None
@@ -0,0 +1,228 @@
+import asyncio
+import contextvars
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.env import env_bool, env_float, env_int
+from app.database import get_repositories
+from app.jobs import job
+from app.lookups import author_snapshot
+from app.metrics import notification_buffer_size, notification_flushes_total
+
+logger = logging.getLogger("app.notifications")
+
+# 알림함 (내 일기/댓글에 달린 댓글, 답글, 좋아요)
+# - 라우트는 알림을 워커 메모리에 모으기만 하고, NOTIFICATIONS_FLUSH_SECONDS마다 bulk_write 한 번으로 저장
+# - 좋아요 알림은 받는 사람과 대상별로 안 읽은 알림 하나에 합쳐 "OOO님 외 11명"으로 보여 줌
+#   (모으는 동안에도 합치고, 저장할 때는 (recipient_id, group) unique 부분 인덱스로 워커 간에도 합침)
+# - 안 읽은 수는 notification_counters에 증분으로 유지해 배지 조회가 _id 조회 한 번
+#   (새 알림 수만큼 더하고, 읽음 처리/정리/삭제한 수만큼 뺌)
+# - 안 읽은 알림이 NOTIFICATIONS_MAX_UNREAD개를 넘으면 오래된 것부터 읽음으로 돌리고,
+#   읽은 알림은 read_at TTL 인덱스로 보관 기간 뒤 삭제됨
+# - 본인 행동은 알리지 않고, 좋아요 취소는 알림을 되돌리지 않음. 저장 전에 프로세스가 죽으면 그 사이 알림은 사라짐
+
+ENABLED = env_bool("NOTIFICATIONS_ENABLED", True)
+FLUSH_SECONDS = env_float("NOTIFICATIONS_FLUSH_SECONDS", 1.0)
+MAX_PENDING = env_int("NOTIFICATIONS_MAX_PENDING", 1000)
+MAX_UNREAD = env_int("NOTIFICATIONS_MAX_UNREAD", 200)
+PREVIEW_LENGTH = 100
+
+_MESSAGES = {
+    "diary.comment": "{actor}님이 회원님의 일기에 댓글을 남겼습니다",
+    "comment.reply": "{actor}님이 회원님의 댓글에 답글을 남겼습니다",
+    "diary.like": "{actor}님{others}이 회원님의 일기를 좋아합니다",
+    "comment.like": "{actor}님{others}이 회원님의 댓글을 좋아합니다",
+}
+
+
+def _actor(user) -> dict:
+    snapshot = author_snapshot(user)
+    return {"id": ObjectId(user.id), "nickname": snapshot["author"], "profile_image": snapshot["author_profile_image"]}
+
+
+def _preview(text: str) -> str:
+    return text if len(text) <= PREVIEW_LENGTH else text[:PREVIEW_LENGTH] + "…"
+
+
+def notification_helper(notification: dict) -> dict:
+    actor = notification.get("actor") or {}
+    count = notification.get("count", 1)
+    others = f" 외 {count - 1}명" if count > 1 else ""
+    comment_id = notification.get("comment_id")
+    return {
+        "id": str(notification["_id"]),
+        "kind": notification["kind"],
+        "message": _MESSAGES[notification["kind"]].format(actor=actor.get("nickname", "익명"), others=others),
+        "diary_id": str(notification["diary_id"]),
+        "comment_id": str(comment_id) if comment_id else None,
+        "actor": {
+            "id": str(actor["id"]) if actor.get("id") else None,
+            "nickname": actor.get("nickname"),
+            "profile_image": actor.get("profile_image"),
+        },
+        "count": count,
+        "preview": notification.get("preview"),
+        "read": notification.get("read", False),
+        "created_at": notification["created_at"],
+        "updated_at": notification["updated_at"],
+    }
+
+
+class Notifier:
+    """워커 프로세스의 알림 버퍼와 주기적 저장 (lifespan에서 시작)"""
+
+    def __init__(self):
+        self._inserts: List[dict] = []
+        # (받는 사람, group) -> 합쳐진 좋아요 알림
+        self._groups: Dict[Tuple[ObjectId, str], dict] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self):
+        """저장 루프를 멈추고 남은 알림 저장"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._wakeup = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("final notification flush failed, %d dropped", self.pending())
+            self._inserts, self._groups = [], {}
+
+    def pending(self) -> int:
+        return len(self._inserts) + len(self._groups)
+
+    def add(self, notification: dict):
+        """알림 하나를 버퍼에 추가 (DB 접근 없음, 본인에게 가는 알림은 무시)"""
+        if self._task is None or notification["recipient_id"] == notification["actor"]["id"]:
+            return
+        group = notification.get("group")
+        if group is None:
+            self._inserts.append(notification)
+        else:
+            earlier = self._groups.get((notification["recipient_id"], group))
+            if earlier is not None:
+                notification["created_at"] = earlier["created_at"]
+            self._groups[(notification["recipient_id"], group)] = notification
+        notification_buffer_size.set(self.pending())
+        if self.pending() >= MAX_PENDING:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """모아 둔 알림 저장 후 안 읽은 수 갱신 (저장한 알림 수 반환)"""
+        batch = self._inserts + list(self._groups.values())
+        self._inserts, self._groups = [], {}
+        notification_buffer_size.set(0)
+        if not batch:
+            return 0
+        repos = get_repositories()
+        try:
+            created = await repos.notifications.deliver(batch)
+        except BaseException:
+            # 다음 저장 때 다시 시도 (이미 들어간 삽입은 같은 _id라 건너뜀)
+            for notification in batch:
+                self._restore(notification)
+            notification_flushes_total.inc("error")
+            raise
+        notification_flushes_total.inc("ok")
+        await repos.notifications.add_unread(created)
+        now = datetime.now(timezone.utc)
+        for user_id in await repos.notifications.over_limit(list(created), MAX_UNREAD):
+            trimmed = await repos.notifications.trim_unread(user_id, MAX_UNREAD, now)
+            await repos.notifications.add_unread({user_id: -trimmed})
+        return len(batch)
+
+    def _restore(self, notification: dict):
+        group = notification.get("group")
+        if group is None:
+            self._inserts.append(notification)
+        else:
+            # 실패하는 동안 더 최근 좋아요가 모였으면 그쪽을 남김
+            self._groups.setdefault((notification["recipient_id"], group), notification)
+        notification_buffer_size.set(self.pending())
+
+    async def _run(self):
+        while True:
+            try:
+                async with asyncio.timeout(FLUSH_SECONDS):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("notification flush failed")
+                await asyncio.sleep(FLUSH_SECONDS)
+
+
+notifier = Notifier()
+
+
+def notify_comment(diary: dict, comment: dict, parent: Optional[dict], actor):
+    """댓글 작성: 답글이면 부모 댓글 작성자에게, 그리고 (부모 작성자가 아니면) 일기 작성자에게"""
+    now = datetime.now(timezone.utc)
+    base = {
+        "diary_id": diary["_id"],
+        "comment_id": comment["_id"],
+        "actor": _actor(actor),
+        "preview": _preview(comment["content"]),
+        "read": False,
+        "created_at": now,
+        "updated_at": now,
+    }
+    recipients = []
+    if parent is not None and parent.get("user_id") is not None:
+        recipients.append((parent["user_id"], "comment.reply"))
+    if diary.get("user_id") is not None and all(diary["user_id"] != user_id for user_id, _ in recipients):
+        recipients.append((diary["user_id"], "diary.comment"))
+    for recipient_id, kind in recipients:
+        notifier.add({**base, "recipient_id": recipient_id, "kind": kind})
+
+
+def notify_like(target_type: str, target: dict, actor, likes_count: int):
+    """좋아요: 대상 작성자의 안 읽은 좋아요 알림에 합침 (count는 대상의 현재 좋아요 수)"""
+    if target.get("user_id") is None:
+        return
+    now = datetime.now(timezone.utc)
+    notification = {
+        "recipient_id": target["user_id"],
+        "kind": f"{target_type}.like",
+        "group": f"{target_type}:{target['_id']}",
+        "diary_id": target["_id"] if target_type == "diary" else target["diary_id"],
+        "actor": _actor(actor),
+        "count": likes_count,
+        "preview": _preview(target["title"] if target_type == "diary" else target["content"]),
+        "read": False,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if target_type == "comment":
+        notification["comment_id"] = target["_id"]
+    notifier.add(notification)
+
+
+@job("notifications.forget")
+async def forget_job(payload: dict) -> int:
+    return await forget(payload["field"], [ObjectId(value) for value in payload["ids"]])
+
+
+async def forget(field: str, ids: List[ObjectId]) -> int:
+    """삭제된 일기/댓글의 알림 정리 (정리 작업에서 호출, 지운 안 읽은 알림 수만큼 배지를 줄임)"""
+    if not ids:
+        return 0
+    repos = get_repositories()
+    removed = await repos.notifications.delete_for(field, ids)
+    await repos.notifications.add_unread({user_id: -count for user_id, count in removed.items()})
+    return sum(removed.values())
@@ -0,0 +1,200 @@
+import asyncio
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.env import env_float, env_int
+from app.metrics import profiles_total
+from app.request_context import current_request
+
+# 요청 단위 샘플링 프로파일러
+# - 관리자용 헤더(X-Profile: <PROFILING_TOKEN>) 또는 PROFILING_SAMPLE_RATE 비율로 요청을 골라 프로파일
+# - 샘플러 스레드가 이벤트 루프 스레드의 스택을 주기적으로 읽고, 이 요청의 미들웨어 프레임이 스택에 있을 때만
+#   해당 요청의 샘플로 셈 (같은 워커의 다른 요청은 섞이지 않음)
+# - 스택에 없던 시간은 await 중인 시간이며, 요청의 MongoDB 시간(db_time)만큼을 [await db]로,
+#   나머지를 [await other]로 나눠 flamegraph에 함께 표시
+# - 결과는 PROFILING_DIR에 collapsed stack 형식(flamegraph.pl, speedscope에서 열림)과 요약 JSON으로 저장하고
+#   오래된 파일부터 지워 PROFILING_MAX_FILES개만 유지
+# - 토큰과 샘플링 비율이 모두 비어 있으면 미들웨어를 등록하지 않으므로 오버헤드 없음 (app/main.py)
+
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "")
+SAMPLE_RATE = min(max(env_float("PROFILING_SAMPLE_RATE", 0.0), 0.0), 1.0)
+INTERVAL_SECONDS = env_float("PROFILING_INTERVAL_MS", 5.0) / 1000
+MAX_FILES = env_int("PROFILING_MAX_FILES", 200)
+PROFILING_DIR = Path(os.environ.get("PROFILING_DIR", "profiles"))
+HEADER = b"x-profile"
+
+ENABLED = bool(PROFILING_TOKEN) or SAMPLE_RATE > 0
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # 프로젝트 파일은 app/... 형태로, 라이브러리는 site-packages 뒤의 경로로 줄임
+    for marker in ("site-packages/", "/backend/"):
+        index = filename.rfind(marker)
+        if index >= 0:
+            filename = filename[index + len(marker):]
+            break
+    return f"{filename}:{code.co_qualname}"
+
+
+class RequestProfile:
+    """프로파일 중인 요청 하나의 샘플"""
+
+    def __init__(self, profile_id: str, thread_id: int, root_frame, label: str):
+        self.profile_id = profile_id
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.label = label
+        self.stacks: StackCounter = StackCounter()
+        self.on_loop = 0
+        self.off_loop = 0
+        self.started = time.perf_counter()
+
+    def sample(self, frame):
+        """스택이 이 요청의 것이면 collapsed 스택으로 기록"""
+        names = []
+        while frame is not None:
+            if frame is self.root_frame:
+                names.reverse()
+                self.stacks[";".join(names)] += 1
+                self.on_loop += 1
+                return
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        self.off_loop += 1
+
+
+class Sampler:
+    """프로파일 중인 요청이 있을 때만 도는 샘플링 스레드"""
+
+    def __init__(self, interval: float = INTERVAL_SECONDS):
+        self.interval = interval
+        self._profiles: Dict[str, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._switch_interval: Optional[float] = None
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles[profile.profile_id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                # 루프 스레드가 GIL을 기본 5ms씩 잡으므로 프로파일 중에는 샘플 간격만큼 자주 넘겨받게 함
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.interval))
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.pop(profile.profile_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                profiles = list(self._profiles.values())
+                if not profiles:
+                    sys.setswitchinterval(self._switch_interval)
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.sample(frames.get(profile.thread_id))
+            del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler()
+
+
+def _slug(route: str) -> str:
+    return "".join(ch if ch.isalnum() else "_" for ch in route).strip("_")[:60] or "root"
+
+
+def write_profile(profile: RequestProfile, directory: Path = PROFILING_DIR, max_files: int = MAX_FILES,
+                  summary: Optional[dict] = None):
+    """collapsed stack과 요약 JSON 저장 후 오래된 프로파일 정리"""
+    directory.mkdir(parents=True, exist_ok=True)
+    lines = [f"{profile.label};{stack} {count}" for stack, count in profile.stacks.items()]
+    summary = summary or {}
+    db_samples = min(profile.off_loop, round(summary.get("db_ms", 0) / 1000 / sampler.interval))
+    if db_samples:
+        lines.append(f"{profile.label};[await db] {db_samples}")
+    if profile.off_loop - db_samples:
+        lines.append(f"{profile.label};[await other] {profile.off_loop - db_samples}")
+    (directory / f"{profile.profile_id}.collapsed").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    (directory / f"{profile.profile_id}.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2),
+                                                        encoding="utf-8")
+
+    files = sorted(directory.glob("*.collapsed"))
+    for old in files[:max(len(files) - max_files, 0)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".json").unlink(missing_ok=True)
+
+
+def _requested(scope) -> Optional[str]:
+    """프로파일 대상이면 트리거 이름 (header, sample)"""
+    if PROFILING_TOKEN:
+        for name, value in scope["headers"]:
+            if name == HEADER:
+                if hmac.compare_digest(value, PROFILING_TOKEN.encode()):
+                    return "header"
+                break
+    if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class ProfilingMiddleware:
+    """선택된 요청을 샘플링 프로파일하는 ASGI 미들웨어 (RequestContextMiddleware 안쪽)"""
+
+    def __init__(self, app, directory: Path = PROFILING_DIR):
+        self.app = app
+        self.directory = directory
+
+    async def __call__(self, scope, receive, send):
+        trigger = _requested(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        context = current_request()
+        label = f"{scope['method']} {context.route if context else scope['path']}"
+        profile_id = (f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}_"
+                      f"{scope['method']}_{_slug(context.route if context else scope['path'])}")
+        profile = RequestProfile(profile_id, threading.get_ident(), sys._getframe(0), label)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiles_total.inc(trigger)
+        sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.remove(profile)
+            wall_ms = (time.perf_counter() - profile.started) * 1000
+            summary = {
+                "id": profile_id,
+                "label": label,
+                "trigger": trigger,
+                "status": context.status_code if context else None,
+                "wall_ms": round(wall_ms, 2),
+                "on_loop_ms": round(profile.on_loop * sampler.interval * 1000, 2),
+                "db_ms": round(context.db_time * 1000, 2) if context else 0.0,
+                "db_commands": context.db_commands if context else 0,
+                "samples": profile.on_loop + profile.off_loop,
+                "interval_ms": sampler.interval * 1000,
+            }
+            await asyncio.to_thread(write_profile, profile, self.directory, MAX_FILES, summary)
@@ -0,0 +1,454 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+# 라우트가 사용하는 데이터 접근 인터페이스
+# - MongoDB 구현: app/repositories/mongo.py
+# - 메모리 구현: app/repositories/memory.py (MongoDB 없이 테스트/프로파일링)
+# 모든 메서드는 MongoDB 문서와 같은 모양의 dict를 반환하고, ID는 ObjectId를 사용함
+# viewer 인자는 읽기 라우팅용 (None이면 비로그인 요청)
+
+
+class UserRepository(ABC):
+    """users 컬렉션"""
+
+    @abstractmethod
+    async def get_by_id(self, user_id: ObjectId) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def email_taken(self, email: str, exclude_username: str) -> bool:
+        """다른 사용자가 이미 쓰는 이메일인지"""
+
+    @abstractmethod
+    async def create(self, user: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def update_by_username(self, username: str, fields: dict) -> Optional[dict]:
+        """필드 수정 후 수정된 문서 반환"""
+
+    @abstractmethod
+    async def get_many(self, user_ids: Iterable[ObjectId], viewer=None) -> Dict[ObjectId, dict]:
+        """ID별 사용자 문서 (작성자 표시용)"""
+
+
+class DiaryRepository(ABC):
+    """diaries 컬렉션 (created_at 내림차순 정렬)"""
+
+    @abstractmethod
+    async def create(self, diary: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def get(self, diary_id: ObjectId, viewer=None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_page(self, skip: int, limit: int, public_only: bool = False,
+                        user_id: Optional[ObjectId] = None, viewer=None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def count(self, public_only: bool = False, user_id: Optional[ObjectId] = None, viewer=None) -> int:
+        ...
+
+    @abstractmethod
+    async def get_many(self, diary_ids: Iterable[ObjectId], viewer=None) -> Dict[ObjectId, dict]:
+        """ID별 일기 문서 (한 번에 조회)"""
+
+    @abstractmethod
+    def iter_public(self, limit: Optional[int] = None, batch_size: int = 1000) -> AsyncIterator[dict]:
+        """공개 일기의 _id, title, content를 최신순으로 (색인 구축용, 메모리를 batch_size만큼만 씀)"""
+
+    @abstractmethod
+    def iter_for_user(self, user_id: ObjectId, batch_size: int = 1000) -> AsyncIterator[dict]:
+        """사용자의 일기 전체를 작성순으로 (내보내기용, 메모리를 batch_size만큼만 씀)"""
+
+    @abstractmethod
+    async def insert_many(self, diaries: List[dict]) -> List[ObjectId]:
+        """_id를 정해 둔 일기 일괄 삽입 (이미 있는 _id는 건너뜀), 새로 들어간 _id 반환"""
+
+    @abstractmethod
+    async def list_for_user_between(self, user_id: ObjectId, start: datetime, end: datetime) -> List[dict]:
+        """사용자가 [start, end)에 쓴 일기의 _id, title, is_public, created_at (작성순, 달력 재구축용)"""
+
+    @abstractmethod
+    async def update(self, diary_id: ObjectId, fields: dict, expected: Optional[dict] = None) -> Optional[dict]:
+        """필드 수정 후 수정된 문서 반환 (expected가 있으면 그 필드 값이 그대로일 때만 수정, 아니면 None)"""
+
+    @abstractmethod
+    async def delete(self, diary_id: ObjectId) -> bool:
+        ...
+
+    @abstractmethod
+    async def bulk_write_owned(self, user_id: ObjectId, updates: Dict[ObjectId, dict],
+                               deletes: List[ObjectId]) -> Tuple[int, List[ObjectId]]:
+        """작성자가 user_id인 일기만 한 번에 수정/삭제, (수정 대상으로 찾은 수, 이 호출이 지운 일기 ID) 반환
+
+        동시에 같은 일기를 지운 다른 요청이 있으면 그 일기는 지운 목록에 들어가지 않음
+        """
+
+    @abstractmethod
+    async def update_author_snapshot(self, user_id: ObjectId, snapshot: dict, version: datetime, limit: int) -> int:
+        """작성자 스냅샷이 version보다 오래된 문서를 최대 limit개 갱신 (갱신한 수 반환)"""
+
+    @abstractmethod
+    async def add_views(self, views: Dict[ObjectId, Tuple[int, int]]):
+        """일기별 (조회 수 증가분, 순 조회자 추정치) 반영 (조회 수는 더하고 추정치는 커질 때만, 없는 일기는 무시)"""
+
+
+class CommentRepository(ABC):
+    """comments 컬렉션 (일기 안에서는 path 오름차순이 스레드 표시 순서, comment_thread_fields 참고)"""
+
+    @abstractmethod
+    async def create(self, comment: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def get(self, comment_id: ObjectId, viewer=None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list_by_diary(self, diary_id: ObjectId, viewer=None) -> List[dict]:
+        """일기의 모든 댓글과 답글 (스레드 표시 순서)"""
+
+    @abstractmethod
+    async def list_subtree(self, diary_id: ObjectId, path: str, viewer=None) -> List[dict]:
+        """path 댓글과 그 아래 모든 답글 (범위 조회 한 번, 표시 순서)"""
+
+    @abstractmethod
+    async def list_thread_page(self, diary_id: ObjectId, after: Optional[str], limit: int,
+                               viewer=None) -> Tuple[List[dict], Optional[str]]:
+        """최상위 댓글 limit개(경로가 after 다음부터)와 그 답글 전체, 다음 페이지 커서"""
+
+    @abstractmethod
+    async def list_by_user(self, user_id: ObjectId) -> List[dict]:
+        """사용자의 댓글 최신순 (삭제 표시만 남은 댓글 제외)"""
+
+    @abstractmethod
+    def iter_for_user(self, user_id: ObjectId, batch_size: int = 1000) -> AsyncIterator[dict]:
+        """사용자의 댓글을 작성순으로 (삭제 표시만 남은 댓글 제외, 내보내기용)"""
+
+    @abstractmethod
+    async def insert_many(self, comments: List[dict]) -> List[ObjectId]:
+        """_id를 정해 둔 댓글 일괄 삽입 (이미 있는 _id는 건너뜀), 새로 들어간 _id 반환"""
+
+    @abstractmethod
+    async def adjust_reply_count(self, comment_id: ObjectId, amount: int) -> Optional[dict]:
+        """답글 수 증감 후 수정된 문서 반환"""
+
+    @abstractmethod
+    async def add_reply_counts(self, counts: Dict[ObjectId, int]):
+        """댓글별 답글 수 증가 (한 번에)"""
+
+    @abstractmethod
+    async def delete_leaf(self, comment_id: ObjectId) -> bool:
+        """답글이 없을 때만 삭제 (답글이 있으면 False)"""
+
+    @abstractmethod
+    async def update(self, comment_id: ObjectId, fields: dict) -> Optional[dict]:
+        """필드 수정 후 수정된 문서 반환"""
+
+    @abstractmethod
+    async def delete(self, comment_id: ObjectId) -> bool:
+        ...
+
+    @abstractmethod
+    async def update_author_snapshot(self, user_id: ObjectId, snapshot: dict, version: datetime, limit: int) -> int:
+        """작성자 스냅샷이 version보다 오래된 문서를 최대 limit개 갱신 (갱신한 수 반환)"""
+
+    @abstractmethod
+    async def list_ids_by_diary(self, diary_id: ObjectId, limit: int) -> List[ObjectId]:
+        """일기에 달린 댓글 ID를 최대 limit개 (일기 삭제 후 정리용)"""
+
+    @abstractmethod
+    async def delete_many(self, comment_ids: Iterable[ObjectId]) -> int:
+        ...
+
+
+class LikeRepository(ABC):
+    """likes 컬렉션 ((target_type, target_id, user_id) 유일)"""
+
+    @abstractmethod
+    async def find(self, target_type: str, target_id: ObjectId, user_id: ObjectId) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def add(self, target_type: str, target_id: ObjectId, user_id: ObjectId) -> Optional[dict]:
+        """좋아요 추가 (동시 요청이 먼저 추가해 이미 있으면 None)"""
+        ...
+
+    @abstractmethod
+    async def remove(self, like_id: ObjectId) -> bool:
+        ...
+
+    @abstractmethod
+    async def count(self, target_type: str, target_id: ObjectId) -> int:
+        ...
+
+    @abstractmethod
+    async def counts(self, target_type: str, target_ids: Iterable[ObjectId], viewer=None) -> Dict[ObjectId, int]:
+        """대상별 좋아요 수 (한 번에 조회)"""
+
+    @abstractmethod
+    async def liked_ids(self, target_type: str, target_ids: Iterable[ObjectId],
+                        user_id: Optional[str], viewer=None) -> Set[ObjectId]:
+        """사용자가 좋아요를 누른 대상 ID 집합"""
+
+    @abstractmethod
+    async def delete_for_targets(self, target_type: str, target_ids: Iterable[ObjectId]) -> int:
+        """대상들에 달린 좋아요 모두 삭제 (삭제한 수 반환)"""
+
+
+class RefreshTokenRepository(ABC):
+    """refresh_tokens 컬렉션 (토큰 원문이 아닌 SHA-256 해시만 저장, expires_at TTL 인덱스)"""
+
+    @abstractmethod
+    async def create(self, token: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def find(self, token_hash: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def rotate(self, token_hash: str, now: datetime) -> Optional[dict]:
+        """아직 사용되지 않았고 만료되지 않은 토큰을 사용 처리 (사용 전 문서 반환, 없으면 None)"""
+
+    @abstractmethod
+    async def revoke_family(self, family_id: str) -> int:
+        """같은 로그인에서 이어진 토큰 모두 폐기"""
+
+    @abstractmethod
+    async def revoke_user(self, user_id: ObjectId) -> int:
+        """사용자의 모든 토큰 폐기"""
+
+
+class JobRepository(ABC):
+    """jobs 컬렉션 (백그라운드 작업 큐, app/jobs.py)
+
+    status는 queued -> running -> done|failed 순으로 바뀌고, run_at은 queued일 때 실행 가능 시각,
+    running일 때 리스 만료 시각이라 두 경우 모두 run_at이 지난 작업을 꺼내면 됨
+    """
+
+    @abstractmethod
+    async def enqueue(self, job: dict) -> dict:
+        """작업 추가 (같은 key의 queued 작업이 있으면 새로 넣지 않고 그 작업의 run_at을 늦춰 반환)"""
+
+    @abstractmethod
+    async def claim(self, names: List[str], worker: str, now: datetime, lease_until: datetime) -> Optional[dict]:
+        """실행 가능한 작업 하나를 원자적으로 가져옴 (running으로 바꾸고 attempts 증가, 가져온 뒤 문서 반환)
+
+        worker는 가져올 때마다 새로 만든 소유자 토큰이어야 리스가 만료돼 다시 가져간 작업과 구분됨
+        """
+
+    @abstractmethod
+    async def update_claimed(self, job_id: ObjectId, worker: str, fields: dict) -> bool:
+        """worker가 잡고 있는 작업만 수정 (리스가 만료돼 다른 워커가 가져갔으면 False)"""
+
+
+class CalendarRepository(ABC):
+    """diary_calendar 컬렉션 (사용자의 한 달 = 문서 하나, app/calendar_rollup.py)
+
+    {_id: "<user_id>:<YYYY-MM>", user_id, year, month, count, days: {"<일>": [{id, title, is_public}, ...]}}
+    """
+
+    @abstractmethod
+    async def add(self, user_id: ObjectId, day: date, entry: dict) -> bool:
+        """날짜에 일기 항목 추가 (이미 있으면 무시하고 False)"""
+
+    @abstractmethod
+    async def remove(self, user_id: ObjectId, day: date, diary_id: ObjectId) -> bool:
+        """날짜에서 일기 항목 제거 (없으면 False)"""
+
+    @abstractmethod
+    async def update_entry(self, user_id: ObjectId, day: date, diary_id: ObjectId, fields: dict) -> bool:
+        """일기 항목의 필드(title, is_public) 수정"""
+
+    @abstractmethod
+    async def apply(self, changes: List[Tuple[ObjectId, date, ObjectId, Optional[dict]]]):
+        """(user_id, 날짜, 일기 ID, 바꿀 필드) 목록을 한 번에 반영 (필드가 None이면 항목 제거)"""
+
+    @abstractmethod
+    async def replace_month(self, user_id: ObjectId, year: int, month: int, days: Dict[str, List[dict]]):
+        """한 달 문서를 통째로 교체 (원본 일기로 다시 계산한 결과)"""
+
+    @abstractmethod
+    async def get_month(self, user_id: ObjectId, year: int, month: int, viewer=None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_year(self, user_id: ObjectId, year: int, viewer=None) -> List[dict]:
+        """일기가 있는 달의 문서 (월 순서)"""
+
+
+class ViewRepository(ABC):
+    """diary_views 컬렉션 (일기별 순 조회자 HyperLogLog 레지스터, app/views.py)
+
+    {_id: diary_id, registers: {"<레지스터 번호>": 순위, ...}}  (0인 레지스터는 저장하지 않음)
+    """
+
+    @abstractmethod
+    async def merge(self, sketches: Dict[ObjectId, Dict[int, int]]) -> Dict[ObjectId, Dict[int, int]]:
+        """레지스터별 최댓값으로 합친 뒤 일기별 전체 레지스터 반환 (다른 워커가 합친 값 포함)"""
+
+    @abstractmethod
+    async def delete(self, diary_id: ObjectId):
+        ...
+
+
+class NotificationRepository(ABC):
+    """notifications 컬렉션(받는 사람별 알림함)과 notification_counters(안 읽은 알림 수, _id = 사용자 ID)
+
+    알림: {recipient_id, kind, diary_id, comment_id, actor, count, preview, group, read, created_at, updated_at}
+    group이 있는 알림(좋아요)은 받는 사람별로 안 읽은 알림 하나에 합쳐짐
+    """
+
+    @abstractmethod
+    async def deliver(self, notifications: List[dict]) -> Dict[ObjectId, int]:
+        """알림 일괄 저장 (group이 같은 안 읽은 알림이 있으면 갱신), 받는 사람별 새로 생긴 안 읽은 알림 수 반환"""
+
+    @abstractmethod
+    async def add_unread(self, counts: Dict[ObjectId, int]):
+        """받는 사람별 안 읽은 알림 수 증감 (한 번에)"""
+
+    @abstractmethod
+    async def unread_count(self, user_id: ObjectId, viewer=None) -> int:
+        """안 읽은 알림 수 (_id 조회 한 번)"""
+
+    @abstractmethod
+    async def over_limit(self, user_ids: List[ObjectId], limit: int) -> List[ObjectId]:
+        """안 읽은 알림이 limit개를 넘는 사용자"""
+
+    @abstractmethod
+    async def list_for(self, user_id: ObjectId, skip: int, limit: int, viewer=None) -> List[dict]:
+        """최근에 갱신된 순"""
+
+    @abstractmethod
+    async def mark_read(self, user_id: ObjectId, notification_ids: Optional[List[ObjectId]], read_at: datetime) -> int:
+        """안 읽은 알림을 읽음으로 (notification_ids가 None이면 전부), 바꾼 수 반환"""
+
+    @abstractmethod
+    async def trim_unread(self, user_id: ObjectId, keep: int, read_at: datetime) -> int:
+        """최근 keep개를 남기고 나머지 안 읽은 알림을 읽음으로 (바꾼 수 반환)"""
+
+    @abstractmethod
+    async def delete_for(self, field: str, ids: List[ObjectId]) -> Dict[ObjectId, int]:
+        """field(diary_id, comment_id)가 ids인 알림 삭제, 받는 사람별 지운 안 읽은 알림 수 반환"""
+
+
+class ImageRepository(ABC):
+    """images 컬렉션 (일기 첨부 이미지, 내용의 SHA-256이 _id, app/attachments.py)
+
+    {_id: digest, ext, content_type, size, width, height, refs, created_at, updated_at}
+    refs는 이 이미지를 붙인 일기 수, updated_at은 업로드나 참조 수가 바뀐 시각 (정리 유예 기준)
+    """
+
+    @abstractmethod
+    async def register(self, digest: str, metadata: dict, now: datetime):
+        """없으면 refs 0으로 추가하고, 있으면 updated_at만 갱신"""
+
+    @abstractmethod
+    async def get_many(self, digests: List[str]) -> Dict[str, dict]:
+        ...
+
+    @abstractmethod
+    async def add_refs(self, digests: List[str], amount: int, now: datetime) -> int:
+        """참조 수 증감 (한 번에), 있던 이미지 수 반환"""
+
+    @abstractmethod
+    async def delete_unreferenced(self, digest: str, updated_before: datetime) -> bool:
+        """참조가 없고 updated_before 이후로 바뀌지 않았을 때만 삭제"""
+
+
+class ImportRepository(ABC):
+    """imports 컬렉션 (가져오기 체크포인트, app/transfer.py)
+
+    {_id: "<user_id>:<import_id>", user_id, status: running|done, line, diaries, comments, skipped, errors,
+     started_at, updated_at, finished_at}  line은 반영을 마친 마지막 줄 번호
+    """
+
+    @abstractmethod
+    async def get(self, checkpoint_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def save(self, checkpoint_id: str, fields: dict, now: datetime):
+        """체크포인트 저장 (없으면 started_at과 함께 추가)"""
+
+
+@dataclass
+class Repositories:
+    """저장소 묶음"""
+    users: UserRepository
+    diaries: DiaryRepository
+    comments: CommentRepository
+    likes: LikeRepository
+    refresh_tokens: RefreshTokenRepository
+    jobs: JobRepository
+    calendar: CalendarRepository
+    views: ViewRepository
+    notifications: NotificationRepository
+    images: ImageRepository
+    imports: ImportRepository
+
+
+def unique_object_ids(values: Iterable) -> List[ObjectId]:
+    """중복과 None을 제거한 ObjectId 목록"""
+    result = []
+    seen = set()
+    for value in values:
+        if value is None or value == "":
+            continue
+        object_id = value if isinstance(value, ObjectId) else ObjectId(value)
+        if object_id not in seen:
+            seen.add(object_id)
+            result.append(object_id)
+    return result
+
+
+def calendar_month_id(user_id: ObjectId, year: int, month: int) -> str:
+    """diary_calendar 문서 _id (한 달 조회가 _id 조회 한 번이 되도록)"""
+    return f"{user_id}:{year:04d}-{month:02d}"
+
+
+# 댓글 스레드 경로 (materialized path)
+# 한 구간은 작성 시각(밀리초, 11자리 16진수) + ObjectId(24자리)로 길이가 같아서
+# path 오름차순이 곧 깊이 우선 표시 순서이고, 한 댓글의 답글 전체는 [path, path + "0") 범위 ("/" < "0")
+# 최상위 댓글은 구간을 뒤집어 최신순, 답글은 작성순으로 정렬됨
+COMMENT_PATH_SEPARATOR = "/"
+_TIME_MAX = (1 << 44) - 1
+_OBJECT_ID_MAX = (1 << 96) - 1
+
+
+def comment_thread_fields(comment_id: ObjectId, created_at: datetime, parent: Optional[dict] = None) -> dict:
+    """새 댓글의 parent_id, path, depth, reply_count (MongoDB가 돌려준 naive 시각은 UTC)"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    milliseconds = int(created_at.timestamp() * 1000)
+    if parent is None:
+        segment = f"{_TIME_MAX - milliseconds:011x}{_OBJECT_ID_MAX - int(str(comment_id), 16):024x}"
+        return {"parent_id": None, "path": segment, "depth": 0, "reply_count": 0}
+    return {
+        "parent_id": parent["_id"],
+        "path": f"{parent['path']}{COMMENT_PATH_SEPARATOR}{milliseconds:011x}{comment_id}",
+        "depth": parent.get("depth", 0) + 1,
+        "reply_count": 0,
+    }
+
+
+def subtree_end(path: str) -> str:
+    """path 댓글의 하위 범위 끝 (미포함)"""
+    return path + "0"
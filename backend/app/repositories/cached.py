@@ -0,0 +1,121 @@
+from app.cache import InvalidationRegistry, LocalCache, registry, tag, user_cache
+from app.repositories.base import DiaryRepository, Repositories, UserRepository
+
+
+class CachedUserRepository(UserRepository):
+    """username 조회 결과를 프로세스 내 캐시에 두는 users 저장소 래퍼
+
+    이 워커의 쓰기는 즉시 레지스트리로 무효화하고, 다른 워커의 쓰기는 change stream이 전달함
+    """
+
+    def __init__(self, inner: UserRepository, cache: LocalCache, invalidation: InvalidationRegistry = registry):
+        self.inner = inner
+        self.cache = cache
+        self.invalidation = invalidation
+
+    async def get_by_id(self, user_id):
+        return await self.inner.get_by_id(user_id)
+
+    async def get_by_username(self, username):
+        user = self.cache.get(username)
+        if user is not None:
+            return dict(user)
+        generation = self.cache.generation
+        user = await self.inner.get_by_username(username)
+        if user is not None:
+            self.cache.set(username, dict(user), tags=[tag("users", user["_id"])], generation=generation)
+        return user
+
+    async def get_by_email(self, email):
+        return await self.inner.get_by_email(email)
+
+    async def email_taken(self, email, exclude_username):
+        return await self.inner.email_taken(email, exclude_username)
+
+    async def create(self, user):
+        return await self.inner.create(user)
+
+    async def update_by_username(self, username, fields):
+        user = await self.inner.update_by_username(username, fields)
+        if user is not None:
+            self.invalidation.publish("users", user["_id"])
+        return user
+
+    async def get_many(self, user_ids, viewer=None):
+        return await self.inner.get_many(user_ids, viewer)
+
+
+class PublishingDiaryRepository(DiaryRepository):
+    """diaries 저장소 래퍼 (이 워커의 쓰기를 레지스트리에 알림, 다른 워커의 쓰기는 change stream이 전달함)
+
+    일기 내용으로 만든 프로세스 내 구조(app/similar.py의 색인 등)가 구독함
+    """
+
+    def __init__(self, inner: DiaryRepository, invalidation: InvalidationRegistry = registry):
+        self.inner = inner
+        self.invalidation = invalidation
+
+    async def create(self, diary):
+        created = await self.inner.create(diary)
+        self.invalidation.publish("diaries", created["_id"])
+        return created
+
+    async def get(self, diary_id, viewer=None):
+        return await self.inner.get(diary_id, viewer)
+
+    async def find_page(self, skip, limit, public_only=False, user_id=None, viewer=None):
+        return await self.inner.find_page(skip, limit, public_only, user_id, viewer)
+
+    async def count(self, public_only=False, user_id=None, viewer=None):
+        return await self.inner.count(public_only, user_id, viewer)
+
+    async def get_many(self, diary_ids, viewer=None):
+        return await self.inner.get_many(diary_ids, viewer)
+
+    def iter_public(self, limit=None, batch_size=1000):
+        return self.inner.iter_public(limit, batch_size)
+
+    def iter_for_user(self, user_id, batch_size=1000):
+        return self.inner.iter_for_user(user_id, batch_size)
+
+    async def insert_many(self, diaries):
+        inserted = await self.inner.insert_many(diaries)
+        for diary_id in inserted:
+            self.invalidation.publish("diaries", diary_id)
+        return inserted
+
+    async def list_for_user_between(self, user_id, start, end):
+        return await self.inner.list_for_user_between(user_id, start, end)
+
+    async def update(self, diary_id, fields, expected=None):
+        diary = await self.inner.update(diary_id, fields, expected)
+        if diary is not None:
+            self.invalidation.publish("diaries", diary_id)
+        return diary
+
+    async def delete(self, diary_id):
+        deleted = await self.inner.delete(diary_id)
+        if deleted:
+            self.invalidation.publish("diaries", diary_id)
+        return deleted
+
+    async def bulk_write_owned(self, user_id, updates, deletes):
+        matched, deleted = await self.inner.bulk_write_owned(user_id, updates, deletes)
+        for diary_id in [*updates, *deleted]:
+            self.invalidation.publish("diaries", diary_id)
+        return matched, deleted
+
+    async def update_author_snapshot(self, user_id, snapshot, version, limit):
+        # 작성자 표시 정보만 바뀌므로 알리지 않음
+        return await self.inner.update_author_snapshot(user_id, snapshot, version, limit)
+
+    async def add_views(self, views):
+        # 조회 수만 바뀌므로 알리지 않음
+        return await self.inner.add_views(views)
+
+
+def with_caches(repositories: Repositories) -> Repositories:
+    """저장소 묶음에 캐시 래퍼 적용"""
+    repositories.users = CachedUserRepository(repositories.users, user_cache)
+    repositories.diaries = PublishingDiaryRepository(repositories.diaries)
+    return repositories
@@ -0,0 +1,794 @@
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.repositories.base import (
+    CalendarRepository,
+    CommentRepository,
+    DiaryRepository,
+    ImageRepository,
+    ImportRepository,
+    JobRepository,
+    LikeRepository,
+    NotificationRepository,
+    RefreshTokenRepository,
+    Repositories,
+    UserRepository,
+    ViewRepository,
+    calendar_month_id,
+    subtree_end,
+    unique_object_ids,
+)
+
+# MongoDB 없이 동작하는 메모리 저장소
+# MongoDB 구현과 같은 결과를 내도록 인덱스를 dict와 정렬 리스트로 유지함
+
+
+def _stored(document: dict) -> dict:
+    """MongoDB에 저장된 것과 같은 모양으로 변환
+
+    MongoDB는 datetime을 밀리초 단위로 잘라 UTC naive 값으로 돌려주므로 똑같이 맞춤
+    """
+    stored = {}
+    for key, value in document.items():
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            value = value.replace(microsecond=value.microsecond // 1000 * 1000)
+        stored[key] = value
+    return stored
+
+
+def _update_author_snapshot(by_id: Dict[ObjectId, dict], index: Optional["SortedIndex"], snapshot: dict,
+                            version: datetime, limit: int) -> int:
+    """사용자 인덱스의 문서 중 스냅샷이 version보다 오래된 것을 최대 limit개 갱신"""
+    if index is None:
+        return 0
+    version = _stored({"version": version})["version"]
+    updated = 0
+    for document_id in index.page(0, None):
+        document = by_id[document_id]
+        synced_at = document.get("author_synced_at")
+        if synced_at is not None and synced_at >= version:
+            continue
+        document.update(_stored(snapshot))
+        document["author_synced_at"] = version
+        updated += 1
+        if updated >= limit:
+            break
+    return updated
+
+
+class SortedIndex:
+    """(field, _id) 키를 정렬 상태로 유지하는 인덱스 (기본은 created_at, 내림차순 페이지 조회)"""
+
+    def __init__(self, field: str = "created_at"):
+        self.field = field
+        self._keys = []
+
+    def add(self, document: dict):
+        insort(self._keys, (document[self.field], document["_id"]))
+
+    def remove(self, document: dict):
+        key = (document[self.field], document["_id"])
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def between(self, start, end=None) -> List[ObjectId]:
+        """키가 [start, end)인 _id (오름차순, end가 None이면 끝까지)"""
+        low = bisect_left(self._keys, (start,))
+        high = len(self._keys) if end is None else bisect_left(self._keys, (end,))
+        return [document_id for _, document_id in self._keys[low:high]]
+
+    def page(self, skip: int, limit: Optional[int]) -> List[ObjectId]:
+        """최신순으로 skip개 건너뛴 뒤 limit개의 _id"""
+        end = len(self._keys) - skip
+        if end <= 0:
+            return []
+        start = 0 if limit is None else max(end - limit, 0)
+        return [document_id for _, document_id in reversed(self._keys[start:end])]
+
+
+class MemoryUserRepository(UserRepository):
+
+    def __init__(self):
+        self.by_id: Dict[ObjectId, dict] = {}
+        self.by_username: Dict[str, ObjectId] = {}
+        self.by_email: Dict[str, ObjectId] = {}
+
+    def _get(self, user_id: Optional[ObjectId]) -> Optional[dict]:
+        user = self.by_id.get(user_id)
+        return dict(user) if user else None
+
+    async def get_by_id(self, user_id):
+        return self._get(user_id)
+
+    async def get_by_username(self, username):
+        return self._get(self.by_username.get(username))
+
+    async def get_by_email(self, email):
+        return self._get(self.by_email.get(email))
+
+    async def email_taken(self, email, exclude_username):
+        user_id = self.by_email.get(email)
+        return user_id is not None and self.by_id[user_id]["username"] != exclude_username
+
+    async def create(self, user):
+        if user["username"] in self.by_username or user["email"] in self.by_email:
+            raise DuplicateKeyError("duplicate username or email")
+        user.setdefault("_id", ObjectId())
+        stored = _stored(user)
+        self.by_id[stored["_id"]] = stored
+        self.by_username[stored["username"]] = stored["_id"]
+        self.by_email[stored["email"]] = stored["_id"]
+        return dict(stored)
+
+    async def update_by_username(self, username, fields):
+        user_id = self.by_username.get(username)
+        if user_id is None:
+            return None
+        user = self.by_id[user_id]
+        if "email" in fields and fields["email"] != user["email"]:
+            if fields["email"] in self.by_email:
+                raise DuplicateKeyError("duplicate email")
+            del self.by_email[user["email"]]
+            self.by_email[fields["email"]] = user_id
+        user.update(_stored(fields))
+        return dict(user)
+
+    async def get_many(self, user_ids, viewer=None):
+        result = {}
+        for user_id in unique_object_ids(user_ids):
+            user = self.by_id.get(user_id)
+            if user:
+                result[user_id] = {key: user.get(key) for key in ("_id", "username", "nickname", "profile_image")
+                                   if key in user}
+        return result
+
+
+class MemoryDiaryRepository(DiaryRepository):
+
+    def __init__(self):
+        self.by_id: Dict[ObjectId, dict] = {}
+        self.all = SortedIndex()
+        self.public = SortedIndex()
+        self.by_user: Dict[ObjectId, SortedIndex] = defaultdict(SortedIndex)
+        self.public_by_user: Dict[ObjectId, SortedIndex] = defaultdict(SortedIndex)
+
+    def _indexes(self, diary: dict) -> List[SortedIndex]:
+        """문서가 속하는 인덱스 목록"""
+        indexes = [self.all]
+        user_id = diary.get("user_id")
+        if user_id is not None:
+            indexes.append(self.by_user[user_id])
+        if diary.get("is_public"):
+            indexes.append(self.public)
+            if user_id is not None:
+                indexes.append(self.public_by_user[user_id])
+        return indexes
+
+    def _select(self, public_only: bool, user_id: Optional[ObjectId]) -> SortedIndex:
+        if user_id is not None:
+            source = self.public_by_user if public_only else self.by_user
+            return source.get(user_id) or SortedIndex()
+        return self.public if public_only else self.all
+
+    async def create(self, diary):
+        diary.setdefault("_id", ObjectId())
+        stored = _stored(diary)
+        self.by_id[stored["_id"]] = stored
+        for index in self._indexes(stored):
+            index.add(stored)
+        return dict(stored)
+
+    async def get(self, diary_id, viewer=None):
+        diary = self.by_id.get(diary_id)
+        return dict(diary) if diary else None
+
+    async def find_page(self, skip, limit, public_only=False, user_id=None, viewer=None):
+        index = self._select(public_only, user_id)
+        return [dict(self.by_id[diary_id]) for diary_id in index.page(skip, limit)]
+
+    async def count(self, public_only=False, user_id=None, viewer=None):
+        return len(self._select(public_only, user_id))
+
+    async def get_many(self, diary_ids, viewer=None):
+        return {
+            diary_id: dict(self.by_id[diary_id])
+            for diary_id in unique_object_ids(diary_ids) if diary_id in self.by_id
+        }
+
+    async def iter_public(self, limit=None, batch_size=1000):
+        for diary_id in self.public.page(0, limit):
+            diary = self.by_id.get(diary_id)
+            if diary is not None:
+                yield {"_id": diary_id, "title": diary["title"], "content": diary["content"]}
+
+    async def iter_for_user(self, user_id, batch_size=1000):
+        index = self.by_user.get(user_id)
+        for diary_id in reversed(index.page(0, None) if index else []):
+            diary = self.by_id.get(diary_id)
+            if diary is not None:
+                yield dict(diary)
+
+    async def insert_many(self, diaries):
+        return [(await self.create(diary))["_id"] for diary in diaries if diary["_id"] not in self.by_id]
+
+    async def list_for_user_between(self, user_id, start, end):
+        index = self.by_user.get(user_id)
+        if index is None:
+            return []
+        bounds = _stored({"start": start, "end": end})
+        return [
+            {key: self.by_id[diary_id][key] for key in ("_id", "title", "is_public", "created_at")}
+            for diary_id in index.between(bounds["start"], bounds["end"])
+        ]
+
+    async def update(self, diary_id, fields, expected=None):
+        diary = self.by_id.get(diary_id)
+        if diary is None:
+            return None
+        if expected and any(diary.get(key) != value for key, value in _stored(expected).items()):
+            return None
+        for index in self._indexes(diary):
+            index.remove(diary)
+        diary.update(_stored(fields))
+        for index in self._indexes(diary):
+            index.add(diary)
+        return dict(diary)
+
+    async def delete(self, diary_id):
+        diary = self.by_id.pop(diary_id, None)
+        if diary is None:
+            return False
+        for index in self._indexes(diary):
+            index.remove(diary)
+        return True
+
+    async def bulk_write_owned(self, user_id, updates, deletes):
+        matched, deleted = 0, []
+        for diary_id, fields in updates.items():
+            if self.by_id.get(diary_id, {}).get("user_id") == user_id:
+                await self.update(diary_id, fields)
+                matched += 1
+        for diary_id in deletes:
+            if self.by_id.get(diary_id, {}).get("user_id") == user_id and await self.delete(diary_id):
+                deleted.append(diary_id)
+        return matched, deleted
+
+    async def update_author_snapshot(self, user_id, snapshot, version, limit):
+        return _update_author_snapshot(self.by_id, self.by_user.get(user_id), snapshot, version, limit)
+
+    async def add_views(self, views):
+        for diary_id, (count, unique) in views.items():
+            diary = self.by_id.get(diary_id)
+            if diary is not None:
+                diary["view_count"] = diary.get("view_count", 0) + count
+                diary["unique_viewers"] = max(diary.get("unique_viewers", 0), unique)
+
+
+class MemoryCommentRepository(CommentRepository):
+
+    def __init__(self):
+        self.by_id: Dict[ObjectId, dict] = {}
+        # 일기별 path 인덱스 (전체, 최상위 댓글만)
+        self.by_diary: Dict[ObjectId, SortedIndex] = defaultdict(lambda: SortedIndex("path"))
+        self.roots_by_diary: Dict[ObjectId, SortedIndex] = defaultdict(lambda: SortedIndex("path"))
+        self.by_user: Dict[ObjectId, SortedIndex] = defaultdict(SortedIndex)
+
+    def _indexes(self, comment: dict) -> List[SortedIndex]:
+        indexes = [self.by_diary[comment["diary_id"]], self.by_user[comment["user_id"]]]
+        if comment.get("depth", 0) == 0:
+            indexes.append(self.roots_by_diary[comment["diary_id"]])
+        return indexes
+
+    def _documents(self, comment_ids: List[ObjectId]) -> List[dict]:
+        return [dict(self.by_id[comment_id]) for comment_id in comment_ids]
+
+    async def create(self, comment):
+        comment.setdefault("_id", ObjectId())
+        stored = _stored(comment)
+        self.by_id[stored["_id"]] = stored
+        for index in self._indexes(stored):
+            index.add(stored)
+        return dict(stored)
+
+    async def get(self, comment_id, viewer=None):
+        comment = self.by_id.get(comment_id)
+        return dict(comment) if comment else None
+
+    async def list_by_diary(self, diary_id, viewer=None):
+        index = self.by_diary.get(diary_id)
+        return self._documents(index.between("")) if index else []
+
+    async def list_subtree(self, diary_id, path, viewer=None):
+        index = self.by_diary.get(diary_id)
+        return self._documents(index.between(path, subtree_end(path))) if index else []
+
+    async def list_thread_page(self, diary_id, after, limit, viewer=None):
+        roots = self.roots_by_diary.get(diary_id)
+        root_ids = roots.between(after or "") if roots else []
+        paths = [self.by_id[root_id]["path"] for root_id in root_ids]
+        if after is not None and paths and paths[0] == after:
+            paths = paths[1:]
+        if not paths:
+            return [], None
+        has_more = len(paths) > limit
+        comment_ids = self.by_diary[diary_id].between(paths[0], paths[limit] if has_more else None)
+        return self._documents(comment_ids), paths[limit - 1] if has_more else None
+
+    async def list_by_user(self, user_id):
+        index = self.by_user.get(user_id)
+        if not index:
+            return []
+        return [comment for comment in self._documents(index.page(0, None)) if not comment.get("is_deleted")]
+
+    async def iter_for_user(self, user_id, batch_size=1000):
+        index = self.by_user.get(user_id)
+        for comment_id in reversed(index.page(0, None) if index else []):
+            comment = self.by_id.get(comment_id)
+            if comment is not None and not comment.get("is_deleted"):
+                yield dict(comment)
+
+    async def insert_many(self, comments):
+        return [(await self.create(comment))["_id"] for comment in comments if comment["_id"] not in self.by_id]
+
+    async def adjust_reply_count(self, comment_id, amount):
+        comment = self.by_id.get(comment_id)
+        if comment is None:
+            return None
+        comment["reply_count"] = comment.get("reply_count", 0) + amount
+        return dict(comment)
+
+    async def add_reply_counts(self, counts):
+        for comment_id, amount in counts.items():
+            await self.adjust_reply_count(comment_id, amount)
+
+    async def delete_leaf(self, comment_id):
+        comment = self.by_id.get(comment_id)
+        if comment is None or comment.get("reply_count", 0) > 0:
+            return False
+        return await self.delete(comment_id)
+
+    async def update(self, comment_id, fields):
+        comment = self.by_id.get(comment_id)
+        if comment is None:
+            return None
+        # 정렬 키(path, created_at)는 수정 대상이 아니므로 인덱스 갱신 불필요
+        comment.update(_stored(fields))
+        return dict(comment)
+
+    async def delete(self, comment_id):
+        comment = self.by_id.pop(comment_id, None)
+        if comment is None:
+            return False
+        for index in self._indexes(comment):
+            index.remove(comment)
+        return True
+
+    async def update_author_snapshot(self, user_id, snapshot, version, limit):
+        return _update_author_snapshot(self.by_id, self.by_user.get(user_id), snapshot, version, limit)
+
+    async def list_ids_by_diary(self, diary_id, limit):
+        index = self.by_diary.get(diary_id)
+        return index.between("")[:limit] if index else []
+
+    async def delete_many(self, comment_ids):
+        deleted = 0
+        for comment_id in unique_object_ids(comment_ids):
+            deleted += await self.delete(comment_id)
+        return deleted
+
+
+class MemoryLikeRepository(LikeRepository):
+
+    def __init__(self):
+        self.by_id: Dict[ObjectId, dict] = {}
+        # (target_type, target_id, user_id) 유일 인덱스
+        self.by_key: Dict[tuple, ObjectId] = {}
+        # (target_type, target_id) -> 좋아요 수
+        self.totals: Dict[tuple, int] = defaultdict(int)
+        # (target_type, target_id) -> 좋아요 ID 집합 (대상 삭제 시 정리용)
+        self.by_target: Dict[tuple, Set[ObjectId]] = defaultdict(set)
+
+    async def find(self, target_type, target_id, user_id):
+        like_id = self.by_key.get((target_type, target_id, user_id))
+        return dict(self.by_id[like_id]) if like_id else None
+
+    async def add(self, target_type, target_id, user_id):
+        key = (target_type, target_id, user_id)
+        if key in self.by_key:
+            return None
+        like = _stored({
+            "_id": ObjectId(),
+            "target_type": target_type,
+            "target_id": target_id,
+            "user_id": user_id,
+            "created_at": datetime.now(timezone.utc),
+        })
+        self.by_id[like["_id"]] = like
+        self.by_key[key] = like["_id"]
+        self.totals[(target_type, target_id)] += 1
+        self.by_target[(target_type, target_id)].add(like["_id"])
+        return dict(like)
+
+    async def remove(self, like_id):
+        like = self.by_id.pop(like_id, None)
+        if like is None:
+            return False
+        del self.by_key[(like["target_type"], like["target_id"], like["user_id"])]
+        self.totals[(like["target_type"], like["target_id"])] -= 1
+        self.by_target[(like["target_type"], like["target_id"])].discard(like_id)
+        return True
+
+    async def count(self, target_type, target_id):
+        return self.totals.get((target_type, target_id), 0)
+
+    async def counts(self, target_type, target_ids, viewer=None):
+        result = {}
+        for target_id in unique_object_ids(target_ids):
+            total = self.totals.get((target_type, target_id), 0)
+            if total:
+                result[target_id] = total
+        return result
+
+    async def liked_ids(self, target_type, target_ids, user_id, viewer=None) -> Set[ObjectId]:
+        if not user_id:
+            return set()
+        user_id = ObjectId(user_id)
+        return {
+            target_id for target_id in unique_object_ids(target_ids)
+            if (target_type, target_id, user_id) in self.by_key
+        }
+
+    async def delete_for_targets(self, target_type, target_ids):
+        deleted = 0
+        for target_id in unique_object_ids(target_ids):
+            for like_id in list(self.by_target.get((target_type, target_id), ())):
+                deleted += await self.remove(like_id)
+            self.by_target.pop((target_type, target_id), None)
+            self.totals.pop((target_type, target_id), None)
+        return deleted
+
+
+class MemoryRefreshTokenRepository(RefreshTokenRepository):
+
+    # TTL 인덱스 대신 생성 N번마다 만료된 토큰 정리
+    purge_every = 1024
+
+    def __init__(self):
+        self.by_hash: Dict[str, dict] = {}
+        self._created = 0
+
+    def _purge_expired(self):
+        now = _stored({"now": datetime.now(timezone.utc)})["now"]
+        for key in [key for key, token in self.by_hash.items() if token["expires_at"] <= now]:
+            del self.by_hash[key]
+
+    async def create(self, token):
+        token.setdefault("_id", ObjectId())
+        if token["token_hash"] in self.by_hash:
+            raise DuplicateKeyError("duplicate token")
+        self._created += 1
+        if self._created % self.purge_every == 0:
+            self._purge_expired()
+        self.by_hash[token["token_hash"]] = _stored(token)
+        return token
+
+    async def find(self, token_hash):
+        token = self.by_hash.get(token_hash)
+        return dict(token) if token else None
+
+    async def rotate(self, token_hash, now):
+        token = self.by_hash.get(token_hash)
+        now = _stored({"now": now})["now"]
+        if token is None or token.get("rotated_at") is not None or token["expires_at"] <= now:
+            return None
+        before = dict(token)
+        token["rotated_at"] = now
+        return before
+
+    async def revoke_family(self, family_id):
+        hashes = [key for key, token in self.by_hash.items() if token["family_id"] == family_id]
+        for key in hashes:
+            del self.by_hash[key]
+        return len(hashes)
+
+    async def revoke_user(self, user_id):
+        hashes = [key for key, token in self.by_hash.items() if token["user_id"] == user_id]
+        for key in hashes:
+            del self.by_hash[key]
+        return len(hashes)
+
+
+class MemoryJobRepository(JobRepository):
+
+    # 끝난 작업은 TTL 인덱스 대신 최근 N개만 보관
+    keep_finished = 1000
+
+    def __init__(self):
+        # 대기/실행 중인 작업과 끝난 작업을 나눠 꺼낼 때 대기 작업만 훑음
+        self.pending: Dict[ObjectId, dict] = {}
+        self.finished: "OrderedDict[ObjectId, dict]" = OrderedDict()
+        # key -> queued 상태인 작업 ID (MongoDB의 부분 unique 인덱스에 해당)
+        self.queued_keys: Dict[str, ObjectId] = {}
+
+    async def enqueue(self, job):
+        key = job.get("key")
+        if key is not None and key in self.queued_keys:
+            existing = self.pending[self.queued_keys[key]]
+            existing["run_at"] = max(existing["run_at"], _stored({"run_at": job["run_at"]})["run_at"])
+            return dict(existing)
+        job.setdefault("_id", ObjectId())
+        stored = _stored(job)
+        self.pending[stored["_id"]] = stored
+        if key is not None:
+            self.queued_keys[key] = stored["_id"]
+        return dict(stored)
+
+    async def claim(self, names, worker, now, lease_until):
+        now = _stored({"now": now})["now"]
+        ready = [
+            job for job in self.pending.values()
+            if job["name"] in names and job["run_at"] <= now
+        ]
+        if not ready:
+            return None
+        job = min(ready, key=lambda item: item["run_at"])
+        if job["status"] == "queued" and job.get("key") is not None:
+            self.queued_keys.pop(job["key"], None)
+        job.update(_stored({"status": "running", "run_at": lease_until, "worker": worker, "started_at": now}))
+        job["attempts"] = job.get("attempts", 0) + 1
+        return dict(job)
+
+    async def update_claimed(self, job_id, worker, fields):
+        job = self.pending.get(job_id)
+        if job is None or job["status"] != "running" or job.get("worker") != worker:
+            return False
+        status = fields.get("status", "running")
+        key = job.get("key")
+        if status == "queued" and key is not None:
+            if key in self.queued_keys:
+                raise DuplicateKeyError("duplicate queued job key")
+            self.queued_keys[key] = job_id
+        job.update(_stored(fields))
+        if status in ("done", "failed"):
+            self.finished[job_id] = self.pending.pop(job_id)
+            while len(self.finished) > self.keep_finished:
+                self.finished.popitem(last=False)
+        return True
+
+
+class MemoryViewRepository(ViewRepository):
+
+    def __init__(self):
+        self.by_id: Dict[ObjectId, Dict[int, int]] = {}
+
+    async def merge(self, sketches):
+        merged = {}
+        for diary_id, registers in sketches.items():
+            stored = self.by_id.setdefault(diary_id, {})
+            for index, rank in registers.items():
+                if rank > stored.get(index, 0):
+                    stored[index] = rank
+            merged[diary_id] = dict(stored)
+        return merged
+
+    async def delete(self, diary_id):
+        self.by_id.pop(diary_id, None)
+
+
+class MemoryNotificationRepository(NotificationRepository):
+
+    def __init__(self):
+        self.by_id: Dict[ObjectId, dict] = {}
+        self.by_recipient: Dict[ObjectId, Set[ObjectId]] = defaultdict(set)
+        # (받는 사람, group) -> 안 읽은 알림 ID (unique 부분 인덱스 대응)
+        self.unread_groups: Dict[tuple, ObjectId] = {}
+        self.counters: Dict[ObjectId, int] = {}
+
+    async def deliver(self, notifications):
+        created: Dict[ObjectId, int] = {}
+        for notification in notifications:
+            recipient_id, group = notification["recipient_id"], notification.get("group")
+            existing = self.unread_groups.get((recipient_id, group)) if group is not None else None
+            if existing is not None:
+                self.by_id[existing].update(_stored({
+                    name: notification[name] for name in ("actor", "count", "preview", "updated_at") if name in notification
+                }))
+                continue
+            notification.setdefault("_id", ObjectId())
+            if notification["_id"] in self.by_id:
+                continue
+            stored = _stored({**notification, "read": False})
+            self.by_id[stored["_id"]] = stored
+            self.by_recipient[recipient_id].add(stored["_id"])
+            if group is not None:
+                self.unread_groups[(recipient_id, group)] = stored["_id"]
+            created[recipient_id] = created.get(recipient_id, 0) + 1
+        return created
+
+    async def add_unread(self, counts):
+        for user_id, amount in counts.items():
+            self.counters[user_id] = self.counters.get(user_id, 0) + amount
+
+    async def unread_count(self, user_id, viewer=None):
+        return max(self.counters.get(user_id, 0), 0)
+
+    async def over_limit(self, user_ids, limit):
+        return [user_id for user_id in user_ids if self.counters.get(user_id, 0) > limit]
+
+    def _newest(self, user_id: ObjectId) -> List[dict]:
+        documents = [self.by_id[notification_id] for notification_id in self.by_recipient.get(user_id, ())]
+        return sorted(documents, key=lambda document: (document["updated_at"], document["_id"]), reverse=True)
+
+    async def list_for(self, user_id, skip, limit, viewer=None):
+        return [dict(document) for document in self._newest(user_id)[skip:skip + limit]]
+
+    async def mark_read(self, user_id, notification_ids, read_at):
+        wanted = None if notification_ids is None else set(notification_ids)
+        changed = 0
+        for document in self._newest(user_id):
+            if document["read"] or (wanted is not None and document["_id"] not in wanted):
+                continue
+            document.update(_stored({"read": True, "read_at": read_at}))
+            if document.get("group") is not None:
+                self.unread_groups.pop((user_id, document["group"]), None)
+            changed += 1
+        return changed
+
+    async def trim_unread(self, user_id, keep, read_at):
+        unread = [document["_id"] for document in self._newest(user_id) if not document["read"]]
+        return await self.mark_read(user_id, unread[keep:], read_at) if len(unread) > keep else 0
+
+    async def delete_for(self, field, ids):
+        wanted = set(ids)
+        removed: Dict[ObjectId, int] = {}
+        for document in [document for document in self.by_id.values() if document.get(field) in wanted]:
+            del self.by_id[document["_id"]]
+            self.by_recipient[document["recipient_id"]].discard(document["_id"])
+            if not document["read"]:
+                self.unread_groups.pop((document["recipient_id"], document.get("group")), None)
+                removed[document["recipient_id"]] = removed.get(document["recipient_id"], 0) + 1
+        return removed
+
+
+class MemoryCalendarRepository(CalendarRepository):
+
+    def __init__(self):
+        self.by_id: Dict[str, dict] = {}
+
+    @staticmethod
+    def _copy(document: dict) -> dict:
+        return {**document, "days": {day: [dict(entry) for entry in entries]
+                                     for day, entries in document["days"].items()}}
+
+    async def add(self, user_id, day, entry):
+        month_id = calendar_month_id(user_id, day.year, day.month)
+        document = self.by_id.setdefault(month_id, {
+            "_id": month_id, "user_id": user_id, "year": day.year, "month": day.month, "count": 0, "days": {},
+        })
+        entries = document["days"].setdefault(str(day.day), [])
+        if any(existing["id"] == entry["id"] for existing in entries):
+            return False
+        entries.append(dict(entry))
+        document["count"] += 1
+        return True
+
+    async def remove(self, user_id, day, diary_id):
+        document = self.by_id.get(calendar_month_id(user_id, day.year, day.month))
+        entries = document["days"].get(str(day.day), []) if document else []
+        remaining = [entry for entry in entries if entry["id"] != diary_id]
+        if len(remaining) == len(entries):
+            return False
+        document["days"][str(day.day)] = remaining
+        document["count"] -= 1
+        return True
+
+    async def update_entry(self, user_id, day, diary_id, fields):
+        document = self.by_id.get(calendar_month_id(user_id, day.year, day.month))
+        updated = False
+        for entry in document["days"].get(str(day.day), []) if document else []:
+            if entry["id"] == diary_id:
+                entry.update(fields)
+                updated = True
+        return updated
+
+    async def apply(self, changes):
+        for user_id, day, diary_id, fields in changes:
+            if fields is None:
+                await self.remove(user_id, day, diary_id)
+            else:
+                await self.update_entry(user_id, day, diary_id, fields)
+
+    async def replace_month(self, user_id, year, month, days):
+        month_id = calendar_month_id(user_id, year, month)
+        count = sum(len(entries) for entries in days.values())
+        if not count:
+            self.by_id.pop(month_id, None)
+            return
+        self.by_id[month_id] = self._copy({
+            "_id": month_id, "user_id": user_id, "year": year, "month": month, "count": count, "days": days,
+        })
+
+    async def get_month(self, user_id, year, month, viewer=None):
+        document = self.by_id.get(calendar_month_id(user_id, year, month))
+        return self._copy(document) if document else None
+
+    async def get_year(self, user_id, year, viewer=None):
+        documents = (self.by_id.get(calendar_month_id(user_id, year, month)) for month in range(1, 13))
+        return [self._copy(document) for document in documents if document is not None]
+
+
+class MemoryImageRepository(ImageRepository):
+
+    def __init__(self):
+        self.by_id: Dict[str, dict] = {}
+
+    async def register(self, digest, metadata, now):
+        image = self.by_id.get(digest)
+        if image is None:
+            self.by_id[digest] = _stored({"_id": digest, **metadata, "refs": 0, "created_at": now, "updated_at": now})
+        else:
+            image["updated_at"] = _stored({"now": now})["now"]
+
+    async def get_many(self, digests):
+        return {digest: dict(self.by_id[digest]) for digest in digests if digest in self.by_id}
+
+    async def add_refs(self, digests, amount, now):
+        now = _stored({"now": now})["now"]
+        found = 0
+        for digest in set(digests):
+            image = self.by_id.get(digest)
+            if image is not None:
+                image["refs"] += amount
+                image["updated_at"] = now
+                found += 1
+        return found
+
+    async def delete_unreferenced(self, digest, updated_before):
+        updated_before = _stored({"updated_before": updated_before})["updated_before"]
+        image = self.by_id.get(digest)
+        if image is None or image["refs"] > 0 or image["updated_at"] >= updated_before:
+            return False
+        del self.by_id[digest]
+        return True
+
+
+class MemoryImportRepository(ImportRepository):
+
+    def __init__(self):
+        self.by_id: Dict[str, dict] = {}
+
+    async def get(self, checkpoint_id):
+        checkpoint = self.by_id.get(checkpoint_id)
+        return dict(checkpoint) if checkpoint else None
+
+    async def save(self, checkpoint_id, fields, now):
+        checkpoint = self.by_id.setdefault(checkpoint_id, _stored({"_id": checkpoint_id, "started_at": now}))
+        checkpoint.update(_stored({**fields, "updated_at": now}))
+
+
+def create_memory_repositories() -> Repositories:
+    """메모리 저장소 묶음 생성"""
+    return Repositories(
+        users=MemoryUserRepository(),
+        diaries=MemoryDiaryRepository(),
+        comments=MemoryCommentRepository(),
+        likes=MemoryLikeRepository(),
+        refresh_tokens=MemoryRefreshTokenRepository(),
+        jobs=MemoryJobRepository(),
+        calendar=MemoryCalendarRepository(),
+        views=MemoryViewRepository(),
+        notifications=MemoryNotificationRepository(),
+        images=MemoryImageRepository(),
+        imports=MemoryImportRepository(),
+    )
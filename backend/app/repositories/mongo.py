@@ -0,0 +1,690 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ASCENDING, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.repositories.base import (
+    CalendarRepository,
+    CommentRepository,
+    DiaryRepository,
+    ImageRepository,
+    ImportRepository,
+    JobRepository,
+    LikeRepository,
+    NotificationRepository,
+    RefreshTokenRepository,
+    Repositories,
+    UserRepository,
+    ViewRepository,
+    calendar_month_id,
+    subtree_end,
+    unique_object_ids,
+)
+
+
+class MongoBase:
+    """쓰기는 primary, 조회는 viewer에 따라 읽기 선호도를 달리하는 공통 베이스"""
+    collection_name = ""
+
+    def __init__(self, db, anonymous_read_db, authenticated_read_db):
+        self.db = db
+        self.collection = db[self.collection_name]
+        self._anonymous = anonymous_read_db[self.collection_name]
+        self._authenticated = authenticated_read_db[self.collection_name]
+
+    def read(self, viewer=None):
+        """조회용 컬렉션 (비로그인은 세컨더리 우선)"""
+        return self._anonymous if viewer is None else self._authenticated
+
+    async def _insert_and_read(self, document: dict, viewer) -> dict:
+        """삽입 후 재조회 (세컨더리로 라우팅돼도 같은 인과적 세션이라 방금 쓴 문서를 읽음)"""
+        async with await self.db.client.start_session(causal_consistency=True) as session:
+            result = await self.collection.insert_one(document, session=session)
+            return await self.read(viewer).find_one({"_id": result.inserted_id}, session=session)
+
+    async def _update_author_snapshot(self, user_id: ObjectId, snapshot: dict, version: datetime, limit: int) -> int:
+        """작성자 스냅샷 갱신 (한 번에 limit개씩 나눠 긴 update_many가 잠금과 oplog를 오래 잡지 않게 함)
+
+        author_synced_at이 version 이상인 문서는 건너뛰므로 늦게 도착한 이전 변경이 최신 값을 덮어쓰지 않음
+        """
+        stale = {"user_id": user_id, "author_synced_at": {"$not": {"$gte": version}}}
+        ids = [doc["_id"] async for doc in self.collection.find(stale, {"_id": 1}).limit(limit)]
+        if not ids:
+            return 0
+        result = await self.collection.update_many(
+            {"_id": {"$in": ids}, **stale},
+            {"$set": {**snapshot, "author_synced_at": version}},
+        )
+        return result.modified_count
+
+    async def _insert_new(self, documents: List[dict]) -> List[ObjectId]:
+        """일괄 삽입 후 새로 들어간 _id 반환 (이전 시도에서 이미 들어간 _id는 건너뜀)"""
+        if not documents:
+            return []
+        failed = set()
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != 11000 for error in errors):
+                raise
+            failed = {error["index"] for error in errors}
+        return [document["_id"] for index, document in enumerate(documents) if index not in failed]
+
+    async def _update_and_read(self, document_id: ObjectId, fields: dict,
+                               expected: Optional[dict] = None) -> Optional[dict]:
+        """수정 후 수정된 문서 반환 (한 번의 왕복, expected 필드 값이 다르면 수정하지 않고 None)"""
+        return await self.collection.find_one_and_update(
+            {"_id": document_id, **(expected or {})},
+            {"$set": fields},
+            return_document=ReturnDocument.AFTER,
+        )
+
+
+class MongoUserRepository(MongoBase, UserRepository):
+    collection_name = "users"
+
+    async def get_by_id(self, user_id):
+        return await self.collection.find_one({"_id": user_id})
+
+    async def get_by_username(self, username):
+        return await self.collection.find_one({"username": username})
+
+    async def get_by_email(self, email):
+        return await self.collection.find_one({"email": email})
+
+    async def email_taken(self, email, exclude_username):
+        existing = await self.collection.find_one(
+            {"email": email, "username": {"$ne": exclude_username}},
+            {"_id": 1},
+        )
+        return existing is not None
+
+    async def create(self, user):
+        return await self._insert_and_read(user, viewer=user)
+
+    async def update_by_username(self, username, fields):
+        return await self.collection.find_one_and_update(
+            {"username": username},
+            {"$set": fields},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def get_many(self, user_ids, viewer=None):
+        ids = unique_object_ids(user_ids)
+        if not ids:
+            return {}
+        cursor = self.read(viewer).find(
+            {"_id": {"$in": ids}},
+            {"username": 1, "nickname": 1, "profile_image": 1},
+        )
+        return {doc["_id"]: doc async for doc in cursor}
+
+
+class MongoDiaryRepository(MongoBase, DiaryRepository):
+    collection_name = "diaries"
+
+    @staticmethod
+    def _query(public_only: bool, user_id: Optional[ObjectId]) -> dict:
+        query = {}
+        if public_only:
+            query["is_public"] = True
+        if user_id is not None:
+            query["user_id"] = user_id
+        return query
+
+    async def create(self, diary):
+        return await self._insert_and_read(diary, viewer=diary.get("user_id"))
+
+    async def get(self, diary_id, viewer=None):
+        return await self.read(viewer).find_one({"_id": diary_id})
+
+    async def find_page(self, skip, limit, public_only=False, user_id=None, viewer=None):
+        cursor = self.read(viewer).find(self._query(public_only, user_id))
+        return await cursor.sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+
+    async def count(self, public_only=False, user_id=None, viewer=None):
+        query = self._query(public_only, user_id)
+        if not query:
+            # 필터가 없으면 컬렉션 메타데이터로 추정해 전체 스캔을 피함
+            return await self.read(viewer).estimated_document_count()
+        return await self.read(viewer).count_documents(query)
+
+    async def get_many(self, diary_ids, viewer=None):
+        ids = unique_object_ids(diary_ids)
+        if not ids:
+            return {}
+        return {doc["_id"]: doc async for doc in self.read(viewer).find({"_id": {"$in": ids}})}
+
+    async def iter_public(self, limit=None, batch_size=1000):
+        # is_public + created_at 인덱스로 정렬 없이 순회 (색인 구축은 비로그인 읽기처럼 세컨더리 우선)
+        cursor = self.read(None).find({"is_public": True}, {"title": 1, "content": 1})
+        cursor = cursor.sort("created_at", -1).limit(limit or 0).batch_size(batch_size)
+        async for diary in cursor:
+            yield diary
+
+    async def iter_for_user(self, user_id, batch_size=1000):
+        # user_id + created_at 인덱스를 거꾸로 읽어 정렬 없이 작성순 (본인 데이터라 primary)
+        cursor = self.collection.find({"user_id": user_id}).sort("created_at", 1).batch_size(batch_size)
+        async for diary in cursor:
+            yield diary
+
+    async def insert_many(self, diaries):
+        return await self._insert_new(diaries)
+
+    async def list_for_user_between(self, user_id, start, end):
+        # user_id + created_at 인덱스 범위 조회 (재구축은 방금 쓴 일기를 봐야 하므로 primary)
+        cursor = self.collection.find(
+            {"user_id": user_id, "created_at": {"$gte": start, "$lt": end}},
+            {"title": 1, "is_public": 1, "created_at": 1},
+        )
+        return await cursor.sort("created_at", 1).to_list(None)
+
+    async def update(self, diary_id, fields, expected=None):
+        return await self._update_and_read(diary_id, fields, expected)
+
+    async def delete(self, diary_id):
+        result = await self.collection.delete_one({"_id": diary_id})
+        return result.deleted_count > 0
+
+    async def bulk_write_owned(self, user_id, updates, deletes):
+        async def update():
+            if not updates:
+                return 0
+            result = await self.collection.bulk_write([
+                UpdateOne({"_id": diary_id, "user_id": user_id}, {"$set": fields})
+                for diary_id, fields in updates.items()
+            ], ordered=False)
+            return result.matched_count
+
+        # bulk_write 결과는 삭제 수만 알려 주므로, 어느 일기를 이 호출이 지웠는지 알도록 일기별로 동시에 삭제
+        matched, *deleted = await asyncio.gather(update(), *[
+            self.collection.delete_one({"_id": diary_id, "user_id": user_id}) for diary_id in deletes
+        ])
+        return matched, [diary_id for diary_id, result in zip(deletes, deleted) if result.deleted_count]
+
+    async def update_author_snapshot(self, user_id, snapshot, version, limit):
+        return await self._update_author_snapshot(user_id, snapshot, version, limit)
+
+    async def add_views(self, views):
+        if not views:
+            return
+        # 조회 수 필드만 바꾸므로 change stream 리스너가 무효화 대상에서 뺌 (app/change_streams.py)
+        await self.collection.bulk_write([
+            UpdateOne({"_id": diary_id}, {"$inc": {"view_count": count}, "$max": {"unique_viewers": unique}})
+            for diary_id, (count, unique) in views.items()
+        ], ordered=False)
+
+
+class MongoViewRepository(MongoBase, ViewRepository):
+    collection_name = "diary_views"
+
+    async def merge(self, sketches):
+        if not sketches:
+            return {}
+        # 레지스터별 $max라 여러 워커가 어떤 순서로 합쳐도 결과가 같음
+        operations = [
+            UpdateOne({"_id": diary_id},
+                      {"$max": {f"registers.{index}": rank for index, rank in registers.items()}},
+                      upsert=True)
+            for diary_id, registers in sketches.items() if registers
+        ]
+        # 조회자를 알 수 없는 조회(클라이언트 주소 없는 비로그인)만 있으면 빈 스케치뿐이라 합칠 것이 없음
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        cursor = self.collection.find({"_id": {"$in": list(sketches)}})
+        return {
+            doc["_id"]: {int(index): rank for index, rank in doc.get("registers", {}).items()}
+            async for doc in cursor
+        }
+
+    async def delete(self, diary_id):
+        await self.collection.delete_one({"_id": diary_id})
+
+
+class MongoNotificationRepository(MongoBase, NotificationRepository):
+    collection_name = "notifications"
+
+    def __init__(self, db, anonymous_read_db, authenticated_read_db):
+        super().__init__(db, anonymous_read_db, authenticated_read_db)
+        self.counters = db["notification_counters"]
+        # 배지 조회는 항상 로그인 사용자 (읽음 처리 직후에도 바뀐 값을 보도록)
+        self._counters_read = authenticated_read_db["notification_counters"]
+
+    @staticmethod
+    def _operation(notification: dict, upsert: bool = True):
+        group = notification.get("group")
+        if group is None:
+            return InsertOne(notification)
+        changed = {name: notification[name] for name in ("actor", "count", "preview", "updated_at") if name in notification}
+        on_insert = {name: value for name, value in notification.items()
+                     if name not in changed and name not in ("recipient_id", "group", "read")}
+        return UpdateOne(
+            {"recipient_id": notification["recipient_id"], "group": group, "read": False},
+            {"$set": changed, "$setOnInsert": on_insert},
+            upsert=upsert,
+        )
+
+    async def deliver(self, notifications):
+        if not notifications:
+            return {}
+        try:
+            result = await self.collection.bulk_write([self._operation(n) for n in notifications], ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            errors = details.get("writeErrors", [])
+            if any(error["code"] != 11000 for error in errors):
+                raise
+            # 삽입은 이전 시도에서 이미 들어간 알림, 그룹 갱신은 다른 워커가 같은 그룹을 먼저 만든 경우
+            retry = [notifications[error["index"]] for error in errors
+                     if notifications[error["index"]].get("group") is not None]
+            if retry:
+                await self.collection.bulk_write([self._operation(n, upsert=False) for n in retry], ordered=False)
+        failed = {error["index"] for error in details.get("writeErrors", [])}
+        upserted = {item["index"] for item in details.get("upserted", [])}
+        created: Dict[ObjectId, int] = {}
+        for index, notification in enumerate(notifications):
+            if index in upserted or (notification.get("group") is None and index not in failed):
+                recipient_id = notification["recipient_id"]
+                created[recipient_id] = created.get(recipient_id, 0) + 1
+        return created
+
+    async def add_unread(self, counts):
+        operations = [UpdateOne({"_id": user_id}, {"$inc": {"unread": amount}}, upsert=True)
+                      for user_id, amount in counts.items() if amount]
+        if operations:
+            await self.counters.bulk_write(operations, ordered=False)
+
+    async def unread_count(self, user_id, viewer=None):
+        document = await self._counters_read.find_one({"_id": user_id})
+        return max(document.get("unread", 0), 0) if document else 0
+
+    async def over_limit(self, user_ids, limit):
+        if not user_ids:
+            return []
+        cursor = self.counters.find({"_id": {"$in": user_ids}, "unread": {"$gt": limit}}, {"_id": 1})
+        return [document["_id"] async for document in cursor]
+
+    async def list_for(self, user_id, skip, limit, viewer=None):
+        cursor = self.read(viewer).find({"recipient_id": user_id}).sort("updated_at", -1)
+        return await cursor.skip(skip).limit(limit).to_list(limit)
+
+    async def mark_read(self, user_id, notification_ids, read_at):
+        query = {"recipient_id": user_id, "read": False}
+        if notification_ids is not None:
+            query["_id"] = {"$in": notification_ids}
+        # read_at이 생기면 TTL 인덱스로 보관 기간 뒤 삭제됨
+        result = await self.collection.update_many(query, {"$set": {"read": True, "read_at": read_at}})
+        return result.modified_count
+
+    async def trim_unread(self, user_id, keep, read_at):
+        cursor = self.collection.find({"recipient_id": user_id, "read": False}, {"_id": 1})
+        ids = [document["_id"] async for document in cursor.sort("updated_at", -1).skip(keep)]
+        if not ids:
+            return 0
+        return await self.mark_read(user_id, ids, read_at)
+
+    async def delete_for(self, field, ids):
+        if not ids:
+            return {}
+        found = await self.collection.find({field: {"$in": ids}}, {"recipient_id": 1, "read": 1}).to_list(None)
+        if not found:
+            return {}
+        await self.collection.delete_many({"_id": {"$in": [document["_id"] for document in found]}})
+        removed: Dict[ObjectId, int] = {}
+        for document in found:
+            if not document.get("read"):
+                removed[document["recipient_id"]] = removed.get(document["recipient_id"], 0) + 1
+        return removed
+
+
+class MongoCalendarRepository(MongoBase, CalendarRepository):
+    collection_name = "diary_calendar"
+
+    async def add(self, user_id, day, entry):
+        # 같은 일기가 없을 때만 추가 (있으면 필터가 맞지 않아 upsert가 같은 _id로 삽입을 시도하다 실패함)
+        query = {"_id": calendar_month_id(user_id, day.year, day.month), f"days.{day.day}.id": {"$ne": entry["id"]}}
+        update = {"$push": {f"days.{day.day}": entry}, "$inc": {"count": 1}}
+        try:
+            await self.collection.update_one(
+                query,
+                {**update, "$setOnInsert": {"user_id": user_id, "year": day.year, "month": day.month}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # 이미 있는 일기이거나, 같은 달의 첫 일기를 동시에 추가해 다른 요청이 문서를 먼저 만든 경우
+            result = await self.collection.update_one(query, update)
+            return result.modified_count > 0
+        return True
+
+    async def remove(self, user_id, day, diary_id):
+        result = await self.collection.update_one(
+            {"_id": calendar_month_id(user_id, day.year, day.month), f"days.{day.day}.id": diary_id},
+            {"$pull": {f"days.{day.day}": {"id": diary_id}}, "$inc": {"count": -1}},
+        )
+        return result.modified_count > 0
+
+    async def update_entry(self, user_id, day, diary_id, fields):
+        result = await self.collection.update_one(
+            {"_id": calendar_month_id(user_id, day.year, day.month), f"days.{day.day}.id": diary_id},
+            {"$set": {f"days.{day.day}.$.{name}": value for name, value in fields.items()}},
+        )
+        return result.modified_count > 0
+
+    async def apply(self, changes):
+        operations = []
+        for user_id, day, diary_id, fields in changes:
+            query = {"_id": calendar_month_id(user_id, day.year, day.month), f"days.{day.day}.id": diary_id}
+            if fields is None:
+                update = {"$pull": {f"days.{day.day}": {"id": diary_id}}, "$inc": {"count": -1}}
+            else:
+                update = {"$set": {f"days.{day.day}.$.{name}": value for name, value in fields.items()}}
+            operations.append(UpdateOne(query, update))
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def replace_month(self, user_id, year, month, days):
+        month_id = calendar_month_id(user_id, year, month)
+        count = sum(len(entries) for entries in days.values())
+        if not count:
+            await self.collection.delete_one({"_id": month_id})
+            return
+        await self.collection.replace_one(
+            {"_id": month_id},
+            {"user_id": user_id, "year": year, "month": month, "count": count, "days": days},
+            upsert=True,
+        )
+
+    async def get_month(self, user_id, year, month, viewer=None):
+        return await self.read(viewer).find_one({"_id": calendar_month_id(user_id, year, month)})
+
+    async def get_year(self, user_id, year, viewer=None):
+        # user_id + year + month 인덱스로 최대 12개 문서
+        cursor = self.read(viewer).find({"user_id": user_id, "year": year}).sort("month", 1)
+        return await cursor.to_list(12)
+
+
+class MongoCommentRepository(MongoBase, CommentRepository):
+    collection_name = "comments"
+
+    async def create(self, comment):
+        return await self._insert_and_read(comment, viewer=comment.get("user_id"))
+
+    async def get(self, comment_id, viewer=None):
+        return await self.read(viewer).find_one({"_id": comment_id})
+
+    async def list_by_diary(self, diary_id, viewer=None):
+        # diary_id + path 인덱스로 스레드 표시 순서 그대로 조회
+        cursor = self.read(viewer).find({"diary_id": diary_id}).sort("path", 1)
+        return await cursor.to_list(None)
+
+    async def list_subtree(self, diary_id, path, viewer=None):
+        cursor = self.read(viewer).find({"diary_id": diary_id, "path": {"$gte": path, "$lt": subtree_end(path)}})
+        return await cursor.sort("path", 1).to_list(None)
+
+    async def list_thread_page(self, diary_id, after, limit, viewer=None):
+        # diary_id + depth + path 인덱스로 최상위 댓글 경로만 limit + 1개 읽어 페이지 범위를 정한 뒤 범위 조회 한 번
+        query = {"diary_id": diary_id, "depth": 0}
+        if after is not None:
+            query["path"] = {"$gt": after}
+        roots = await self.read(viewer).find(query, {"path": 1, "_id": 0}).sort("path", 1).to_list(limit + 1)
+        if not roots:
+            return [], None
+        path_range = {"$gte": roots[0]["path"]}
+        has_more = len(roots) > limit
+        if has_more:
+            path_range["$lt"] = roots[limit]["path"]
+        cursor = self.read(viewer).find({"diary_id": diary_id, "path": path_range}).sort("path", 1)
+        return await cursor.to_list(None), roots[limit - 1]["path"] if has_more else None
+
+    async def list_by_user(self, user_id):
+        cursor = self.collection.find({"user_id": user_id, "is_deleted": {"$ne": True}}).sort("created_at", -1)
+        return await cursor.to_list(None)
+
+    async def iter_for_user(self, user_id, batch_size=1000):
+        cursor = self.collection.find({"user_id": user_id, "is_deleted": {"$ne": True}})
+        async for comment in cursor.sort("created_at", 1).batch_size(batch_size):
+            yield comment
+
+    async def insert_many(self, comments):
+        return await self._insert_new(comments)
+
+    async def adjust_reply_count(self, comment_id, amount):
+        return await self.collection.find_one_and_update(
+            {"_id": comment_id},
+            {"$inc": {"reply_count": amount}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def add_reply_counts(self, counts):
+        if not counts:
+            return
+        await self.collection.bulk_write(
+            [UpdateOne({"_id": comment_id}, {"$inc": {"reply_count": amount}}) for comment_id, amount in counts.items()],
+            ordered=False,
+        )
+
+    async def delete_leaf(self, comment_id):
+        # 답글 작성은 부모의 reply_count를 먼저 올리므로, 삭제와 겹쳐도 답글이 고아가 되지 않음
+        result = await self.collection.delete_one({"_id": comment_id, "reply_count": {"$not": {"$gt": 0}}})
+        return result.deleted_count > 0
+
+    async def update(self, comment_id, fields):
+        return await self._update_and_read(comment_id, fields)
+
+    async def delete(self, comment_id):
+        result = await self.collection.delete_one({"_id": comment_id})
+        return result.deleted_count > 0
+
+    async def update_author_snapshot(self, user_id, snapshot, version, limit):
+        return await self._update_author_snapshot(user_id, snapshot, version, limit)
+
+    async def list_ids_by_diary(self, diary_id, limit):
+        cursor = self.collection.find({"diary_id": diary_id}, {"_id": 1}).limit(limit)
+        return [doc["_id"] async for doc in cursor]
+
+    async def delete_many(self, comment_ids):
+        ids = unique_object_ids(comment_ids)
+        if not ids:
+            return 0
+        result = await self.collection.delete_many({"_id": {"$in": ids}})
+        return result.deleted_count
+
+
+class MongoLikeRepository(MongoBase, LikeRepository):
+    collection_name = "likes"
+
+    async def find(self, target_type, target_id, user_id):
+        return await self.collection.find_one({
+            "target_type": target_type,
+            "target_id": target_id,
+            "user_id": user_id
+        })
+
+    async def add(self, target_type, target_id, user_id):
+        like = {
+            "target_type": target_type,
+            "target_id": target_id,
+            "user_id": user_id,
+            "created_at": datetime.now(timezone.utc),
+        }
+        try:
+            await self.collection.insert_one(like)
+        except DuplicateKeyError:
+            # 같은 사용자의 동시 요청(더블 클릭)이 먼저 추가함
+            return None
+        return like
+
+    async def remove(self, like_id):
+        result = await self.collection.delete_one({"_id": like_id})
+        return result.deleted_count > 0
+
+    async def count(self, target_type, target_id):
+        return await self.collection.count_documents({"target_type": target_type, "target_id": target_id})
+
+    async def counts(self, target_type, target_ids, viewer=None) -> Dict[ObjectId, int]:
+        ids = unique_object_ids(target_ids)
+        if not ids:
+            return {}
+        pipeline = [
+            {"$match": {"target_type": target_type, "target_id": {"$in": ids}}},
+            {"$group": {"_id": "$target_id", "count": {"$sum": 1}}},
+        ]
+        return {doc["_id"]: doc["count"] async for doc in self.read(viewer).aggregate(pipeline)}
+
+    async def liked_ids(self, target_type, target_ids, user_id, viewer=None) -> Set[ObjectId]:
+        ids = unique_object_ids(target_ids)
+        if not ids or not user_id:
+            return set()
+        cursor = self.read(viewer).find(
+            {"target_type": target_type, "target_id": {"$in": ids}, "user_id": ObjectId(user_id)},
+            {"target_id": 1, "_id": 0},
+        )
+        return {doc["target_id"] async for doc in cursor}
+
+    async def delete_for_targets(self, target_type, target_ids):
+        ids = unique_object_ids(target_ids)
+        if not ids:
+            return 0
+        result = await self.collection.delete_many({"target_type": target_type, "target_id": {"$in": ids}})
+        return result.deleted_count
+
+
+class MongoRefreshTokenRepository(MongoBase, RefreshTokenRepository):
+    collection_name = "refresh_tokens"
+
+    async def create(self, token):
+        await self.collection.insert_one(token)
+        return token
+
+    async def find(self, token_hash):
+        return await self.collection.find_one({"token_hash": token_hash})
+
+    async def rotate(self, token_hash, now):
+        # 조회와 사용 처리를 한 번의 원자적 명령으로 (동시 요청 중 하나만 성공)
+        return await self.collection.find_one_and_update(
+            {"token_hash": token_hash, "rotated_at": None, "expires_at": {"$gt": now}},
+            {"$set": {"rotated_at": now}},
+        )
+
+    async def revoke_family(self, family_id):
+        result = await self.collection.delete_many({"family_id": family_id})
+        return result.deleted_count
+
+    async def revoke_user(self, user_id):
+        result = await self.collection.delete_many({"user_id": user_id})
+        return result.deleted_count
+
+
+class MongoJobRepository(MongoBase, JobRepository):
+    collection_name = "jobs"
+
+    async def enqueue(self, job):
+        try:
+            await self.collection.insert_one(job)
+            return job
+        except DuplicateKeyError:
+            if job.get("key") is None:
+                raise
+        # 같은 key의 대기 작업에 합침 (부분 unique 인덱스: status가 queued인 key는 하나뿐)
+        existing = await self.collection.find_one_and_update(
+            {"key": job["key"], "status": "queued"},
+            {"$max": {"run_at": job["run_at"]}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if existing is None:
+            # 그사이 다른 워커가 가져갔으면 새로 추가
+            job.pop("_id", None)
+            await self.collection.insert_one(job)
+            return job
+        return existing
+
+    async def claim(self, names, worker, now, lease_until):
+        # status + run_at 인덱스로 가장 오래 기다린 작업부터
+        return await self.collection.find_one_and_update(
+            {"status": {"$in": ["queued", "running"]}, "run_at": {"$lte": now}, "name": {"$in": names}},
+            {
+                "$set": {"status": "running", "run_at": lease_until, "worker": worker, "started_at": now},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def update_claimed(self, job_id, worker, fields):
+        result = await self.collection.update_one(
+            {"_id": job_id, "status": "running", "worker": worker},
+            {"$set": fields},
+        )
+        return result.matched_count > 0
+
+
+class MongoImageRepository(MongoBase, ImageRepository):
+    collection_name = "images"
+
+    async def register(self, digest, metadata, now):
+        # 같은 이미지를 동시에 올려도 upsert 하나로 합쳐짐
+        try:
+            await self.collection.update_one(
+                {"_id": digest},
+                {"$setOnInsert": {**metadata, "refs": 0, "created_at": now}, "$set": {"updated_at": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            await self.collection.update_one({"_id": digest}, {"$set": {"updated_at": now}})
+
+    async def get_many(self, digests):
+        if not digests:
+            return {}
+        return {doc["_id"]: doc async for doc in self.collection.find({"_id": {"$in": list(digests)}})}
+
+    async def add_refs(self, digests, amount, now):
+        if not digests:
+            return 0
+        result = await self.collection.update_many(
+            {"_id": {"$in": list(digests)}},
+            {"$inc": {"refs": amount}, "$set": {"updated_at": now}},
+        )
+        return result.matched_count
+
+    async def delete_unreferenced(self, digest, updated_before):
+        result = await self.collection.delete_one(
+            {"_id": digest, "refs": {"$lte": 0}, "updated_at": {"$lt": updated_before}}
+        )
+        return result.deleted_count > 0
+
+
+class MongoImportRepository(MongoBase, ImportRepository):
+    collection_name = "imports"
+
+    async def get(self, checkpoint_id):
+        return await self.collection.find_one({"_id": checkpoint_id})
+
+    async def save(self, checkpoint_id, fields, now):
+        await self.collection.update_one(
+            {"_id": checkpoint_id},
+            {"$setOnInsert": {"started_at": now}, "$set": {**fields, "updated_at": now}},
+            upsert=True,
+        )
+
+
+def create_mongo_repositories(db, anonymous_read_db, authenticated_read_db) -> Repositories:
+    """MongoDB 저장소 묶음 생성"""
+    args = (db, anonymous_read_db, authenticated_read_db)
+    return Repositories(
+        users=MongoUserRepository(*args),
+        diaries=MongoDiaryRepository(*args),
+        comments=MongoCommentRepository(*args),
+        likes=MongoLikeRepository(*args),
+        refresh_tokens=MongoRefreshTokenRepository(*args),
+        jobs=MongoJobRepository(*args),
+        calendar=MongoCalendarRepository(*args),
+        views=MongoViewRepository(*args),
+        notifications=MongoNotificationRepository(*args),
+        images=MongoImageRepository(*args),
+        imports=MongoImportRepository(*args),
+    )
@@ -0,0 +1,100 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from starlette.routing import Match
+
+
+@dataclass
+class RequestContext:
+    """요청 단위로 공유되는 상태 (라우트 템플릿, DB 호출 통계)"""
+    method: str
+    route: str
+    # 데드라인/동시성 제한 분류 (feed, detail, write, auth, 제외 대상이면 빈 문자열)
+    route_class: str = ""
+    # 인증된 사용자 ID (get_current_user가 채움)
+    user_id: Optional[str] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    status_code: int = 0
+    db_commands: int = 0
+    db_time: float = 0.0
+    db_reply_bytes: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        """요청 시작 후 경과 시간 (초)"""
+        return time.perf_counter() - self.started_at
+
+
+_current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+# 요청 종료 시 호출되는 훅 (metrics, access log 등)
+_finished_hooks: List[Callable[[RequestContext], None]] = []
+# 응답 헤더를 보내기 직전에 호출되는 훅 (핸들러는 끝났고 클라이언트는 아직 응답을 받지 않음)
+_response_started_hooks: List[Callable[[RequestContext], None]] = []
+
+
+def current_request() -> Optional[RequestContext]:
+    """현재 처리 중인 요청의 컨텍스트 (요청 밖이면 None)"""
+    return _current_request.get()
+
+
+def add_request_finished_hook(hook: Callable[[RequestContext], None]):
+    """요청 종료 훅 등록"""
+    if hook not in _finished_hooks:
+        _finished_hooks.append(hook)
+
+
+def add_response_started_hook(hook: Callable[[RequestContext], None]):
+    """응답 시작 훅 등록"""
+    if hook not in _response_started_hooks:
+        _response_started_hooks.append(hook)
+
+
+def resolve_route(router, scope) -> str:
+    """요청 경로를 라우트 템플릿으로 변환 (예: /api/diaries/{diary_id})
+
+    실제 ID가 들어간 경로 대신 템플릿을 라벨로 써야 메트릭 카디널리티가 제한됨
+    """
+    partial = None
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class RequestContextMiddleware:
+    """요청마다 RequestContext를 만들고 contextvar로 전파하는 ASGI 미들웨어"""
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(method=scope["method"], route=resolve_route(self.router, scope))
+        token = _current_request.set(context)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                context.status_code = message["status"]
+                for hook in _response_started_hooks:
+                    hook(context)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            context.status_code = 500
+            raise
+        finally:
+            _current_request.reset(token)
+            for hook in _finished_hooks:
+                hook(context)
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Query, Request, status, Depends
+from fastapi.responses import StreamingResponse
+
+from app import transfer
+from app.auth import get_current_user
+from app.models.transfer import IMPORT_ID_PATTERN, ImportResult
+from app.models.user import UserResponse
+
+router = APIRouter()
+
+
+@router.get("/export")
+async def export_account(current_user: UserResponse = Depends(get_current_user)):
+    """내 일기와 댓글 전체를 NDJSON으로 내려받기 (인증 필요, 모으지 않고 커서에서 바로 스트리밍)"""
+    filename = f"diaries-{datetime.now(timezone.utc):%Y%m%d}.ndjson"
+    return StreamingResponse(
+        transfer.export_lines(current_user.model_dump(by_alias=True)),
+        media_type=transfer.MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_account(
+    request: Request,
+    import_id: str = Query(..., pattern=IMPORT_ID_PATTERN),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """NDJSON 본문의 일기와 댓글을 내 계정으로 가져오기 (인증 필요)
+
+    중간에 끊기면 같은 import_id로 같은 파일을 다시 보내면 반영된 줄 다음부터 이어서 가져옴
+    """
+    importer = transfer.Importer(current_user.model_dump(by_alias=True), import_id)
+    try:
+        return await importer.run(transfer.iter_lines(request.stream()))
+    except transfer.LineTooLong as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e}, fix it and send the file again with the same import_id"
+        )
@@ -1,31 +1,58 @@
 from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import datetime, timedelta, timezone
+import asyncio
 import os
+import secrets
 import shutil
 from pathlib import Path
 
-from app.models.user import UserCreate, UserLogin, Token, UserResponse, UserUpdate
+from app.models.user import UserCreate, UserLogin, Token, UserResponse, UserUpdate, RefreshRequest
 from app.auth import (
     get_password_hash,
     verify_password,
     create_access_token,
     get_current_user,
+    issue_refresh_token,
+    rotate_refresh_token,
+    revoke_refresh_token,
     user_helper,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from app.database import get_database
+from app.database import get_repositories
+from app.images import process_profile_image
+from app.jobs import enqueue, job
+from app.lookups import schedule_author_propagation
 
 router = APIRouter()
 
+# 리사이즈는 CPU를 쓰므로 작업 프로세스 풀에서 실행
+job("profile_image.process", cpu_bound=True)(process_profile_image)
+
+
+def token_response(user: dict, refresh_token: str) -> Token:
+    """액세스 토큰을 만들어 토큰 응답 생성"""
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user["username"]},
+        expires_delta=access_token_expires
+    )
+
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        refresh_token=refresh_token,
+        user=UserResponse(**user_helper(user))
+    )
+
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(user: UserCreate):
     """회원가입"""
-    db = get_database()
+    repos = get_repositories()
 
     # 이미 존재하는 사용자명 확인
-    existing_user = await db.users.find_one({"username": user.username})
+    existing_user = await repos.users.get_by_username(user.username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,7 +60,7 @@ async def register(user: UserCreate):
         )
 
     # 이미 존재하는 이메일 확인
-    existing_email = await db.users.find_one({"email": user.email})
+    existing_email = await repos.users.get_by_email(user.email)
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -50,30 +77,19 @@ async def register(user: UserCreate):
         "created_at": datetime.now(timezone.utc)
     }
 
-    result = await db.users.insert_one(user_dict)
-    created_user = await db.users.find_one({"_id": result.inserted_id})
+    created_user = await repos.users.create(user_dict)
 
-    # 액세스 토큰 생성
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username},
-        expires_delta=access_token_expires
-    )
-
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user=UserResponse(**user_helper(created_user))
-    )
+    # 액세스 토큰과 리프레시 토큰 발급
+    return token_response(created_user, await issue_refresh_token(created_user))
 
 
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """로그인"""
-    db = get_database()
+    repos = get_repositories()
 
     # 사용자 찾기
-    user = await db.users.find_one({"username": form_data.username})
+    user = await repos.users.get_by_username(form_data.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,27 +105,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 액세스 토큰 생성
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user["username"]},
-        expires_delta=access_token_expires
-    )
-
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user=UserResponse(**user_helper(user))
-    )
+    # 액세스 토큰과 리프레시 토큰 발급
+    return token_response(user, await issue_refresh_token(user))
 
 
 @router.post("/login-json", response_model=Token)
 async def login_json(user_login: UserLogin):
     """JSON 형식 로그인 (프론트엔드용)"""
-    db = get_database()
+    repos = get_repositories()
 
     # 사용자 찾기
-    user = await db.users.find_one({"username": user_login.username})
+    user = await repos.users.get_by_username(user_login.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -123,18 +129,22 @@ async def login_json(user_login: UserLogin):
             detail="Incorrect username or password",
         )
 
-    # 액세스 토큰 생성
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user["username"]},
-        expires_delta=access_token_expires
-    )
+    # 액세스 토큰과 리프레시 토큰 발급
+    return token_response(user, await issue_refresh_token(user))
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest):
+    """액세스 토큰 재발급 (리프레시 토큰 교체, 비밀번호 검증 없음)"""
+    user, refresh_token = await rotate_refresh_token(request.refresh_token)
+    return token_response(user, refresh_token)
 
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user=UserResponse(**user_helper(user))
-    )
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshRequest):
+    """로그아웃 (리프레시 토큰 폐기)"""
+    await revoke_refresh_token(request.refresh_token)
+    return None
 
 
 @router.get("/me", response_model=UserResponse)
@@ -143,6 +153,11 @@ async def get_me(current_user: UserResponse = Depends(get_current_user)):
     return current_user
 
 
+def _save_upload(source, path: Path):
+    with path.open("wb") as buffer:
+        shutil.copyfileobj(source, buffer)
+
+
 @router.post("/upload-profile-image", response_model=UserResponse)
 async def upload_profile_image(
     file: UploadFile = File(...),
@@ -163,14 +178,13 @@ async def upload_profile_image(
     upload_dir = Path("uploads/profile_images")
     upload_dir.mkdir(parents=True, exist_ok=True)
 
-    # 파일명 생성 (사용자 ID + 확장자)
-    filename = f"{current_user.id}{file_extension}"
+    # 파일명 생성 (사용자 ID + 임의 토큰 + 확장자, 새 사진이 브라우저 캐시에 가려지지 않게 매번 다른 이름)
+    filename = f"{current_user.id}-{secrets.token_hex(4)}{file_extension}"
     file_path = upload_dir / filename
 
-    # 파일 저장
+    # 파일 저장 (디스크 쓰기가 이벤트 루프를 막지 않도록 스레드에서)
     try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.to_thread(_save_upload, file.file, file_path)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -178,16 +192,16 @@ async def upload_profile_image(
         )
 
     # 데이터베이스 업데이트
-    db = get_database()
+    repos = get_repositories()
     profile_image_url = f"/uploads/profile_images/{filename}"
 
-    await db.users.update_one(
-        {"username": current_user.username},
-        {"$set": {"profile_image": profile_image_url}}
-    )
-
     # 업데이트된 사용자 정보 반환
-    updated_user = await db.users.find_one({"username": current_user.username})
+    updated_user = await repos.users.update_by_username(
+        current_user.username, {"profile_image": profile_image_url}
+    )
+    # 리사이즈, 이전 사진 정리, 일기/댓글의 작성자 스냅샷 갱신은 백그라운드 작업으로
+    await enqueue("profile_image.process", {"path": str(file_path), "user_id": current_user.id})
+    await schedule_author_propagation(updated_user)
     return UserResponse(**user_helper(updated_user))
 
 
@@ -197,10 +211,10 @@ async def update_profile(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """회원정보 수정"""
-    db = get_database()
+    repos = get_repositories()
 
     # 현재 사용자 정보 조회
-    user = await db.users.find_one({"username": current_user.username})
+    user = await repos.users.get_by_username(current_user.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -213,16 +227,11 @@ async def update_profile(
     # 닉네임 업데이트
     if update_data.nickname is not None:
         update_fields["nickname"] = update_data.nickname
-        # 일기와 댓글의 author는 조회 시 users 테이블에서 실시간으로 가져오므로 별도 업데이트 불필요
 
     # 이메일 업데이트
     if update_data.email is not None:
         # 이메일 중복 확인
-        existing_email = await db.users.find_one({
-            "email": update_data.email,
-            "username": {"$ne": current_user.username}
-        })
-        if existing_email:
+        if await repos.users.email_taken(update_data.email, current_user.username):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
@@ -247,12 +256,15 @@ async def update_profile(
         # 새 비밀번호 해시화
         update_fields["hashed_password"] = get_password_hash(update_data.new_password)
 
-    if update_fields:
-        await db.users.update_one(
-            {"username": current_user.username},
-            {"$set": update_fields}
-        )
-
     # 업데이트된 사용자 정보 반환
-    updated_user = await db.users.find_one({"username": current_user.username})
+    if update_fields:
+        updated_user = await repos.users.update_by_username(current_user.username, update_fields)
+        if "hashed_password" in update_fields:
+            # 비밀번호가 바뀌면 모든 기기의 리프레시 토큰 폐기
+            await repos.refresh_tokens.revoke_user(user["_id"])
+        if "nickname" in update_fields and update_fields["nickname"] != user.get("nickname"):
+            # 일기/댓글의 작성자 스냅샷은 백그라운드 작업으로 청크 단위로 갱신
+            await schedule_author_propagation(updated_user)
+    else:
+        updated_user = user
     return UserResponse(**user_helper(updated_user))
@@ -1,59 +1,97 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from typing import Optional
+from typing import List, Optional
+import asyncio
+import re
 from datetime import datetime, timezone
 from bson import ObjectId
 
 from app.models.comment import CommentCreate, CommentUpdate
 from app.models.user import UserResponse
-from app.database import get_database
+from app.database import get_repositories
 from app.auth import get_current_user, get_current_user_optional
+from app.events import hub
+from app.jobs import enqueue, job
+from app.lookups import author_snapshot, resolve_authors
+from app.notifications import forget as forget_notifications, notify_comment
+from app.repositories.base import comment_thread_fields
+from app.singleflight import coalesce
 
 router = APIRouter()
 
+# 답글 최대 깊이 (최상위 댓글은 0)
+MAX_REPLY_DEPTH = 5
+# 스레드 페이지당 최대 최상위 댓글 수
+THREAD_PAGE_MAX_LIMIT = 50
+# 스레드 페이지 커서 (최상위 댓글 경로 한 구간)
+THREAD_CURSOR = re.compile(r"[0-9a-f]{35}")
+
+
+async def comment_helpers(comments: List[dict], current_user_id: str = None) -> List[dict]:
+    """MongoDB 문서 목록을 딕셔너리 목록으로 변환 (좋아요 정보 일괄 조회, 작성자는 스냅샷 사용)"""
+    if not comments:
+        return []
+
+    repos = get_repositories()
+    comment_ids = [comment["_id"] for comment in comments]
+    likes_counts, liked_ids, authors = await asyncio.gather(
+        repos.likes.counts("comment", comment_ids, viewer=current_user_id),
+        repos.likes.liked_ids("comment", comment_ids, current_user_id, viewer=current_user_id),
+        resolve_authors(comments, viewer=current_user_id),
+    )
+
+    result = []
+    for comment, (author_nickname, author_profile_image) in zip(comments, authors):
+        result.append({
+            "id": str(comment["_id"]),  # 프론트엔드 호환성을 위해 id 필드 추가
+            "_id": str(comment["_id"]),
+            "diary_id": str(comment["diary_id"]),
+            "content": comment["content"],
+            "author": author_nickname,  # 프로필 변경 시 백그라운드로 갱신되는 작성자 스냅샷
+            "user_id": str(comment["user_id"]),
+            "author_profile_image": author_profile_image,
+            "likes_count": likes_counts.get(comment["_id"], 0),
+            "is_liked": comment["_id"] in liked_ids,
+            "parent_id": str(comment["parent_id"]) if comment.get("parent_id") else None,
+            "depth": comment.get("depth", 0),
+            "reply_count": comment.get("reply_count", 0),
+            "is_deleted": comment.get("is_deleted", False),
+            "created_at": comment["created_at"],
+            "updated_at": comment["updated_at"]
+        })
+    return result
+
 
 async def comment_helper(comment, current_user_id: str = None) -> dict:
     """MongoDB 문서를 딕셔너리로 변환"""
-    db = get_database()
-    comment_id = comment["_id"]
+    return (await comment_helpers([comment], current_user_id))[0]
 
-    # 좋아요 수 계산
-    likes_count = await db.likes.count_documents({
-        "target_type": "comment",
-        "target_id": comment_id
-    })
 
-    # 현재 사용자의 좋아요 여부 확인
-    is_liked = False
-    if current_user_id:
-        like = await db.likes.find_one({
-            "target_type": "comment",
-            "target_id": comment_id,
-            "user_id": ObjectId(current_user_id)
-        })
-        is_liked = like is not None
-
-    # 작성자의 최신 닉네임과 프로필 이미지 가져오기
-    author_nickname = "익명"
-    author_profile_image = None
-    if comment.get("user_id"):
-        author = await db.users.find_one({"_id": ObjectId(comment["user_id"])})
-        if author:
-            author_nickname = author.get("nickname", author.get("username", "익명"))
-            author_profile_image = author.get("profile_image")
-
-    return {
-        "id": str(comment["_id"]),  # 프론트엔드 호환성을 위해 id 필드 추가
-        "_id": str(comment["_id"]),
-        "diary_id": str(comment["diary_id"]),
-        "content": comment["content"],
-        "author": author_nickname,  # DB 저장값이 아닌 users 컬렉션에서 가져온 최신 닉네임 사용
-        "user_id": str(comment["user_id"]),
-        "author_profile_image": author_profile_image,
-        "likes_count": likes_count,
-        "is_liked": is_liked,
-        "created_at": comment["created_at"],
-        "updated_at": comment["updated_at"]
-    }
+def thread_path(comment: dict) -> str:
+    """댓글의 스레드 경로 (백필 전 댓글은 백필과 같은 최상위 경로로 계산)"""
+    if "path" in comment:
+        return comment["path"]
+    return comment_thread_fields(comment["_id"], comment["created_at"])["path"]
+
+
+async def detach_from_parent(comment: dict):
+    """삭제된 답글을 부모의 답글 수에서 빼고, 삭제 표시만 남은 부모에 답글이 없어지면 부모도 삭제"""
+    repos = get_repositories()
+    parent_id = comment.get("parent_id")
+    while parent_id is not None:
+        parent = await repos.comments.adjust_reply_count(parent_id, -1)
+        if parent is None or not parent.get("is_deleted") or not await repos.comments.delete_leaf(parent_id):
+            return
+        hub.publish(str(parent["diary_id"]), "comment.deleted", {"id": str(parent_id)})
+        await enqueue("comment.cleanup", {"comment_id": str(parent_id)})
+        parent_id = parent.get("parent_id")
+
+
+@job("comment.cleanup")
+async def cleanup_comment(payload: dict) -> int:
+    """삭제된 댓글의 좋아요와 알림 정리"""
+    comment_id = ObjectId(payload["comment_id"])
+    await forget_notifications("comment_id", [comment_id])
+    return await get_repositories().likes.delete_for_targets("comment", [comment_id])
 
 
 @router.get("/comments/me")
@@ -61,12 +99,10 @@ async def get_my_comments(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """현재 인증된 사용자의 모든 댓글 반환"""
-    db = get_database()
-    comments = []
-    async for comment in db.comments.find({"user_id": ObjectId(current_user.id)}).sort("created_at", -1):
-        comments.append(await comment_helper(comment, current_user.id))
+    repos = get_repositories()
+    comments = await repos.comments.list_by_user(ObjectId(current_user.id))
 
-    return comments
+    return await comment_helpers(comments, current_user.id)
 
 
 @router.post("/diaries/{diary_id}/comments", status_code=status.HTTP_201_CREATED)
@@ -76,7 +112,7 @@ async def create_comment(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """댓글 생성 (인증 필요)"""
-    db = get_database()
+    repos = get_repositories()
 
     if not ObjectId.is_valid(diary_id):
         raise HTTPException(
@@ -85,34 +121,67 @@ async def create_comment(
         )
 
     # 일기가 존재하는지 확인
-    diary = await db.diaries.find_one({"_id": ObjectId(diary_id)})
+    diary = await repos.diaries.get(ObjectId(diary_id), viewer=current_user.id)
     if not diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Diary with id {diary_id} not found"
         )
 
-    comment_dict = comment.model_dump()
+    parent = None
+    if comment.parent_id is not None:
+        if not ObjectId.is_valid(comment.parent_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid comment ID format"
+            )
+        parent = await repos.comments.get(ObjectId(comment.parent_id), viewer=current_user.id)
+        if not parent or parent["diary_id"] != diary["_id"] or parent.get("is_deleted"):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Comment with id {comment.parent_id} not found"
+            )
+        if parent.get("depth", 0) >= MAX_REPLY_DEPTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reply depth limit reached"
+            )
+        parent = {**parent, "path": thread_path(parent)}
+
+    comment_dict = comment.model_dump(exclude={"parent_id"})
+    comment_dict["_id"] = ObjectId()
     comment_dict["diary_id"] = ObjectId(diary_id)
-    comment_dict["author"] = current_user.nickname if current_user.nickname else current_user.username
+    comment_dict.update(author_snapshot(current_user, synced_at=datetime.now(timezone.utc)))
     comment_dict["user_id"] = ObjectId(current_user.id)
     comment_dict["created_at"] = datetime.now(timezone.utc)
     comment_dict["updated_at"] = datetime.now(timezone.utc)
+    # 스레드 표시 순서를 정하는 경로 (일기 안에서 path 오름차순 = 표시 순서)
+    comment_dict.update(comment_thread_fields(comment_dict["_id"], comment_dict["created_at"], parent))
 
-    result = await db.comments.insert_one(comment_dict)
-    created_comment = await db.comments.find_one({"_id": result.inserted_id})
+    if parent is not None:
+        # 부모 삭제와 겹쳐도 답글이 고아가 되지 않도록 답글 수를 먼저 올림 (delete_leaf 참고)
+        await repos.comments.adjust_reply_count(parent["_id"], 1)
+    created_comment = await repos.comments.create(comment_dict)
+    result = await comment_helper(created_comment, current_user.id)
 
-    return await comment_helper(created_comment, current_user.id)
+    # 구독자에게는 사용자별 필드(is_liked)를 뺀 댓글 전달
+    hub.publish(str(diary["_id"]), "comment.created", {key: value for key, value in result.items() if key != "is_liked"})
+    notify_comment(diary, created_comment, parent, current_user)
+    return result
 
 
 @router.get("/diaries/{diary_id}/comments")
+@coalesce
 async def get_comments(
     diary_id: str,
     sort_by: str = "newest",  # newest 또는 likes
     current_user: Optional[UserResponse] = Depends(get_current_user_optional)
 ):
-    """특정 일기의 댓글 목록 조회 (로그인 선택 사항)"""
-    db = get_database()
+    """특정 일기의 댓글과 답글 전체 조회 (로그인 선택 사항)
+
+    최상위 댓글은 최신순, 답글은 부모 아래에 작성순으로 (depth로 들여쓰기)
+    """
+    repos = get_repositories()
 
     if not ObjectId.is_valid(diary_id):
         raise HTTPException(
@@ -122,46 +191,78 @@ async def get_comments(
 
     # 로그인한 경우 사용자 ID 전달
     user_id = current_user.id if current_user else None
-    comments = []
-    
-    # 각 댓글의 좋아요 수를 미리 계산하여 정렬에 사용
-    pipeline = [
-        {"$match": {"diary_id": ObjectId(diary_id)}},
-        {
-            "$lookup": {
-                "from": "likes",
-                "let": {"comment_id": "$_id"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$and": [
-                                    {"$eq": ["$target_type", "comment"]},
-                                    {"$eq": ["$target_id", "$$comment_id"]}
-                                ]
-                            }
-                        }
-                    }
-                ],
-                "as": "likes"
-            }
-        },
-        {
-            "$addFields": {
-                "likes_count": {"$size": "$likes"}
-            }
-        },
-        {
-            "$sort": {
-                "likes_count" if sort_by == "likes" else "created_at": -1
-            }
-        }
-    ]
-    
-    async for comment in db.comments.aggregate(pipeline):
-        comments.append(await comment_helper(comment, user_id))
-
-    return comments
+
+    # diary_id + path 인덱스로 표시 순서대로 조회 후 좋아요 수는 일괄 계산
+    comments = await repos.comments.list_by_diary(ObjectId(diary_id), viewer=user_id)
+    result = await comment_helpers(comments, user_id)
+
+    if sort_by == "likes":
+        # 스레드 단위로 최상위 댓글의 좋아요 순 (같으면 최신순 유지, 안정 정렬)
+        threads = []
+        for item in result:
+            if item["depth"] == 0 or not threads:
+                threads.append([item])
+            else:
+                threads[-1].append(item)
+        threads.sort(key=lambda thread: thread[0]["likes_count"], reverse=True)
+        result = [item for thread in threads for item in thread]
+
+    return result
+
+
+@router.get("/diaries/{diary_id}/comments/threads")
+@coalesce
+async def get_comment_threads(
+    diary_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """최상위 댓글 limit개와 그 답글 전체 (최신 스레드부터, next_cursor로 다음 페이지)"""
+    repos = get_repositories()
+    limit = max(1, min(limit, THREAD_PAGE_MAX_LIMIT))
+
+    if not ObjectId.is_valid(diary_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid diary ID format"
+        )
+    if cursor is not None and not THREAD_CURSOR.fullmatch(cursor):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    user_id = current_user.id if current_user else None
+    comments, next_cursor = await repos.comments.list_thread_page(ObjectId(diary_id), cursor, limit, viewer=user_id)
+    return {"items": await comment_helpers(comments, user_id), "next_cursor": next_cursor}
+
+
+@router.get("/comments/{comment_id}/replies")
+@coalesce
+async def get_comment_replies(
+    comment_id: str,
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """댓글과 그 아래 모든 답글 (표시 순서, 범위 조회 한 번)"""
+    repos = get_repositories()
+
+    if not ObjectId.is_valid(comment_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid comment ID format"
+        )
+
+    user_id = current_user.id if current_user else None
+    comment = await repos.comments.get(ObjectId(comment_id), viewer=user_id)
+    if not comment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Comment with id {comment_id} not found"
+        )
+
+    subtree = await repos.comments.list_subtree(comment["diary_id"], thread_path(comment), viewer=user_id)
+    return {"items": await comment_helpers(subtree or [comment], user_id)}
 
 
 @router.put("/comments/{comment_id}")
@@ -171,7 +272,7 @@ async def update_comment(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """댓글 수정 (인증 필요, 본인만 가능)"""
-    db = get_database()
+    repos = get_repositories()
 
     if not ObjectId.is_valid(comment_id):
         raise HTTPException(
@@ -179,9 +280,9 @@ async def update_comment(
             detail="Invalid comment ID format"
         )
 
-    # 댓글 찾기
-    comment = await db.comments.find_one({"_id": ObjectId(comment_id)})
-    if not comment:
+    # 댓글 찾기 (삭제 표시만 남은 댓글은 수정 불가)
+    comment = await repos.comments.get(ObjectId(comment_id), viewer=current_user.id)
+    if not comment or comment.get("is_deleted"):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment with id {comment_id} not found"
@@ -198,12 +299,12 @@ async def update_comment(
     update_data = comment_update.model_dump(exclude_unset=True)
     update_data["updated_at"] = datetime.now(timezone.utc)
 
-    await db.comments.update_one(
-        {"_id": ObjectId(comment_id)},
-        {"$set": update_data}
-    )
-
-    updated_comment = await db.comments.find_one({"_id": ObjectId(comment_id)})
+    updated_comment = await repos.comments.update(ObjectId(comment_id), update_data)
+    hub.publish(str(updated_comment["diary_id"]), "comment.updated", {
+        "id": str(updated_comment["_id"]),
+        "content": updated_comment["content"],
+        "updated_at": updated_comment["updated_at"],
+    })
     return await comment_helper(updated_comment, current_user.id)
 
 
@@ -213,7 +314,7 @@ async def delete_comment(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """댓글 삭제 (인증 필요, 본인만 가능)"""
-    db = get_database()
+    repos = get_repositories()
 
     if not ObjectId.is_valid(comment_id):
         raise HTTPException(
@@ -222,8 +323,8 @@ async def delete_comment(
         )
 
     # 댓글 찾기
-    comment = await db.comments.find_one({"_id": ObjectId(comment_id)})
-    if not comment:
+    comment = await repos.comments.get(ObjectId(comment_id), viewer=current_user.id)
+    if not comment or comment.get("is_deleted"):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment with id {comment_id} not found"
@@ -236,7 +337,26 @@ async def delete_comment(
             detail="You can only delete your own comments"
         )
 
-    # 댓글 삭제
-    await db.comments.delete_one({"_id": ObjectId(comment_id)})
+    # 답글이 없으면 삭제하고, 있으면 답글 스레드가 유지되도록 내용만 지우고 자리를 남김
+    if await repos.comments.delete_leaf(ObjectId(comment_id)):
+        hub.publish(str(comment["diary_id"]), "comment.deleted", {"id": str(comment["_id"])})
+        await enqueue("comment.cleanup", {"comment_id": comment_id})
+        await detach_from_parent(comment)
+    else:
+        updated_comment = await repos.comments.update(ObjectId(comment_id), {
+            "content": "",
+            "is_deleted": True,
+            "updated_at": datetime.now(timezone.utc),
+        })
+        if updated_comment is None:
+            return None
+        hub.publish(str(comment["diary_id"]), "comment.updated", {
+            "id": str(comment["_id"]),
+            "content": "",
+            "is_deleted": True,
+            "updated_at": updated_comment["updated_at"],
+        })
+        # 지운 내용이 알림 미리보기로 남지 않게
+        await enqueue("notifications.forget", {"field": "comment_id", "ids": [comment_id]})
 
     return None
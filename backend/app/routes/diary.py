@@ -1,60 +1,103 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, status, Depends
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+import asyncio
 from datetime import datetime, timezone
 from bson import ObjectId
 
-from app.models.diary import DiaryCreate, DiaryUpdate, DiaryResponse
+from app.models.diary import DiaryBulkRequest, DiaryCreate, DiaryUpdate, DiaryResponse
 from app.models.user import UserResponse
-from app.database import get_database
+from app import attachments, calendar_rollup, similar, views
+from app.database import get_repositories
 from app.auth import get_current_user, get_current_user_optional
+from app.events import hub
+from app.jobs import enqueue, job
+from app.lookups import author_snapshot, resolve_authors
+from app.notifications import forget as forget_notifications
+from app.singleflight import coalesce
 
 router = APIRouter()
 
+# 일기 삭제 후 댓글/좋아요를 한 번에 지우는 개수
+CLEANUP_BATCH_SIZE = 500
+# 비슷한 일기 추천 최대 개수
+SIMILAR_MAX_LIMIT = 20
+# 첨부 이미지를 바꾸는 수정이 동시 수정과 겹칠 때 다시 읽어서 시도하는 횟수
+UPDATE_ATTEMPTS = 3
+
+
+async def diary_helpers(diaries: List[dict], current_user_id: str = None) -> List[dict]:
+    """MongoDB 문서 목록을 딕셔너리 목록으로 변환
+
+    좋아요 수, 좋아요 여부를 목록 전체에 대해 한 번씩만 조회하므로
+    DB 왕복 횟수가 페이지 크기와 무관함 (작성자 정보와 첨부 이미지는 문서에 저장된 스냅샷 사용)
+    """
+    if not diaries:
+        return []
+
+    repos = get_repositories()
+    diary_ids = [diary["_id"] for diary in diaries]
+    likes_counts, liked_ids, authors = await asyncio.gather(
+        repos.likes.counts("diary", diary_ids, viewer=current_user_id),
+        repos.likes.liked_ids("diary", diary_ids, current_user_id, viewer=current_user_id),
+        resolve_authors(diaries, viewer=current_user_id),
+    )
 
-async def diary_helper(diary, current_user_id: str = None) -> dict:
-    """MongoDB 문서를 딕셔너리로 변환"""
-    db = get_database()
-    diary_id = diary["_id"]
-
-    # 좋아요 수 계산
-    likes_count = await db.likes.count_documents({
-        "target_type": "diary",
-        "target_id": diary_id
-    })
-
-    # 현재 사용자의 좋아요 여부 확인
-    is_liked = False
-    if current_user_id:
-        like = await db.likes.find_one({
-            "target_type": "diary",
-            "target_id": diary_id,
-            "user_id": ObjectId(current_user_id)
+    result = []
+    for diary, (author_nickname, author_profile_image) in zip(diaries, authors):
+        result.append({
+            "id": str(diary["_id"]),  # 프론트엔드 호환성을 위해 id 필드 추가
+            "_id": str(diary["_id"]),
+            "title": diary["title"],
+            "content": diary["content"],
+            "author": author_nickname,  # 프로필 변경 시 백그라운드로 갱신되는 작성자 스냅샷
+            "user_id": str(diary.get("user_id", "")),
+            "author_profile_image": author_profile_image,
+            "likes_count": likes_counts.get(diary["_id"], 0),
+            "is_liked": diary["_id"] in liked_ids,
+            "view_count": diary.get("view_count", 0),
+            "unique_viewers": diary.get("unique_viewers", 0),
+            "images": [attachments.image_view(image) for image in diary.get("images", [])],
+            "is_public": diary["is_public"],
+            "created_at": diary["created_at"],
+            "updated_at": diary["updated_at"]
         })
-        is_liked = like is not None
+    return result
 
-    # 작성자의 최신 닉네임과 프로필 이미지 가져오기
-    author_nickname = "익명"
-    author_profile_image = None
-    if diary.get("user_id"):
-        author = await db.users.find_one({"_id": ObjectId(diary["user_id"])})
-        if author:
-            author_nickname = author.get("nickname", author.get("username", "익명"))
-            author_profile_image = author.get("profile_image")
 
-    return {
-        "id": str(diary["_id"]),  # 프론트엔드 호환성을 위해 id 필드 추가
-        "_id": str(diary["_id"]),
-        "title": diary["title"],
-        "content": diary["content"],
-        "author": author_nickname,  # DB 저장값이 아닌 users 컬렉션에서 가져온 최신 닉네임 사용
-        "user_id": str(diary.get("user_id", "")),
-        "author_profile_image": author_profile_image,
-        "likes_count": likes_count,
-        "is_liked": is_liked,
-        "is_public": diary["is_public"],
-        "created_at": diary["created_at"],
-        "updated_at": diary["updated_at"]
-    }
+async def diary_helper(diary, current_user_id: str = None) -> dict:
+    """MongoDB 문서를 딕셔너리로 변환"""
+    return (await diary_helpers([diary], current_user_id))[0]
+
+
+@job("diary.cleanup")
+async def cleanup_diary(payload: dict) -> int:
+    """삭제된 일기(일괄 삭제면 여러 개)의 댓글, 댓글 좋아요, 일기 좋아요 정리 (중간에 멈춰도 다시 실행하면 이어서 지움)"""
+    repos = get_repositories()
+    diary_ids = [ObjectId(diary_id) for diary_id in payload.get("diary_ids") or [payload["diary_id"]]]
+    deleted = 0
+    for diary_id in diary_ids:
+        while True:
+            comment_ids = await repos.comments.list_ids_by_diary(diary_id, CLEANUP_BATCH_SIZE)
+            if not comment_ids:
+                break
+            # 좋아요를 먼저 지워야 중간에 멈춰도 댓글 ID를 다시 찾을 수 있음
+            await repos.likes.delete_for_targets("comment", comment_ids)
+            deleted += await repos.comments.delete_many(comment_ids)
+        await repos.views.delete(diary_id)
+    await repos.likes.delete_for_targets("diary", diary_ids)
+    await forget_notifications("diary_id", diary_ids)
+    return deleted
+
+
+async def _attach_images(digests: List[str]) -> List[dict]:
+    try:
+        return await attachments.attach(digests)
+    except LookupError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Image not found, upload it again"
+        )
 
 
 @router.post("/", response_model=DiaryResponse, status_code=status.HTTP_201_CREATED)
@@ -63,21 +106,30 @@ async def create_diary(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """일기 생성 (인증 필요)"""
-    db = get_database()
+    repos = get_repositories()
 
     diary_dict = diary.model_dump()
-    diary_dict["author"] = current_user.nickname if current_user.nickname else current_user.username  # 작성자를 닉네임으로 설정
+    # 첨부 이미지의 참조 수를 먼저 올림 (같은 이미지를 여러 번 넣으면 한 번만)
+    image_ids = list(dict.fromkeys(diary_dict.pop("images")))
+    diary_dict["images"] = await _attach_images(image_ids)
+    # 작성자 닉네임과 프로필 이미지 스냅샷
+    diary_dict.update(author_snapshot(current_user, synced_at=datetime.now(timezone.utc)))
     diary_dict["user_id"] = ObjectId(current_user.id)  # 사용자 ID를 ObjectId로 저장
     diary_dict["created_at"] = datetime.now(timezone.utc)
     diary_dict["updated_at"] = datetime.now(timezone.utc)
 
-    result = await db.diaries.insert_one(diary_dict)
-    created_diary = await db.diaries.find_one({"_id": result.inserted_id})
+    try:
+        created_diary = await repos.diaries.create(diary_dict)
+    except BaseException:
+        await attachments.detach(image_ids)
+        raise
+    await calendar_rollup.record_created(created_diary)
 
     return await diary_helper(created_diary, current_user.id)
 
 
 @router.get("/")
+@coalesce
 async def get_diaries(
     skip: int = 0,
     limit: int = 10,
@@ -85,20 +137,16 @@ async def get_diaries(
     current_user: Optional[UserResponse] = Depends(get_current_user_optional)
 ):
     """일기 목록 조회 (로그인 선택 사항)"""
-    db = get_database()
-
-    query = {"is_public": True} if public_only else {}
+    repos = get_repositories()
+    user_id = current_user.id if current_user else None
 
     # 전체 개수 조회
-    total = await db.diaries.count_documents(query)
+    total = await repos.diaries.count(public_only=public_only, viewer=user_id)
 
-    diaries = await db.diaries.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    diaries = await repos.diaries.find_page(skip, limit, public_only=public_only, viewer=user_id)
 
     # 좋아요 정보를 포함하여 반환 (로그인한 경우 사용자 ID 전달)
-    user_id = current_user.id if current_user else None
-    result = []
-    for diary in diaries:
-        result.append(await diary_helper(diary, user_id))
+    result = await diary_helpers(diaries, user_id)
 
     return {
         "items": result,
@@ -109,23 +157,21 @@ async def get_diaries(
 
 
 @router.get("/me")
+@coalesce
 async def get_my_diaries(
     skip: int = 0,
     limit: int = 10,
     current_user: UserResponse = Depends(get_current_user)
 ):
     """현재 인증된 사용자의 모든 일기(비공개 포함) 반환"""
-    db = get_database()
-
-    query = {"user_id": ObjectId(current_user.id)}
+    repos = get_repositories()
+    user_id = ObjectId(current_user.id)
 
     # 전체 개수 조회
-    total = await db.diaries.count_documents(query)
+    total = await repos.diaries.count(user_id=user_id, viewer=current_user.id)
 
-    diaries = await db.diaries.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    result = []
-    for diary in diaries:
-        result.append(await diary_helper(diary, current_user.id))
+    diaries = await repos.diaries.find_page(skip, limit, user_id=user_id, viewer=current_user.id)
+    result = await diary_helpers(diaries, current_user.id)
 
     return {
         "items": result,
@@ -135,13 +181,134 @@ async def get_my_diaries(
     }
 
 
+@router.get("/me/calendar")
+@coalesce
+async def get_my_calendar(
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """내 일기 달력 (한 해 또는 한 달의 날짜별 일기 수와 ID/제목, 비공개 포함)
+
+    월별로 미리 묶어 둔 diary_calendar 문서를 읽으므로 일기 수와 무관하게 문서 최대 12개 조회
+    """
+    repos = get_repositories()
+    user_id = ObjectId(current_user.id)
+    year = calendar_rollup.current_year() if year is None else year
+
+    if not 1 <= year <= 9999 or (month is not None and not 1 <= month <= 12):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid year or month"
+        )
+
+    if month is not None:
+        document = await repos.calendar.get_month(user_id, year, month, viewer=current_user.id)
+        documents = [document] if document else []
+    else:
+        documents = await repos.calendar.get_year(user_id, year, viewer=current_user.id)
+
+    months = [calendar_rollup.month_view(document) for document in documents]
+    return {
+        "year": year,
+        "month": month,
+        "total": sum(item["count"] for item in months),
+        "months": [item for item in months if item["count"]],
+    }
+
+
+@router.post("/me/bulk")
+async def bulk_my_diaries(
+    request: DiaryBulkRequest,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """내 일기 일괄 수정(제목, 공개 여부)/삭제 (인증 필요, 작업별 결과 반환)
+
+    대상 조회 한 번과 작성자로 거른 bulk_write 한 번으로 수정하고(삭제는 일기별로 동시에),
+    달력, 첨부 이미지 참조, 정리 작업은 이 요청이 실제로 지운 일기만 한 번씩 반영
+    """
+    repos = get_repositories()
+    user_id = ObjectId(current_user.id)
+    operations = request.operations
+    results = [{"id": operation.id, "op": operation.op, "status": None} for operation in operations]
+
+    # 일기 ID -> 작업 순서
+    targets = {}
+    for index, operation in enumerate(operations):
+        if not ObjectId.is_valid(operation.id):
+            results[index].update(status="invalid", detail="Invalid diary ID format")
+        elif ObjectId(operation.id) in targets:
+            results[index].update(status="invalid", detail="Duplicate diary ID")
+        elif operation.op == "update" and operation.title is None and operation.is_public is None:
+            results[index].update(status="invalid", detail="No fields to update")
+        else:
+            targets[ObjectId(operation.id)] = index
+
+    diaries = await repos.diaries.get_many(list(targets), viewer=current_user.id)
+    now = datetime.now(timezone.utc)
+    updates, deletes = {}, []
+    for diary_id, index in targets.items():
+        diary = diaries.get(diary_id)
+        # 남의 일기는 없는 일기와 구분하지 않음
+        if diary is None or diary.get("user_id") != user_id:
+            results[index].update(status="not_found", detail="Diary not found")
+        elif operations[index].op == "delete":
+            deletes.append(diary_id)
+        else:
+            updates[diary_id] = {
+                **operations[index].model_dump(include={"title", "is_public"}, exclude_none=True),
+                "updated_at": now,
+            }
+
+    matched, deleted = await repos.diaries.bulk_write_owned(user_id, updates, deletes)
+    # 조회와 쓰기 사이에 다른 요청이 지운 일기는 그 요청이 달력, 이미지 참조, 정리 작업을 반영함
+    for diary_id in set(deletes) - set(deleted):
+        results[targets[diary_id]].update(status="not_found", detail="Diary not found")
+    if matched < len(updates):
+        remaining = await repos.diaries.get_many(list(updates), viewer=current_user.id)
+        for diary_id in [diary_id for diary_id in updates if diary_id not in remaining]:
+            del updates[diary_id]
+            results[targets[diary_id]].update(status="not_found", detail="Diary not found")
+
+    for diary_id in updates:
+        results[targets[diary_id]]["status"] = "updated"
+    for diary_id in deleted:
+        results[targets[diary_id]]["status"] = "deleted"
+
+    deleted_diaries = [diaries[diary_id] for diary_id in deleted]
+    await calendar_rollup.record_bulk(
+        [{**diaries[diary_id], **fields} for diary_id, fields in updates.items()], deleted_diaries
+    )
+    if deleted:
+        await attachments.detach([image["id"] for diary in deleted_diaries for image in diary.get("images", [])])
+        await enqueue("diary.cleanup", {"diary_ids": [str(diary_id) for diary_id in deleted]})
+
+    return {"results": results, "updated": len(updates), "deleted": len(deleted)}
+
+
 @router.get("/{diary_id}")
 async def get_diary(
     diary_id: str,
+    request: Request,
     current_user: Optional[UserResponse] = Depends(get_current_user_optional)
 ):
-    """일기 상세 조회 (로그인 선택 사항)"""
-    db = get_database()
+    """일기 상세 조회 (로그인 선택 사항, 작성자가 아니면 조회 수에 반영)"""
+    diary = await load_diary(diary_id=diary_id, current_user=current_user)
+    user_id = current_user.id if current_user else None
+    if user_id is None or user_id != diary["user_id"]:
+        # 합쳐진 동시 요청도 각자 한 번씩 셈
+        views.counter.record(ObjectId(diary["id"]), views.viewer_key(user_id, request.client and request.client.host))
+    return diary
+
+
+@coalesce
+async def load_diary(
+    diary_id: str,
+    current_user: Optional[UserResponse] = None
+):
+    """일기 상세 (같은 일기의 동시 조회는 한 번만 실행)"""
+    repos = get_repositories()
+    user_id = current_user.id if current_user else None
 
     if not ObjectId.is_valid(diary_id):
         raise HTTPException(
@@ -149,7 +316,7 @@ async def get_diary(
             detail="Invalid diary ID format"
         )
 
-    diary = await db.diaries.find_one({"_id": ObjectId(diary_id)})
+    diary = await repos.diaries.get(ObjectId(diary_id), viewer=user_id)
 
     if not diary:
         raise HTTPException(
@@ -158,10 +325,82 @@ async def get_diary(
         )
 
     # 로그인한 경우 사용자 ID 전달
-    user_id = current_user.id if current_user else None
     return await diary_helper(diary, user_id)
 
 
+@router.get("/{diary_id}/similar")
+@coalesce
+async def get_similar_diaries(
+    diary_id: str,
+    limit: int = 5,
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """비슷한 공개 일기 추천 (워커의 메모리 색인에서 조회하며, 색인 구축 전에는 빈 목록)"""
+    repos = get_repositories()
+    user_id = current_user.id if current_user else None
+    limit = max(1, min(limit, SIMILAR_MAX_LIMIT))
+
+    if not ObjectId.is_valid(diary_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid diary ID format"
+        )
+
+    diary = await repos.diaries.get(ObjectId(diary_id), viewer=user_id)
+
+    if not diary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Diary with id {diary_id} not found"
+        )
+
+    similar_ids = similar.service.similar(diary, limit)
+    found = await repos.diaries.get_many(similar_ids, viewer=user_id) if similar_ids else {}
+    # 색인 반영 전에 비공개로 바뀌거나 삭제된 일기는 제외하고 유사도 순서 유지
+    ordered = [found[similar_id] for similar_id in similar_ids
+               if similar_id in found and found[similar_id].get("is_public")]
+    return {"items": await diary_helpers(ordered, user_id)}
+
+
+@router.get("/{diary_id}/events")
+async def diary_events(diary_id: str):
+    """일기 실시간 이벤트 스트림 (SSE)
+
+    새 댓글, 댓글 수정/삭제, 일기/댓글 좋아요 수 변경을 델타로 전달
+    사용자별 정보(is_liked)는 담지 않으므로 인증 없이 구독 (EventSource는 헤더를 못 보냄)
+    """
+    repos = get_repositories()
+
+    if not ObjectId.is_valid(diary_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid diary ID format"
+        )
+
+    diary = await repos.diaries.get(ObjectId(diary_id))
+    if not diary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Diary with id {diary_id} not found"
+        )
+
+    if hub.full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event streams",
+            headers={"Retry-After": "5"}
+        )
+
+    return StreamingResponse(
+        hub.stream(str(diary["_id"])),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx 버퍼링 비활성화
+        },
+    )
+
+
 @router.put("/{diary_id}")
 async def update_diary(
     diary_id: str,
@@ -169,7 +408,7 @@ async def update_diary(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """일기 수정 (인증 필요, 본인 글만 가능)"""
-    db = get_database()
+    repos = get_repositories()
 
     if not ObjectId.is_valid(diary_id):
         raise HTTPException(
@@ -178,7 +417,7 @@ async def update_diary(
         )
 
     # 일기 찾기
-    diary = await db.diaries.find_one({"_id": ObjectId(diary_id)})
+    diary = await repos.diaries.get(ObjectId(diary_id), viewer=current_user.id)
     if not diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -202,13 +441,43 @@ async def update_diary(
         )
 
     update_data["updated_at"] = datetime.now(timezone.utc)
-
-    result = await db.diaries.update_one(
-        {"_id": ObjectId(diary_id)},
-        {"$set": update_data}
-    )
-
-    updated_diary = await db.diaries.find_one({"_id": ObjectId(diary_id)})
+    image_ids = list(dict.fromkeys(update_data["images"])) if "images" in update_data else None
+
+    # 첨부 이미지를 바꾸면 새로 붙은 것만 참조를 올리고, 빠진 것은 저장한 뒤에 내림.
+    # 읽은 뒤 다른 요청이 지우거나 이미지를 바꿨으면 그 요청이 이미 참조 수를 고쳤으므로,
+    # 읽은 images가 그대로일 때만 저장하고 아니면 올린 참조를 되돌린 뒤 다시 읽어서 계산
+    for _ in range(UPDATE_ATTEMPTS):
+        added, removed, expected = [], [], None
+        if image_ids is not None:
+            current = {image["id"]: image for image in diary.get("images", [])}
+            added = [image_id for image_id in image_ids if image_id not in current]
+            removed = [image_id for image_id in current if image_id not in image_ids]
+            attached = {image["id"]: image for image in await _attach_images(added)}
+            update_data["images"] = [current.get(image_id) or attached[image_id] for image_id in image_ids]
+            expected = {"images": diary.get("images")}
+
+        try:
+            updated_diary = await repos.diaries.update(ObjectId(diary_id), update_data, expected)
+        except BaseException:
+            await attachments.detach(added)
+            raise
+        if updated_diary is not None:
+            break
+        await attachments.detach(added)
+        diary = await repos.diaries.get(ObjectId(diary_id), viewer=current_user.id)
+        if diary is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Diary with id {diary_id} not found"
+            )
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Diary was modified concurrently, try again"
+        )
+    await attachments.detach(removed)
+    if "title" in update_data or "is_public" in update_data:
+        await calendar_rollup.record_updated(updated_diary)
     return await diary_helper(updated_diary, current_user.id)
 
 
@@ -218,7 +487,7 @@ async def delete_diary(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """일기 삭제 (인증 필요, 본인 글만 가능)"""
-    db = get_database()
+    repos = get_repositories()
 
     if not ObjectId.is_valid(diary_id):
         raise HTTPException(
@@ -227,7 +496,7 @@ async def delete_diary(
         )
 
     # 일기 찾기
-    diary = await db.diaries.find_one({"_id": ObjectId(diary_id)})
+    diary = await repos.diaries.get(ObjectId(diary_id), viewer=current_user.id)
     if not diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -241,6 +510,12 @@ async def delete_diary(
             detail="You can only delete your own diaries"
         )
 
-    result = await db.diaries.delete_one({"_id": ObjectId(diary_id)})
+    deleted = await repos.diaries.delete(ObjectId(diary_id))
+    if deleted:
+        # 동시에 지운 다른 요청이 이미 달력, 첨부 참조, 정리 작업을 처리했으면 다시 하지 않음 (일괄 삭제와 같음)
+        await calendar_rollup.record_deleted(diary)
+        await attachments.detach([image["id"] for image in diary.get("images", [])])
+        # 댓글과 좋아요는 백그라운드 작업으로 정리
+        await enqueue("diary.cleanup", {"diary_id": diary_id})
 
     return None
@@ -0,0 +1,147 @@
+import asyncio
+import re
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request, status, Depends
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+
+from app import attachments
+from app.auth import get_current_user
+from app.models.image import ImageUploadResponse
+from app.models.user import UserResponse
+
+router = APIRouter()
+
+# {다이제스트}.{확장자} 또는 {다이제스트}.thumb.webp
+_NAME = re.compile(r"([0-9a-f]{64})\.(jpg|png|gif|webp|thumb\.webp)")
+# 단일 범위만 지원 (여러 범위 요청에는 전체를 보냄)
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+_READ_CHUNK = 64 * 1024
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.post("/", response_model=ImageUploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_image(
+    request: Request,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """일기 첨부 이미지 업로드 (인증 필요, 요청 본문이 이미지 파일 그대로)"""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image is larger than {attachments.MAX_BYTES} bytes"
+    )
+    # 본문을 받기 전에 크기로 먼저 거절
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > attachments.MAX_BYTES:
+        raise too_large
+
+    try:
+        async with asyncio.timeout(attachments.UPLOAD_TIMEOUT_SECONDS):
+            image = await attachments.store(request.stream())
+    except attachments.UploadTooLarge:
+        raise too_large
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except TimeoutError:
+        raise HTTPException(status_code=status.HTTP_408_REQUEST_TIMEOUT, detail="Upload timed out")
+
+    return {
+        **attachments.image_view({"id": image["_id"], **image}),
+        "size": image["size"],
+        "content_type": image["content_type"],
+    }
+
+
+def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Range 헤더를 (시작, 끝) 포함 구간으로 (해석할 수 없으면 None, 범위 밖이면 ValueError)"""
+    match = _RANGE.fullmatch(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        # bytes=-N: 마지막 N바이트
+        if not end:
+            return None
+        if int(end) == 0:
+            raise ValueError(header)
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(end), size - 1) if end else size - 1
+
+
+async def _read(path, start: int, length: int):
+    async with await anyio.open_file(path, "rb") as file:
+        await file.seek(start)
+        while length > 0:
+            chunk = await file.read(min(_READ_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _original_name(digest: str) -> Optional[str]:
+    for candidate in (attachments.STORE_DIR / digest[:2]).glob(f"{digest}.*"):
+        if candidate.name.count(".") == 1:
+            return candidate.name
+    return None
+
+
+@router.api_route("/{name}", methods=["GET", "HEAD"])
+async def get_image(name: str, request: Request):
+    """첨부 이미지 파일 (URL이 내용의 해시라 영구 캐시, 단일 Range 요청 지원, DB 조회 없음)"""
+    match = _NAME.fullmatch(name)
+    if match is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    digest, kind = match.groups()
+    path = attachments.STORE_DIR / digest[:2] / name
+    try:
+        size = (await asyncio.to_thread(path.stat)).st_size
+    except FileNotFoundError:
+        original = None
+        if kind == attachments.THUMBNAIL_SUFFIX:
+            original = await asyncio.to_thread(_original_name, digest)
+        if original is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+        # 썸네일이 아직 없으면 원본으로 (이 응답은 캐시하지 않음)
+        return RedirectResponse(
+            f"{attachments.URL_PREFIX}/{original}",
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": "no-store"}
+        )
+
+    etag = f'"{name}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "Accept-Ranges": "bytes"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    start, end = 0, size - 1
+    status_code = status.HTTP_200_OK
+    range_header = request.headers.get("range")
+    # If-Range가 다른 버전을 가리키면 범위를 무시하고 전체를 보냄
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = _byte_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(end - start + 1, 0)
+    headers["Content-Length"] = str(length)
+    media_type = attachments.CONTENT_TYPES[kind]
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(_read(path, start, length), status_code=status_code,
+                             headers=headers, media_type=media_type)
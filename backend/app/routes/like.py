@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from datetime import datetime, timezone
 from bson import ObjectId
 
 from app.models.user import UserResponse
-from app.database import get_database
+from app.database import get_repositories
 from app.auth import get_current_user
+from app.events import hub
+from app.notifications import notify_like
 
 router = APIRouter()
 
@@ -15,7 +16,7 @@ async def toggle_diary_like(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """일기 좋아요 토글 (인증 필요)"""
-    db = get_database()
+    repos = get_repositories()
 
     if not ObjectId.is_valid(diary_id):
         raise HTTPException(
@@ -24,7 +25,7 @@ async def toggle_diary_like(
         )
 
     # 일기 존재 확인
-    diary = await db.diaries.find_one({"_id": ObjectId(diary_id)})
+    diary = await repos.diaries.get(ObjectId(diary_id), viewer=current_user.id)
     if not diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -32,32 +33,23 @@ async def toggle_diary_like(
         )
 
     # 이미 좋아요를 눌렀는지 확인
-    existing_like = await db.likes.find_one({
-        "target_type": "diary",
-        "target_id": ObjectId(diary_id),
-        "user_id": ObjectId(current_user.id)
-    })
+    existing_like = await repos.likes.find("diary", ObjectId(diary_id), ObjectId(current_user.id))
 
     if existing_like:
         # 좋아요 취소
-        await db.likes.delete_one({"_id": existing_like["_id"]})
+        await repos.likes.remove(existing_like["_id"])
         liked = False
+        added = None
     else:
-        # 좋아요 추가
-        like_dict = {
-            "target_type": "diary",
-            "target_id": ObjectId(diary_id),
-            "user_id": ObjectId(current_user.id),
-            "created_at": datetime.now(timezone.utc)
-        }
-        await db.likes.insert_one(like_dict)
+        # 좋아요 추가 (동시 요청이 먼저 추가했으면 이미 누른 것으로 보고 알림은 그쪽에 맡김)
+        added = await repos.likes.add("diary", ObjectId(diary_id), ObjectId(current_user.id))
         liked = True
 
     # 전체 좋아요 수 계산
-    likes_count = await db.likes.count_documents({
-        "target_type": "diary",
-        "target_id": ObjectId(diary_id)
-    })
+    likes_count = await repos.likes.count("diary", ObjectId(diary_id))
+    hub.publish(str(diary["_id"]), "diary.likes", {"diary_id": str(diary["_id"]), "likes_count": likes_count})
+    if liked and added:
+        notify_like("diary", diary, current_user, likes_count)
 
     return {
         "liked": liked,
@@ -71,7 +63,7 @@ async def toggle_comment_like(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """댓글 좋아요 토글 (인증 필요)"""
-    db = get_database()
+    repos = get_repositories()
 
     if not ObjectId.is_valid(comment_id):
         raise HTTPException(
@@ -80,7 +72,7 @@ async def toggle_comment_like(
         )
 
     # 댓글 존재 확인
-    comment = await db.comments.find_one({"_id": ObjectId(comment_id)})
+    comment = await repos.comments.get(ObjectId(comment_id), viewer=current_user.id)
     if not comment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -88,32 +80,23 @@ async def toggle_comment_like(
         )
 
     # 이미 좋아요를 눌렀는지 확인
-    existing_like = await db.likes.find_one({
-        "target_type": "comment",
-        "target_id": ObjectId(comment_id),
-        "user_id": ObjectId(current_user.id)
-    })
+    existing_like = await repos.likes.find("comment", ObjectId(comment_id), ObjectId(current_user.id))
 
     if existing_like:
         # 좋아요 취소
-        await db.likes.delete_one({"_id": existing_like["_id"]})
+        await repos.likes.remove(existing_like["_id"])
         liked = False
+        added = None
     else:
-        # 좋아요 추가
-        like_dict = {
-            "target_type": "comment",
-            "target_id": ObjectId(comment_id),
-            "user_id": ObjectId(current_user.id),
-            "created_at": datetime.now(timezone.utc)
-        }
-        await db.likes.insert_one(like_dict)
+        # 좋아요 추가 (동시 요청이 먼저 추가했으면 이미 누른 것으로 보고 알림은 그쪽에 맡김)
+        added = await repos.likes.add("comment", ObjectId(comment_id), ObjectId(current_user.id))
         liked = True
 
     # 전체 좋아요 수 계산
-    likes_count = await db.likes.count_documents({
-        "target_type": "comment",
-        "target_id": ObjectId(comment_id)
-    })
+    likes_count = await repos.likes.count("comment", ObjectId(comment_id))
+    hub.publish(str(comment["diary_id"]), "comment.likes", {"id": str(comment["_id"]), "likes_count": likes_count})
+    if liked and added:
+        notify_like("comment", comment, current_user, likes_count)
 
     return {
         "liked": liked,
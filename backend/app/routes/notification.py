@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from bson import ObjectId
+
+from app.models.notification import NotificationRead
+from app.models.user import UserResponse
+from app.database import get_repositories
+from app.auth import get_current_user
+from app.notifications import notification_helper
+
+router = APIRouter()
+
+# 알림 목록 한 번에 최대 개수
+LIST_MAX_LIMIT = 50
+
+
+@router.get("/")
+async def get_notifications(
+    skip: int = 0,
+    limit: int = 20,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """내 알림 목록 (최근 갱신순)과 안 읽은 수"""
+    repos = get_repositories()
+    user_id = ObjectId(current_user.id)
+    skip = max(skip, 0)
+    limit = max(1, min(limit, LIST_MAX_LIMIT))
+
+    notifications, unread = await asyncio.gather(
+        repos.notifications.list_for(user_id, skip, limit, viewer=current_user.id),
+        repos.notifications.unread_count(user_id, viewer=current_user.id),
+    )
+    return {"items": [notification_helper(notification) for notification in notifications], "unread": unread}
+
+
+@router.get("/unread")
+async def get_unread_count(
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """안 읽은 알림 수 (헤더 배지 폴링용, 조회 한 번)"""
+    unread = await get_repositories().notifications.unread_count(ObjectId(current_user.id), viewer=current_user.id)
+    return {"unread": unread}
+
+
+@router.post("/read")
+async def mark_notifications_read(
+    request: Optional[NotificationRead] = None,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """알림 읽음 처리 (ids를 생략하면 모두)"""
+    repos = get_repositories()
+    user_id = ObjectId(current_user.id)
+
+    ids = request.ids if request is not None else None
+    if ids is not None:
+        if not all(ObjectId.is_valid(notification_id) for notification_id in ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid notification ID format"
+            )
+        ids = [ObjectId(notification_id) for notification_id in ids]
+
+    changed = await repos.notifications.mark_read(user_id, ids, datetime.now(timezone.utc))
+    if changed:
+        await repos.notifications.add_unread({user_id: -changed})
+    return {"unread": await repos.notifications.unread_count(user_id, viewer=current_user.id)}
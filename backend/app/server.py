@@ -0,0 +1,136 @@
+import argparse
+import gc
+import importlib.util
+import os
+from typing import Optional
+
+from app.env import env_bool, env_int
+
+# 운영용 서버 실행 (python -m app)
+# - uvloop/httptools가 설치돼 있으면 사용하고, 없으면 asyncio/h11로 동작
+# - 워커 수는 사용 가능한 CPU 수 (비동기 워커는 코어당 하나로 충분)
+# - gunicorn이 있으면 앱을 마스터에서 미리 불러온 뒤 fork해 시작이 빠르고 코드/상수 메모리를 워커가 공유(copy-on-write)
+#   gunicorn이 없으면 uvicorn 멀티프로세스(spawn)로 실행하며 워커마다 앱을 따로 불러옴
+# - keep-alive는 로드밸런서의 유휴 타임아웃(보통 60초)보다 길게 잡아, 로드밸런서가 재사용하려는 연결을
+#   서버가 먼저 닫아 502가 나는 경합을 피함
+# - MongoDB 연결, change stream, SSE 허브는 lifespan에서 워커마다 만들어지므로 fork 전에는 열리지 않음
+
+APP = "app.main:app"
+
+
+def access_log_enabled() -> bool:
+    return env_bool("ACCESS_LOG_ENABLED", True)
+
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def cpu_count() -> int:
+    """이 프로세스가 쓸 수 있는 CPU 수 (컨테이너 CPU 제한은 affinity로 반영될 때만)"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(len(os.sched_getaffinity(0)), 1)
+    return os.cpu_count() or 1
+
+
+def event_loop() -> str:
+    return "uvloop" if available("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if available("httptools") else "h11"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app", description="일기 공유 API 서버 실행")
+    parser.add_argument("--host", default=os.environ.get("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=env_int("PORT", 8000))
+    parser.add_argument("--workers", type=int, default=env_int("WEB_CONCURRENCY", cpu_count()),
+                        help="워커 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--backlog", type=int, default=env_int("SERVER_BACKLOG", 2048),
+                        help="listen 대기열 크기 (net.core.somaxconn보다 크면 커널 값으로 잘림)")
+    parser.add_argument("--keepalive", type=int, default=env_int("SERVER_KEEPALIVE_SECONDS", 75),
+                        help="유휴 keep-alive 연결 유지 시간 (로드밸런서 유휴 타임아웃보다 길게)")
+    parser.add_argument("--graceful-timeout", type=int, default=env_int("SERVER_GRACEFUL_TIMEOUT", 30),
+                        help="종료 시 처리 중인 요청을 기다리는 시간")
+    parser.add_argument("--max-requests", type=int, default=env_int("SERVER_MAX_REQUESTS", 0),
+                        help="워커 재시작 전 처리할 요청 수 (0이면 재시작 안 함)")
+    parser.add_argument("--forwarded-allow-ips", default=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+                        help="X-Forwarded-* 헤더를 신뢰할 프록시 주소")
+    parser.add_argument("--no-gunicorn", action="store_true", help="gunicorn이 있어도 uvicorn으로 실행")
+    return parser.parse_args(argv)
+
+
+def load_app():
+    """앱을 불러오고 이후 GC가 건드리지 않도록 고정 (fork 후 copy-on-write 페이지 복사 감소)"""
+    from app.main import app
+
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class TunedUvicornWorker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": event_loop(), "http": http_protocol()}
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": TunedUvicornWorker,
+                "backlog": args.backlog,
+                "keepalive": args.keepalive,
+                "graceful_timeout": args.graceful_timeout,
+                "max_requests": args.max_requests,
+                "max_requests_jitter": args.max_requests // 10,
+                "forwarded_allow_ips": args.forwarded_allow_ips,
+                "preload_app": True,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    Server().run()
+
+
+def run_uvicorn(args):
+    import uvicorn
+
+    options = dict(
+        host=args.host,
+        port=args.port,
+        loop=event_loop(),
+        http=http_protocol(),
+        backlog=args.backlog,
+        timeout_keep_alive=args.keepalive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        # 접근 로그는 app/access_log.py가 비동기로 기록
+        access_log=not access_log_enabled(),
+    )
+    if args.workers > 1:
+        # 멀티프로세스는 spawn이므로 앱 객체 대신 import 경로를 넘김
+        uvicorn.run(APP, workers=args.workers, **options)
+    else:
+        uvicorn.run(load_app(), **options)
+
+
+def main(argv: Optional[list] = None):
+    args = parse_args(argv)
+    use_gunicorn = args.workers > 1 and not args.no_gunicorn and available("gunicorn") and os.name != "nt"
+    print(f"✓ Starting {args.workers} worker(s) on {args.host}:{args.port} "
+          f"({'gunicorn' if use_gunicorn else 'uvicorn'}, loop={event_loop()}, http={http_protocol()}, "
+          f"backlog={args.backlog}, keepalive={args.keepalive}s)")
+    if use_gunicorn:
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
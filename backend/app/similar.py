@@ -0,0 +1,330 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from app.env import env_bool, env_float, env_int
+from app.cache import InvalidationRegistry, registry
+from app.database import get_repositories
+from app.metrics import similar_index_builds_total, similar_index_documents
+from app.repositories.base import DiaryRepository
+
+logger = logging.getLogger("app.similar")
+
+# 비슷한 일기 추천용 프로세스 내 역색인
+# - 공개 일기의 제목(두 번)과 본문을 한국어 글자 바이그램으로 나누고(한 글자 단어는 그대로)
+#   BM25 가중치 상위 SIMILAR_TERMS_PER_DOC개만 남겨 L2 정규화
+# - 용어는 hash()로 2^20개 버킷에 매핑해 어휘 사전을 두지 않음 (색인은 프로세스마다 따로 만들므로 해시 시드가 달라도 됨)
+# - 용어별 포스팅은 array('I') 하나에 (슬롯 << 10 | 10비트 양자화 가중치)로 묶어 두어 문서 수만큼 파이썬 객체가 늘지 않음
+# - 수정/삭제는 기존 슬롯을 비워 두고(tombstone) 새 슬롯에 넣으며, 빈 슬롯이 많아지면 DB에서 다시 구축
+# - 문서 빈도(df)는 재구축 전까지 늘기만 하므로 IDF가 조금씩 어긋날 수 있음 (재구축 시 바로잡힘)
+# - 이 워커의 쓰기와 다른 워커의 쓰기(change stream)를 무효화 레지스트리로 받아 바뀐 일기만 다시 읽어 반영
+
+ENABLED = env_bool("SIMILAR_ENABLED", True)
+TERMS_PER_DOC = env_int("SIMILAR_TERMS_PER_DOC", 32)
+MAX_DF_RATIO = env_float("SIMILAR_MAX_DF_RATIO", 0.05)
+IDF_SAMPLE = env_int("SIMILAR_IDF_SAMPLE", 5000)
+BUILD_BATCH_SIZE = 1000
+REFRESH_BATCH_SIZE = 200
+# 짧은 간격의 연속 쓰기를 한 번에 반영
+REFRESH_DELAY_SECONDS = 0.2
+# 빈 슬롯이 이 비율을 넘으면 재구축
+COMPACT_RATIO = 0.3
+# 질의할 때 쓰는 용어 수 (문서 쪽보다 조금 넉넉하게)
+QUERY_TERMS = 48
+# df가 이 값 이하인 용어는 비율과 관계없이 질의에 씀 (색인이 작을 때 모든 용어가 걸러지지 않게)
+MIN_DF_CUTOFF = 50
+
+TERM_BITS = 20
+TERM_MASK = (1 << TERM_BITS) - 1
+WEIGHT_BITS = 10
+WEIGHT_SCALE = (1 << WEIGHT_BITS) - 1
+MAX_SLOTS = 1 << (32 - WEIGHT_BITS)
+MAX_DF = (1 << 32) - 1
+# BM25 파라미터
+K1 = 1.2
+B = 0.75
+
+_BIGRAMS = re.compile(r"(?=(\w\w))")
+_SINGLES = re.compile(r"(?<!\w)\w(?!\w)")
+
+
+def tokenize(text: str) -> Dict[int, int]:
+    """용어 버킷별 빈도 (글자 바이그램, 한 글자 단어는 그대로)"""
+    text = text.lower()
+    grams = Counter(_BIGRAMS.findall(text))
+    grams.update(_SINGLES.findall(text))
+    counts: Dict[int, int] = {}
+    for gram, count in grams.items():
+        term = hash(gram) & TERM_MASK
+        counts[term] = counts.get(term, 0) + count
+    return counts
+
+
+def document_text(diary: dict) -> str:
+    """색인할 텍스트 (제목은 두 번 넣어 본문보다 무겁게)"""
+    title = diary.get("title") or ""
+    return f"{title}\n{title}\n{diary.get('content') or ''}"
+
+
+class SimilarityIndex:
+    """공개 일기의 희소 벡터 역색인"""
+
+    def __init__(self, terms_per_doc: int = TERMS_PER_DOC, max_df_ratio: float = MAX_DF_RATIO):
+        self.terms_per_doc = terms_per_doc
+        self.max_df_ratio = max_df_ratio
+        self._postings: Dict[int, array] = {}
+        self._df = array("I", bytes(4 << TERM_BITS))
+        self._documents = 0
+        self._total_length = 0
+        # 슬롯 -> 일기 ID (삭제된 슬롯은 None), 일기 ID -> 슬롯
+        self._ids: List[Optional[ObjectId]] = []
+        self._slots: Dict[ObjectId, int] = {}
+
+    def __len__(self):
+        return len(self._slots)
+
+    @property
+    def slots(self) -> int:
+        return len(self._ids)
+
+    @property
+    def tombstones(self) -> int:
+        return len(self._ids) - len(self._slots)
+
+    def observe(self, counts: Dict[int, int]):
+        """문서 빈도와 평균 길이에 반영"""
+        df = self._df
+        for term in counts:
+            df[term] += 1
+        self._documents += 1
+        self._total_length += sum(counts.values())
+
+    def scale_df(self, factor: float):
+        """표본으로 센 문서 빈도를 전체 문서 수에 맞게 늘림"""
+        self._df = array("I", (min(round(value * factor), MAX_DF) for value in self._df))
+        self._documents = round(self._documents * factor)
+        self._total_length = round(self._total_length * factor)
+
+    def _weigh(self, counts: Dict[int, int], limit: int) -> List[Tuple[int, float]]:
+        """BM25 가중치 상위 limit개 용어 (L2 정규화)"""
+        documents = max(self._documents, 1)
+        length = sum(counts.values())
+        average = self._total_length / documents if self._total_length else length
+        norm = K1 * (1 - B + B * length / max(average, 1))
+        df = self._df
+        log = math.log
+        weighted = [
+            (log(1 + (documents - df[term] + 0.5) / (df[term] + 0.5)) * count * (K1 + 1) / (count + norm), term)
+            for term, count in counts.items()
+        ]
+        top = heapq.nlargest(limit, weighted)
+        scale = math.sqrt(sum(weight * weight for weight, _ in top)) or 1.0
+        return [(term, weight / scale) for weight, term in top]
+
+    def insert(self, diary_id: ObjectId, counts: Dict[int, int]):
+        """문서 벡터를 포스팅에 추가 (문서 빈도는 바꾸지 않음)"""
+        self.remove(diary_id)
+        if not counts:
+            return
+        if len(self._ids) >= MAX_SLOTS:
+            raise OverflowError("similar diaries index is full, rebuild required")
+        slot = len(self._ids)
+        self._ids.append(diary_id)
+        self._slots[diary_id] = slot
+        postings = self._postings
+        for term, weight in self._weigh(counts, self.terms_per_doc):
+            entries = postings.get(term)
+            if entries is None:
+                entries = postings[term] = array("I")
+            entries.append(slot << WEIGHT_BITS | max(1, round(weight * WEIGHT_SCALE)))
+
+    def add(self, diary_id: ObjectId, text: str):
+        """새 문서 또는 수정된 문서 반영"""
+        counts = tokenize(text)
+        self.observe(counts)
+        self.insert(diary_id, counts)
+
+    def remove(self, diary_id: ObjectId) -> bool:
+        slot = self._slots.pop(diary_id, None)
+        if slot is None:
+            return False
+        self._ids[slot] = None
+        return True
+
+    def observe_many(self, texts: Iterable[str]):
+        for text in texts:
+            self.observe(tokenize(text))
+
+    def insert_many(self, documents: Iterable[Tuple[ObjectId, str]]):
+        for diary_id, text in documents:
+            self.insert(diary_id, tokenize(text))
+
+    def similar_to(self, text: str, limit: int, exclude: Optional[ObjectId] = None) -> List[Tuple[ObjectId, float]]:
+        """text와 코사인 유사도가 높은 문서 (ID, 점수) 목록"""
+        counts = tokenize(text)
+        if not counts:
+            return []
+        # 거의 모든 일기에 나오는 용어("오늘", "했다" 등)는 포스팅이 길고 변별력이 없어 건너뜀
+        max_df = max(self.max_df_ratio * self._documents, MIN_DF_CUTOFF)
+        df = self._df
+        scores: Dict[int, float] = {}
+        get = scores.get
+        for term, weight in self._weigh(counts, QUERY_TERMS):
+            entries = self._postings.get(term)
+            if entries is None or df[term] > max_df:
+                continue
+            weight /= WEIGHT_SCALE
+            for packed in entries:
+                slot = packed >> WEIGHT_BITS
+                scores[slot] = get(slot, 0.0) + weight * (packed & WEIGHT_SCALE)
+
+        ids = self._ids
+        excluded = self._slots.get(exclude) if exclude is not None else None
+        best = heapq.nlargest(limit, (
+            (score, slot) for slot, score in scores.items()
+            if ids[slot] is not None and slot != excluded
+        ))
+        return [(ids[slot], round(score, 4)) for score, slot in best]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._slots),
+            "slots": len(self._ids),
+            "terms": len(self._postings),
+            "postings": sum(len(entries) for entries in self._postings.values()),
+        }
+
+
+async def build_index(diaries: DiaryRepository, idf_sample: int = IDF_SAMPLE,
+                      batch_size: int = BUILD_BATCH_SIZE) -> SimilarityIndex:
+    """공개 일기 전체로 색인 구축
+
+    IDF는 최근 idf_sample개 일기의 문서 빈도를 전체 수에 맞게 늘려 추정해 전체를 두 번 토큰화하지 않고,
+    토큰화는 batch_size개씩 스레드에서 실행해 이벤트 루프를 오래 막지 않음
+    """
+    index = SimilarityIndex()
+    total = await diaries.count(public_only=True)
+    sample = [document_text(diary) async for diary in diaries.iter_public(limit=idf_sample, batch_size=batch_size)]
+    if not sample:
+        return index
+    await asyncio.to_thread(index.observe_many, sample)
+    index.scale_df(max(total, len(sample)) / len(sample))
+    del sample
+
+    batch = []
+    async for diary in diaries.iter_public(batch_size=batch_size):
+        batch.append((diary["_id"], document_text(diary)))
+        if len(batch) >= batch_size:
+            await asyncio.to_thread(index.insert_many, batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(index.insert_many, batch)
+    return index
+
+
+class SimilarDiaries:
+    """워커 프로세스의 색인 구축과 갱신 (lifespan에서 시작)"""
+
+    def __init__(self, invalidation: InvalidationRegistry = registry):
+        self.invalidation = invalidation
+        # 첫 구축이 끝나기 전에는 None (추천 없이 응답)
+        self.index: Optional[SimilarityIndex] = None
+        self._dirty: Set[ObjectId] = set()
+        self._rebuild_reason: Optional[str] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed = False
+
+    def start(self):
+        if not self._subscribed:
+            self.invalidation.subscribe("diaries", self._on_change)
+            self._subscribed = True
+        self._wakeup = asyncio.Event()
+        self._rebuild_reason = "startup"
+        self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._wakeup = None
+
+    def _on_change(self, diary_id):
+        if self._wakeup is None:
+            return
+        if diary_id is None:
+            # 어떤 쓰기를 놓쳤는지 모름 (change stream 재시작 등)
+            self._rebuild_reason = self._rebuild_reason or "requested"
+        else:
+            self._dirty.add(diary_id)
+        self._wakeup.set()
+
+    def similar(self, diary: dict, limit: int) -> List[ObjectId]:
+        """diary와 비슷한 공개 일기 ID (색인 구축 전이면 빈 목록)"""
+        index = self.index
+        if index is None:
+            return []
+        return [diary_id for diary_id, _ in index.similar_to(document_text(diary), limit, exclude=diary["_id"])]
+
+    async def _run(self):
+        while True:
+            try:
+                if self._rebuild_reason is not None:
+                    await self._rebuild()
+                elif self._dirty:
+                    await self._refresh()
+                else:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    await asyncio.sleep(REFRESH_DELAY_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("similar diaries index update failed")
+                await asyncio.sleep(5)
+
+    async def _rebuild(self):
+        reason = self._rebuild_reason
+        self._rebuild_reason = None
+        # 구축 중에 바뀐 일기는 다시 표시되어 구축이 끝난 뒤 반영됨
+        self._dirty.clear()
+        try:
+            index = await build_index(get_repositories().diaries)
+        except BaseException:
+            self._rebuild_reason = self._rebuild_reason or reason
+            raise
+        self.index = index
+        similar_index_builds_total.inc(reason)
+        similar_index_documents.set(len(index))
+        print(f"✓ Similar diaries index built ({reason}): {len(index)} diaries")
+
+    async def _refresh(self):
+        ids = list(itertools.islice(self._dirty, REFRESH_BATCH_SIZE))
+        self._dirty.difference_update(ids)
+        # 방금 쓴 문서를 읽어야 하므로 로그인 사용자처럼 primary로 라우팅
+        diaries = await get_repositories().diaries.get_many(ids, viewer="similar-index")
+        index = self.index
+        if index is None:
+            return
+        for diary_id in ids:
+            diary = diaries.get(diary_id)
+            if diary is not None and diary.get("is_public"):
+                index.add(diary_id, document_text(diary))
+            else:
+                index.remove(diary_id)
+        similar_index_documents.set(len(index))
+        if index.slots > BUILD_BATCH_SIZE and index.tombstones > COMPACT_RATIO * index.slots:
+            self._rebuild_reason = "compaction"
+
+
+service = SimilarDiaries()
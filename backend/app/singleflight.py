@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.env import env_bool, env_float
+from app.metrics import singleflight_requests_total
+from app.request_context import RequestContext, add_response_started_hook
+
+# 같은 읽기 요청의 동시 실행 합치기 (single-flight)
+# - 라우트, 파라미터, 조회자가 같은 요청이 처리 중이면 새로 DB를 조회하지 않고 먼저 온 요청의 결과를 공유
+# - 결과는 완료 즉시 버리므로 캐시가 아니며, 실행 중에 들어온 요청만 합쳐짐
+# - 본인 쓰기 반영: 로그인 사용자가 쓰기 응답을 받은 뒤의 읽기는 그 쓰기 전에 시작한 실행에 합치지 않고 직접 실행
+#   (다른 사용자의 쓰기는 동시에 도착한 요청과 마찬가지로 진행 중인 실행 결과에 없을 수 있음)
+# - 뒤따르는 요청은 SINGLEFLIGHT_MAX_WAIT_MS까지만 기다리고, 넘기면 직접 실행
+# - 먼저 온 요청이 취소되면(클라이언트 연결 끊김 등) 기다리던 요청은 각자 실행
+
+ENABLED = env_bool("SINGLEFLIGHT_ENABLED", True)
+MAX_WAIT_SECONDS = env_float("SINGLEFLIGHT_MAX_WAIT_MS", 500.0) / 1000
+
+
+class _LeaderCancelled(Exception):
+    """먼저 실행하던 요청이 취소되어 결과가 없음"""
+
+
+class SingleFlight:
+    """키별로 실행 중인 코루틴 하나의 결과를 공유"""
+
+    def __init__(self, max_wait: float = MAX_WAIT_SECONDS):
+        self.max_wait = max_wait
+        # 키 -> (결과, 시작 시각)
+        self._flights: Dict[Hashable, Tuple[asyncio.Future, float]] = {}
+        # 사용자 ID -> 마지막 쓰기 응답 시각 (진행 중인 실행이 있을 때만 기록, 모두 끝나면 비움)
+        self._writes: Dict[str, float] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def note_write(self, viewer: str):
+        """viewer의 쓰기가 끝남 (지금 진행 중인 실행에는 이 쓰기가 없을 수 있음)"""
+        # 진행 중인 실행이 없으면 이후 시작하는 실행은 모두 이 쓰기 뒤라 기록할 필요 없음
+        if self._flights:
+            self._writes[viewer] = time.perf_counter()
+
+    async def do(self, name: str, key: Hashable, func: Callable[[], Awaitable[Any]],
+                 viewer: Optional[str] = None) -> Any:
+        """key가 같은 실행이 있으면 그 결과를, 없으면 func()를 실행한 결과를 반환
+
+        viewer가 그 실행이 시작된 뒤 쓰기를 했으면 합치지 않고 직접 실행
+        """
+        flight = self._flights.get(key)
+        if flight is not None and viewer is not None and self._writes.get(viewer, float("-inf")) >= flight[1]:
+            singleflight_requests_total.inc(name, "own_write")
+            return await func()
+        if flight is not None:
+            future = flight[0]
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                singleflight_requests_total.inc(name, "wait_timeout")
+            except _LeaderCancelled:
+                singleflight_requests_total.inc(name, "leader_cancelled")
+            else:
+                singleflight_requests_total.inc(name, "coalesced")
+                return result
+            # 직접 실행 (진행 중인 실행은 그대로 두고 새로 합치지 않음)
+            return await func()
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = (future, time.perf_counter())
+        singleflight_requests_total.inc(name, "leader")
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            # HTTPException(404 등)과 DB 에러도 기다리던 요청에 그대로 전달
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key, (None,))[0] is future:
+                del self._flights[key]
+            if not self._flights:
+                self._writes.clear()
+            if future.done() and not future.cancelled():
+                # 기다리는 요청이 없을 때 "exception was never retrieved" 경고 방지
+                future.exception()
+
+
+flights = SingleFlight()
+
+
+def _note_write(context: RequestContext):
+    # 로그인 사용자의 쓰기 요청이 응답을 보내기 시작하면 (핸들러의 쓰기는 끝난 뒤)
+    if context.user_id is not None and context.method not in ("GET", "HEAD", "OPTIONS"):
+        flights.note_write(context.user_id)
+
+
+add_response_started_hook(_note_write)
+
+
+def _key_part(value: Any) -> Hashable:
+    # 조회자(UserResponse)는 사용자 ID로, 그 외 파라미터는 값 그대로
+    if value is None:
+        return None
+    if isinstance(value, BaseModel):
+        return getattr(value, "id", None)
+    return value
+
+
+def coalesce(func):
+    """읽기 핸들러 데코레이터: 파라미터와 조회자가 같은 동시 요청을 한 번만 실행
+
+    FastAPI는 핸들러를 키워드 인자로 호출하므로 인자 전체를 키로 사용
+    (functools.wraps로 원래 시그니처를 유지해 의존성 주입은 그대로 동작)
+    """
+    if not ENABLED:
+        return func
+
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(**kwargs):
+        key = (name,) + tuple(sorted((arg, _key_part(value)) for arg, value in kwargs.items()))
+        viewer = next((value.id for value in kwargs.values()
+                       if isinstance(value, BaseModel) and getattr(value, "id", None)), None)
+        return await flights.do(name, key, lambda: func(**kwargs), viewer)
+
+    return wrapper
@@ -0,0 +1,398 @@
+"""계정 내보내기/가져오기 (NDJSON, 한 줄에 JSON 객체 하나)
+
+사용법 (backend 디렉토리에서):
+    python -m app.transfer export alice -o alice.ndjson
+    python -m app.transfer import alice alice.ndjson          # 중단되면 같은 명령으로 이어서
+    python -m app.transfer import alice dump.ndjson --import-id blog-2026
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import anyio
+from bson import ObjectId
+from pydantic import ValidationError
+
+from app.env import env_int
+from app import attachments, calendar_rollup
+from app.database import get_repositories
+from app.lookups import author_snapshot
+from app.metrics import transfer_documents_total
+from app.models.transfer import ImportedComment, ImportedDiary
+from app.repositories.base import comment_thread_fields
+
+# - 내보내기는 계정 줄을 DB 조회 전에 먼저 보내고, 일기와 댓글을 작성순 커서로 TRANSFER_BATCH_SIZE개씩 읽어
+#   64KB씩 모아 흘려보냄 (메모리는 배치 크기만큼, 첫 바이트까지의 시간은 데이터 양과 무관)
+# - 가져오기는 본문을 줄 단위로 읽어 TRANSFER_BATCH_SIZE개마다 insert_many로 쓰고, 배치마다 반영한 줄 번호를
+#   imports 컬렉션에 체크포인트로 남김. 중단된 import_id로 같은 파일을 다시 보내면 체크포인트까지는 쓰지 않고 건너뛰고,
+#   끝난 import_id로 다시 보내면(잘못된 줄을 고친 파일 등) 처음부터 다시 확인
+# - 새 문서의 _id는 (사용자, import_id, 원본 ID)로 정해지므로 체크포인트 저장 직전에 멈춰 같은 배치를 다시 써도
+#   이미 들어간 문서는 건너뜀 (체크포인트가 보관 기간 뒤 지워진 뒤 다시 보내도 중복이 생기지 않음)
+# - 댓글은 같은 파일에 있는 일기에 달린 것만 가져오고(내보내기에 들어 있는 남의 일기 댓글은 건너뜀),
+#   부모 댓글이 앞줄에 있으면 답글로 이어 붙임. 원본 ID 대응표(일기 ID, 댓글 경로)만 메모리에 둠
+# - 첨부 이미지, 좋아요, 조회 수는 가져오지 않고, 달력은 가져온 달마다 다시 계산하는 작업으로 채움
+
+BATCH_SIZE = env_int("TRANSFER_BATCH_SIZE", 500)
+MAX_LINE_BYTES = env_int("IMPORT_MAX_LINE_BYTES", 1024 * 1024)
+
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/x-ndjson"
+# 결과에 남기는 형식 오류 수
+MAX_ERRORS = 20
+# 내보내기 응답에 한 번에 쓰는 크기 (줄마다 보내지 않도록 모음)
+_EXPORT_CHUNK = 64 * 1024
+_READ_CHUNK = 64 * 1024
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        # MongoDB가 돌려준 naive 시각은 UTC
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_line(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode() + b"\n"
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _account_record(user: dict) -> dict:
+    return {
+        "type": "account",
+        "version": FORMAT_VERSION,
+        "exported_at": datetime.now(timezone.utc),
+        "user": {"id": user["_id"], **{key: user.get(key) for key in ("username", "email", "nickname", "created_at")}},
+    }
+
+
+def _diary_record(diary: dict) -> dict:
+    return {
+        "type": "diary",
+        "id": diary["_id"],
+        "title": diary["title"],
+        "content": diary["content"],
+        "is_public": diary.get("is_public", True),
+        "images": [attachments.image_view(image) for image in diary.get("images", [])],
+        "view_count": diary.get("view_count", 0),
+        "created_at": diary["created_at"],
+        "updated_at": diary["updated_at"],
+    }
+
+
+def _comment_record(comment: dict) -> dict:
+    return {
+        "type": "comment",
+        "id": comment["_id"],
+        "diary_id": comment["diary_id"],
+        "parent_id": comment.get("parent_id"),
+        "content": comment["content"],
+        "created_at": comment["created_at"],
+        "updated_at": comment["updated_at"],
+    }
+
+
+async def export_lines(user: dict, batch_size: int = BATCH_SIZE) -> AsyncIterator[bytes]:
+    """사용자 문서(또는 UserResponse.model_dump(by_alias=True))의 계정 NDJSON (계정 줄, 일기, 댓글 순)"""
+    user_id = ObjectId(user["_id"])
+    yield encode_line(_account_record(user))
+    repos = get_repositories()
+    sources = (
+        ("diary", repos.diaries.iter_for_user(user_id, batch_size), _diary_record),
+        ("comment", repos.comments.iter_for_user(user_id, batch_size), _comment_record),
+    )
+    chunk = bytearray()
+    for kind, documents, record in sources:
+        count = 0
+        async for document in documents:
+            chunk += encode_line(record(document))
+            count += 1
+            if len(chunk) >= _EXPORT_CHUNK:
+                yield bytes(chunk)
+                chunk = bytearray()
+        transfer_documents_total.inc("export", kind, amount=count)
+    if chunk:
+        yield bytes(chunk)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """바이트 스트림을 줄 단위로 (한 줄이 max_line_bytes를 넘으면 LineTooLong)"""
+    pending = b""
+    number = 0
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            number += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLong(f"Line {number} is longer than {max_line_bytes} bytes")
+            yield line
+        if len(pending) > max_line_bytes:
+            raise LineTooLong(f"Line {number + 1} is longer than {max_line_bytes} bytes")
+    if pending:
+        yield pending
+
+
+async def read_file(path: str) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as file:
+        while chunk := await file.read(_READ_CHUNK):
+            yield chunk
+
+
+_MODELS = {"diary": ImportedDiary, "comment": ImportedComment}
+
+
+def _parse(raw: bytes):
+    """줄 하나를 (종류, 모델)로 (계정 줄은 모델 없이, 형식이 잘못됐으면 ValueError)"""
+    try:
+        record = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise ValueError("Line is not a JSON object")
+    kind = record.get("type")
+    if kind == "account":
+        version = record.get("version", FORMAT_VERSION)
+        if not isinstance(version, int) or version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported export version {version!r}")
+        return kind, None
+    model = _MODELS.get(kind)
+    if model is None:
+        raise ValueError(f"Unknown record type {kind!r}")
+    try:
+        return kind, model.model_validate(record)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+
+
+class Importer:
+    """가져오기 한 번 (원본 ID 대응표, 쓰기 배치, 체크포인트)"""
+
+    def __init__(self, user: dict, import_id: str, batch_size: int = BATCH_SIZE):
+        self.user_id = ObjectId(user["_id"])
+        self.import_id = import_id
+        self.checkpoint_id = f"{self.user_id}:{import_id}"
+        self.batch_size = max(batch_size, 1)
+        self.snapshot = author_snapshot(user, synced_at=datetime.now(timezone.utc))
+        # 원본 ID -> 새 _id (일기), 원본 ID -> (일기 원본 ID, 새 _id, path, depth) (댓글)
+        self.diaries: Dict[str, ObjectId] = {}
+        self.comments: Dict[str, Tuple[str, ObjectId, str, int]] = {}
+        self.pending_diaries: List[dict] = []
+        self.pending_comments: List[dict] = []
+        self.state = {"status": "running", "line": 0, "diaries": 0, "comments": 0, "skipped": 0, "errors": []}
+        self.resumed_from = 0
+        self.started = time.monotonic()
+
+    def _object_id(self, kind: str, source_id: str) -> ObjectId:
+        """(사용자, import_id, 원본 ID)로 정해지는 새 _id"""
+        return ObjectId(hashlib.sha256(f"{self.checkpoint_id}:{kind}:{source_id}".encode()).digest()[:12])
+
+    async def run(self, lines: AsyncIterator[bytes], progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """줄 스트림을 가져오고 결과 반환 (progress는 배치를 반영할 때마다 중간 결과로 호출)"""
+        checkpoint = await get_repositories().imports.get(self.checkpoint_id)
+        # 끝난 가져오기를 다시 보내면(잘못된 줄을 고친 파일 등) 처음부터 다시 확인하고 다시 셈 (이미 들어간 문서는 건너뜀)
+        if checkpoint is not None and checkpoint["status"] == "running":
+            self.state.update(line=checkpoint["line"], diaries=checkpoint["diaries"], comments=checkpoint["comments"],
+                              skipped=checkpoint["skipped"], errors=list(checkpoint["errors"]))
+            self.resumed_from = self.state["line"]
+        self.started = time.monotonic()
+        number = 0
+        try:
+            async for raw in lines:
+                number += 1
+                if raw.strip():
+                    self._add(number, raw, write=number > self.resumed_from)
+                if len(self.pending_diaries) + len(self.pending_comments) >= self.batch_size:
+                    await self._flush(number)
+                    if progress is not None:
+                        progress(self.result())
+        except Exception:
+            # 잘못된 줄이나 연결 끊김으로 멈추면 그 앞까지 반영해 둠 (DB 오류라 실패해도 다음 시도가 다시 씀)
+            try:
+                await self._flush(number)
+            except Exception:
+                pass
+            raise
+        await self._flush(number, done=True)
+        return self.result()
+
+    def _add(self, number: int, raw: bytes, write: bool):
+        # 체크포인트 앞의 줄도 대응표를 채우기 위해 해석만 함
+        try:
+            kind, record = _parse(raw)
+        except ValueError as e:
+            if write:
+                self._skip(number, str(e))
+            return
+        if kind == "diary":
+            document = self._diary(record)
+            if write:
+                self.pending_diaries.append(document)
+        elif kind == "comment":
+            document = self._comment(record)
+            if write:
+                if document is None:
+                    self.state["skipped"] += 1
+                else:
+                    self.pending_comments.append(document)
+
+    def _skip(self, number: int, detail: str):
+        self.state["skipped"] += 1
+        if len(self.state["errors"]) < MAX_ERRORS:
+            self.state["errors"].append({"line": number, "detail": detail})
+
+    def _diary(self, record: ImportedDiary) -> dict:
+        diary_id = self._object_id("diary", record.id)
+        self.diaries[record.id] = diary_id
+        return {
+            "_id": diary_id,
+            "title": record.title,
+            "content": record.content,
+            "is_public": record.is_public,
+            "images": [],
+            **self.snapshot,
+            "user_id": self.user_id,
+            "created_at": _utc(record.created_at),
+            "updated_at": _utc(record.updated_at or record.created_at),
+        }
+
+    def _comment(self, record: ImportedComment) -> Optional[dict]:
+        """같은 파일에 일기가 없으면 None (부모 댓글이 없거나 다른 일기의 댓글이면 최상위 댓글로)"""
+        diary_id = self.diaries.get(record.diary_id)
+        if diary_id is None:
+            return None
+        comment_id = self._object_id("comment", record.id)
+        parent = self.comments.get(record.parent_id) if record.parent_id else None
+        if parent is not None and parent[0] != record.diary_id:
+            parent = None
+        created_at = _utc(record.created_at)
+        fields = comment_thread_fields(
+            comment_id, created_at,
+            {"_id": parent[1], "path": parent[2], "depth": parent[3]} if parent is not None else None,
+        )
+        self.comments[record.id] = (record.diary_id, comment_id, fields["path"], fields["depth"])
+        return {
+            "_id": comment_id,
+            "content": record.content,
+            "diary_id": diary_id,
+            **self.snapshot,
+            "user_id": self.user_id,
+            "created_at": created_at,
+            "updated_at": _utc(record.updated_at or record.created_at),
+            **fields,
+        }
+
+    async def _flush(self, line: int, done: bool = False):
+        """모인 배치를 쓰고 체크포인트 저장"""
+        repos = get_repositories()
+        diaries, self.pending_diaries = self.pending_diaries, []
+        comments, self.pending_comments = self.pending_comments, []
+        # 이미 있는 문서는 같은 import_id의 앞선 시도가 넣은 것(_id가 정해져 있음)이라 결과 수에는 함께 셈
+        if diaries:
+            inserted = await repos.diaries.insert_many(diaries)
+            self.state["diaries"] += len(diaries)
+            transfer_documents_total.inc("import", "diary", amount=len(inserted))
+            # 이전 시도가 일기만 쓰고 멈췄을 수 있으므로 이미 있던 일기의 달도 예약
+            await calendar_rollup.record_imported(diaries)
+        if comments:
+            inserted = set(await repos.comments.insert_many(comments))
+            self.state["comments"] += len(comments)
+            transfer_documents_total.inc("import", "comment", amount=len(inserted))
+            # 새로 들어간 답글만큼 부모의 답글 수를 올림 (삽입과 이 사이에 멈추면 그 배치의 답글 수는 빠짐)
+            replies = Counter(comment["parent_id"] for comment in comments
+                              if comment["_id"] in inserted and comment["parent_id"] is not None)
+            await repos.comments.add_reply_counts(dict(replies))
+        now = datetime.now(timezone.utc)
+        self.state["line"] = max(line, self.state["line"])
+        fields = {**self.state, "errors": list(self.state["errors"]), "user_id": self.user_id, "import_id": self.import_id}
+        if done:
+            fields["status"] = self.state["status"] = "done"
+            fields["finished_at"] = now
+        await repos.imports.save(self.checkpoint_id, fields, now)
+
+    def result(self) -> dict:
+        seconds = time.monotonic() - self.started
+        processed = max(self.state["line"] - self.resumed_from, 0)
+        return {
+            "import_id": self.import_id,
+            "status": self.state["status"],
+            "lines": self.state["line"],
+            "resumed_from": self.resumed_from,
+            "diaries": self.state["diaries"],
+            "comments": self.state["comments"],
+            "skipped": self.state["skipped"],
+            "errors": list(self.state["errors"]),
+            "seconds": round(seconds, 3),
+            "lines_per_second": round(processed / seconds, 1) if seconds > 0 else 0.0,
+        }
+
+
+def _print_progress(result: dict):
+    print(f"  {result['lines']} lines: {result['diaries']} diaries, {result['comments']} comments, "
+          f"{result['skipped']} skipped ({result['lines_per_second']} lines/s)")
+
+
+async def _main(argv=None) -> int:
+    from app.database import close_mongo_connection, connect_to_mongo
+
+    parser = argparse.ArgumentParser(prog="python -m app.transfer", description="계정 내보내기/가져오기 (NDJSON)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="사용자의 일기와 댓글을 파일로")
+    export_parser.add_argument("username")
+    export_parser.add_argument("-o", "--output", help="출력 파일 (기본: <username>.ndjson)")
+    import_parser = subparsers.add_parser("import", help="파일의 일기와 댓글을 사용자 계정으로")
+    import_parser.add_argument("username")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--import-id", help="이어서 가져올 때 쓰는 식별자 (기본: 파일 경로로 만든 값)")
+    import_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    await connect_to_mongo()
+    try:
+        user = await get_repositories().users.get_by_username(args.username)
+        if user is None:
+            print(f"✗ User {args.username} not found")
+            return 1
+        started = time.monotonic()
+        if args.command == "export":
+            output = args.output or f"{args.username}.ndjson"
+            written = 0
+            async with await anyio.open_file(output, "wb") as file:
+                async for chunk in export_lines(user):
+                    await file.write(chunk)
+                    written += len(chunk)
+            seconds = time.monotonic() - started
+            print(f"✓ Exported {written} bytes to {output} in {seconds:.1f}s "
+                  f"({written / max(seconds, 1e-9) / 1024 / 1024:.1f} MB/s)")
+        else:
+            import_id = args.import_id or "cli-" + hashlib.sha256(os.path.abspath(args.file).encode()).hexdigest()[:16]
+            print(f"✓ Import id: {import_id}")
+            importer = Importer(user, import_id, args.batch_size)
+            result = await importer.run(iter_lines(read_file(args.file)), progress=_print_progress)
+            if result["resumed_from"]:
+                print(f"  resumed after line {result['resumed_from']}")
+            for error in result["errors"]:
+                print(f"  line {error['line']}: {error['detail']}")
+            print(f"✓ Imported {result['diaries']} diaries and {result['comments']} comments "
+                  f"({result['skipped']} lines skipped) in {result['seconds']}s, {result['lines_per_second']} lines/s")
+    finally:
+        await close_mongo_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
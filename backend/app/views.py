@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.env import env_bool, env_float, env_int
+from app.database import get_repositories
+from app.metrics import view_buffer_diaries, view_flushes_total
+
+logger = logging.getLogger("app.views")
+
+# 일기 조회 수와 순 조회자 추정
+# - 상세 조회마다 DB에 쓰지 않고 워커 메모리에 일기별 (조회 수, HyperLogLog 레지스터)를 모아 두었다가
+#   VIEWS_FLUSH_SECONDS마다(또는 VIEWS_MAX_PENDING개 일기가 쌓이면) bulk_write로 반영
+# - 순 조회자는 레지스터 2^10개(표준 오차 약 3.2%)짜리 HyperLogLog로 추정. diary_views 컬렉션에 레지스터별
+#   $max로 합치므로 여러 워커의 스케치가 순서와 관계없이 같은 결과로 합쳐짐
+# - 합친 레지스터로 계산한 추정치를 조회 수와 함께 일기 문서(view_count, unique_viewers)에 저장해
+#   목록/상세 응답이 추가 조회 없이 읽음
+# - 조회자는 로그인 사용자 ID, 비로그인은 클라이언트 IP의 해시만 쓰며 원본은 저장하지 않음
+# - 작성자 본인의 조회는 세지 않음. 반영 전에 프로세스가 죽으면 그 사이의 조회는 사라짐
+
+ENABLED = env_bool("VIEWS_ENABLED", True)
+FLUSH_SECONDS = env_float("VIEWS_FLUSH_SECONDS", 5.0)
+MAX_PENDING = env_int("VIEWS_MAX_PENDING", 5000)
+
+PRECISION = 10
+REGISTERS = 1 << PRECISION
+_RANK_BITS = 64 - PRECISION
+_RANK_MASK = (1 << _RANK_BITS) - 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def register_of(viewer: str) -> Tuple[int, int]:
+    """조회자의 (레지스터 번호, 순위): 64비트 해시의 상위 10비트와 나머지 비트의 선행 0 개수 + 1"""
+    hashed = int.from_bytes(hashlib.blake2b(viewer.encode(), digest_size=8).digest(), "big")
+    return hashed >> _RANK_BITS, _RANK_BITS - (hashed & _RANK_MASK).bit_length() + 1
+
+
+def estimate(registers: Dict[int, int]) -> int:
+    """순 조회자 수 추정 (작은 값은 빈 레지스터 수로 선형 계수)"""
+    empty = REGISTERS - len(registers)
+    raw = _ALPHA * REGISTERS * REGISTERS / (sum(2.0 ** -rank for rank in registers.values()) + empty)
+    if raw <= 2.5 * REGISTERS and empty:
+        return round(REGISTERS * math.log(REGISTERS / empty))
+    return round(raw)
+
+
+def viewer_key(user_id: Optional[str], client_host: Optional[str]) -> Optional[str]:
+    if user_id is not None:
+        return f"user:{user_id}"
+    if client_host:
+        return f"ip:{client_host}"
+    return None
+
+
+class ViewCounter:
+    """워커 프로세스의 조회 버퍼와 주기적 반영 (lifespan에서 시작)"""
+
+    def __init__(self):
+        # 일기 ID -> [조회 수, {레지스터 번호: 순위}]
+        self._pending: Dict[ObjectId, List] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self):
+        """반영 루프를 멈추고 남은 조회를 반영"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._wakeup = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("final view flush failed, %d diaries dropped", len(self._pending))
+            self._pending = {}
+
+    def record(self, diary_id: ObjectId, viewer: Optional[str]):
+        """조회 한 건 기록 (DB 접근 없음)"""
+        if self._task is None:
+            return
+        entry = self._pending.get(diary_id)
+        if entry is None:
+            entry = self._pending[diary_id] = [0, {}]
+            view_buffer_diaries.set(len(self._pending))
+        entry[0] += 1
+        if viewer is not None:
+            index, rank = register_of(viewer)
+            if rank > entry[1].get(index, 0):
+                entry[1][index] = rank
+        if len(self._pending) >= MAX_PENDING:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """모아 둔 조회 반영 (왕복 3번: 스케치 합치기, 합친 스케치 읽기, 일기 갱신). 반영한 일기 수 반환"""
+        batch, self._pending = self._pending, {}
+        view_buffer_diaries.set(0)
+        if not batch:
+            return 0
+        repos = get_repositories()
+        try:
+            merged = await repos.views.merge({diary_id: registers for diary_id, (_, registers) in batch.items()})
+            await repos.diaries.add_views({
+                diary_id: (count, estimate(merged.get(diary_id, registers)))
+                for diary_id, (count, registers) in batch.items()
+            })
+        except BaseException:
+            # 다음 반영 때 다시 시도 (레지스터 합치기는 여러 번 해도 같은 결과)
+            self._restore(batch)
+            view_flushes_total.inc("error")
+            raise
+        view_flushes_total.inc("ok")
+        return len(batch)
+
+    def _restore(self, batch: Dict[ObjectId, List]):
+        for diary_id, (count, registers) in batch.items():
+            entry = self._pending.setdefault(diary_id, [0, {}])
+            entry[0] += count
+            for index, rank in registers.items():
+                if rank > entry[1].get(index, 0):
+                    entry[1][index] = rank
+        view_buffer_diaries.set(len(self._pending))
+
+    async def _run(self):
+        while True:
+            try:
+                async with asyncio.timeout(FLUSH_SECONDS):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("view flush failed")
+                await asyncio.sleep(FLUSH_SECONDS)
+
+
+counter = ViewCounter()
@@ -0,0 +1,119 @@
+"""인증 의존성의 요청당 오버헤드 측정
+
+1. JWT 라이브러리별 디코딩 비용 (python-jose, PyJWT가 설치돼 있으면 함께 비교)
+2. get_current_user 의존성 호출 비용 (검증된 토큰 캐시 끔/켬)
+3. GET /api/auth/me 요청 전체 비용 (캐시 끔/켬, 메모리 저장소로 DB 비용 제외)
+
+사용 예:
+    python -m benchmarks.auth_overhead --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ["DATA_BACKEND"] = "memory"
+
+import httpx
+from jose import jwt as jose_jwt
+
+from app import auth, database
+from app.main import app
+
+try:
+    import jwt as pyjwt
+except ImportError:
+    pyjwt = None
+
+
+def per_call_us(func, iterations: int) -> float:
+    """동기 함수 한 번 호출의 평균 시간 (마이크로초)"""
+    for _ in range(min(iterations, 1000)):
+        func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+
+async def async_per_call_us(func, iterations: int) -> float:
+    """비동기 함수 한 번 호출의 평균 시간 (마이크로초)"""
+    for _ in range(min(iterations, 1000)):
+        await func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+
+def set_token_cache(enabled: bool, size: int):
+    auth.verified_tokens.clear()
+    auth.verified_tokens.maxsize = size if enabled else 0
+
+
+async def run(args) -> dict:
+    database.use_memory_backend()
+    await database.get_repositories().users.create({
+        "username": "bench_auth",
+        "email": "bench_auth@bench.example.com",
+        "nickname": "bench",
+        "profile_image": None,
+        "hashed_password": "x",
+        "created_at": datetime.now(timezone.utc),
+    })
+    token = auth.create_access_token({"sub": "bench_auth"}, timedelta(minutes=30))
+    cache_size = auth.TOKEN_CACHE_SIZE or 10000
+
+    results = {"algorithm": auth.ALGORITHM, "decode_us": {}, "dependency_us": {}, "request_us": {}}
+
+    # 1. 라이브러리별 디코딩
+    results["decode_us"]["python-jose"] = per_call_us(
+        lambda: jose_jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]), args.iterations
+    )
+    if pyjwt is not None:
+        results["decode_us"]["PyJWT"] = per_call_us(
+            lambda: pyjwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]), args.iterations
+        )
+    else:
+        results["decode_us"]["PyJWT"] = "not installed (pip install PyJWT)"
+    set_token_cache(True, cache_size)
+    results["decode_us"]["cached decode_access_token"] = per_call_us(
+        lambda: auth.decode_access_token(token), args.iterations
+    )
+
+    # 2. 의존성 호출
+    for label, enabled in (("before (no token cache)", False), ("after (token cache)", True)):
+        set_token_cache(enabled, cache_size)
+        results["dependency_us"][label] = await async_per_call_us(
+            lambda: auth.get_current_user(token), args.iterations
+        )
+
+    # 3. 요청 전체
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, enabled in (("before (no token cache)", False), ("after (token cache)", True)):
+            set_token_cache(enabled, cache_size)
+
+            async def call():
+                response = await client.get("/api/auth/me", headers=headers)
+                response.raise_for_status()
+
+            results["request_us"][label] = await async_per_call_us(call, args.requests)
+
+    set_token_cache(True, auth.TOKEN_CACHE_SIZE)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="인증 의존성 오버헤드 측정")
+    parser.add_argument("--iterations", type=int, default=20000, help="디코딩/의존성 호출 반복 수")
+    parser.add_argument("--requests", type=int, default=2000, help="GET /api/auth/me 요청 수")
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
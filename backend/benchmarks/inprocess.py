@@ -0,0 +1,151 @@
+"""메모리 저장소로 API의 순수 파이썬 오버헤드 측정
+
+MongoDB와 네트워크 없이 ASGI 앱을 직접 호출해 라우팅, 의존성 주입, 헬퍼, Pydantic
+직렬화에 드는 시간만 엔드포인트별로 잽니다. --profile을 주면 cProfile 결과를 저장합니다.
+
+사용 예:
+    python -m benchmarks.inprocess --requests 2000 --profile inprocess.prof
+"""
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ["DATA_BACKEND"] = "memory"
+
+import httpx
+from bson import ObjectId
+
+from app import database
+from app.auth import create_access_token, get_password_hash
+from app.main import app
+from app.repositories.base import comment_thread_fields
+
+
+async def seed_memory(users: int, diaries: int, comments: int, likes: int, seed: int):
+    """메모리 저장소에 데이터 적재 (HTTP를 거치지 않고 저장소에 직접)"""
+    database.use_memory_backend()
+    repos = database.get_repositories()
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    hashed_password = get_password_hash("benchpass")
+
+    user_docs = []
+    for i in range(users):
+        user_docs.append(await repos.users.create({
+            "username": f"bench_user_{i}",
+            "email": f"bench_user_{i}@bench.example.com",
+            "nickname": f"벤치{i}",
+            "profile_image": None,
+            "hashed_password": hashed_password,
+            "created_at": now,
+        }))
+
+    diary_ids = []
+    for i in range(diaries):
+        author = user_docs[min(int(rng.paretovariate(1.2)) - 1, users - 1)]
+        created_at = now - timedelta(minutes=i)
+        diary = await repos.diaries.create({
+            "title": f"일기 {i}",
+            "content": "오늘은 좋은 하루였다. " * 10,
+            "is_public": rng.random() < 0.8,
+            "author": author["nickname"],
+            "user_id": author["_id"],
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        diary_ids.append(diary["_id"])
+
+    for i in range(comments):
+        user = rng.choice(user_docs)
+        created_at = now - timedelta(seconds=i)
+        comment_id = ObjectId()
+        await repos.comments.create({
+            "_id": comment_id,
+            "diary_id": diary_ids[min(int(rng.paretovariate(1.1)) - 1, diaries - 1)],
+            "content": "좋은 글이네요!",
+            "author": user["nickname"],
+            "user_id": user["_id"],
+            "created_at": created_at,
+            "updated_at": created_at,
+            **comment_thread_fields(comment_id, created_at),
+        })
+
+    for _ in range(likes):
+        user = rng.choice(user_docs)
+        target_id = diary_ids[min(int(rng.paretovariate(1.1)) - 1, diaries - 1)]
+        if not await repos.likes.find("diary", target_id, user["_id"]):
+            await repos.likes.add("diary", target_id, user["_id"])
+
+    return user_docs, diary_ids
+
+
+async def measure(client, method: str, path: str, headers: dict, count: int) -> dict:
+    """같은 요청을 count번 순차 실행한 지연 통계 (마이크로초)"""
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = await client.request(method, path, headers=headers)
+        samples.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status_code}")
+    samples.sort()
+    return {
+        "requests": count,
+        "mean_us": round(sum(samples) / count * 1e6, 1),
+        "p50_us": round(samples[count // 2] * 1e6, 1),
+        "p99_us": round(samples[min(count - 1, int(count * 0.99))] * 1e6, 1),
+    }
+
+
+async def run(args) -> dict:
+    user_docs, diary_ids = await seed_memory(args.users, args.diaries, args.comments, args.likes, args.seed)
+    token = create_access_token({"sub": user_docs[0]["username"]}, timedelta(minutes=30))
+    auth = {"Authorization": f"Bearer {token}"}
+    hot = str(diary_ids[0])
+
+    cases = {
+        "feed (anonymous)": ("GET", "/api/diaries/?limit=10", {}),
+        "feed (authenticated)": ("GET", "/api/diaries/?limit=10", auth),
+        "detail (anonymous)": ("GET", f"/api/diaries/{hot}", {}),
+        "comments": ("GET", f"/api/diaries/{hot}/comments?sort_by=newest", {}),
+        "my diaries": ("GET", "/api/diaries/me?limit=10", auth),
+        "auth me": ("GET", "/api/auth/me", auth),
+        "health": ("GET", "/health", {}),
+    }
+
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (method, path, headers) in cases.items():
+            await measure(client, method, path, headers, min(50, args.requests))
+            results[name] = await measure(client, method, path, headers, args.requests)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="메모리 저장소 기반 API 오버헤드 측정")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--diaries", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--likes", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=1000, help="엔드포인트별 요청 수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--profile", help="cProfile 결과 저장 경로 (snakeviz 등으로 확인)")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        results = profiler.runcall(asyncio.run, run(args))
+        profiler.dump_stats(args.profile)
+    else:
+        results = asyncio.run(run(args))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
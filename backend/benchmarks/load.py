@@ -0,0 +1,236 @@
+"""비동기 부하 드라이버
+
+benchmarks.seed가 만든 manifest를 읽어 실행 중인 서버에 접근 로그와 비슷한
+읽기/쓰기 혼합 부하를 동시성 단계별로 걸고, 엔드포인트별 p50/p95/p99 지연과
+처리량을 JSON으로 출력합니다.
+
+사용 예:
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --concurrency 1,8,32 --duration 30 \\
+        --output results/2024-01-01.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from itertools import accumulate
+
+import httpx
+
+# backend_uvicorn.log의 요청 비율(OPTIONS/리다이렉트 제외)을 반올림한 가중치
+PROFILE = {
+    "feed": 108,
+    "comments": 43,
+    "detail": 38,
+    "my_diaries": 14,
+    "login": 8,
+    "my_comments": 6,
+    "toggle_like": 3,
+    "create_comment": 3,
+    "create_diary": 2,
+}
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """nearest-rank 백분위수"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+class LoadDriver:
+    """동시성 단계별로 혼합 부하를 실행하고 지연을 기록"""
+
+    def __init__(self, client: httpx.AsyncClient, manifest: dict, profile: dict, seed: int):
+        self.client = client
+        self.manifest = manifest
+        self.rng = random.Random(seed)
+        self.operations = list(profile)
+        self.operation_weights = list(accumulate(profile.values()))
+        self.diary_ids = [item["id"] for item in manifest["diaries"]]
+        self.diary_weights = list(accumulate(item["weight"] for item in manifest["diaries"]))
+        self.tokens = []
+
+    async def login(self, username: str):
+        response = await self.client.post(
+            "/api/auth/login-json",
+            json={"username": username, "password": self.manifest["password"]},
+        )
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    async def prepare(self, sessions: int):
+        """측정 전에 사용할 토큰 확보"""
+        usernames = self.manifest["usernames"][:sessions]
+        self.tokens = await asyncio.gather(*(self.login(name) for name in usernames))
+
+    def pick_diary(self) -> str:
+        return self.rng.choices(self.diary_ids, cum_weights=self.diary_weights)[0]
+
+    def pick_auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+
+    async def run_operation(self, name: str):
+        if name == "feed":
+            page = min(int(self.rng.paretovariate(1.5)) - 1, 20)
+            headers = self.pick_auth() if self.rng.random() < 0.5 else {}
+            return await self.client.get(
+                "/api/diaries/", params={"skip": page * 10, "limit": 10}, headers=headers
+            )
+        if name == "detail":
+            headers = self.pick_auth() if self.rng.random() < 0.5 else {}
+            return await self.client.get(f"/api/diaries/{self.pick_diary()}", headers=headers)
+        if name == "comments":
+            return await self.client.get(
+                f"/api/diaries/{self.pick_diary()}/comments", params={"sort_by": "newest"}
+            )
+        if name == "my_diaries":
+            return await self.client.get("/api/diaries/me", headers=self.pick_auth())
+        if name == "my_comments":
+            return await self.client.get("/api/comments/me", headers=self.pick_auth())
+        if name == "login":
+            username = self.rng.choice(self.manifest["usernames"])
+            return await self.client.post(
+                "/api/auth/login-json",
+                json={"username": username, "password": self.manifest["password"]},
+            )
+        if name == "toggle_like":
+            return await self.client.post(f"/api/diaries/{self.pick_diary()}/like", headers=self.pick_auth())
+        if name == "create_comment":
+            return await self.client.post(
+                f"/api/diaries/{self.pick_diary()}/comments",
+                json={"content": "벤치마크 댓글"},
+                headers=self.pick_auth(),
+            )
+        if name == "create_diary":
+            return await self.client.post(
+                "/api/diaries/",
+                json={"title": "벤치마크", "content": "벤치마크 본문", "is_public": False},
+                headers=self.pick_auth(),
+            )
+        raise ValueError(f"unknown operation: {name}")
+
+    async def worker(self, deadline: float, samples: dict, errors: dict):
+        while time.perf_counter() < deadline:
+            name = self.rng.choices(self.operations, cum_weights=self.operation_weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await self.run_operation(name)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            samples.setdefault(name, []).append(time.perf_counter() - started)
+            if failed:
+                errors[name] = errors.get(name, 0) + 1
+
+    async def run_level(self, concurrency: int, duration: float, warmup: float) -> dict:
+        if warmup > 0:
+            await asyncio.gather(*(
+                self.worker(time.perf_counter() + warmup, {}, {}) for _ in range(concurrency)
+            ))
+
+        samples, errors = {}, {}
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self.worker(deadline, samples, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        endpoints = {}
+        total = 0
+        for name, values in sorted(samples.items()):
+            values.sort()
+            total += len(values)
+            endpoints[name] = {
+                "count": len(values),
+                "errors": errors.get(name, 0),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            }
+        return {
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 2),
+            "requests": total,
+            "errors": sum(errors.values()),
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    profile = dict(PROFILE)
+    if args.read_only:
+        profile = {name: weight for name, weight in profile.items()
+                   if name in ("feed", "detail", "comments", "my_diaries", "my_comments")}
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout,
+                                 follow_redirects=True) as client:
+        driver = LoadDriver(client, manifest, profile, args.seed)
+        await driver.prepare(args.sessions)
+        results = []
+        for level in levels:
+            print(f"concurrency={level} ...", flush=True)
+            results.append(await driver.run_level(level, args.duration, args.warmup))
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "label": args.label,
+        "base_url": args.base_url,
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "dataset": manifest.get("counts", {}),
+        "profile": profile,
+        "levels": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="혼합 부하 실행 및 지연 측정")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", default="bench_manifest.json")
+    parser.add_argument("--concurrency", default="1,8,32", help="쉼표로 구분한 동시성 단계")
+    parser.add_argument("--duration", type=float, default=30.0, help="단계별 측정 시간(초)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="단계별 워밍업 시간(초)")
+    parser.add_argument("--sessions", type=int, default=50, help="미리 로그인할 사용자 수")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--read-only", action="store_true", help="쓰기 요청 제외")
+    parser.add_argument("--label", default="", help="결과 비교용 라벨")
+    parser.add_argument("--output", help="결과 JSON 파일 (생략 시 stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
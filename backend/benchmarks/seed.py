@@ -0,0 +1,231 @@
+"""벤치마크용 합성 데이터 생성기
+
+재현 가능한 시드로 users/diaries/comments/likes를 insert_many로 대량 적재합니다.
+인기 편중(소수 사용자가 많은 글을 쓰고, 소수 일기에 좋아요/댓글이 몰림)을
+파레토 분포 가중치로 흉내냅니다.
+
+사용 예:
+    python -m benchmarks.seed --users 2000 --diaries 50000 --comments 200000 --likes 500000 --drop
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+import bcrypt
+from bson import ObjectId
+from pymongo import MongoClient
+
+from app.database import settings
+from app.repositories.base import comment_thread_fields
+
+BENCH_PASSWORD = "benchpass"
+
+WORDS = [
+    "오늘", "하루", "날씨", "맑음", "흐림", "비", "산책", "커피", "친구", "가족",
+    "회사", "학교", "공부", "운동", "저녁", "아침", "점심", "여행", "바다", "산",
+    "영화", "음악", "책", "생각", "행복", "피곤", "감사", "기억", "주말", "봄",
+]
+
+
+def power_law_weights(rng: random.Random, count: int, alpha: float) -> list:
+    """파레토 분포 가중치 (alpha가 작을수록 편중이 심함)"""
+    return [rng.paretovariate(alpha) for _ in range(count)]
+
+
+def random_text(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words)))
+
+
+def insert_batches(collection, documents, batch_size: int) -> int:
+    """문서를 batch_size 단위로 insert_many"""
+    inserted = 0
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+def generate(db, args) -> dict:
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    span_seconds = args.days * 24 * 3600
+    # bcrypt는 느리므로 모든 벤치 사용자가 같은 해시를 공유
+    hashed_password = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+    def timestamp():
+        return now - timedelta(seconds=rng.randint(0, span_seconds))
+
+    user_ids = [ObjectId() for _ in range(args.users)]
+    usernames = [f"{args.prefix}{i}" for i in range(args.users)]
+    users = (
+        {
+            "_id": user_id,
+            "username": username,
+            "email": f"{username}@bench.example.com",
+            "nickname": f"벤치{i}",
+            "profile_image": None,
+            "hashed_password": hashed_password,
+            "created_at": timestamp(),
+        }
+        for i, (user_id, username) in enumerate(zip(user_ids, usernames))
+    )
+    started = time.perf_counter()
+    insert_batches(db.users, users, args.batch_size)
+    print(f"users: {args.users} ({time.perf_counter() - started:.1f}s)")
+
+    # 작성자 편중: 일부 사용자가 대부분의 일기를 씀
+    author_weights = list(accumulate(power_law_weights(rng, args.users, 1.2)))
+    diary_ids = [ObjectId() for _ in range(args.diaries)]
+    public_flags = [rng.random() < args.public_ratio for _ in range(args.diaries)]
+
+    def diaries():
+        for diary_id, is_public in zip(diary_ids, public_flags):
+            author_index = rng.choices(range(args.users), cum_weights=author_weights)[0]
+            created_at = timestamp()
+            yield {
+                "_id": diary_id,
+                "title": random_text(rng, 2, 6),
+                "content": random_text(rng, 20, 200),
+                "is_public": is_public,
+                "author": f"벤치{author_index}",
+                "author_profile_image": None,
+                "author_synced_at": created_at,
+                "user_id": user_ids[author_index],
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+
+    started = time.perf_counter()
+    insert_batches(db.diaries, diaries(), args.batch_size)
+    print(f"diaries: {args.diaries} ({time.perf_counter() - started:.1f}s)")
+
+    # 인기 편중: 소수의 "핫" 일기에 댓글과 좋아요가 몰림
+    popularity = power_law_weights(rng, args.diaries, 1.1)
+    diary_weights = list(accumulate(popularity))
+    comment_ids = [ObjectId() for _ in range(args.comments)]
+
+    def comments():
+        for comment_id in comment_ids:
+            diary_index = rng.choices(range(args.diaries), cum_weights=diary_weights)[0]
+            user_index = rng.randrange(args.users)
+            created_at = timestamp()
+            yield {
+                "_id": comment_id,
+                "diary_id": diary_ids[diary_index],
+                "content": random_text(rng, 3, 30),
+                "author": f"벤치{user_index}",
+                "author_profile_image": None,
+                "author_synced_at": created_at,
+                "user_id": user_ids[user_index],
+                "created_at": created_at,
+                "updated_at": created_at,
+                **comment_thread_fields(comment_id, created_at),
+            }
+
+    started = time.perf_counter()
+    if args.comments:
+        insert_batches(db.comments, comments(), args.batch_size)
+    print(f"comments: {args.comments} ({time.perf_counter() - started:.1f}s)")
+
+    comment_weights = list(accumulate(power_law_weights(rng, args.comments, 1.3))) if args.comments else []
+
+    def likes():
+        seen = set()
+        attempts = 0
+        produced = 0
+        while produced < args.likes and attempts < args.likes * 3:
+            attempts += 1
+            if comment_weights and rng.random() < args.comment_like_ratio:
+                target_type = "comment"
+                target_id = comment_ids[rng.choices(range(args.comments), cum_weights=comment_weights)[0]]
+            else:
+                target_type = "diary"
+                target_id = diary_ids[rng.choices(range(args.diaries), cum_weights=diary_weights)[0]]
+            user_index = rng.randrange(args.users)
+            key = (target_id, user_index)
+            if key in seen:
+                continue
+            seen.add(key)
+            produced += 1
+            yield {
+                "target_type": target_type,
+                "target_id": target_id,
+                "user_id": user_ids[user_index],
+                "created_at": timestamp(),
+            }
+
+    started = time.perf_counter()
+    liked = insert_batches(db.likes, likes(), args.batch_size) if args.likes else 0
+    print(f"likes: {liked} ({time.perf_counter() - started:.1f}s)")
+
+    # 부하 드라이버가 사용할 샘플 (핫 일기 가중치 포함)
+    public_ranked = sorted(
+        (index for index in range(args.diaries) if public_flags[index]),
+        key=lambda index: popularity[index],
+        reverse=True,
+    )[:args.manifest_diaries]
+    return {
+        "seed": args.seed,
+        "password": BENCH_PASSWORD,
+        "usernames": usernames[:args.manifest_users],
+        "diaries": [
+            {"id": str(diary_ids[index]), "weight": round(popularity[index], 4)}
+            for index in public_ranked
+        ],
+        "counts": {
+            "users": args.users,
+            "diaries": args.diaries,
+            "comments": args.comments,
+            "likes": liked,
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 데이터 적재")
+    parser.add_argument("--mongodb-url", default=settings.url)
+    parser.add_argument("--database", default=settings.database_name + "_bench")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--diaries", type=int, default=20000)
+    parser.add_argument("--comments", type=int, default=60000)
+    parser.add_argument("--likes", type=int, default=150000)
+    parser.add_argument("--days", type=int, default=365, help="created_at 분포 기간(일)")
+    parser.add_argument("--public-ratio", type=float, default=0.8)
+    parser.add_argument("--comment-like-ratio", type=float, default=0.3)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--prefix", default="bench_user_")
+    parser.add_argument("--manifest", default="bench_manifest.json")
+    parser.add_argument("--manifest-users", type=int, default=200)
+    parser.add_argument("--manifest-diaries", type=int, default=2000)
+    parser.add_argument("--drop", action="store_true", help="적재 전 컬렉션 삭제")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    client = MongoClient(args.mongodb_url)
+    db = client[args.database]
+    if args.drop:
+        for name in ("users", "diaries", "comments", "likes"):
+            db.drop_collection(name)
+    manifest = generate(db, args)
+    manifest["database"] = args.database
+    with open(args.manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"manifest written to {args.manifest}")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""서버 실행 설정 비교 (기본 uvicorn vs python -m app)
+
+설정마다 서버를 새로 띄워 다음을 측정합니다.
+- 시작 시간: 프로세스 실행부터 /health가 응답할 때까지
+- 메모리: 프로세스 트리 전체의 RSS와 PSS (PSS는 fork 후 공유된 페이지를 나눠 계산하므로
+  preload + copy-on-write 효과가 드러남, Linux만)
+- 처리량/지연: keep-alive 연결로 읽기 엔드포인트에 고정 동시성 부하
+
+기본은 DATA_BACKEND=memory로 실행해 MongoDB 없이 서버 설정 차이만 봅니다.
+MongoDB로 측정하려면 --backend mongo (benchmarks.seed로 적재한 DB 사용).
+
+사용 예:
+    python -m benchmarks.server_config --concurrency 64 --duration 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.load import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CONFIGS = {
+    # 지금까지의 실행 방식과 같은 단일 워커, 순수 파이썬 이벤트 루프/파서
+    "uvicorn-default": ["-m", "uvicorn", "app.main:app", "--loop", "asyncio", "--http", "h11",
+                        "--no-access-log"],
+    "launcher": ["-m", "app"],
+}
+
+PATHS = ["/health", "/api/diaries/?skip=0&limit=10"]
+
+
+def process_tree(pid: int) -> list:
+    """pid와 모든 자식 프로세스 (Linux /proc 기준)"""
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in Path(f"/proc/{current}/task").iterdir():
+                children = (task / "children").read_text().split()
+                pids.extend(int(child) for child in children)
+        except OSError:
+            continue
+    return pids
+
+
+def memory_kb(pid: int) -> dict:
+    """프로세스 트리의 RSS/PSS 합계 (KB)"""
+    totals = {"rss_kb": 0, "pss_kb": 0, "processes": 0}
+    for current in process_tree(pid):
+        try:
+            lines = Path(f"/proc/{current}/smaps_rollup").read_text().splitlines()
+        except OSError:
+            continue
+        totals["processes"] += 1
+        for line in lines:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                totals[f"{key.lower()}_kb"] += int(value.split()[0])
+    return totals
+
+
+async def wait_ready(base_url: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=1.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return True
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    return False
+
+
+async def drive(base_url: str, concurrency: int, duration: float, warmup: float) -> dict:
+    """고정 동시성으로 PATHS를 번갈아 요청"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    errors = 0
+    measuring = False
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10.0) as client:
+        async def worker(offset: int, stop_at: float):
+            nonlocal errors
+            index = offset
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(PATHS[index % len(PATHS)])
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                index += 1
+                if measuring:
+                    if ok:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors += 1
+
+        await asyncio.gather(*(worker(i, time.monotonic() + warmup) for i in range(concurrency)))
+        measuring = True
+        started = time.monotonic()
+        await asyncio.gather(*(worker(i, time.monotonic() + duration) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def measure(name: str, args) -> dict:
+    env = dict(os.environ, DATA_BACKEND=args.backend, PORT=str(args.port))
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+    command = [sys.executable] + CONFIGS[name] + (["--port", str(args.port)] if name != "launcher" else [])
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    started = time.monotonic()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        if not await wait_ready(base_url, args.startup_timeout):
+            return {"config": name, "error": "server did not become ready"}
+        startup = time.monotonic() - started
+        # 워커가 모두 뜰 때까지 잠시 대기
+        await asyncio.sleep(1.0)
+        idle_memory = memory_kb(process.pid)
+        load = await drive(base_url, args.concurrency, args.duration, args.warmup)
+        return {
+            "config": name,
+            "command": " ".join(["python"] + command[1:]),
+            "startup_seconds": round(startup, 3),
+            "memory_idle": idle_memory,
+            "memory_after_load": memory_kb(process.pid),
+            "load": load,
+        }
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+async def run(args) -> dict:
+    results = []
+    for name in args.configs.split(","):
+        print(f"{name} ...", flush=True)
+        results.append(await measure(name, args))
+    return {
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "backend": args.backend,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="서버 실행 설정 비교")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help="쉼표로 구분한 설정 이름")
+    parser.add_argument("--backend", default="memory", choices=("memory", "mongo"))
+    parser.add_argument("--workers", type=int, default=0, help="launcher 워커 수 (기본: CPU 수)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="결과 JSON 파일 (생략 시 stdout)")
+    args = parser.parse_args(argv)
+
+    text = json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
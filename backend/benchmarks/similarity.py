@@ -0,0 +1,141 @@
+"""비슷한 일기 추천 색인(app/similar.py) 측정
+
+1. 공개 일기 N개로 색인 구축 시간과 색인 메모리 (tracemalloc)
+2. 추천 조회 지연 시간 (p50/p95/p99)
+3. 일기 추가/수정 반영 시간
+
+메모리 저장소에 합성 일기(주제별 어휘 + 공통 어휘, Zipf 분포)를 넣어 측정하므로 DB 비용은 포함하지 않음
+
+사용 예:
+    python -m benchmarks.similarity --diaries 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+os.environ["DATA_BACKEND"] = "memory"
+
+from bson import ObjectId
+
+from app import database, similar
+
+# 모든 일기에 나오는 공통 어휘
+COMMON_WORDS = [
+    "오늘", "하루", "정말", "그리고", "했다", "있었다", "너무", "조금", "다시", "생각",
+    "기분", "시간", "사람", "마음", "아침", "저녁", "내일", "어제", "함께", "좋았다",
+]
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    """한글 음절 2~4개짜리 합성 단어"""
+    words = set()
+    while len(words) < size:
+        words.add("".join(chr(rng.randint(0xAC00, 0xD7A3)) for _ in range(rng.randint(2, 4))))
+    return list(words)
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> list:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def percentile(values: list, ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    # 주제마다 어휘 일부를 골라 자주 쓰게 해서 비슷한 일기 묶음을 만듦
+    topics = [rng.sample(vocabulary, 200) for _ in range(args.topics)]
+    vocabulary_weights = zipf_weights(len(vocabulary))
+    topic_weights = zipf_weights(200)
+
+    def text(topic: list, words: int) -> str:
+        chosen = (rng.choices(topic, topic_weights, k=words // 2)
+                  + rng.choices(vocabulary, vocabulary_weights, k=words // 4)
+                  + rng.choices(COMMON_WORDS, k=words - words // 2 - words // 4))
+        rng.shuffle(chosen)
+        return " ".join(chosen)
+
+    database.use_memory_backend()
+    diaries = database.get_repositories().diaries
+    started_at = datetime.now(timezone.utc) - timedelta(days=365)
+    for number in range(args.diaries):
+        topic = rng.choice(topics)
+        created_at = started_at + timedelta(seconds=number)
+        await diaries.create({
+            "title": text(topic, rng.randint(2, 6)),
+            "content": text(topic, rng.randint(20, 200)),
+            "is_public": True,
+            "user_id": ObjectId(),
+            "author": "벤치",
+            "author_profile_image": None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+    results = {"diaries": args.diaries, "idf_sample": args.idf_sample}
+
+    # 1. 구축 (tracemalloc은 구축을 크게 느리게 하므로 메모리는 따로 한 번 더 구축해 측정)
+    started = time.perf_counter()
+    index = await similar.build_index(diaries, idf_sample=args.idf_sample)
+    results["build_seconds"] = round(time.perf_counter() - started, 2)
+    results["index"] = index.stats()
+    if not args.skip_memory:
+        del index
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        index = await similar.build_index(diaries, idf_sample=args.idf_sample)
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        retained = sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+        results["index_memory_mb"] = round(retained / 1024 / 1024, 1)
+
+    # 2. 조회
+    samples = [diary async for diary in diaries.iter_public(limit=args.diaries)]
+    queries = rng.sample(samples, min(args.queries, len(samples)))
+    latencies = []
+    for diary in queries:
+        started = time.perf_counter()
+        index.similar_to(similar.document_text(diary), args.limit, exclude=diary["_id"])
+        latencies.append((time.perf_counter() - started) * 1000)
+    results["query_ms"] = {
+        "p50": round(statistics.median(latencies), 2),
+        "p95": round(percentile(latencies, 0.95), 2),
+        "p99": round(percentile(latencies, 0.99), 2),
+        "max": round(max(latencies), 2),
+    }
+
+    # 3. 증분 반영 (수정은 기존 슬롯을 비우고 새로 넣음)
+    updates = rng.sample(samples, min(1000, len(samples)))
+    started = time.perf_counter()
+    for diary in updates:
+        index.add(diary["_id"], similar.document_text(diary))
+    results["update_us"] = round((time.perf_counter() - started) / len(updates) * 1e6, 1)
+    results["tombstones"] = index.tombstones
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="비슷한 일기 추천 색인 측정")
+    parser.add_argument("--diaries", type=int, default=100000, help="공개 일기 수")
+    parser.add_argument("--vocabulary", type=int, default=30000, help="합성 어휘 크기")
+    parser.add_argument("--topics", type=int, default=500, help="주제 수")
+    parser.add_argument("--queries", type=int, default=1000, help="추천 조회 수")
+    parser.add_argument("--limit", type=int, default=5, help="추천 개수")
+    parser.add_argument("--idf-sample", type=int, default=similar.IDF_SAMPLE, help="IDF 추정에 쓰는 일기 수")
+    parser.add_argument("--skip-memory", action="store_true", help="메모리 측정용 두 번째 구축 생략")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
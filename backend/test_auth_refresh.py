@@ -0,0 +1,120 @@
+"""리프레시 토큰 교체/재사용 검사
+
+메모리 저장소로 앱을 띄워 /api/auth/refresh를 호출하고 토큰 계열(같은 로그인에서 이어진 토큰)의 상태를 확인합니다.
+
+- 교체된 토큰을 유예 시간(REFRESH_TOKEN_REUSE_GRACE_SECONDS) 안에 다시 쓰면 받아들이고 계열은 그대로인지
+- 유예 시간 뒤에 다시 쓰면 401이고 같은 계열의 다른 토큰도 모두 401인지 (다른 로그인의 토큰은 그대로)
+- 로그아웃한 토큰과 알 수 없는 토큰은 401
+
+사용법 (backend 디렉토리에서, MongoDB 불필요):
+    python test_auth_refresh.py
+"""
+import os
+import sys
+
+# app 모듈을 불러오기 전에 메모리 저장소로 전환
+os.environ["DATA_BACKEND"] = "memory"
+
+from fastapi.testclient import TestClient
+
+from app import auth
+from app.main import app
+
+USERNAME = "refresh_user"
+PASSWORD = "password1"
+
+
+def login(client) -> str:
+    response = client.post("/api/auth/login-json", json={"username": USERNAME, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["refresh_token"]
+
+
+def refresh(client, token: str):
+    """(상태 코드, 새 리프레시 토큰 또는 None)"""
+    response = client.post("/api/auth/refresh", json={"refresh_token": token})
+    if response.status_code != 200:
+        return response.status_code, None
+    body = response.json()
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {body['access_token']}"})
+    return (response.status_code if me.status_code == 200 else me.status_code), body["refresh_token"]
+
+
+def report(name: str, ok: bool, failures: list, detail: str):
+    print(f"{name:<40} {'ok' if ok else 'FAIL'}")
+    if not ok:
+        failures.append(f"{name}: {detail}")
+
+
+def check_reuse_within_grace(client) -> list:
+    """두 탭이 같은 토큰으로 동시에 재발급하는 경우"""
+    failures = []
+    first = login(client)
+    status, tab_a = refresh(client, first)
+    report("refresh rotates token", status == 200 and tab_a not in (None, first), failures, f"status {status}")
+
+    status, tab_b = refresh(client, first)
+    report("reuse within grace accepted", status == 200 and tab_b not in (None, tab_a), failures,
+           f"status {status}")
+
+    statuses = [refresh(client, token)[0] for token in (tab_a, tab_b) if token]
+    report("family kept after reuse within grace", statuses == [200, 200], failures, f"statuses {statuses}")
+    return failures
+
+
+def check_reuse_after_grace(client) -> list:
+    """유예 시간 뒤 재사용은 탈취로 보고 계열 전체 폐기"""
+    failures = []
+    other_session = login(client)
+    stolen = login(client)
+    _, rotated = refresh(client, stolen)
+    _, sibling = refresh(client, stolen)
+    _, latest = refresh(client, rotated)
+
+    grace = auth.REFRESH_TOKEN_REUSE_GRACE_SECONDS
+    auth.REFRESH_TOKEN_REUSE_GRACE_SECONDS = -1
+    try:
+        status, _ = refresh(client, stolen)
+    finally:
+        auth.REFRESH_TOKEN_REUSE_GRACE_SECONDS = grace
+    report("reuse after grace rejected", status == 401, failures, f"status {status}")
+
+    statuses = [refresh(client, token)[0] for token in (rotated, sibling, latest)]
+    report("whole family revoked", statuses == [401, 401, 401], failures, f"statuses {statuses}")
+
+    status, _ = refresh(client, other_session)
+    report("other login unaffected", status == 200, failures, f"status {status}")
+    return failures
+
+
+def check_logout_and_unknown(client) -> list:
+    failures = []
+    token = login(client)
+    client.post("/api/auth/logout", json={"refresh_token": token})
+    statuses = [refresh(client, token)[0], refresh(client, "not-a-token")[0]]
+    report("logged out and unknown tokens rejected", statuses == [401, 401], failures, f"statuses {statuses}")
+    return failures
+
+
+def main() -> int:
+    failures = []
+    with TestClient(app) as client:
+        client.post("/api/auth/register", json={
+            "username": USERNAME, "email": f"{USERNAME}@example.com", "password": PASSWORD,
+        }).raise_for_status()
+        failures += check_reuse_within_grace(client)
+        failures += check_reuse_after_grace(client)
+        failures += check_logout_and_unknown(client)
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All refresh token checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
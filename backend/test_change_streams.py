@@ -0,0 +1,172 @@
+"""change stream 기반 캐시 무효화 검사 (단일 노드 레플리카셋 필요)
+
+다른 워커 역할을 하는 별도 클라이언트로 쓰기를 하고, 리스너가 로컬 캐시를
+무효화하는지 확인합니다.
+
+- 다른 프로세스의 사용자 수정이 /api/auth/me 캐시에 반영되는지 (앱 전체 경로)
+- 리스너를 멈춘 사이의 쓰기가 저장된 재개 토큰으로 재시작 후 전달되는지
+- 스트림이 없는 동안 캐시가 fallback TTL로 만료되는지
+
+단일 노드 레플리카셋 준비:
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval 'rs.initiate()'
+
+사용법 (backend 디렉토리에서):
+    MONGODB_URL="mongodb://localhost:27017/?directConnection=true" python test_change_streams.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+# app 모듈을 불러오기 전에 검사용 DB로 전환
+DATABASE = os.environ.get("CHANGE_STREAM_TEST_DATABASE", "diary_db_change_streams")
+os.environ["DATABASE_NAME"] = DATABASE
+os.environ.setdefault("MONGODB_PREWARM", "false")
+os.environ["CHANGE_STREAMS_ENABLED"] = "true"
+os.environ["CHANGE_STREAM_TOKEN_SAVE_SECONDS"] = "0"
+
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from app.cache import InvalidationRegistry, LocalCache, tag
+from app.change_streams import TOKEN_COLLECTION, ChangeStreamListener
+from app.database import settings
+
+TIMEOUT = 10.0
+
+
+def wait_until(predicate, timeout: float = TIMEOUT) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+async def async_wait_until(predicate, timeout: float = TIMEOUT) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+def check_app_invalidation(other_worker) -> list:
+    """다른 워커에서 닉네임을 바꾸면 이 워커의 인증 캐시가 갱신되는지"""
+    from app.main import app
+
+    failures = []
+    with TestClient(app) as client:
+        response = client.post("/api/auth/register", json={
+            "username": "cs_user", "email": "cs_user@example.com", "password": "password1", "nickname": "before",
+        })
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        from app.change_streams import listener
+        if not wait_until(lambda: listener is not None and listener.invalidation.healthy):
+            return ["change stream listener did not start (is this a replica set?)"]
+
+        # 첫 조회로 캐시 채우기
+        assert client.get("/api/auth/me", headers=headers).json()["nickname"] == "before"
+
+        other_worker.users.update_one({"username": "cs_user"}, {"$set": {"nickname": "after"}})
+        updated = wait_until(
+            lambda: client.get("/api/auth/me", headers=headers).json()["nickname"] == "after"
+        )
+        print(f"{'cross-worker user update':<40} {'ok' if updated else 'FAIL'}")
+        if not updated:
+            failures.append("user update from another worker was not reflected in /api/auth/me")
+    return failures
+
+
+async def check_resume_and_fallback(db, other_worker) -> list:
+    """재개 토큰으로 재시작 후 놓친 이벤트 수신, 스트림 중단 시 fallback TTL"""
+    failures = []
+    now = datetime.now(timezone.utc)
+    changed_id = other_worker.users.insert_one({"username": "cs_changed", "email": "c@example.com",
+                                                "created_at": now}).inserted_id
+    untouched_id = other_worker.users.insert_one({"username": "cs_untouched", "email": "u@example.com",
+                                                  "created_at": now}).inserted_id
+
+    registry = InvalidationRegistry()
+    first = ChangeStreamListener(db, invalidation=registry, token_save_seconds=0)
+    first.start()
+    await async_wait_until(lambda: registry.healthy)
+    # 토큰이 한 번 이상 저장되도록 이벤트 하나 흘려보냄
+    other_worker.users.update_one({"_id": untouched_id}, {"$set": {"touched_at": now}})
+    await async_wait_until(lambda: first._saved_token is not None)
+    await asyncio.sleep(0.5)
+    await first.stop()
+
+    # 리스너가 없는 동안의 쓰기
+    other_worker.users.update_one({"_id": changed_id}, {"$set": {"nickname": "missed"}})
+
+    registry = InvalidationRegistry()
+    cache = LocalCache("resume_check", 10, fallback_ttl=0.5, invalidation=registry)
+    cache.watch("users")
+    cache.set("cs_changed", {"nickname": None}, tags=[tag("users", changed_id)])
+    cache.set("cs_untouched", {}, tags=[tag("users", untouched_id)])
+
+    second = ChangeStreamListener(db, invalidation=registry, token_save_seconds=0)
+    second.start()
+    resumed = await async_wait_until(lambda: "cs_changed" not in cache._entries)
+    # 재개에 성공했다면 전체 flush 없이 바뀐 문서만 무효화됨
+    kept = "cs_untouched" in cache._entries
+    print(f"{'resume after restart':<40} {'ok' if resumed and kept else 'FAIL'}")
+    if not resumed:
+        failures.append("write made while the listener was stopped was not replayed from the resume token")
+    elif not kept:
+        failures.append("listener flushed all caches instead of resuming from the stored token")
+
+    await second.stop()
+    # 스트림이 없으면 남은 항목은 fallback TTL 뒤에 만료됨
+    await asyncio.sleep(0.6)
+    expired = cache.get("cs_untouched") is None
+    print(f"{'fallback TTL without stream':<40} {'ok' if expired else 'FAIL'}")
+    if not expired:
+        failures.append("cache entry outlived the fallback TTL while the stream was down")
+    return failures
+
+
+def main() -> int:
+    sync_client = MongoClient(settings.url)
+    if not sync_client.admin.command("hello").get("setName"):
+        print("MongoDB is not running as a replica set; see the instructions at the top of this file")
+        return 1
+    sync_client.drop_database(DATABASE)
+    other_worker = sync_client[DATABASE]
+
+    failures = check_app_invalidation(other_worker)
+
+    async def run_listener_checks():
+        client = AsyncIOMotorClient(settings.url)
+        try:
+            await client[DATABASE][TOKEN_COLLECTION].delete_many({})
+            return await check_resume_and_fallback(client[DATABASE], other_worker)
+        finally:
+            client.close()
+
+    failures += asyncio.run(run_listener_checks())
+
+    sync_client.drop_database(DATABASE)
+    sync_client.close()
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All change stream checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""일기 첨부 이미지 참조 수와 Range 요청 검사
+
+메모리 저장소와 임시 저장소 디렉터리로 앱을 띄워 이미지를 올리고 일기에 붙였다 떼면서 images 문서의 refs를 확인합니다.
+
+- 같은 내용을 두 번 올리면 파일 하나, 일기 하나에 같은 이미지를 여러 번 넣어도 참조는 하나
+- 일기 작성/수정/삭제에 따른 참조 증감, 참조가 0인 이미지만 정리(image.collect)되고 쓰이는 이미지는 남는지
+- 수정이 읽은 뒤 저장하기 전에 그 일기가 지워지면 404이고, 다른 일기가 쓰는 이미지의 참조를 내리지 않는지
+- 같은 이미지를 빼는 수정 두 개가 겹쳐도 참조를 두 번 내리지 않는지
+- 단일 Range 해석(routes/image.py)과 206/416 응답
+
+사용법 (backend 디렉토리에서, MongoDB 불필요):
+    python test_images.py
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+
+# app 모듈을 불러오기 전에 메모리 저장소와 임시 저장소 디렉터리로 전환 (정리는 검사에서 직접 호출)
+STORE = tempfile.TemporaryDirectory()
+os.environ["DATA_BACKEND"] = "memory"
+os.environ["IMAGE_STORE_DIR"] = STORE.name
+os.environ["IMAGE_ORPHAN_GRACE_SECONDS"] = "3600"
+
+import httpx
+from PIL import Image
+
+from app import attachments
+from app.database import get_repositories
+from app.main import app
+from app.routes.image import _byte_range
+
+
+def png(color: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def register(client, username: str) -> dict:
+    response = await client.post("/api/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "password1",
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def upload(client, headers: dict, body: bytes) -> str:
+    response = await client.post("/api/images/", content=body, headers=headers)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def new_diary(client, headers: dict, images: list) -> str:
+    response = await client.post("/api/diaries/", json={"title": "사진", "content": "c", "images": images},
+                                 headers=headers)
+    response.raise_for_status()
+    return response.json()["_id"]
+
+
+async def refs(*digests) -> list:
+    images = await get_repositories().images.get_many(list(digests))
+    return [images[digest]["refs"] if digest in images else None for digest in digests]
+
+
+def stored_files(digest: str) -> int:
+    return len(list((attachments.STORE_DIR / digest[:2]).glob(f"{digest}.*")))
+
+
+async def collect(*digests) -> int:
+    """유예 기간 없이 정리 작업 실행"""
+    grace = attachments.ORPHAN_GRACE_SECONDS
+    attachments.ORPHAN_GRACE_SECONDS = 0
+    try:
+        await asyncio.sleep(0.01)
+        return await attachments.collect_images({"digests": list(digests)})
+    finally:
+        attachments.ORPHAN_GRACE_SECONDS = grace
+
+
+def report(name: str, ok: bool, failures: list, detail: str):
+    print(f"{name:<44} {'ok' if ok else 'FAIL'}")
+    if not ok:
+        failures.append(f"{name}: {detail}")
+
+
+async def check_refcounts(client, headers: dict) -> list:
+    failures = []
+    red, green, blue = png("red"), png("green"), png("blue")
+    x = await upload(client, headers, red)
+    again = await upload(client, headers, red)
+    y = await upload(client, headers, green)
+    report("same content stored once", again == x and stored_files(x) == 1 and await refs(x) == [0], failures,
+           f"ids {x} {again}, files {stored_files(x)}, refs {await refs(x)}")
+
+    d1 = await new_diary(client, headers, [x, x, y])
+    images = (await client.get(f"/api/diaries/{d1}", headers=headers)).json()["images"]
+    d2 = await new_diary(client, headers, [x])
+    ok = [image["id"] for image in images] == [x, y] and await refs(x, y) == [2, 1]
+    report("create attaches each image once", ok, failures, f"images {images}, refs {await refs(x, y)}")
+
+    z = await upload(client, headers, blue)
+    response = await client.put(f"/api/diaries/{d1}", json={"images": [y, z]}, headers=headers)
+    ok = response.status_code == 200 and await refs(x, y, z) == [1, 1, 1]
+    report("update attaches new and detaches dropped", ok, failures,
+           f"status {response.status_code}, refs {await refs(x, y, z)}")
+
+    response = await client.put(f"/api/diaries/{d1}", json={"images": ["0" * 64]}, headers=headers)
+    ok = response.status_code == 400 and await refs(x, y, z) == [1, 1, 1]
+    report("unknown image rejected without changes", ok, failures,
+           f"status {response.status_code}, refs {await refs(x, y, z)}")
+
+    await client.delete(f"/api/diaries/{d2}", headers=headers)
+    ok = await refs(x, y, z) == [0, 1, 1]
+    report("delete detaches images", ok, failures, f"refs {await refs(x, y, z)}")
+
+    collected = await collect(x, y, z)
+    ok = collected == 1 and await refs(x, y, z) == [None, 1, 1] and stored_files(x) == 0 and stored_files(y) == 1
+    report("collect removes only unreferenced", ok, failures,
+           f"collected {collected}, refs {await refs(x, y, z)}, files {stored_files(x)} {stored_files(y)}")
+    return failures
+
+
+async def check_update_races(client, headers: dict) -> list:
+    """수정이 읽은 뒤 저장하기 전에 다른 요청이 끼어드는 경우 (저장소 update 직전에 실행)"""
+    failures = []
+    diaries = get_repositories().diaries
+    update = diaries.update
+    shared = await upload(client, headers, png("yellow"))
+    extra = await upload(client, headers, png("purple"))
+
+    def interleave(request):
+        state = {"done": False}
+
+        async def racing_update(diary_id, fields, expected=None):
+            if not state["done"]:
+                state["done"] = True
+                await request()
+            return await update(diary_id, fields, expected)
+        return racing_update
+
+    # 같은 이미지를 쓰는 일기 둘 중 하나를 수정하는 사이에 삭제
+    d1 = await new_diary(client, headers, [shared])
+    d2 = await new_diary(client, headers, [shared])
+    diaries.update = interleave(lambda: client.delete(f"/api/diaries/{d1}", headers=headers))
+    try:
+        response = await client.put(f"/api/diaries/{d1}", json={"images": [extra]}, headers=headers)
+    finally:
+        diaries.update = update
+    ok = response.status_code == 404 and await refs(shared, extra) == [1, 0]
+    report("update of concurrently deleted diary", ok, failures,
+           f"status {response.status_code}, refs {await refs(shared, extra)}")
+    await collect(shared)
+    report("image still used elsewhere is kept", stored_files(shared) == 1, failures,
+           f"files {stored_files(shared)}")
+
+    # 같은 이미지를 빼는 수정 두 개
+    d3 = await new_diary(client, headers, [shared, extra])
+    diaries.update = interleave(lambda: client.put(f"/api/diaries/{d3}", json={"images": [extra]}, headers=headers))
+    try:
+        response = await client.put(f"/api/diaries/{d3}", json={"images": [extra]}, headers=headers)
+    finally:
+        diaries.update = update
+    images = [image["id"] for image in response.json().get("images", [])]
+    ok = response.status_code == 200 and images == [extra] and await refs(shared, extra) == [1, 1]
+    report("overlapping edits detach once", ok, failures,
+           f"status {response.status_code}, images {images}, refs {await refs(shared, extra)}")
+
+    await client.delete(f"/api/diaries/{d2}", headers=headers)
+    await client.delete(f"/api/diaries/{d3}", headers=headers)
+    ok = await refs(shared, extra) == [0, 0]
+    report("refs return to zero", ok, failures, f"refs {await refs(shared, extra)}")
+    return failures
+
+
+def check_byte_range() -> list:
+    """크기 100바이트 파일에 대한 Range 헤더 해석"""
+    failures = []
+    cases = {
+        "bytes=0-9": (0, 9), "bytes=90-": (90, 99), "bytes=-10": (90, 99), "bytes=-200": (0, 99),
+        "bytes=50-500": (50, 99), "bytes=5-2": None, "bytes=0-1,5-6": None, "items=0-1": None, "bytes=-": None,
+    }
+    for header, expected in cases.items():
+        got = _byte_range(header, 100)
+        report(f"range {header}", got == expected, failures, f"expected {expected}, got {got}")
+    for header in ("bytes=100-", "bytes=-0"):
+        try:
+            got = _byte_range(header, 100)
+        except ValueError:
+            got = "ValueError"
+        report(f"range {header} not satisfiable", got == "ValueError", failures, f"got {got}")
+    return failures
+
+
+async def check_range_requests(client, headers: dict) -> list:
+    failures = []
+    body = png("orange")
+    digest = await upload(client, headers, body)
+    path = f"/api/images/{digest}.png"
+
+    response = await client.get(path, headers={"Range": "bytes=0-9"})
+    ok = (response.status_code == 206 and response.content == body[:10]
+          and response.headers["content-range"] == f"bytes 0-9/{len(body)}")
+    report("206 partial content", ok, failures, f"status {response.status_code}, {response.headers}")
+
+    response = await client.get(path, headers={"Range": f"bytes={len(body)}-"})
+    ok = response.status_code == 416 and response.headers["content-range"] == f"bytes */{len(body)}"
+    report("416 past end of file", ok, failures, f"status {response.status_code}")
+
+    response = await client.get(path, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    ok = response.status_code == 200 and response.content == body
+    report("If-Range mismatch sends whole file", ok, failures, f"status {response.status_code}")
+    return failures
+
+
+async def run_checks() -> list:
+    failures = []
+    async with app.router.lifespan_context(app):
+        # 처리 중 예외는 500 응답으로 받아 검사 실패로 보고
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = await register(client, "image_author")
+            failures += await check_refcounts(client, headers)
+            failures += await check_update_races(client, headers)
+            failures += check_byte_range()
+            failures += await check_range_requests(client, headers)
+    return failures
+
+
+def main() -> int:
+    failures = asyncio.run(run_checks())
+    STORE.cleanup()
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All image checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""알림함 동작 검사
+
+메모리 저장소로 앱을 띄워 좋아요와 댓글을 보내고, 알림 버퍼를 직접 반영(flush)한 뒤 알림 목록과 배지 수를 확인합니다.
+
+- 같은 일기에 여러 번 온 좋아요는 (반영을 여러 번 나눠도) 안 읽은 알림 하나로 합쳐지고 count가 좋아요 수인지
+- 본인 좋아요는 알리지 않음 (count에는 들어감)
+- /api/notifications/read 후 /api/notifications/unread가 0으로 돌아오는지 (id 지정, 전체)
+- 읽은 뒤 새로 온 좋아요는 새 알림으로 쌓이는지
+
+사용법 (backend 디렉토리에서, MongoDB 불필요):
+    python test_notifications.py
+"""
+import asyncio
+import os
+import sys
+
+# app 모듈을 불러오기 전에 메모리 저장소로 전환 (반영은 검사에서 직접 호출)
+os.environ["DATA_BACKEND"] = "memory"
+os.environ["NOTIFICATIONS_FLUSH_SECONDS"] = "3600"
+
+import httpx
+
+from app import notifications
+from app.main import app
+
+
+async def register(client, username: str) -> dict:
+    response = await client.post("/api/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "password1",
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def inbox(client, headers: dict) -> tuple:
+    """버퍼를 반영한 뒤 ([(kind, count, read)], 배지 수)"""
+    await notifications.notifier.flush()
+    items = (await client.get("/api/notifications/", headers=headers)).json()["items"]
+    unread = (await client.get("/api/notifications/unread", headers=headers)).json()["unread"]
+    return [(item["kind"], item["count"], item["read"]) for item in items], unread
+
+
+def report(name: str, ok: bool, failures: list, detail: str):
+    print(f"{name:<40} {'ok' if ok else 'FAIL'}")
+    if not ok:
+        failures.append(f"{name}: {detail}")
+
+
+async def check_like_collapse(client, owner: dict, likers: list, diary_id: str) -> list:
+    """좋아요 3명(한 명은 취소 후 다시)과 작성자 본인, 반영은 두 번에 나눠서"""
+    failures = []
+    like = f"/api/diaries/{diary_id}/like"
+    await client.post(like, headers=likers[0])
+    await client.post(like, headers=likers[1])
+    await client.post(like, headers=likers[1])
+    await client.post(like, headers=likers[1])
+    await client.post(like, headers=owner)
+    await notifications.notifier.flush()
+    await client.post(like, headers=likers[2])
+
+    items, unread = await inbox(client, owner)
+    ok = items == [("diary.like", 4, False)] and unread == 1
+    report("repeated likes collapse into one", ok, failures, f"items {items}, unread {unread}")
+    return failures
+
+
+async def check_read_resets_unread(client, owner: dict, likers: list, diary_id: str) -> list:
+    failures = []
+    await client.post(f"/api/diaries/{diary_id}/comments", json={"content": "첫 댓글"}, headers=likers[0])
+    items, unread = await inbox(client, owner)
+    report("comment adds a second notification", unread == 2 and len(items) == 2, failures,
+           f"items {items}, unread {unread}")
+
+    listed = (await client.get("/api/notifications/", headers=owner)).json()["items"]
+    first = listed[0]["id"]
+    response = await client.post("/api/notifications/read", json={"ids": [first]}, headers=owner)
+    _, unread = await inbox(client, owner)
+    ok = response.json()["unread"] == 1 and unread == 1
+    report("read by id decrements unread", ok, failures, f"read -> {response.json()}, unread {unread}")
+
+    response = await client.post("/api/notifications/read", headers=owner)
+    items, unread = await inbox(client, owner)
+    ok = response.json()["unread"] == 0 and unread == 0 and all(read for _, _, read in items)
+    report("read all resets unread to 0", ok, failures, f"read -> {response.json()}, items {items}, unread {unread}")
+
+    # 읽은 알림에는 합치지 않고 새 알림으로
+    await client.post(f"/api/diaries/{diary_id}/like", headers=likers[0])
+    await client.post(f"/api/diaries/{diary_id}/like", headers=likers[0])
+    items, unread = await inbox(client, owner)
+    ok = unread == 1 and items[0] == ("diary.like", 4, False)
+    report("like after read starts a new group", ok, failures, f"items {items}, unread {unread}")
+    return failures
+
+
+async def run_checks() -> list:
+    failures = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            owner = await register(client, "notify_owner")
+            likers = [await register(client, f"notify_liker{index}") for index in range(3)]
+            response = await client.post("/api/diaries/", json={"title": "알림", "content": "c", "is_public": True},
+                                         headers=owner)
+            diary_id = response.json()["_id"]
+            failures += await check_like_collapse(client, owner, likers, diary_id)
+            failures += await check_read_resets_unread(client, owner, likers, diary_id)
+    return failures
+
+
+def main() -> int:
+    failures = asyncio.run(run_checks())
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All notification checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
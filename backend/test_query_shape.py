@@ -0,0 +1,296 @@
+"""라우트별 MongoDB 쿼리 모양 회귀 검사
+
+로컬 mongod에 시드 데이터를 적재하고 app/routes/의 엔드포인트를 호출하면서
+명령 모니터링으로 실제 발생한 MongoDB 명령을 기록합니다.
+
+- 엔드포인트별 DB 왕복 횟수가 예산 이하인지, 그리고 페이지 크기나 데이터 양이
+  달라도 같은지 확인합니다 (루프 안의 쿼리 = N+1 회귀 검출).
+  커서 배치 경계에서 생기는 getMore는 결과 크기에 비례하므로 예산에서 제외합니다.
+- 기록된 모든 조회 명령을 explain 해서 COLLSCAN 또는 메모리 내 SORT 단계가
+  있으면 실패합니다 (인덱스를 타지 않는 쿼리 회귀 검출).
+
+사용법 (backend 디렉토리에서, 검사용 DB는 매번 새로 만듦):
+    MONGODB_URL=mongodb://localhost:27017 python test_query_shape.py
+"""
+import os
+import sys
+import tempfile
+
+# app 모듈을 불러오기 전에 검사용 DB로 전환
+DATABASE = os.environ.get("QUERY_SHAPE_DATABASE", "diary_db_query_shape")
+os.environ["DATABASE_NAME"] = DATABASE
+os.environ.setdefault("MONGODB_PREWARM", "false")
+# 캐시 적중 여부나 백그라운드 change stream 명령이 왕복 횟수에 섞이지 않도록 끔
+os.environ.setdefault("USER_CACHE_SIZE", "0")
+os.environ.setdefault("CHANGE_STREAMS_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient, monitoring
+
+from app.database import settings
+from benchmarks import seed
+
+# getMore, 세션 정리 등은 결과 크기/수명에 따라 달라지므로 예산에서 제외
+EXCLUDED_FROM_BUDGET = {"getMore", "endSessions", "killCursors"}
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT"}
+# explain에 넘기면 안 되는 드라이버 메타데이터 필드
+DRIVER_FIELDS = {"lsid", "txnNumber", "apiVersion", "apiStrict", "apiDeprecationErrors",
+                 "readConcern", "writeConcern", "$db", "$clusterTime", "$readPreference"}
+
+
+class RecordingListener(monitoring.CommandListener):
+    """검사용 DB로 보낸 명령을 기록"""
+
+    def __init__(self):
+        self.recording = False
+        self.commands = []
+
+    def started(self, event):
+        if self.recording and event.database_name == DATABASE:
+            self.commands.append((event.command_name, dict(event.command)))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+recorder = RecordingListener()
+monitoring.register(recorder)
+
+
+def call(client, method, path, token=None, **kwargs):
+    """요청 하나를 보내고 (응답, 기록된 명령 목록) 반환"""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    recorder.commands = []
+    recorder.recording = True
+    try:
+        response = client.request(method, path, headers=headers, **kwargs)
+    finally:
+        recorder.recording = False
+    if response.status_code >= 400:
+        raise AssertionError(f"{method} {path} -> {response.status_code}: {response.text}")
+    return response, list(recorder.commands)
+
+
+def round_trips(commands) -> int:
+    return sum(1 for name, _ in commands if name not in EXCLUDED_FROM_BUDGET)
+
+
+def plan_stages(node, inside_plan=False):
+    """explain 결과의 winningPlan 하위에 있는 모든 stage 이름"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "stage" and inside_plan and isinstance(value, str):
+                yield value
+            else:
+                yield from plan_stages(value, inside_plan or key == "winningPlan")
+    elif isinstance(node, list):
+        for item in node:
+            yield from plan_stages(item, inside_plan)
+
+
+def explain(db, command_name, command):
+    """기록된 명령을 queryPlanner 모드로 explain"""
+    inner = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+    if command_name in ("update", "delete"):
+        # explain은 단일 문장만 지원
+        statements_key = command_name + "s"
+        inner[statements_key] = inner[statements_key][:1]
+    if command_name == "aggregate":
+        inner.pop("cursor", None)
+    return db.command({"explain": inner, "verbosity": "queryPlanner"})
+
+
+def seed_database(sync_db):
+    """검사용 데이터 적재 (페이지가 가득 차고 인기 편중이 있도록)"""
+    for name in sync_db.list_collection_names():
+        sync_db.drop_collection(name)
+    with tempfile.TemporaryDirectory() as directory:
+        args = seed.parse_args([
+            "--users", "60", "--diaries", "3000", "--comments", "6000", "--likes", "12000",
+            "--seed", "1234", "--manifest", os.path.join(directory, "manifest.json"),
+        ])
+        seed.generate(sync_db, args)
+
+
+def extremes(sync_db, collection, group_field, match=None):
+    """그룹별 문서 수가 가장 적은(1개 이상) 키와 가장 많은 키"""
+    pipeline = [{"$match": match or {}}, {"$group": {"_id": f"${group_field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": 1}}]
+    groups = [group for group in sync_db[collection].aggregate(pipeline) if group["_id"] is not None]
+    return groups[0]["_id"], groups[-1]["_id"]
+
+
+def build_cases(sync_db, tokens):
+    """(이름, 예산, [변형별 요청]) 목록. 같은 케이스의 변형들은 왕복 횟수가 같아야 함"""
+    public = {"is_public": True}
+    public_ids = {doc["_id"] for doc in sync_db.diaries.find(public, {"_id": 1})}
+    comment_counts = {}
+    for doc in sync_db.comments.aggregate([{"$group": {"_id": "$diary_id", "count": {"$sum": 1}}}]):
+        if doc["_id"] in public_ids:
+            comment_counts[doc["_id"]] = doc["count"]
+    ranked = sorted(comment_counts, key=comment_counts.get)
+    cold_diary, hot_diary = str(ranked[0]), str(ranked[-1])
+    cold_comment = sync_db.comments.find_one({"diary_id": ranked[0]}, {"_id": 1})["_id"]
+    hot_comment = sync_db.comments.find_one({"diary_id": ranked[-1]}, {"_id": 1})["_id"]
+
+    author = sync_db.users.find_one({"username": tokens["author_name"]}, {"_id": 1})
+    author_diaries = [str(doc["_id"]) for doc in sync_db.diaries.find({"user_id": author["_id"]}, {"_id": 1}).limit(50)]
+    bulk_titles = lambda diary_ids: {"json": {"operations": [
+        {"id": diary_id, "op": "update", "title": "일괄 수정"} for diary_id in diary_ids
+    ]}}
+
+    token = tokens["author"]
+    light_token = tokens["light_commenter"]
+    heavy_token = tokens["heavy_commenter"]
+
+    return [
+        ("feed (anonymous)", 3, [
+            ("GET", "/api/diaries/?limit=5", None),
+            ("GET", "/api/diaries/?limit=50", None),
+        ]),
+        ("feed (authenticated)", 5, [
+            ("GET", "/api/diaries/?limit=5", token),
+            ("GET", "/api/diaries/?limit=50&skip=100", token),
+        ]),
+        ("diary detail (anonymous)", 2, [
+            ("GET", f"/api/diaries/{cold_diary}", None),
+            ("GET", f"/api/diaries/{hot_diary}", None),
+        ]),
+        ("diary detail (authenticated)", 4, [
+            ("GET", f"/api/diaries/{cold_diary}", token),
+            ("GET", f"/api/diaries/{hot_diary}", token),
+        ]),
+        ("comments newest", 2, [
+            ("GET", f"/api/diaries/{cold_diary}/comments?sort_by=newest", None),
+            ("GET", f"/api/diaries/{hot_diary}/comments?sort_by=newest", None),
+        ]),
+        ("comments by likes (authenticated)", 4, [
+            ("GET", f"/api/diaries/{cold_diary}/comments?sort_by=likes", token),
+            ("GET", f"/api/diaries/{hot_diary}/comments?sort_by=likes", token),
+        ]),
+        ("comment threads", 2, [
+            ("GET", f"/api/diaries/{cold_diary}/comments/threads?limit=5", None),
+            ("GET", f"/api/diaries/{hot_diary}/comments/threads?limit=50", None),
+        ]),
+        ("comment replies", 2, [
+            ("GET", f"/api/comments/{cold_comment}/replies", None),
+            ("GET", f"/api/comments/{hot_comment}/replies", None),
+        ]),
+        ("my diaries", 5, [
+            ("GET", "/api/diaries/me?limit=5", token),
+            ("GET", "/api/diaries/me?limit=50", token),
+        ]),
+        ("my calendar", 2, [
+            ("GET", "/api/diaries/me/calendar", token),
+            ("GET", "/api/diaries/me/calendar?year=2024&month=3", token),
+        ]),
+        ("my comments", 4, [
+            ("GET", "/api/comments/me", light_token),
+            ("GET", "/api/comments/me", heavy_token),
+        ]),
+        ("toggle diary like", 5, [
+            ("POST", f"/api/diaries/{cold_diary}/like", token),
+            ("POST", f"/api/diaries/{hot_diary}/like", token),
+        ]),
+        ("create comment", 6, [
+            ("POST", f"/api/diaries/{cold_diary}/comments", token, {"json": {"content": "쿼리 모양 검사"}}),
+            ("POST", f"/api/diaries/{hot_diary}/comments", token, {"json": {"content": "쿼리 모양 검사"}}),
+        ]),
+        ("bulk edit my diaries", 4, [
+            ("POST", "/api/diaries/me/bulk", token, bulk_titles(author_diaries[:2])),
+            ("POST", "/api/diaries/me/bulk", token, bulk_titles(author_diaries)),
+        ]),
+        ("notification badge", 2, [
+            ("GET", "/api/notifications/unread", light_token),
+            ("GET", "/api/notifications/unread", heavy_token),
+        ]),
+        ("notification inbox", 3, [
+            ("GET", "/api/notifications/?limit=5", light_token),
+            ("GET", "/api/notifications/?limit=50", heavy_token),
+        ]),
+        ("auth me", 1, [
+            ("GET", "/api/auth/me", token),
+        ]),
+        ("login", 1, [
+            ("POST", "/api/auth/login-json", None, {"json": {"username": tokens["author_name"],
+                                                             "password": seed.BENCH_PASSWORD}}),
+        ]),
+    ]
+
+
+def login(client, username):
+    response = client.post("/api/auth/login-json", json={"username": username, "password": seed.BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def main() -> int:
+    sync_client = MongoClient(settings.url)
+    sync_db = sync_client[DATABASE]
+    seed_database(sync_db)
+
+    # 일기를 가장 많이 쓴 사용자 (내 일기 limit=50이 가득 차도록)
+    _, author_id = extremes(sync_db, "diaries", "user_id")
+    light_id, heavy_id = extremes(sync_db, "comments", "user_id")
+    username_of = {doc["_id"]: doc["username"] for doc in sync_db.users.find({}, {"username": 1})}
+
+    failures = []
+    explained = {}
+    from app.main import app
+
+    with TestClient(app) as client:
+        tokens = {
+            "author": login(client, username_of[author_id]),
+            "author_name": username_of[author_id],
+            "light_commenter": login(client, username_of[light_id]),
+            "heavy_commenter": login(client, username_of[heavy_id]),
+        }
+
+        for name, budget, variants in build_cases(sync_db, tokens):
+            counts = []
+            for variant in variants:
+                method, path, token = variant[:3]
+                kwargs = variant[3] if len(variant) > 3 else {}
+                _, commands = call(client, method, path, token, **kwargs)
+                counts.append(round_trips(commands))
+                for command_name, command in commands:
+                    if command_name in EXPLAINABLE:
+                        explained.setdefault((name, command_name, command.get(command_name)), command)
+
+            status = "ok"
+            if max(counts) > budget:
+                status = "over budget"
+                failures.append(f"{name}: {counts} round trips, budget {budget}")
+            elif len(set(counts)) > 1:
+                status = "depends on size"
+                failures.append(f"{name}: round trips vary with data size {counts}")
+            print(f"{name:<36} round trips={counts} budget={budget} {status}")
+
+    print()
+    for (name, command_name, collection), command in explained.items():
+        stages = set(plan_stages(explain(sync_db, command_name, command)))
+        bad = stages & FORBIDDEN_STAGES
+        status = "ok" if not bad else "FAIL " + ",".join(sorted(bad))
+        if bad:
+            failures.append(f"{name}: {command_name} on {collection} uses {sorted(bad)}")
+        print(f"{name:<36} {command_name:<14} {str(collection):<10} {','.join(sorted(stages)):<40} {status}")
+
+    sync_client.drop_database(DATABASE)
+    sync_client.close()
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All query-shape checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""댓글 답글(스레드) 동작 검사
+
+메모리 저장소로 앱을 띄워 댓글 API를 호출하고 순서와 상태를 확인합니다.
+
+- 최상위 댓글은 최신순, 답글은 부모 바로 아래에 작성순 (depth, parent_id, reply_count)
+- sort_by=likes는 스레드 단위로 최상위 댓글의 좋아요 순
+- 스레드 페이지 커서로 페이지 경계를 넘겨도 빠지거나 겹치는 스레드가 없는지
+- 답글 깊이 제한(MAX_REPLY_DEPTH)
+- 답글이 있어 삭제 표시만 남은 부모는 마지막 답글이 지워지면 함께 삭제됨 (여러 단계 연쇄 포함)
+
+사용법 (backend 디렉토리에서, MongoDB 불필요):
+    python test_threads.py
+"""
+import os
+import sys
+
+# app 모듈을 불러오기 전에 메모리 저장소로 전환
+os.environ["DATA_BACKEND"] = "memory"
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes.comment import MAX_REPLY_DEPTH
+
+
+def register(client, username: str) -> dict:
+    response = client.post("/api/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "password1",
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def new_diary(client, headers, title: str) -> str:
+    response = client.post("/api/diaries/", json={"title": title, "content": "c", "is_public": True}, headers=headers)
+    response.raise_for_status()
+    return response.json()["_id"]
+
+
+def comment(client, headers, diary_id: str, content: str, parent_id: str = None) -> str:
+    body = {"content": content}
+    if parent_id is not None:
+        body["parent_id"] = parent_id
+    response = client.post(f"/api/diaries/{diary_id}/comments", json=body, headers=headers)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def contents(items) -> list:
+    return [item["content"] for item in items]
+
+
+def report(name: str, ok: bool, failures: list, detail: str):
+    print(f"{name:<40} {'ok' if ok else 'FAIL'}")
+    if not ok:
+        failures.append(f"{name}: {detail}")
+
+
+def check_thread_order(client, headers, reader) -> list:
+    """최상위 최신순, 답글은 부모 아래 작성순, 좋아요순은 스레드째로 이동"""
+    failures = []
+    diary_id = new_diary(client, headers, "스레드 순서")
+    first = comment(client, headers, diary_id, "r1")
+    comment(client, headers, diary_id, "r2")
+    comment(client, headers, diary_id, "r3")
+    reply = comment(client, headers, diary_id, "r1-a", first)
+    comment(client, headers, diary_id, "r1-b", first)
+    comment(client, headers, diary_id, "r1-a-x", reply)
+
+    items = client.get(f"/api/diaries/{diary_id}/comments").json()
+    expected = ["r3", "r2", "r1", "r1-a", "r1-a-x", "r1-b"]
+    report("newest roots, replies under parent", contents(items) == expected, failures,
+           f"expected {expected}, got {contents(items)}")
+
+    by_content = {item["content"]: item for item in items}
+    shape = [(by_content[name]["depth"], by_content[name]["parent_id"]) for name in ("r1", "r1-a", "r1-a-x", "r1-b")]
+    expected_shape = [(0, None), (1, first), (2, reply), (1, first)]
+    counts = (by_content["r1"]["reply_count"], by_content["r1-a"]["reply_count"], by_content["r3"]["reply_count"])
+    report("depth, parent_id, reply_count", shape == expected_shape and counts == (2, 1, 0), failures,
+           f"shape {shape}, reply counts {counts}")
+
+    client.post(f"/api/comments/{first}/like", headers=reader)
+    liked = client.get(f"/api/diaries/{diary_id}/comments?sort_by=likes").json()
+    expected = ["r1", "r1-a", "r1-a-x", "r1-b", "r3", "r2"]
+    report("sort_by=likes moves whole threads", contents(liked) == expected, failures,
+           f"expected {expected}, got {contents(liked)}")
+
+    subtree = client.get(f"/api/comments/{reply}/replies").json()["items"]
+    report("replies endpoint returns subtree", contents(subtree) == ["r1-a", "r1-a-x"], failures,
+           f"got {contents(subtree)}")
+    return failures
+
+
+def check_cursor_pagination(client, headers) -> list:
+    """limit=2로 7개 스레드를 끝까지 넘기기 (페이지마다 최상위 댓글과 그 답글 전체)"""
+    failures = []
+    diary_id = new_diary(client, headers, "스레드 페이지")
+    for index in range(7):
+        root = comment(client, headers, diary_id, f"t{index}")
+        if index % 2 == 0:
+            comment(client, headers, diary_id, f"t{index}-reply", root)
+
+    pages, cursor = [], None
+    while len(pages) < 10:
+        query = f"?limit=2&cursor={cursor}" if cursor else "?limit=2"
+        page = client.get(f"/api/diaries/{diary_id}/comments/threads{query}").json()
+        pages.append(contents(page["items"]))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = [["t6", "t6-reply", "t5"], ["t4", "t4-reply", "t3"], ["t2", "t2-reply", "t1"], ["t0", "t0-reply"]]
+    report("thread cursor across pages", pages == expected, failures, f"expected {expected}, got {pages}")
+
+    invalid = client.get(f"/api/diaries/{diary_id}/comments/threads?cursor=not-a-cursor").status_code
+    report("invalid cursor rejected", invalid == 400, failures, f"status {invalid}")
+    return failures
+
+
+def check_depth_limit(client, headers) -> list:
+    """MAX_REPLY_DEPTH까지는 답글을 달 수 있고 그 아래는 400"""
+    failures = []
+    diary_id = new_diary(client, headers, "깊이 제한")
+    parent_id = comment(client, headers, diary_id, "depth-0")
+    for depth in range(1, MAX_REPLY_DEPTH + 1):
+        parent_id = comment(client, headers, diary_id, f"depth-{depth}", parent_id)
+
+    response = client.post(f"/api/diaries/{diary_id}/comments",
+                           json={"content": "too deep", "parent_id": parent_id}, headers=headers)
+    depths = [item["depth"] for item in client.get(f"/api/diaries/{diary_id}/comments").json()]
+    ok = response.status_code == 400 and depths == list(range(MAX_REPLY_DEPTH + 1))
+    report(f"reply depth limit ({MAX_REPLY_DEPTH})", ok, failures,
+           f"status {response.status_code}, depths {depths}")
+    return failures
+
+
+def check_delete_cascade(client, headers) -> list:
+    """삭제 표시만 남은 부모는 마지막 답글 삭제와 함께 사라짐"""
+    failures = []
+    diary_id = new_diary(client, headers, "삭제 연쇄")
+    parent = comment(client, headers, diary_id, "parent")
+    first = comment(client, headers, diary_id, "reply-1", parent)
+    second = comment(client, headers, diary_id, "reply-2", parent)
+    path = f"/api/diaries/{diary_id}/comments"
+
+    client.delete(f"/api/comments/{parent}", headers=headers)
+    items = client.get(path).json()
+    tombstone = items[0] if items else {}
+    ok = contents(items) == ["", "reply-1", "reply-2"] and tombstone.get("is_deleted") and tombstone.get("reply_count") == 2
+    report("parent with replies kept as tombstone", ok, failures, f"got {items}")
+
+    client.delete(f"/api/comments/{first}", headers=headers)
+    items = client.get(path).json()
+    ok = contents(items) == ["", "reply-2"] and items[0]["reply_count"] == 1
+    report("tombstone kept while replies remain", ok, failures, f"got {contents(items)}")
+
+    client.delete(f"/api/comments/{second}", headers=headers)
+    items = client.get(path).json()
+    report("last reply removes tombstone", items == [], failures, f"got {contents(items)}")
+
+    # 삭제 표시 두 단계 아래의 마지막 답글
+    top = comment(client, headers, diary_id, "top")
+    middle = comment(client, headers, diary_id, "middle", top)
+    leaf = comment(client, headers, diary_id, "leaf", middle)
+    sibling = comment(client, headers, diary_id, "sibling")
+    client.delete(f"/api/comments/{top}", headers=headers)
+    client.delete(f"/api/comments/{middle}", headers=headers)
+    client.delete(f"/api/comments/{leaf}", headers=headers)
+    items = client.get(path).json()
+    ok = [item["id"] for item in items] == [sibling]
+    report("cascade through nested tombstones", ok, failures, f"got {[(i['content'], i['depth']) for i in items]}")
+    return failures
+
+
+def main() -> int:
+    failures = []
+    with TestClient(app) as client:
+        headers = register(client, "thread_author")
+        reader = register(client, "thread_reader")
+        failures += check_thread_order(client, headers, reader)
+        failures += check_cursor_pagination(client, headers)
+        failures += check_depth_limit(client, headers)
+        failures += check_delete_cascade(client, headers)
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All comment thread checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
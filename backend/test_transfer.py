@@ -0,0 +1,236 @@
+"""계정 내보내기/가져오기 동작 검사
+
+메모리 저장소로 앱을 띄워 한 사용자의 일기와 댓글(답글 스레드 포함)을 내보내고 다른 계정으로 가져옵니다.
+배치 크기를 3으로 줄여 파일 하나가 여러 체크포인트로 나뉘게 합니다.
+
+- 내보내기 → 가져오기 왕복 후 일기(제목, 내용, 공개 여부, 순서)와 댓글 스레드(내용, depth, reply_count)가 같은지
+- 파일 중간에 끊긴 가져오기를 같은 import_id로 다시 보내면 체크포인트 다음 줄부터 이어서 가져오는지
+- 문서는 들어갔지만 체크포인트 저장 전에 멈춘 배치를 다시 써도 중복이 생기지 않고 답글 수가 두 번 오르지 않는지
+- 끝난 import_id로 다시 보내면 처음부터 다시 확인만 하고 문서가 늘지 않는지
+
+사용법 (backend 디렉토리에서, MongoDB 불필요):
+    python test_transfer.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+# app 모듈을 불러오기 전에 메모리 저장소와 작은 배치로 전환
+os.environ["DATA_BACKEND"] = "memory"
+os.environ["TRANSFER_BATCH_SIZE"] = "3"
+
+import httpx
+
+from app import transfer
+from app.database import get_repositories
+from app.main import app
+
+# 내보내기에 들어가는 사용자의 일기 4개, 댓글 6개 중 남의 일기에 단 1개는 가져오지 않음
+EXPECTED = {"diaries": 4, "comments": 5, "skipped": 1}
+
+
+async def register(client, username: str) -> dict:
+    response = await client.post("/api/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "password1",
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def post(client, path: str, body: dict, headers: dict) -> str:
+    response = await client.post(path, json=body, headers=headers)
+    response.raise_for_status()
+    return response.json()["_id"]
+
+
+async def seed(client) -> dict:
+    """원본 사용자의 일기와 댓글 (남의 일기에 단 댓글, 남이 단 댓글 포함)"""
+    alice = await register(client, "transfer_alice")
+    bob = await register(client, "transfer_bob")
+    diaries = [
+        await post(client, "/api/diaries/", {"title": f"일기 {index}", "content": f"내용 {index}",
+                                            "is_public": index != 2}, alice)
+        for index in range(4)
+    ]
+    bob_diary = await post(client, "/api/diaries/", {"title": "bob", "content": "c"}, bob)
+
+    comments = f"/api/diaries/{diaries[0]}/comments"
+    top = await post(client, comments, {"content": "top"}, alice)
+    reply = await post(client, comments, {"content": "reply", "parent_id": top}, alice)
+    await post(client, comments, {"content": "reply-2", "parent_id": reply}, alice)
+    await post(client, comments, {"content": "second"}, alice)
+    await post(client, f"/api/diaries/{diaries[1]}/comments", {"content": "d1-comment"}, alice)
+    await post(client, f"/api/diaries/{bob_diary}/comments", {"content": "on-bob"}, alice)
+    await post(client, comments, {"content": "from-bob"}, bob)
+    return alice
+
+
+async def user_id(client, headers: dict) -> str:
+    return (await client.get("/api/auth/me", headers=headers)).json()["_id"]
+
+
+async def signature(client, headers: dict) -> list:
+    """사용자의 일기(최신순)와 그 사용자가 단 댓글 스레드"""
+    me = await user_id(client, headers)
+    diaries = (await client.get("/api/diaries/me?limit=50", headers=headers)).json()["items"]
+    result = []
+    for diary in diaries:
+        comments = (await client.get(f"/api/diaries/{diary['_id']}/comments", headers=headers)).json()
+        result.append((
+            diary["title"], diary["content"], diary["is_public"],
+            [(item["content"], item["depth"], item["reply_count"]) for item in comments
+             if item["user_id"] == me],
+        ))
+    return result
+
+
+async def counts(client, headers: dict) -> tuple:
+    """(일기 수, 댓글 수) - 중복이 들어갔으면 원본보다 많아짐"""
+    diaries = (await client.get("/api/diaries/me?limit=50", headers=headers)).json()["total"]
+    comments = len((await client.get("/api/comments/me", headers=headers)).json())
+    return diaries, comments
+
+
+async def interrupted(lines: list, after: int):
+    """after줄까지 보낸 뒤 연결이 끊긴 것처럼 실패하는 줄 스트림"""
+    for number, line in enumerate(lines, 1):
+        if number > after:
+            raise ConnectionError("client disconnected")
+        yield line
+
+
+async def all_lines(lines: list):
+    for line in lines:
+        yield line
+
+
+async def importer(username: str, import_id: str) -> transfer.Importer:
+    user = await get_repositories().users.get_by_username(username)
+    return transfer.Importer(user, import_id)
+
+
+def report(name: str, ok: bool, failures: list, detail: str):
+    print(f"{name:<44} {'ok' if ok else 'FAIL'}")
+    if not ok:
+        failures.append(f"{name}: {detail}")
+
+
+def summary(result: dict) -> dict:
+    return {key: result[key] for key in EXPECTED}
+
+
+async def check_round_trip(client, body: bytes, original: list) -> list:
+    """HTTP로 내보낸 파일을 그대로 다른 계정에 가져오기"""
+    failures = []
+    headers = await register(client, "transfer_dave")
+    response = await client.post("/api/me/import?import_id=round-trip", content=body, headers=headers)
+    result = response.json()
+    ok = response.status_code == 200 and summary(result) == EXPECTED and result["status"] == "done"
+    report("import result", ok, failures, f"{response.status_code} {result}")
+
+    imported = await signature(client, headers)
+    report("export -> import round trip", imported == original, failures,
+           f"expected {original}, got {imported}")
+    return failures
+
+
+async def check_resume(client, lines: list, original: list) -> list:
+    """6번째 줄 뒤에 끊긴 가져오기를 같은 import_id로 이어서"""
+    failures = []
+    headers = await register(client, "transfer_carol")
+    try:
+        await (await importer("transfer_carol", "resume")).run(interrupted(lines, 6))
+        failures.append("interrupted import did not raise")
+    except ConnectionError:
+        pass
+    checkpoint = await get_repositories().imports.get(f"{await user_id(client, headers)}:resume")
+    ok = checkpoint is not None and checkpoint["status"] == "running" and checkpoint["line"] == 6
+    report("checkpoint after interruption", ok, failures,
+           f"expected running at line 6, got {checkpoint and (checkpoint['status'], checkpoint['line'])}")
+
+    result = await (await importer("transfer_carol", "resume")).run(all_lines(lines))
+    ok = result["resumed_from"] == 6 and summary(result) == EXPECTED and result["status"] == "done"
+    report("resume from checkpoint", ok, failures, f"got {result}")
+
+    present = await counts(client, headers)
+    imported = await signature(client, headers)
+    ok = present == (EXPECTED["diaries"], EXPECTED["comments"]) and imported == original
+    report("resumed import has no duplicates", ok, failures, f"counts {present}, threads {imported}")
+    return failures
+
+
+async def check_replay_without_checkpoint(client, lines: list, original: list) -> list:
+    """두 번째 배치를 쓰고 체크포인트 저장 전에 멈춘 가져오기 다시 보내기"""
+    failures = []
+    headers = await register(client, "transfer_erin")
+    imports = get_repositories().imports
+    save = imports.save
+    calls = {"count": 0}
+
+    async def failing_save(checkpoint_id, fields, now):
+        calls["count"] += 1
+        if calls["count"] >= 2:
+            raise RuntimeError("connection lost before checkpoint")
+        await save(checkpoint_id, fields, now)
+
+    imports.save = failing_save
+    try:
+        await (await importer("transfer_erin", "replay")).run(all_lines(lines))
+        failures.append("import with failing checkpoint did not raise")
+    except RuntimeError:
+        pass
+    finally:
+        imports.save = save
+
+    result = await (await importer("transfer_erin", "replay")).run(all_lines(lines))
+    ok = 0 < result["resumed_from"] < len(lines) and summary(result) == EXPECTED
+    report("replay batch written before checkpoint", ok, failures, f"got {result}")
+
+    present = await counts(client, headers)
+    imported = await signature(client, headers)
+    ok = present == (EXPECTED["diaries"], EXPECTED["comments"]) and imported == original
+    report("replayed batch has no duplicates", ok, failures, f"counts {present}, threads {imported}")
+
+    result = await (await importer("transfer_erin", "replay")).run(all_lines(lines))
+    present = await counts(client, headers)
+    ok = (result["resumed_from"] == 0 and summary(result) == EXPECTED
+          and present == (EXPECTED["diaries"], EXPECTED["comments"]) and await signature(client, headers) == original)
+    report("re-sending a finished import", ok, failures, f"result {result}, counts {present}")
+    return failures
+
+
+async def run_checks() -> list:
+    failures = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            alice = await seed(client)
+            response = await client.get("/api/me/export", headers=alice)
+            lines = response.content.splitlines()
+            kinds = [json.loads(line)["type"] for line in lines]
+            ok = response.status_code == 200 and kinds == ["account"] + ["diary"] * 4 + ["comment"] * 6
+            report("export lines", ok, failures, f"{response.status_code} {kinds}")
+
+            original = await signature(client, alice)
+            failures += await check_round_trip(client, response.content, original)
+            failures += await check_resume(client, lines, original)
+            failures += await check_replay_without_checkpoint(client, lines, original)
+    return failures
+
+
+def main() -> int:
+    failures = asyncio.run(run_checks())
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All transfer checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""일기 조회 수/순 조회자 반영 검사
+
+상세 조회를 보내고 조회 버퍼를 직접 반영(flush)한 뒤 일기 응답의 view_count, unique_viewers를 확인합니다.
+
+- 클라이언트 주소가 없는 비로그인 조회(Unix 소켓 뒤 등)는 조회자를 알 수 없어 빈 스케치만 남는데,
+  그런 조회만 모인 배치도 반영되고 조회 수에 들어가는지
+- 로그인 사용자와 IP가 다른 비로그인 조회자가 섞인 배치의 순 조회자 추정
+- 작성자 본인의 조회는 세지 않음
+
+사용법 (backend 디렉토리에서, 기본은 메모리 저장소):
+    python test_views.py
+    DATA_BACKEND=mongodb MONGODB_URL=mongodb://localhost:27017 python test_views.py
+"""
+import asyncio
+import os
+import sys
+
+# app 모듈을 불러오기 전에 검사용 설정으로 전환 (반영은 검사에서 직접 호출)
+DATABASE = os.environ.get("VIEWS_TEST_DATABASE", "diary_db_views")
+os.environ["DATABASE_NAME"] = DATABASE
+os.environ.setdefault("DATA_BACKEND", "memory")
+os.environ.setdefault("MONGODB_PREWARM", "false")
+os.environ.setdefault("CHANGE_STREAMS_ENABLED", "false")
+os.environ["VIEWS_FLUSH_SECONDS"] = "3600"
+
+import httpx
+
+from app import views
+from app.database import settings
+from app.main import app
+
+
+async def register(client, username: str) -> dict:
+    response = await client.post("/api/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "password1",
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def view_stats(client, diary_id: str, headers: dict) -> tuple:
+    """버퍼를 반영한 뒤 (view_count, unique_viewers), 작성자로 조회해 조회 수에 섞이지 않게 함"""
+    await views.counter.flush()
+    diary = (await client.get(f"/api/diaries/{diary_id}", headers=headers)).json()
+    return diary["view_count"], diary["unique_viewers"]
+
+
+async def check_anonymous_without_client(author, headers) -> list:
+    """클라이언트 주소 없는 비로그인 조회만 있는 배치도 반영되는지"""
+    failures = []
+    diary = (await author.post("/api/diaries/", json={"title": "소켓 뒤", "content": "c"}, headers=headers)).json()
+
+    # ASGI scope의 client가 None인 요청 (request.client is None)
+    transport = httpx.ASGITransport(app=app, client=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as anonymous:
+        for _ in range(3):
+            response = await anonymous.get(f"/api/diaries/{diary['_id']}")
+            if response.status_code != 200:
+                return [f"anonymous view without client host -> {response.status_code}"]
+
+    try:
+        stats = await view_stats(author, diary["_id"], headers)
+    except Exception as exc:
+        stats = None
+        failures.append(f"flush of views without a known viewer failed: {type(exc).__name__}: {exc}")
+    ok = stats == (3, 0) and not views.counter._pending
+    print(f"{'anonymous view without client host':<40} {stats} {'ok' if ok else 'FAIL'}")
+    if stats is not None and not ok:
+        failures.append(f"anonymous views without client host: expected (3, 0) and an empty buffer, got {stats}")
+    return failures
+
+
+async def check_mixed_viewers(author, headers) -> list:
+    """로그인 사용자 2명(한 명은 두 번), IP가 다른 비로그인 2명, 작성자 본인의 조회"""
+    diary = (await author.post("/api/diaries/", json={"title": "여러 조회자", "content": "c"}, headers=headers)).json()
+    path = f"/api/diaries/{diary['_id']}"
+
+    for username in ("views_reader1", "views_reader2"):
+        reader = await register(author, username)
+        await author.get(path, headers=reader)
+    await author.get(path, headers=reader)
+    for host in ("10.0.0.1", "10.0.0.2"):
+        transport = httpx.ASGITransport(app=app, client=(host, 5000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as anonymous:
+            await anonymous.get(path)
+    await author.get(path, headers=headers)
+
+    stats = await view_stats(author, diary["_id"], headers)
+    ok = stats == (5, 4)
+    print(f"{'mixed viewers':<40} {stats} {'ok' if ok else 'FAIL'}")
+    return [] if ok else [f"mixed viewers: expected (5, 4), got {stats}"]
+
+
+async def run_checks() -> list:
+    failures = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as author:
+            headers = await register(author, "views_author")
+            failures += await check_anonymous_without_client(author, headers)
+            failures += await check_mixed_viewers(author, headers)
+    return failures
+
+
+def main() -> int:
+    if settings.backend != "memory":
+        from pymongo import MongoClient
+        MongoClient(settings.url).drop_database(DATABASE)
+
+    failures = asyncio.run(run_checks())
+
+    if settings.backend != "memory":
+        MongoClient(settings.url).drop_database(DATABASE)
+
+    print()
+    if failures:
+        print("FAILED")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("All view counting checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { likeAPI } from '../services/api';
 
@@ -9,6 +9,17 @@ const Comment = ({ comment, onUpdate, onDelete }) => {
   const [likesCount, setLikesCount] = useState(comment.likes_count || 0);
   const [isLiked, setIsLiked] = useState(comment.is_liked || false);
 
+  // 실시간 이벤트로 바뀐 좋아요 수/내용 반영
+  useEffect(() => {
+    setLikesCount(comment.likes_count || 0);
+  }, [comment.likes_count]);
+
+  useEffect(() => {
+    if (!isEditing) {
+      setEditContent(comment.content);
+    }
+  }, [comment.content]);
+
   const formatDate = (dateString) => {
     const date = new Date(dateString);
     return date.toLocaleDateString('ko-KR', {
@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo } from 'react';
 import { useAuth } from '../context/AuthContext';
-import { commentAPI } from '../services/api';
+import { commentAPI, eventsAPI } from '../services/api';
 import Comment from './Comment';
 
 const CommentSection = ({ diaryId }) => {
@@ -11,24 +11,58 @@ const CommentSection = ({ diaryId }) => {
   const [error, setError] = useState(null);
   const [sortBy, setSortBy] = useState('newest'); // 정렬 상태 추가
 
+  // 댓글은 최신순으로 한 번만 불러오고, 정렬 변경은 클라이언트에서 처리
   useEffect(() => {
     fetchComments();
-  }, [diaryId, sortBy]); // sortBy가 변경될 때마다 댓글 다시 불러오기
+  }, [diaryId]);
 
-  const fetchComments = async () => {
+  // 실시간 이벤트로 목록 갱신 (다시 불러오지 않음)
+  useEffect(() => {
+    return eventsAPI.subscribeDiary(diaryId, {
+      // 재연결 시 끊긴 동안 놓친 이벤트를 보정하기 위해 다시 조회
+      ready: (_, isReconnect) => {
+        if (isReconnect) fetchComments({ silent: true });
+      },
+      'comment.created': (data) => addComment(data),
+      'comment.updated': (data) => patchComment(data.id, { content: data.content, updated_at: data.updated_at }),
+      'comment.deleted': (data) => removeComment(data.id),
+      'comment.likes': (data) => patchComment(data.id, { likes_count: data.likes_count }),
+    });
+  }, [diaryId]);
+
+  const fetchComments = async ({ silent = false } = {}) => {
     try {
-      setLoading(true);
-      const data = await commentAPI.getComments(diaryId, sortBy);
+      if (!silent) setLoading(true);
+      const data = await commentAPI.getComments(diaryId, 'newest');
       setComments(data);
       setError(null);
     } catch (err) {
       console.error('댓글 조회 실패:', err);
       setError('댓글을 불러오는데 실패했습니다.');
     } finally {
-      setLoading(false);
+      if (!silent) setLoading(false);
     }
   };
 
+  const addComment = (comment) => {
+    // 내가 쓴 댓글은 응답과 이벤트로 두 번 올 수 있으므로 중복 제거
+    setComments((prev) => (prev.some((c) => c.id === comment.id) ? prev : [comment, ...prev]));
+  };
+
+  const patchComment = (commentId, fields) => {
+    setComments((prev) => prev.map((c) => (c.id === commentId ? { ...c, ...fields } : c)));
+  };
+
+  const removeComment = (commentId) => {
+    setComments((prev) => prev.filter((c) => c.id !== commentId));
+  };
+
+  // 좋아요순은 안정 정렬이라 좋아요 수가 같으면 최신순 유지
+  const sortedComments = useMemo(() => {
+    if (sortBy !== 'likes') return comments;
+    return [...comments].sort((a, b) => (b.likes_count || 0) - (a.likes_count || 0));
+  }, [comments, sortBy]);
+
   const handleCreateComment = async (e) => {
     e.preventDefault();
 
@@ -43,9 +77,9 @@ const CommentSection = ({ diaryId }) => {
     }
 
     try {
-      await commentAPI.create(diaryId, newComment);
+      const created = await commentAPI.create(diaryId, newComment);
       setNewComment('');
-      await fetchComments();
+      addComment(created);
     } catch (err) {
       console.error('댓글 작성 실패:', err);
       alert('댓글 작성에 실패했습니다.');
@@ -54,8 +88,8 @@ const CommentSection = ({ diaryId }) => {
 
   const handleUpdateComment = async (commentId, content) => {
     try {
-      await commentAPI.update(commentId, content);
-      await fetchComments();
+      const updated = await commentAPI.update(commentId, content);
+      patchComment(commentId, { content: updated.content, updated_at: updated.updated_at });
     } catch (err) {
       console.error('댓글 수정 실패:', err);
       alert('댓글 수정에 실패했습니다.');
@@ -69,7 +103,7 @@ const CommentSection = ({ diaryId }) => {
 
     try {
       await commentAPI.delete(commentId);
-      await fetchComments();
+      removeComment(commentId);
     } catch (err) {
       console.error('댓글 삭제 실패:', err);
       alert('댓글 삭제에 실패했습니다.');
@@ -144,7 +178,7 @@ const CommentSection = ({ diaryId }) => {
         </div>
       ) : (
         <div className="space-y-4">
-          {comments.map((comment) => (
+          {sortedComments.map((comment) => (
             <Comment
               key={comment.id}
               comment={comment}
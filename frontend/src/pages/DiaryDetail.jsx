@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
-import { diaryAPI, likeAPI } from '../services/api';
+import { diaryAPI, likeAPI, eventsAPI } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import CommentSection from '../components/CommentSection';
 
@@ -18,6 +18,13 @@ const DiaryDetail = () => {
     fetchDiary();
   }, [id]);
 
+  // 다른 사용자의 좋아요도 실시간 반영
+  useEffect(() => {
+    return eventsAPI.subscribeDiary(id, {
+      'diary.likes': (data) => setLikesCount(data.likes_count),
+    });
+  }, [id]);
+
   const fetchDiary = async () => {
     try {
       setLoading(true);
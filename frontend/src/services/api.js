@@ -23,46 +23,190 @@ api.interceptors.request.use(
   }
 );
 
-// 응답 인터셉터: 인증 오류 처리
+// 로그인/재발급 응답의 토큰 저장
+const saveTokens = (data) => {
+  if (data.access_token) {
+    localStorage.setItem('access_token', data.access_token);
+  }
+  if (data.refresh_token) {
+    localStorage.setItem('refresh_token', data.refresh_token);
+  }
+  if (data.user) {
+    localStorage.setItem('user', JSON.stringify(data.user));
+  }
+};
+
+const clearTokens = () => {
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+  localStorage.removeItem('user');
+  // 응답에 사용자별 값(is_liked 등)이 들어 있으므로 캐시도 비움
+  clearCache();
+};
+
+// 진행 중인 토큰 재발급 (동시에 401을 받은 요청들은 같은 재발급을 기다림)
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    // 인터셉터가 다시 걸리지 않도록 api 인스턴스 대신 axios로 직접 호출
+    refreshPromise = (refreshToken
+      ? axios.post(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        saveTokens(response.data);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
+// 응답 인터셉터: 액세스 토큰 만료 시 리프레시 토큰으로 재발급 후 재시도
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      // 토큰 만료 시 로그아웃
-      localStorage.removeItem('access_token');
-      localStorage.removeItem('user');
-      window.location.href = '/login';
+  async (error) => {
+    const original = error.config;
+    const isAuthRequest = original?.url?.startsWith('/auth/login') || original?.url === '/auth/refresh';
+
+    if (error.response?.status === 401 && original && !original._retry && !isAuthRequest) {
+      original._retry = true;
+      try {
+        // 다른 탭이 이미 재발급했으면 새 토큰으로 바로 재시도
+        const sentToken = original.headers?.Authorization?.replace('Bearer ', '');
+        const storedToken = localStorage.getItem('access_token');
+        const token = storedToken && storedToken !== sentToken ? storedToken : await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        // 재발급 실패 시 로그아웃
+        clearTokens();
+        window.location.href = '/login';
+        return Promise.reject(refreshError);
+      }
     }
     return Promise.reject(error);
   }
 );
 
+// GET 응답 캐시 (stale-while-revalidate)
+// - 같은 요청이 진행 중이면 새로 보내지 않고 그 응답을 같이 기다림
+// - CACHE_FRESH_MS 안에는 캐시를 그대로 쓰고, CACHE_MAX_AGE_MS까지는 캐시를 먼저 돌려준 뒤 뒤에서 다시 조회
+// - 키는 URL과 정렬한 쿼리 파라미터. 변경 요청은 관련 키를 무효화하고, 로그인/로그아웃 시 전부 비움
+const CACHE_FRESH_MS = 10 * 1000;
+const CACHE_MAX_AGE_MS = 5 * 60 * 1000;
+const CACHE_MAX_ENTRIES = 100;
+
+const cache = new Map(); // key -> { data, fetchedAt }
+const inflight = new Map(); // key -> Promise
+
+const cacheKey = (url, params) => {
+  const query = Object.keys(params || {})
+    .sort()
+    .map((name) => `${name}=${encodeURIComponent(params[name])}`)
+    .join('&');
+  return query ? `${url}?${query}` : url;
+};
+
+const fetchAndStore = (key, url, params) => {
+  const promise = api
+    .get(url, { params })
+    .then((response) => {
+      // 응답을 기다리는 동안 무효화됐으면 저장하지 않음 (변경 전 데이터일 수 있음)
+      if (inflight.get(key) === promise) {
+        cache.delete(key);
+        cache.set(key, { data: response.data, fetchedAt: Date.now() });
+        // Map은 넣은 순서를 유지하므로 가장 오래된 항목부터 제거
+        while (cache.size > CACHE_MAX_ENTRIES) {
+          cache.delete(cache.keys().next().value);
+        }
+      }
+      return response.data;
+    })
+    .finally(() => {
+      if (inflight.get(key) === promise) inflight.delete(key);
+    });
+  inflight.set(key, promise);
+  return promise;
+};
+
+const cachedGet = (url, params) => {
+  const key = cacheKey(url, params);
+  const entry = cache.get(key);
+  const age = entry ? Date.now() - entry.fetchedAt : Infinity;
+
+  if (age < CACHE_FRESH_MS) {
+    return Promise.resolve(entry.data);
+  }
+  if (age < CACHE_MAX_AGE_MS) {
+    // 오래된 값을 바로 돌려주고 다음 조회를 위해 뒤에서 갱신 (실패하면 다음에 다시 시도)
+    if (!inflight.has(key)) {
+      fetchAndStore(key, url, params).catch(() => {});
+    }
+    return Promise.resolve(entry.data);
+  }
+  return inflight.get(key) || fetchAndStore(key, url, params);
+};
+
+// 조건에 맞는 키 무효화 (문자열은 접두사, 함수는 키를 받아 판단)
+const invalidate = (...matchers) => {
+  const matches = (key) =>
+    matchers.some((m) => (typeof m === 'function' ? m(key) : key.startsWith(m)));
+  [cache, inflight].forEach((map) => {
+    [...map.keys()].forEach((key) => {
+      if (matches(key)) map.delete(key);
+    });
+  });
+};
+
+const clearCache = () => {
+  cache.clear();
+  inflight.clear();
+};
+
+// 브라우저가 한가할 때 실행 (requestIdleCallback이 없으면 setTimeout)
+const whenIdle = (callback) => {
+  if (typeof window !== 'undefined' && window.requestIdleCallback) {
+    window.requestIdleCallback(callback, { timeout: 2000 });
+  } else {
+    setTimeout(callback, 200);
+  }
+};
+
+// 일기 목록에 영향을 주는 키 (피드, 내 일기)
+const DIARY_LISTS = ['/diaries?', '/diaries/me?'];
+const isCommentKey = (key) => key.includes('/comments');
+
 // 인증 API
 export const authAPI = {
   // 회원가입
   register: async (userData) => {
     const response = await api.post('/auth/register', userData);
-    if (response.data.access_token) {
-      localStorage.setItem('access_token', response.data.access_token);
-      localStorage.setItem('user', JSON.stringify(response.data.user));
-    }
+    clearCache();
+    saveTokens(response.data);
     return response.data;
   },
 
   // 로그인
   login: async (credentials) => {
     const response = await api.post('/auth/login-json', credentials);
-    if (response.data.access_token) {
-      localStorage.setItem('access_token', response.data.access_token);
-      localStorage.setItem('user', JSON.stringify(response.data.user));
-    }
+    clearCache();
+    saveTokens(response.data);
     return response.data;
   },
 
   // 로그아웃
   logout: () => {
-    localStorage.removeItem('access_token');
-    localStorage.removeItem('user');
+    // 서버의 리프레시 토큰도 폐기 (실패해도 로컬 로그아웃은 진행)
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      axios.post(`${API_BASE_URL}/auth/logout`, { refresh_token: refreshToken }).catch(() => {});
+    }
+    clearTokens();
   },
 
   // 현재 사용자 정보
@@ -93,6 +237,9 @@ export const authAPI = {
       },
     });
 
+    // 목록/상세 응답의 작성자 정보가 바뀌므로 캐시를 비움
+    clearCache();
+
     // 업데이트된 사용자 정보를 로컬 스토리지에 저장
     if (response.data) {
       localStorage.setItem('user', JSON.stringify(response.data));
@@ -104,48 +251,85 @@ export const authAPI = {
   // 회원정보 수정
   updateProfile: async (data) => {
     const response = await api.put('/auth/update-profile', data);
+    clearCache();
     return response.data;
   },
 };
 
 // 일기 API
 export const diaryAPI = {
-  // 일기 목록 조회
+  // 일기 목록 조회 (다음 페이지는 한가할 때 미리 불러옴)
   getAll: async (skip = 0, limit = 10, publicOnly = true) => {
-    const response = await api.get('/diaries', {
-      params: { skip, limit, public_only: publicOnly }
-    });
-    return response.data;
+    const data = await cachedGet('/diaries', { skip, limit, public_only: publicOnly });
+    if (skip + limit < data.total) {
+      whenIdle(() => {
+        cachedGet('/diaries', { skip: skip + limit, limit, public_only: publicOnly }).catch(() => {});
+      });
+    }
+    return data;
   },
 
   // 일기 상세 조회
   getById: async (id) => {
-    const response = await api.get(`/diaries/${id}`);
-    return response.data;
+    return cachedGet(`/diaries/${id}`);
   },
 
   // 일기 생성
   create: async (diaryData) => {
     const response = await api.post('/diaries', diaryData);
+    invalidate(...DIARY_LISTS);
     return response.data;
   },
 
   // 일기 수정
   update: async (id, diaryData) => {
     const response = await api.put(`/diaries/${id}`, diaryData);
+    invalidate(`/diaries/${id}`, ...DIARY_LISTS);
     return response.data;
   },
 
-  // 일기 삭제
+  // 일기 삭제 (댓글도 함께 지워지므로 내 댓글 목록도 무효화)
   delete: async (id) => {
     const response = await api.delete(`/diaries/${id}`);
+    invalidate(`/diaries/${id}`, ...DIARY_LISTS, '/comments/me');
     return response.data;
   },
   // 현재 사용자 일기 조회
   getMine: async (skip = 0, limit = 10) => {
-    const response = await api.get('/diaries/me', {
-      params: { skip, limit }
+    return cachedGet('/diaries/me', { skip, limit });
+  },
+};
+
+// 일기 첨부 이미지 API
+export const imageAPI = {
+  // 이미지 업로드 (파일을 본문 그대로 전송, 응답의 id를 일기 작성/수정의 images에 넣음)
+  upload: async (file) => {
+    const response = await api.post('/images/', file, {
+      headers: {
+        'Content-Type': file.type || 'application/octet-stream',
+      },
+    });
+    return response.data;
+  },
+};
+
+// 계정 내보내기/가져오기 API (NDJSON)
+export const accountAPI = {
+  // 내 일기와 댓글 전체를 NDJSON 파일(Blob)로 내려받기
+  exportData: async () => {
+    const response = await api.get('/me/export', { responseType: 'blob' });
+    return response.data;
+  },
+
+  // NDJSON 파일 가져오기 (끊기면 같은 importId로 같은 파일을 다시 보내면 이어서 가져옴)
+  importData: async (file, importId) => {
+    const response = await api.post('/me/import', file, {
+      params: { import_id: importId },
+      headers: {
+        'Content-Type': 'application/x-ndjson',
+      },
     });
+    clearCache();
     return response.data;
   },
 };
@@ -154,31 +338,30 @@ export const diaryAPI = {
 export const commentAPI = {
   // 댓글 목록 조회
   getComments: async (diaryId, sortBy = 'newest') => {
-    const response = await api.get(`/diaries/${diaryId}/comments`, {
-      params: { sort_by: sortBy }
-    });
-    return response.data;
+    return cachedGet(`/diaries/${diaryId}/comments`, { sort_by: sortBy });
   },  // 댓글 생성
   create: async (diaryId, content) => {
     const response = await api.post(`/diaries/${diaryId}/comments`, { content });
+    invalidate(`/diaries/${diaryId}`, ...DIARY_LISTS, '/comments/me');
     return response.data;
   },
 
-  // 댓글 수정
+  // 댓글 수정 (어느 일기의 댓글인지 모르므로 댓글 목록 전체를 무효화)
   update: async (commentId, content) => {
     const response = await api.put(`/comments/${commentId}`, { content });
+    invalidate(isCommentKey);
     return response.data;
   },
 
   // 댓글 삭제
   delete: async (commentId) => {
     const response = await api.delete(`/comments/${commentId}`);
+    invalidate(isCommentKey, ...DIARY_LISTS);
     return response.data;
   },
   // 현재 사용자 댓글 조회
   getMine: async () => {
-    const response = await api.get('/comments/me');
-    return response.data;
+    return cachedGet('/comments/me');
   },
 };
 
@@ -187,14 +370,61 @@ export const likeAPI = {
   // 일기 좋아요 토글
   toggleDiaryLike: async (diaryId) => {
     const response = await api.post(`/diaries/${diaryId}/like`);
+    invalidate((key) => key === `/diaries/${diaryId}`, ...DIARY_LISTS);
     return response.data;
   },
 
   // 댓글 좋아요 토글
   toggleCommentLike: async (commentId) => {
     const response = await api.post(`/comments/${commentId}/like`);
+    invalidate(isCommentKey);
     return response.data;
   },
 };
 
+// 실시간 이벤트 API (SSE)
+// 같은 일기를 여러 컴포넌트가 구독해도 EventSource 연결은 하나만 유지
+const eventSources = {};
+
+export const eventsAPI = {
+  // 일기 이벤트 구독: handlers = { 'comment.created': (data) => ..., ready: (data, isReconnect) => ... }
+  // 반환값은 구독 해제 함수
+  subscribeDiary: (diaryId, handlers) => {
+    let entry = eventSources[diaryId];
+    if (!entry) {
+      const source = new EventSource(`${API_BASE_URL}/diaries/${diaryId}/events`);
+      entry = { source, subscribers: new Set(), connected: false, listening: new Set() };
+      // 서버는 연결될 때마다 ready를 보내므로 두 번째부터는 재연결 (놓친 이벤트는 다시 조회로 보정)
+      source.addEventListener('ready', (e) => {
+        const isReconnect = entry.connected;
+        // 끊긴 동안 바뀌었을 수 있으므로 이 일기의 캐시를 버림
+        if (isReconnect) invalidate(`/diaries/${diaryId}`);
+        entry.connected = true;
+        entry.subscribers.forEach((h) => h.ready?.(JSON.parse(e.data), isReconnect));
+      });
+      eventSources[diaryId] = entry;
+    }
+
+    Object.keys(handlers).forEach((type) => {
+      if (type === 'ready' || entry.listening.has(type)) return;
+      entry.listening.add(type);
+      entry.source.addEventListener(type, (e) => {
+        const data = JSON.parse(e.data);
+        // 다른 사용자의 변경으로 캐시된 상세/댓글 응답이 오래됐으므로 무효화
+        invalidate(`/diaries/${diaryId}`);
+        entry.subscribers.forEach((h) => h[type]?.(data));
+      });
+    });
+    entry.subscribers.add(handlers);
+
+    return () => {
+      entry.subscribers.delete(handlers);
+      if (entry.subscribers.size === 0) {
+        entry.source.close();
+        delete eventSources[diaryId];
+      }
+    };
+  },
+};
+
 export default api;